@@ -1,7 +1,5 @@
 import json
 
-import requests
-
 from apps import App, action
 
 
@@ -12,7 +10,7 @@ class DailyQuote(App):
         App.__init__(self, app_name, device, context)
         self.introMessage = {"message": "Quote App"}
         self.baseUrl = "http://quotes.rest/qod.json?category=inspire"
-        self.s = requests.Session()
+        self.s = self.get_http_client("http://quotes.rest")
 
     # Returns the message defined in init above
     @action
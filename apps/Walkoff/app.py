@@ -1,7 +1,6 @@
 import logging
 import time
 
-import requests
 from requests.exceptions import Timeout
 
 import walkoff.config
@@ -39,6 +38,8 @@ class Walkoff(App):
             self.walkoff_address = "http://"
         self.walkoff_address += self.device_fields['ip']
         self.walkoff_address += ':{}'.format(self.device_fields['port'])
+        verify = walkoff.config.Config.CERTIFICATE_PATH if self.is_https else True
+        self.client = self.get_http_client(self.walkoff_address, verify=verify)
 
     @action
     def connect(self, timeout=DEFAULT_TIMEOUT):
@@ -189,27 +190,18 @@ class Walkoff(App):
             return 'Unknown error occurred', 'UnknownResponse'
 
     def _format_request_args(self, address, timeout, headers=None, data=None, **kwargs):
-        address = '{0}{1}'.format(self.walkoff_address, address)
         args = kwargs
         args['timeout'] = timeout
         if not (self.headers is None and headers is None):
             args['headers'] = headers if headers is not None else self.headers
         if data is not None:
             args['json'] = data
-        if self.is_https:
-            args['verify'] = walkoff.config.Config.CERTIFICATE_PATH
         return address, args
 
     def _request(self, method, address, timeout, headers=None, data=None, **kwargs):
         address, args = self._format_request_args(address, timeout, headers, data, **kwargs)
-        if method == 'put':
-            return requests.put(address, **args)
-        elif method == 'post':
-            return requests.post(address, **args)
-        elif method == 'get':
-            return requests.get(address, **args)
-        elif method == 'delete':
-            return requests.delete(address, **args)
+        if method in ('put', 'post', 'get', 'delete'):
+            return self.client.request(method, address, **args)
 
     def request_with_refresh(self, method, address, timeout, headers=None, data=None, **kwargs):
         if self.is_connected:
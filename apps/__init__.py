@@ -9,6 +9,7 @@ from walkoff.cache import make_cache
 import walkoff.config
 
 from walkoff.appgateway.decorators import *
+from walkoff.appgateway.httpclient import HttpClient, get_http_client_pool
 
 _logger = logging.getLogger(__name__)
 _console_handler = ConsoleLoggingHandler()
@@ -24,6 +25,7 @@ _reserved_fields = [
         'device_id',
         'context',
         '_cache',
+        '_http_clients',
         '__cache_separator'
         '_is_walkoff_app',
     ]
@@ -57,6 +59,7 @@ class App(object):
         self.device_id = device
         self.context = context
         self._cache = make_cache(walkoff.config.Config.CACHE)
+        self._http_clients = []
 
     def _format_cache_key(self, field_name):
         return self.__cache_separator.join(
@@ -92,19 +95,63 @@ class App(object):
         for key in self._cache.scan(self._get_field_pattern()):
             self._cache.delete(key)
 
+    def get_http_client(self, base_url, timeout=None, max_connections=None, max_retries=None, backoff_factor=None,
+                        verify=True):
+        """Gets an HTTP client for a base URL. The client is shared by the app instances in the worker which use the
+        same base URL and options, so that their requests reuse its keep-alive connections, and it is released when the
+        app instance is shut down. Options which are not given default to the HTTP_CLIENT settings of the configuration
+        Args:
+            base_url (str): The URL which relative request paths are joined to
+            timeout (float, optional): The default number of seconds to wait for the server to respond
+            max_connections (int, optional): The maximum number of connections kept open to the server
+            max_retries (int, optional): The maximum number of times to retry a request
+            backoff_factor (float, optional): The factor of the exponential backoff between retries
+            verify (bool|str, optional): Whether or not to verify the server's TLS certificate, or the path to the CA
+                bundle to verify it with. Defaults to True.
+        Returns:
+            walkoff.appgateway.httpclient.HttpClient: The client
+        """
+        config = walkoff.config.Config
+        client = get_http_client_pool().acquire(
+            base_url,
+            timeout=timeout if timeout is not None else config.HTTP_CLIENT_TIMEOUT_SECONDS,
+            max_connections=max_connections if max_connections is not None else config.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_retries=max_retries if max_retries is not None else config.HTTP_CLIENT_MAX_RETRIES,
+            backoff_factor=backoff_factor if backoff_factor is not None else config.HTTP_CLIENT_BACKOFF_FACTOR,
+            verify=verify)
+        self._http_clients.append(client)
+        return client
+
+    def _release_http_clients(self):
+        clients, self._http_clients = self._http_clients, []
+        for client in clients:
+            get_http_client_pool().release(client)
+
     def shutdown(self):
         """When implemented, this method performs shutdown procedures for the app
         """
         pass
 
+    def is_healthy(self):
+        """When implemented, this method checks whether the app can still be used, for example whether its session
+        with the device is still valid. It is called before a pooled app instance is reused, and unhealthy instances
+        are shut down
+        Returns:
+            bool: Whether or not the app can still be used
+        """
+        return True
+
     def __getstate__(self):
         state = self.__dict__.copy()
         state.pop('_cache', None)
+        state.pop('_http_clients', None)
         return state
 
     def __setstate__(self, state):
         self.__dict__.update(state)
         self.__dict__['_cache'] = make_cache(walkoff.config.Config.CACHE)
+        # Unpickled HttpClients are acquired from the pool again, so they are released when the app is shut down
+        self.__dict__['_http_clients'] = [value for value in state.values() if isinstance(value, HttpClient)]
 
 #    def __getattribute__(self, item):
 #        try:
@@ -2,6 +2,8 @@
 
 import logging
 import os
+import threading
+from contextlib import contextmanager
 from timeit import default_timer as timer
 
 import falcon
@@ -11,18 +13,22 @@ from jsonschema import validate, ValidationError
 
 import walkoff.config
 from apps import App
-from walkoff.appgateway import cache_apps, get_app
+from walkoff.appgateway import get_app
 from walkoff.appgateway.accumulators import ExternallyCachedAccumulator
-from walkoff.appgateway.apiutil import UnknownFunction
+from walkoff.appgateway.apiutil import UnknownApp, UnknownFunction, InvalidArgument, get_condition_api, \
+    get_transform_api
+from walkoff.appgateway.validator import validate_condition_parameters, validate_transform_parameters
 from walkoff.cache import make_cache
 from walkoff.events import WalkoffEvent
 from walkoff.executiondb import ExecutionDatabase
+from walkoff.executiondb.argument import Argument
 from walkoff.helpers import ExecutionError
 from walkoff.multiprocessedexecutor.kafka_senders import KafkaWorkflowResultsSender
 from walkoff.worker.action_exec_strategy import LocalActionExecutionStrategy, ExecutableContext
 from walkoff.worker.workflow_exec_context import RestrictedWorkflowContext
 
 app_name = os.environ.get('APP_NAME')
+inline_result_max_bytes = int(os.environ.get('INLINE_RESULT_MAX_BYTES', 65536))
 
 
 def make_logger():
@@ -58,6 +64,17 @@ def parse_openapi(path):
         raise
 
 
+def parse_openapi_definition(path, name):
+    logger.debug('Parsing definition {} of OpenAPI file at {}'.format(name, path))
+    try:
+        with open(path) as openapi:
+            definitions = yaml.safe_load(openapi)['definitions']
+        return {'$ref': '#/definitions/{}'.format(name), 'definitions': definitions}
+    except (OSError, IOError) as e:
+        logger.fatal('Could not parse OpenAPI specification', exc_info=True)
+        raise
+
+
 def make_redis():
     redis_host = os.environ.get('REDIS_HOST')
     redis_port = os.environ.get('REDIS_PORT', 6379)
@@ -84,19 +101,33 @@ def make_execution_db():
 
 app_path = os.environ.get('APP_PATH', './app')
 
-cache_apps(app_path)
 walkoff.config.load_app_apis(app_path)
 execution_post_schema = parse_openapi(os.environ.get('OPENAPI_PATH', 'api.yaml'))
+segment_post_schema = parse_openapi_definition(os.environ.get('OPENAPI_PATH', 'api.yaml'), 'SegmentExecutionContext')
 redis_cache = make_redis()
 execution_db = make_execution_db()
 
 
 class ActionExecution(object):
 
-    def __init__(self, strategy, kafka_sender, accumulator):
+    def __init__(self, strategy, kafka_sender, cache):
+        """Requests may be handled concurrently by several threads, so each request uses its own view of the
+            accumulator, and the context of the workflow which sent it is kept per thread. A single event handler routes
+            the events sent while executing to the workflow of the request which sent them.
+        """
         self.strategy = strategy
-        self.accumulator = accumulator
+        self.cache = cache
         self.kafka_sender = kafka_sender
+        self._request_context = threading.local()
+        WalkoffEvent.CommonWorkflowSignal.connect(self.handle_event)
+
+    def make_accumulator(self, workflow_exec_id):
+        return ExternallyCachedAccumulator(self.cache, workflow_exec_id)
+
+    def handle_event(self, sender, **kwargs):
+        workflow_context = getattr(self._request_context, 'workflow_context', None)
+        if workflow_context is not None:
+            self.kafka_sender.handle_event(workflow_context, sender, **kwargs)
 
     def on_post(self, req, resp, workflow_exec_id, action_exec_id):
 
@@ -114,7 +145,7 @@ class ActionExecution(object):
 
         workflow_context = {'workflow_{}'.format(key): value for key, value in data['workflow_context'].items()}
         workflow_context['workflow_execution_id'] = workflow_exec_id
-        self.accumulator.set_key(workflow_exec_id)
+        accumulator = self.make_accumulator(workflow_exec_id)
         action_context = data['executable_context']
         executable_context = ExecutableContext(
             action_context['type'],
@@ -123,40 +154,49 @@ class ActionExecution(object):
             action_context['id']
         )
 
-        restricted_workflow_context = RestrictedWorkflowContext(
+        with self.request_context(workflow_exec_id, data['workflow_context']):
+            resp.media = self.execute(workflow_context, action_context, executable_context, accumulator,
+                                      data['arguments'])
+
+    @contextmanager
+    def request_context(self, workflow_exec_id, workflow_context):
+        self._request_context.workflow_context = RestrictedWorkflowContext(
             workflow_exec_id,
-            workflow_context['workflow_id'],
-            workflow_context['workflow_name']
+            workflow_context['id'],
+            workflow_context['name']
         )
+        try:
+            yield
+        finally:
+            self._request_context.workflow_context = None
 
-        @WalkoffEvent.CommonWorkflowSignal.connect
-        def handle_event(sender, **kwargs):
-            self.kafka_sender.handle_event(restricted_workflow_context, sender, **kwargs)
-
+    def execute(self, workflow_context, action_context, executable_context, accumulator, arguments):
         if 'device_id' in action_context:
             app_instance = self.create_device(workflow_context, action_context['device_id'])
         else:
             logger.debug('App instance creation not required.')
             app_instance = None
 
-        arguments = {arg['name']: arg['value'] for arg in data['arguments']}
+        arguments = {arg['name']: arg['value'] for arg in arguments}
 
         try:
             logger.info('Executing {}'.format(str(executable_context)))
             result = self.strategy.execute_from_context(
                 executable_context,
-                self.accumulator,
+                accumulator,
                 arguments,
                 instance=app_instance
             )
             if executable_context.is_action():
                 result.set_default_status(app_name, executable_context.executable_name)
                 result_status = result.status
+                result = result.result
             else:
                 result_status = 'Success'
         except ExecutionError as e:
             logger.exception('Unhandled exception while executing {}'.format(str(executable_context)))
             result_status = 'UnhandledException'
+            result = None
         except UnknownFunction:
             logger.error('Unknown function {} of type {}'.format(
                 executable_context.executable_name,
@@ -167,9 +207,19 @@ class ActionExecution(object):
                 description='Unknown {} {}'.format(executable_context.type, executable_context.executable_name)
             )
 
-        result = {'status': result_status, 'result_key': self.accumulator.format_key(str(executable_context.id))}
-        logger.info('Result of executing {}: {}'.format(str(executable_context), result))
-        resp.media = result
+        response = {'status': result_status, 'result_key': accumulator.format_key(str(executable_context.id))}
+        logger.info('Result of executing {}: {}'.format(str(executable_context), response))
+        if result_status != 'UnhandledException' and self.is_inline_result(result):
+            response['result'] = result
+        return response
+
+    @staticmethod
+    def is_inline_result(result):
+        """Small results are returned in the response, so that the caller does not have to read them from the cache"""
+        try:
+            return len(ujson.dumps(result)) <= inline_result_max_bytes
+        except (TypeError, ValueError, OverflowError):
+            return False
 
     @staticmethod
     def format_app_instance_key(workflow_execution_id, device_id):  # do we need a app name?
@@ -184,17 +234,110 @@ class ActionExecution(object):
         logger.info('Creating app instance for workflow {}, device {}'.format(workflow_exec_id, device_id))
         redis_key = ActionExecution.format_app_instance_key(workflow_exec_id, device_id)
         app_class = get_app(app_name)
-        if not redis_cache.cache.sismember(app_instance_set_name, redis_key):
-            # If workflows become parallelized, this will need to be locked
+        # Adding to the set is atomic, so only one of several concurrent requests for the device creates the instance
+        if self.cache.cache.sadd(app_instance_set_name, redis_key):
             logger.info('Creating new app instance')
-            app_instance = app_class(app_name, device_id, workflow_context)
-            redis_cache.cache.sadd(app_instance_set_name, redis_key)
-            return app_instance
+            try:
+                return app_class(app_name, device_id, workflow_context)
+            except Exception:
+                # The instance was never created, so later requests must not try to load it from the cache
+                self.cache.cache.srem(app_instance_set_name, redis_key)
+                raise
         else:
             logger.debug('Using existing app instance')
             return App.from_cache(app_name, device_id, workflow_context)
 
 
+class SegmentExecution(object):
+
+    # A segment is an ordered run of the transforms and condition of a condition which all belong to this app. The
+    # output of each step is the input of the next, and the references in their arguments are resolved against the
+    # accumulator here, so that the worker executes the whole segment in a single request.
+    _api_lookup = {
+        'condition': (get_condition_api, validate_condition_parameters),
+        'transform': (get_transform_api, validate_transform_parameters)
+    }
+
+    def __init__(self, action_execution):
+        self.action_execution = action_execution
+
+    def on_post(self, req, resp, workflow_exec_id):
+
+        data = req.json
+        try:
+            validate(data, segment_post_schema)
+        except ValidationError as e:
+            logger.error('Schema validation error while parsing segment request for workflow_id {}'.format(
+                workflow_exec_id))
+            raise falcon.HTTPBadRequest('Invalid segment request', str(e))
+
+        for executable in data['executables']:
+            if executable['executable_context']['type'] not in self._api_lookup:
+                raise falcon.HTTPBadRequest('Invalid segment request', 'Segments may only contain conditions and '
+                                                                       'transforms')
+
+        accumulator = self.action_execution.make_accumulator(workflow_exec_id)
+        with self.action_execution.request_context(workflow_exec_id, data['workflow_context']):
+            resp.media = self.execute(accumulator, data['data_in'], data['executables'])
+
+    def execute(self, accumulator, data, executables):
+        results = []
+        result_index = -1
+        for index, executable in enumerate(executables):
+            executable_context = ExecutableContext(
+                executable['executable_context']['type'],
+                app_name,
+                executable['executable_context']['name'],
+                executable['executable_context']['id']
+            )
+            try:
+                status, result = self.execute_step(executable_context, accumulator, data, executable['arguments'])
+            except (UnknownApp, UnknownFunction):
+                logger.error('Unknown function {} of type {}'.format(
+                    executable_context.executable_name,
+                    executable_context.type)
+                )
+                raise falcon.HTTPNotFound(
+                    title='Unknown {}'.format(executable_context.type),
+                    description='Unknown {} {}'.format(executable_context.type, executable_context.executable_name)
+                )
+            if status == 'Success':
+                data = result
+                result_index = index
+            results.append({'status': status, 'result_key': accumulator.format_key(str(executable_context.id))})
+
+        response = {'results': results, 'result_index': result_index}
+        logger.info('Result of executing segment: {}'.format(response))
+        if result_index >= 0 and self.action_execution.is_inline_result(data):
+            response['result'] = data
+        return response
+
+    def execute_step(self, executable_context, accumulator, data, arguments):
+        get_api, validate_parameters = self._api_lookup[executable_context.type]
+        data_param_name, _, api = get_api(app_name, executable_context.executable_name)
+        arguments = [Argument(arg['name'], value=arg.get('value'), reference=arg.get('reference'),
+                              selection=arg.get('selection'))
+                     for arg in arguments if arg['name'] != data_param_name]
+        arguments.append(Argument(data_param_name, value=data))
+        try:
+            arguments = validate_parameters(api, arguments, executable_context.executable_name,
+                                            accumulator=accumulator)
+        except InvalidArgument:
+            logger.exception('Invalid arguments for {}'.format(str(executable_context)))
+            return 'InvalidArguments', None
+
+        try:
+            logger.info('Executing {}'.format(str(executable_context)))
+            return 'Success', self.action_execution.strategy.execute_from_context(
+                executable_context,
+                accumulator,
+                arguments
+            )
+        except ExecutionError:
+            logger.exception('Unhandled exception while executing {}'.format(str(executable_context)))
+            return 'UnhandledException', None
+
+
 class WorkflowExecution(object):
 
     def on_delete(self, req, resp, workflow_exec_id):
@@ -257,17 +400,17 @@ class JsonMiddleware(object):
 
 api = application = falcon.API(middleware=[JsonMiddleware()])
 
-accumulator = ExternallyCachedAccumulator(redis_cache, 'null')
-
 kafka_sender = KafkaWorkflowResultsSender(execution_db)
 
-action_executions = ActionExecution(LocalActionExecutionStrategy(fully_cached=True), kafka_sender, accumulator)
+action_executions = ActionExecution(LocalActionExecutionStrategy(fully_cached=True), kafka_sender, redis_cache)
+segment_executions = SegmentExecution(action_executions)
 workflow_executions = WorkflowExecution()
 health_resource = Health()
 
 api.add_route(
     '/workflows/{workflow_exec_id:uuid}/actions/{action_exec_id:uuid}',
     action_executions)
+api.add_route('/workflows/{workflow_exec_id:uuid}/segments', segment_executions)
 api.add_route('/workflows/{workflow_exec_id:uuid}', workflow_executions)
 api.add_route('/health', health_resource)
 
@@ -41,8 +41,8 @@ def accumulator():
 
 
 @pytest.fixture
-def action_executor(accumulator, kafka_client):
-    return runtime.ActionExecution(LocalActionExecutionStrategy(fully_cached=True), kafka_client, accumulator)
+def action_executor(kafka_client):
+    return runtime.ActionExecution(LocalActionExecutionStrategy(fully_cached=True), kafka_client, runtime.redis_cache)
 
 
 def make_execute_url(workflow_execution_id, executable_execution_id):
@@ -121,10 +121,35 @@ def test_execute_transform(client, accumulator):
     resp = client.simulate_post(url, json=doc)
     assert resp.status_code == 200
     expected_key = accumulator.format_key(executable_id)
-    assert resp.json == {'status': 'Success', 'result_key': expected_key}
+    assert resp.json == {'status': 'Success', 'result_key': expected_key, 'result': 1}
     # assert accumulator[expected_key].decode('utf-8') == '1' #unknown why this says key doesn't exist. Manual testing with redis-cli confirms it exists
 
 
+def test_execute_transform_large_result_not_inline(client, accumulator, monkeypatch):
+    monkeypatch.setattr(runtime, 'inline_result_max_bytes', 1)
+    workflow_execution_id = str(uuid4())
+    executable_execution_id = str(uuid4())
+    accumulator.set_key(workflow_execution_id)
+    arguments = [
+        {
+            'name': 'json_in',
+            'value': {'a': 100, 'b': ['d', 'e', 'f']}
+        },
+        {
+            'name': 'element',
+            'value': 'a'
+        }
+    ]
+    doc = make_execution_json('transform', 'select json', arguments=arguments)
+    executable_id = get_exec_id_from_exec_json(doc)
+
+    url = make_execute_url(workflow_execution_id, executable_execution_id)
+    resp = client.simulate_post(url, json=doc)
+    assert resp.status_code == 200
+    expected_key = accumulator.format_key(executable_id)
+    assert resp.json == {'status': 'Success', 'result_key': expected_key}
+
+
 def test_execute_transform_execution_error(client, accumulator):
     workflow_execution_id = str(uuid4())
     executable_execution_id = str(uuid4())
@@ -169,7 +194,7 @@ def test_execute_condition(client, accumulator):
     resp = client.simulate_post(url, json=doc)
     assert resp.status_code == 200
     expected_key = accumulator.format_key(executable_id)
-    assert resp.json == {'status': 'Success', 'result_key': expected_key}
+    assert resp.json == {'status': 'Success', 'result_key': expected_key, 'result': False}
 
 
 def test_execute_condition_execution_error(client, accumulator):
@@ -213,7 +238,7 @@ def test_execute_action_no_device(client, accumulator):
     resp = client.simulate_post(url, json=doc)
     assert resp.status_code == 200
     expected_key = accumulator.format_key(executable_id)
-    assert resp.json == {'status': 'Success', 'result_key': expected_key}
+    assert resp.json == {'status': 'Success', 'result_key': expected_key, 'result': 'aaa'}
 
 
 def test_create_device_already_in_cache(action_executor):
@@ -251,6 +276,99 @@ def test_execute_action_device_not_in_cache(action_executor):
     assert app_instance.introMessage == {'message': 'HELLO WORLD'}
 
 
+def test_create_device_constructor_fails(action_executor, monkeypatch):
+    workflow_context = {
+        'workflow_execution_id': str(uuid4()),
+        'workflow_id': str(uuid4()),
+        'workflow_name': 'TestWorkflow'
+    }
+
+    def fail_to_connect(*args, **kwargs):
+        raise IOError('Device unreachable')
+
+    monkeypatch.setattr(get_app(runtime.app_name), '__init__', fail_to_connect)
+    with pytest.raises(IOError):
+        action_executor.create_device(workflow_context, 1)
+    app_instance_key = runtime.ActionExecution.format_app_instance_key(workflow_context['workflow_execution_id'], 1)
+    assert not runtime.redis_cache.cache.sismember(runtime.app_instance_set_name, app_instance_key)
+
+
+def make_segment_url(workflow_execution_id):
+    return '/workflows/{}/segments'.format(workflow_execution_id)
+
+
+def make_segment_json(data_in, executables):
+    return {
+        'workflow_context': {
+            'name': 'TestWorkflow',
+            'id': str(uuid4())
+        },
+        'data_in': data_in,
+        'executables': [
+            {'executable_context': {'name': name, 'type': exec_type, 'id': str(uuid4())}, 'arguments': arguments}
+            for exec_type, name, arguments in executables
+        ]
+    }
+
+
+def test_execute_segment(client, accumulator):
+    workflow_execution_id = str(uuid4())
+    accumulator.set_key(workflow_execution_id)
+    reference = str(uuid4())
+    accumulator[reference] = {'numbers': [1, 2]}
+    doc = make_segment_json(
+        'abcd',
+        [('transform', 'length', []),
+         ('transform', 'mod1_filter2', [{'name': 'arg1', 'reference': reference, 'selection': ['numbers', '1']}]),
+         ('condition', 'count', [{'name': 'operator', 'value': 'e'}, {'name': 'threshold', 'value': 6}])])
+
+    resp = client.simulate_post(make_segment_url(workflow_execution_id), json=doc)
+    assert resp.status_code == 200
+    expected_results = [
+        {'status': 'Success', 'result_key': accumulator.format_key(executable['executable_context']['id'])}
+        for executable in doc['executables']]
+    assert resp.json == {'results': expected_results, 'result_index': 2, 'result': True}
+    assert accumulator[doc['executables'][1]['executable_context']['id']] == 6
+
+
+def test_execute_segment_failed_steps(client, accumulator):
+    workflow_execution_id = str(uuid4())
+    accumulator.set_key(workflow_execution_id)
+    doc = make_segment_json(
+        'abc',
+        [('transform', 'mod1_filter2', [{'name': 'arg1', 'value': 1}]),
+         ('transform', 'length', []),
+         ('condition', 'count', [{'name': 'operator', 'value': 'invalid'}, {'name': 'threshold', 'value': 3}])])
+
+    resp = client.simulate_post(make_segment_url(workflow_execution_id), json=doc)
+    assert resp.status_code == 200
+    assert [result['status'] for result in resp.json['results']] == ['InvalidArguments', 'Success', 'InvalidArguments']
+    assert resp.json['result_index'] == 1
+    assert resp.json['result'] == 3
+
+
+def test_execute_segment_unknown_function(client):
+    doc = make_segment_json('aaa', [('transform', 'length', []), ('condition', 'invalid', [])])
+    resp = client.simulate_post(make_segment_url(uuid4()), json=doc)
+    assert resp.status_code == 404
+    assert resp.json == {'title': 'Unknown condition', 'description': 'Unknown condition invalid'}
+
+
+def test_execute_segment_action_not_allowed(client):
+    doc = make_segment_json('aaa', [('transform', 'length', []), ('action', 'global1', [])])
+    resp = client.simulate_post(make_segment_url(uuid4()), json=doc)
+    assert resp.status_code == 400
+
+
+def test_execute_segment_invalid_request(client):
+    doc = make_segment_json('aaa', [('transform', 'length', [{'name': 'value', 'invalid': 'something'}])])
+    resp = client.simulate_post(make_segment_url(uuid4()), json=doc)
+    assert resp.status_code == 400
+    doc['executables'] = []
+    resp = client.simulate_post(make_segment_url(uuid4()), json=doc)
+    assert resp.status_code == 400
+
+
 def test_workflow_execution_deleted(client):
     workflow_execution_id = str(uuid4())
 
@@ -350,10 +468,10 @@ def invalid_execution_request_generator():
     yield 'not json'
 
 
-@pytest.mark.parametrize('request', [request for request in invalid_execution_request_generator()])
-def test_execute_invalid_request(request, client):  # test endpoint validation
+@pytest.mark.parametrize('execution_request', list(invalid_execution_request_generator()))
+def test_execute_invalid_request(execution_request, client):  # test endpoint validation
     workflow_execution_id = str(uuid4())
     executable_execution_id = str(uuid4())
     url = make_execute_url(workflow_execution_id, executable_execution_id)
-    resp = client.simulate_post(url, json=request)
+    resp = client.simulate_post(url, json=execution_request)
     assert resp.status_code == 400
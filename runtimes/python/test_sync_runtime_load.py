@@ -0,0 +1,109 @@
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import defaultdict
+from uuid import uuid4
+
+sys.path.append(os.path.abspath('../..'))
+
+import fakeredis
+import falcon
+import pytest
+import syncruntime as runtime
+from falcon import testing
+
+from walkoff.events import WalkoffEvent
+from walkoff.worker.action_exec_strategy import LocalActionExecutionStrategy
+
+logging.disable(logging.CRITICAL)  # comment out to see logs
+
+NUM_THREADS = 8
+REQUESTS_PER_THREAD = 25
+
+
+class StubKafkaResultsSender(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = defaultdict(list)
+
+    def handle_event(self, workflow, sender, **kwargs):
+        with self.lock:
+            self.events[str(workflow.execution_id)].append(sender)
+
+
+class EventSendingStrategy(LocalActionExecutionStrategy):
+    """Sends an event before executing, and yields so that the requests of the threads interleave"""
+
+    def execute_from_context(self, context, accumulator, arguments, instance=None):
+        WalkoffEvent.CommonWorkflowSignal.send(context.id, event=WalkoffEvent.ActionStarted)
+        time.sleep(0.001)
+        return super(EventSendingStrategy, self).execute_from_context(context, accumulator, arguments,
+                                                                      instance=instance)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    monkeypatch.setattr(runtime.redis_cache, 'cache', fakeredis.FakeStrictRedis())
+    return runtime.redis_cache
+
+
+@pytest.fixture
+def kafka_sender():
+    return StubKafkaResultsSender()
+
+
+@pytest.fixture
+def client(fake_redis, kafka_sender):
+    api = falcon.API(middleware=[runtime.JsonMiddleware()])
+    api.add_route(
+        '/workflows/{workflow_exec_id:uuid}/actions/{action_exec_id:uuid}',
+        runtime.ActionExecution(EventSendingStrategy(fully_cached=True), kafka_sender, fake_redis))
+    return testing.TestClient(api)
+
+
+def make_transform_json(value):
+    return {
+        'workflow_context': {'name': 'LoadTestWorkflow', 'id': str(uuid4())},
+        'executable_context': {'name': 'select json', 'type': 'transform', 'id': str(uuid4())},
+        'arguments': [{'name': 'json_in', 'value': {'a': value}}, {'name': 'element', 'value': 'a'}]
+    }
+
+
+def send_requests(client, thread_number, results, errors):
+    try:
+        for i in range(REQUESTS_PER_THREAD):
+            workflow_execution_id = str(uuid4())
+            value = thread_number * REQUESTS_PER_THREAD + i
+            doc = make_transform_json(value)
+            resp = client.simulate_post('/workflows/{}/actions/{}'.format(workflow_execution_id, uuid4()), json=doc)
+            results.append((workflow_execution_id, doc['executable_context']['id'], value, resp.status_code,
+                            resp.json))
+    except Exception as e:
+        errors.append(e)
+
+
+def test_concurrent_requests(client, fake_redis, kafka_sender):
+    num_receivers = len(WalkoffEvent.CommonWorkflowSignal.signal.receivers)
+    results = []
+    errors = []
+    threads = [threading.Thread(target=send_requests, args=(client, i, results, errors)) for i in range(NUM_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(results) == NUM_THREADS * REQUESTS_PER_THREAD
+    for workflow_execution_id, executable_id, value, status_code, data in results:
+        assert status_code == 200
+        assert data['status'] == 'Success'
+        assert data['result'] == value
+        assert data['result_key'] == 'accumulator:{}:{}'.format(workflow_execution_id, executable_id)
+        assert pickle.loads(fake_redis.cache.get(data['result_key'])) == value
+        assert [str(sender) for sender in kafka_sender.events[workflow_execution_id]] == [executable_id]
+
+    assert len(WalkoffEvent.CommonWorkflowSignal.signal.receivers) == num_receivers
@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from uuid import uuid4
+
+sys.path.append(os.path.abspath('.'))
+
+import walkoff.config
+from walkoff.executiondb import ExecutionDatabase
+from walkoff.executiondb.workflowresults import WorkflowStatus
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measures execution database query throughput from concurrent threads, '
+                                                 'the way worker threads and the results receiver use it')
+    parser.add_argument('-c', '--config', help='The path to the Walkoff configuration to use')
+    parser.add_argument('-t', '--threads', type=int, default=walkoff.config.Config.NUMBER_THREADS_PER_PROCESS,
+                        help='The number of concurrent threads')
+    parser.add_argument('-q', '--queries', type=int, default=1000, help='The number of queries each thread makes')
+    parser.add_argument('-p', '--pool-size', type=int, help='Overrides EXECUTION_DB_POOL_SIZE. 0 disables pooling')
+    return parser.parse_args()
+
+
+def query_workflow_statuses(execution_db, execution_ids, queries, completed, errors):
+    count = 0
+    try:
+        for i in range(queries):
+            execution_db.session.query(WorkflowStatus).filter_by(
+                execution_id=execution_ids[i % len(execution_ids)]).first()
+            execution_db.session.commit()
+            count += 1
+    except Exception as e:
+        errors.append(e)
+    finally:
+        completed.append(count)
+        execution_db.remove_session()
+
+
+def run_benchmark(execution_db, threads, queries):
+    execution_ids = [uuid4() for _ in range(100)]
+    for execution_id in execution_ids:
+        execution_db.session.add(WorkflowStatus(execution_id, uuid4(), 'benchmark'))
+    execution_db.session.commit()
+
+    completed = []
+    errors = []
+    workers = [threading.Thread(target=query_workflow_statuses,
+                                args=(execution_db, execution_ids, queries, completed, errors))
+               for _ in range(threads)]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - start
+
+    execution_db.session.query(WorkflowStatus).filter(WorkflowStatus.execution_id.in_(execution_ids)).delete(
+        synchronize_session=False)
+    execution_db.session.commit()
+    return sum(completed), elapsed, errors
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    walkoff.config.Config.load_config(args.config)
+    walkoff.config.Config.load_env_vars()
+    if args.pool_size is not None:
+        walkoff.config.Config.EXECUTION_DB_POOL_SIZE = args.pool_size
+
+    execution_db = ExecutionDatabase(walkoff.config.Config.EXECUTION_DB_TYPE, walkoff.config.Config.EXECUTION_DB_PATH,
+                                     walkoff.config.Config.EXECUTION_DB_HOST)
+    total, elapsed, errors = run_benchmark(execution_db, args.threads, args.queries)
+    print('{} database, pool {}: {} queries from {} threads in {:.2f}s ({:.0f} queries/s), {} errors'.format(
+        walkoff.config.Config.EXECUTION_DB_TYPE, execution_db.engine.pool.status(), total, args.threads, elapsed,
+        total / elapsed, len(errors)))
+    execution_db.tear_down()
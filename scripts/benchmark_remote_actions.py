@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from uuid import uuid4
+
+import requests
+
+sys.path.append(os.path.abspath('.'))
+
+from walkoff.worker.action_exec_strategy import ExecutableContext, RemoteActionExecutionStrategy
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measures the throughput of the remote action execution strategy '
+                                                 'against a local stub app service, compared to sending each request '
+                                                 'on a new connection')
+    parser.add_argument('-t', '--threads', type=int, default=3, help='The number of concurrent workflow threads')
+    parser.add_argument('-r', '--requests', type=int, default=500, help='The number of requests each thread sends')
+    return parser.parse_args()
+
+
+class StubAppService(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubAppServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = json.dumps({'status': 'Success', 'result_key': 'accumulator:key', 'result': True}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WorkflowContext(object):
+    id = str(uuid4())
+    execution_id = str(uuid4())
+    name = 'benchmark'
+
+
+def make_strategy_class(address):
+    class StubRemoteActionExecutionStrategy(RemoteActionExecutionStrategy):
+        @staticmethod
+        def format_service_url(app_name):
+            return 'http://{}:{}'.format(*address)
+
+    return StubRemoteActionExecutionStrategy
+
+
+def execute_pooled(strategy_class, requests_per_thread):
+    strategy = strategy_class(WorkflowContext)
+    for _ in range(requests_per_thread):
+        context = ExecutableContext('condition', 'HelloWorld', 'regMatch', uuid4())
+        strategy.execute_from_context(context, {}, {'value': 'aaa', 'regex': 'a'})
+
+
+def execute_unpooled(strategy_class, requests_per_thread):
+    for _ in range(requests_per_thread):
+        url = strategy_class.format_url('HelloWorld', WorkflowContext.execution_id, uuid4())
+        requests.post(url, json={'arguments': [{'name': 'value', 'value': 'aaa'}, {'name': 'regex', 'value': 'a'}]},
+                      headers={'Connection': 'close'}).json()
+
+
+def run_benchmark(target, strategy_class, threads, requests_per_thread):
+    workers = [threading.Thread(target=target, args=(strategy_class, requests_per_thread)) for _ in range(threads)]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    server = StubAppService(('127.0.0.1', 0), StubAppServiceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    strategy_class = make_strategy_class(server.server_address)
+    total = args.threads * args.requests
+    for name, target in (('new connection per request', execute_unpooled), ('pooled strategy', execute_pooled)):
+        elapsed = run_benchmark(target, strategy_class, args.threads, args.requests)
+        print('{}: {} requests from {} threads in {:.2f}s ({:.0f} requests/s)'.format(
+            name, total, args.threads, elapsed, total / elapsed))
+    RemoteActionExecutionStrategy.clear_services()
+    server.shutdown()
@@ -6,6 +6,7 @@ import signal
 import time
 
 import walkoff.config
+from walkoff.worker.forkserver import WorkerForkServer
 from walkoff.worker.worker import Worker
 
 logger = logging.getLogger(__name__)
@@ -25,10 +26,19 @@ def parse_args():
 
 
 def spawn_worker_processes():
-    """Initialize the multiprocessing pool, allowing for parallel execution of workflows.
+    """Initialize the multiprocessing pool, allowing for parallel execution of workflows. If WORKER_FORK_SERVER is
+    set, the workers are forked from a WorkerForkServer, whose template process is the last of the returned processes.
     """
     pids = []
     try:
+        if walkoff.config.Config.WORKER_FORK_SERVER and os.name != 'nt':
+            fork_server = WorkerForkServer(walkoff.config.Config.CONFIG_PATH)
+            if fork_server.start():
+                for i in range(walkoff.config.Config.NUMBER_PROCESSES):
+                    pids.append(fork_server.spawn_worker(i))
+                pids.append(fork_server.process)
+                return pids
+            logger.warning('Starting worker processes separately')
         for i in range(walkoff.config.Config.NUMBER_PROCESSES):
             pid = multiprocessing.Process(target=Worker, args=(i, walkoff.config.Config.CONFIG_PATH))
             pid.start()
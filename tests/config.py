@@ -10,6 +10,7 @@ class TestConfig(walkoff.config.Config):
     TEST_PATH = join('.', 'tests')
     WORKFLOWS_PATH = join('.', 'tests', 'testWorkflows') + sep
     APPS_PATH = join('.', 'tests', 'testapps')
+    APP_API_INDEX_PATH = ''
     DATA_DIR_NAME = 'testdata'
     DATA_PATH = join('.', 'tests', DATA_DIR_NAME)
     DEFAULT_APPDEVICE_EXPORT_PATH = join(DATA_PATH, 'appdevice.json')
@@ -22,3 +23,4 @@ class TestConfig(walkoff.config.Config):
     CACHE = {'type': 'redis', 'host': 'localhost', 'port': 6379}
     WALKOFF_DB_TYPE = 'sqlite'
     SQLALCHEMY_DATABASE_URI = format_db_path(WALKOFF_DB_TYPE, DB_PATH)
+    SCHEDULER_PERSISTENT = False
@@ -0,0 +1,182 @@
+import unittest
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from mock import MagicMock, patch
+
+import walkoff.appgateway
+import walkoff.config
+from tests.util import execution_db_help, initialize_test_config
+from tests.util.mock_objects import MockRedisCacheAdapter
+from walkoff.executiondb.metrics import WorkflowMetric
+from walkoff.executiondb.workflowresults import WorkflowStatus
+from walkoff.multiprocessedexecutor.admission import AdmissionController
+from walkoff.multiprocessedexecutor.affinity import BULK_QUEUE, REQUEST_QUEUE
+from walkoff.multiprocessedexecutor.multiprocessedexecutor import MultiprocessedExecutor
+
+
+class TestAdmissionController(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+        cls.cache = MockRedisCacheAdapter()
+
+    def setUp(self):
+        self.cache.delete(REQUEST_QUEUE)
+        self.cache.delete(BULK_QUEUE)
+        self.controller = AdmissionController(self.cache, self.execution_db)
+        self.patchers = []
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.cache.delete(REQUEST_QUEUE)
+        self.cache.delete(BULK_QUEUE)
+        self.execution_db.session.query(WorkflowMetric).delete()
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def configure(self, **options):
+        for name, value in options.items():
+            patcher = patch.object(walkoff.config.Config, name, value)
+            patcher.start()
+            self.patchers.append(patcher)
+
+    def queue_requests(self, count, queue=REQUEST_QUEUE):
+        self.cache.lpush(queue, *['request'] * count)
+
+    def test_disabled(self):
+        self.queue_requests(10)
+        decision = self.controller.admit()
+        self.assertTrue(decision.admitted)
+        self.assertFalse(decision.bulk)
+        self.assertEqual(self.controller.get_metrics()['admitted'], 1)
+        self.assertIsNone(self.controller.get_metrics()['queue'])
+
+    def test_queue_depth(self):
+        self.configure(ADMISSION_MAX_QUEUE_DEPTH=5, ADMISSION_RETRY_AFTER_SECONDS=7)
+        self.queue_requests(5)
+        self.assertTrue(self.controller.admit().admitted)
+
+        self.controller = AdmissionController(self.cache, self.execution_db)
+        self.queue_requests(1)
+        decision = self.controller.admit(3)
+        self.assertFalse(decision.admitted)
+        self.assertEqual(decision.reason, 'queue_depth')
+        self.assertEqual(decision.retry_after, 7)
+        metrics = self.controller.get_metrics()
+        self.assertDictEqual(metrics['rejected'], {'queue_depth': 3})
+        self.assertEqual(metrics['limits']['queue_depth'], 5)
+        self.assertEqual(metrics['queue']['queue_depth'], 6)
+
+    def test_sample_cached(self):
+        self.configure(ADMISSION_MAX_QUEUE_DEPTH=5, ADMISSION_CHECK_INTERVAL_SECONDS=60)
+        self.assertTrue(self.controller.admit().admitted)
+        self.queue_requests(6)
+        self.assertTrue(self.controller.admit().admitted)
+        with patch.object(walkoff.config.Config, 'ADMISSION_CHECK_INTERVAL_SECONDS', 0):
+            self.assertFalse(self.controller.admit().admitted)
+
+    def add_pending(self, minutes_ago):
+        workflow_status = WorkflowStatus(str(uuid4()), uuid4(), 'wf')
+        workflow_status.created_at = datetime.utcnow() - timedelta(minutes=minutes_ago)
+        self.execution_db.session.add(workflow_status)
+        self.execution_db.session.commit()
+
+    def test_queue_age(self):
+        self.configure(ADMISSION_MAX_QUEUE_AGE_SECONDS=60)
+        self.add_pending(5)
+        self.queue_requests(1)
+        decision = self.controller.admit()
+        self.assertFalse(decision.admitted)
+        self.assertEqual(decision.reason, 'queue_age')
+
+    def test_queue_age_ignores_lost_requests(self):
+        self.configure(ADMISSION_MAX_QUEUE_AGE_SECONDS=60, ADMISSION_CHECK_INTERVAL_SECONDS=0)
+        for minutes_ago in (30, 20, 2, 0):
+            self.add_pending(minutes_ago)
+        self.assertEqual(self.controller.sample()['queue_age'], 0)
+        self.queue_requests(1)
+        self.assertTrue(self.controller.admit().admitted)
+        self.queue_requests(1, queue=BULK_QUEUE)
+        self.assertEqual(self.controller.admit().reason, 'queue_age')
+        self.assertAlmostEqual(self.controller.sample()['queue_age'], 120, delta=5)
+
+    def test_estimated_wait(self):
+        self.configure(ADMISSION_MAX_ESTIMATED_WAIT_SECONDS=10, NUMBER_PROCESSES=1, NUMBER_THREADS_PER_PROCESS=2)
+        self.execution_db.session.add(WorkflowMetric(uuid4(), 'wf', 4.))
+        self.execution_db.session.commit()
+        self.queue_requests(8)
+        decision = self.controller.admit()
+        self.assertFalse(decision.admitted)
+        self.assertEqual(decision.reason, 'estimated_wait')
+        self.assertEqual(self.controller.sample()['estimated_wait'], 16)
+        self.assertEqual(decision.retry_after, 6)
+
+    def test_divert(self):
+        self.configure(ADMISSION_MAX_QUEUE_DEPTH=5, ADMISSION_OVERLOAD_ACTION='divert',
+                       ADMISSION_CHECK_INTERVAL_SECONDS=0)
+        self.queue_requests(6)
+        decision = self.controller.admit(2)
+        self.assertTrue(decision.admitted)
+        self.assertTrue(decision.bulk)
+
+        self.queue_requests(2, queue=BULK_QUEUE)
+        decision = self.controller.admit(4)
+        self.assertFalse(decision.admitted)
+        self.assertEqual(decision.reason, 'bulk_queue_depth')
+        metrics = self.controller.get_metrics()
+        self.assertEqual(metrics['diverted'], 2)
+        self.assertDictEqual(metrics['rejected'], {'bulk_queue_depth': 4})
+        self.assertEqual(metrics['limits']['bulk_queue_depth'], 5)
+
+    def test_divert_bulk_queue_depth(self):
+        self.configure(ADMISSION_MAX_QUEUE_AGE_SECONDS=60, ADMISSION_OVERLOAD_ACTION='divert',
+                       ADMISSION_CHECK_INTERVAL_SECONDS=0)
+        self.add_pending(5)
+        self.queue_requests(1)
+        self.assertFalse(self.controller.admit().admitted)
+
+        self.configure(ADMISSION_MAX_BULK_QUEUE_DEPTH=3)
+        self.assertTrue(self.controller.admit(3).bulk)
+        self.queue_requests(3, queue=BULK_QUEUE)
+        self.assertFalse(self.controller.admit().admitted)
+
+
+class TestBulkLane(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def setUp(self):
+        self.executor = MultiprocessedExecutor(MockRedisCacheAdapter(), walkoff.config.Config)
+        self.executor.results_sender = MagicMock()
+        self.executor.results_sender.create_workflow_request_message.return_value = b'message'
+        self.workflow = execution_db_help.load_workflow('basicWorkflowTest', 'helloWorldWorkflow')
+
+    def tearDown(self):
+        self.executor.cache.delete(REQUEST_QUEUE)
+        self.executor.cache.delete(BULK_QUEUE)
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def test_execute_workflow_bulk(self):
+        self.executor.execute_workflow(self.workflow.id, bulk=True)
+        self.executor.execute_workflow(self.workflow.id)
+        self.assertEqual(self.executor.cache.llen(BULK_QUEUE), 1)
+        self.assertEqual(self.executor.cache.llen(REQUEST_QUEUE), 1)
+
+    def test_execute_workflow_batch_bulk(self):
+        self.executor.execute_workflow_batch(self.workflow.id, [[], [], []], bulk=True)
+        self.assertEqual(self.executor.cache.llen(BULK_QUEUE), 3)
+        self.assertEqual(self.executor.cache.llen(REQUEST_QUEUE), 0)
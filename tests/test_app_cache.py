@@ -350,3 +350,58 @@ class TestAppCache(TestCase):
         self.cache._cache_app(B, 'B', 'tests.test_app_cache')
         self.cache._cache['A'].cache_functions([(xx, self.action_tag)], 'tests.test_app_cache')
         self.assertFalse(self.cache.is_app_action_bound('A', 'xx'))
+
+    def test_cache_app(self):
+        self.cache.cache_app(os.path.join('.', 'tests', 'testapps'), 'DailyQuote')
+        from tests.testapps.DailyQuote.main import Main
+        self.assert_cache_has_apps({'DailyQuote'})
+        self.assert_cache_has_main(Main, app='DailyQuote')
+
+    def test_function_registry(self):
+        self.cache.cache_app(os.path.join('.', 'tests', 'testapps'), 'HelloWorldBounded')
+        registry = self.cache.get_function_registry('HelloWorldBounded')
+        self.assertDictEqual(registry['main.Main.helloWorld'], {'is_bound': True, 'tags': ['action']})
+        self.assertDictEqual(registry['conditions.regMatch'], {'is_bound': False, 'tags': ['condition']})
+
+    def test_get_function_registry_unknown_app(self):
+        with self.assertRaises(UnknownApp):
+            self.cache.get_function_registry('invalid')
+
+    def test_cache_lazy_app(self):
+        cache = AppCache()
+        cache.cache_app(os.path.join('.', 'tests', 'testapps'), 'HelloWorldBounded')
+        registry = cache.get_function_registry('HelloWorldBounded')
+
+        self.cache.cache_lazy_app(os.path.join('.', 'tests', 'testapps'), 'HelloWorldBounded', registry)
+        self.assertTrue(self.cache.is_app_cached('HelloWorldBounded'))
+        self.assertIsNone(self.cache._cache['HelloWorldBounded'].main)
+        self.assertTrue(self.cache.is_app_action_bound('HelloWorldBounded', 'main.Main.helloWorld'))
+        self.assertIn('conditions.regMatch', self.cache.get_app_condition_names('HelloWorldBounded'))
+        self.assertIsNone(self.cache._cache['HelloWorldBounded'].main)
+
+        from tests.testapps.HelloWorldBounded.main import Main
+        from tests.testapps.HelloWorldBounded.conditions import regMatch
+        self.assertEqual(self.cache.get_app_condition('HelloWorldBounded', 'conditions.regMatch'), regMatch)
+        self.assert_cache_has_main(Main, app='HelloWorldBounded')
+        self.assertEqual(self.cache.get_app('HelloWorldBounded'), Main)
+
+    def test_cache_lazy_app_import_fails(self):
+        self.cache.cache_lazy_app(os.path.join('.', 'tests', 'testapps'), 'Invalid',
+                                  {'main.Main.x': {'is_bound': True, 'tags': ['action']}})
+        self.assertEqual(self.cache.get_app_action_names('Invalid'), ['main.Main.x'])
+        with self.assertRaises(UnknownApp):
+            self.cache.get_app_action('Invalid', 'main.Main.x')
+        self.assertFalse(self.cache.is_app_cached('Invalid'))
+
+    def test_clear_cache_lazy_apps(self):
+        self.cache.cache_lazy_app(os.path.join('.', 'tests', 'testapps'), 'HelloWorld', {})
+        self.cache.clear()
+        self.assertDictEqual(self.cache._lazy_apps, {})
+        self.assertFalse(self.cache.is_app_cached('HelloWorld'))
+
+    def test_import_lazy_apps(self):
+        self.cache.cache_lazy_app(os.path.join('.', 'tests', 'testapps'), 'HelloWorldBounded', {})
+        self.cache.import_lazy_apps()
+        from tests.testapps.HelloWorldBounded.main import Main
+        self.assertDictEqual(self.cache._lazy_apps, {})
+        self.assert_cache_has_main(Main, app='HelloWorldBounded')
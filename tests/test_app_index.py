@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+import walkoff.appgateway
+import walkoff.config
+from tests.util import initialize_test_config
+from walkoff.appgateway.appindex import AppIndex, hash_app
+
+
+class TestAppIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.apps_path = os.path.join(self.directory, 'apps')
+        shutil.copytree(os.path.join('.', 'tests', 'testapps', 'HelloWorld'), os.path.join(self.apps_path, 'app'),
+                        ignore=shutil.ignore_patterns('__pycache__'))
+        self.index_path = os.path.join(self.directory, 'index.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hash_app_unchanged(self):
+        self.assertEqual(hash_app(self.apps_path, 'app'), hash_app(self.apps_path, 'app'))
+
+    def test_hash_app_file_changed(self):
+        original = hash_app(self.apps_path, 'app')
+        with open(os.path.join(self.apps_path, 'app', 'api.yaml'), 'a') as api_file:
+            api_file.write('\n')
+        self.assertNotEqual(hash_app(self.apps_path, 'app'), original)
+
+    def test_hash_app_file_added(self):
+        original = hash_app(self.apps_path, 'app')
+        with open(os.path.join(self.apps_path, 'app', 'new.py'), 'w') as new_file:
+            new_file.write('')
+        self.assertNotEqual(hash_app(self.apps_path, 'app'), original)
+
+    def test_hash_app_ignores_compiled_files(self):
+        original = hash_app(self.apps_path, 'app')
+        os.mkdir(os.path.join(self.apps_path, 'app', '__pycache__'))
+        with open(os.path.join(self.apps_path, 'app', '__pycache__', 'main.cpython-37.pyc'), 'wb') as compiled:
+            compiled.write(b'\0')
+        self.assertEqual(hash_app(self.apps_path, 'app'), original)
+
+    def test_hash_app_dependency_changed(self):
+        dependency = os.path.join(self.directory, 'schema.json')
+        with open(dependency, 'w') as dependency_file:
+            dependency_file.write('{}')
+        original = hash_app(self.apps_path, 'app', dependency)
+        with open(dependency, 'w') as dependency_file:
+            dependency_file.write('{"a": 1}')
+        self.assertNotEqual(hash_app(self.apps_path, 'app', dependency), original)
+
+    def test_save_and_load(self):
+        index = AppIndex(self.index_path)
+        index.update('app', 'abc', {'actions': {}}, {'main.f': {'is_bound': False, 'tags': ['action']}})
+        index.save()
+
+        loaded = AppIndex(self.index_path)
+        loaded.load()
+        self.assertDictEqual(loaded.get('app', 'abc'), {'hash': 'abc', 'api': {'actions': {}},
+                                                        'registry': {'main.f': {'is_bound': False, 'tags': ['action']}}})
+        self.assertIsNone(loaded.get('app', 'def'))
+        self.assertIsNone(loaded.get('other', 'abc'))
+
+    def test_load_missing(self):
+        index = AppIndex(self.index_path)
+        index.load()
+        self.assertDictEqual(index.apps, {})
+
+    def test_load_invalid(self):
+        with open(self.index_path, 'w') as index_file:
+            index_file.write('{')
+        index = AppIndex(self.index_path)
+        index.load()
+        self.assertDictEqual(index.apps, {})
+
+    def test_load_other_version(self):
+        with open(self.index_path, 'w') as index_file:
+            json.dump({'version': AppIndex.version + 1, 'apps': {'app': {}}}, index_file)
+        index = AppIndex(self.index_path)
+        index.load()
+        self.assertDictEqual(index.apps, {})
+
+    def test_save_unmodified(self):
+        AppIndex(self.index_path).save()
+        self.assertFalse(os.path.exists(self.index_path))
+
+    def test_prune(self):
+        index = AppIndex(self.index_path)
+        index.update('app1', 'abc', {}, {})
+        index.update('app2', 'abc', {}, {})
+        index.prune(['app1'])
+        self.assertSetEqual(set(index.apps), {'app1'})
+
+
+class TestLoadAppApisWithIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        walkoff.config.Config.APP_API_INDEX_PATH = os.path.join(self.directory, 'index.json')
+        self.original_app_apis = walkoff.config.app_apis
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        walkoff.config.Config.APP_API_INDEX_PATH = ''
+        walkoff.config.app_apis = self.original_app_apis
+        walkoff.appgateway.clear_cache()
+        walkoff.appgateway.cache_apps(walkoff.config.Config.APPS_PATH)
+
+    @staticmethod
+    def load_app_apis():
+        walkoff.appgateway.clear_cache()
+        walkoff.config.app_apis = {}
+        walkoff.config.load_app_apis()
+
+    def test_index_created(self):
+        self.load_app_apis()
+        with open(walkoff.config.Config.APP_API_INDEX_PATH) as index_file:
+            index = json.load(index_file)
+        self.assertSetEqual(set(index['apps']), {'HelloWorld', 'HelloWorldBounded', 'DailyQuote'})
+        self.assertDictEqual(index['apps']['HelloWorld']['api'], walkoff.config.app_apis['HelloWorld'])
+
+    def test_unchanged_apps_not_validated_or_imported(self):
+        self.load_app_apis()
+        app_apis = walkoff.config.app_apis
+
+        with patch('walkoff.appgateway.validator.validate_app_spec') as mock_validate:
+            with patch.object(walkoff.appgateway, 'cache_app') as mock_cache_app:
+                self.load_app_apis()
+        mock_validate.assert_not_called()
+        mock_cache_app.assert_not_called()
+        self.assertDictEqual(walkoff.config.app_apis, app_apis)
+        self.assertTrue(walkoff.appgateway.is_app_action_bound('HelloWorldBounded', 'main.Main.helloWorld'))
+
+        from tests.testapps.HelloWorldBounded.main import Main
+        self.assertEqual(walkoff.appgateway.get_app('HelloWorldBounded'), Main)
+
+    def test_changed_app_revalidated(self):
+        self.load_app_apis()
+        with open(walkoff.config.Config.APP_API_INDEX_PATH) as index_file:
+            index = json.load(index_file)
+        index['apps']['HelloWorld']['hash'] = 'outdated'
+        with open(walkoff.config.Config.APP_API_INDEX_PATH, 'w') as index_file:
+            json.dump(index, index_file)
+
+        with patch('walkoff.appgateway.validator.validate_app_spec') as mock_validate:
+            self.load_app_apis()
+        self.assertEqual(mock_validate.call_count, 1)
+        self.assertEqual(mock_validate.call_args[0][1], 'HelloWorld')
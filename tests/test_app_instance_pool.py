@@ -0,0 +1,207 @@
+import threading
+import unittest
+from uuid import uuid4
+
+from mock import MagicMock, patch
+
+import walkoff.appgateway
+from tests.util import execution_db_help, initialize_test_config
+from walkoff.appgateway.appinstance import AppInstance
+from walkoff.appgateway.appinstancepool import AppInstancePool
+from walkoff.appgateway.appinstancerepo import AppInstanceRepo
+
+
+class TestAppInstancePool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        execution_db_help.setup_dbs()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def setUp(self):
+        self.pool = AppInstancePool(max_idle_seconds=10, max_lifetime_seconds=100)
+        self.now = 1000.
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    @staticmethod
+    def make_context():
+        return {'workflow_execution_id': uuid4(), 'workflow_id': uuid4(), 'workflow_name': 'wf'}
+
+    def lease(self, device='testDevice'):
+        self.leased_context = self.make_context()
+        with patch('walkoff.appgateway.appinstancepool.time.time', return_value=self.now):
+            return self.pool.lease('HelloWorld', device, self.leased_context)
+
+    def release(self, app_instance, device='testDevice'):
+        with patch('walkoff.appgateway.appinstancepool.time.time', return_value=self.now):
+            return self.pool.release('HelloWorld', device, app_instance)
+
+    def test_lease_new_instance(self):
+        app_instance = self.lease()
+        self.assertIsInstance(app_instance, AppInstance)
+        self.assertIsNotNone(app_instance())
+        self.assertEqual(self.pool.get_leased_count(), 1)
+        self.assertEqual(self.pool.get_idle_count(), 0)
+
+    def test_release_and_reuse(self):
+        app_instance = self.lease()
+        context = self.leased_context
+        self.assertTrue(self.release(app_instance))
+        self.assertEqual(self.pool.get_idle_count(), 1)
+        self.assertEqual(self.pool.get_leased_count(), 0)
+
+        with patch.object(AppInstance, 'create') as mock_create:
+            reused = self.lease()
+        mock_create.assert_not_called()
+        self.assertIs(reused, app_instance)
+        self.assertIsNot(self.leased_context, context)
+        self.assertIs(reused().context, self.leased_context)
+
+    def test_release_not_leased(self):
+        self.assertFalse(self.release(AppInstance.create('HelloWorld', 'testDevice', self.make_context())))
+
+    def test_lease_other_device(self):
+        app_instance = self.lease()
+        self.release(app_instance)
+        self.assertIsNot(self.lease(device='otherDevice'), app_instance)
+
+    def test_idle_instance_expires(self):
+        app_instance = self.lease()
+        self.release(app_instance)
+        self.now += 11
+        with patch.object(AppInstance, 'shutdown') as mock_shutdown:
+            self.assertIsNot(self.lease(), app_instance)
+        mock_shutdown.assert_called_once_with()
+
+    def test_old_instance_shut_down_on_release(self):
+        app_instance = self.lease()
+        self.now += 101
+        with patch.object(AppInstance, 'shutdown') as mock_shutdown:
+            self.release(app_instance)
+        mock_shutdown.assert_called_once_with()
+        self.assertEqual(self.pool.get_idle_count(), 0)
+
+    def test_evict(self):
+        self.release(self.lease())
+        self.now += 11
+        with patch('walkoff.appgateway.appinstancepool.time.time', return_value=self.now):
+            with patch.object(AppInstance, 'shutdown') as mock_shutdown:
+                self.pool.evict()
+        mock_shutdown.assert_called_once_with()
+        self.assertEqual(self.pool.get_idle_count(), 0)
+
+    def test_unhealthy_instance_not_reused(self):
+        app_instance = self.lease()
+        self.release(app_instance)
+        app_instance().is_healthy = MagicMock(return_value=False)
+        with patch.object(AppInstance, 'shutdown') as mock_shutdown:
+            self.assertIsNot(self.lease(), app_instance)
+        mock_shutdown.assert_called_once_with()
+
+    def test_failed_creation_not_leased(self):
+        with patch.object(AppInstance, 'create', return_value=AppInstance(instance=None)):
+            app_instance = self.lease()
+        self.assertIsNone(app_instance())
+        self.assertEqual(self.pool.get_leased_count(), 0)
+
+    def test_max_leases_per_device_timeout(self):
+        self.pool = AppInstancePool(max_leases_per_device=1, lease_timeout=0.1)
+        self.pool.lease('HelloWorld', 'testDevice', self.make_context())
+        self.assertIsNone(self.pool.lease('HelloWorld', 'testDevice', self.make_context())())
+        self.assertIsNotNone(self.pool.lease('HelloWorld', 'otherDevice', self.make_context())())
+
+    def test_max_leases_per_device_waits_for_release(self):
+        self.pool = AppInstancePool(max_leases_per_device=1, lease_timeout=5)
+        app_instance = self.pool.lease('HelloWorld', 'testDevice', self.make_context())
+        leased = []
+        thread = threading.Thread(
+            target=lambda: leased.append(self.pool.lease('HelloWorld', 'testDevice', self.make_context())))
+        thread.start()
+        thread.join(timeout=0.2)
+        self.assertListEqual(leased, [])
+
+        self.pool.release('HelloWorld', 'testDevice', app_instance)
+        thread.join(timeout=5)
+        self.assertListEqual(leased, [app_instance])
+
+    def test_shutdown(self):
+        app_instance = self.lease()
+        self.release(self.lease(device='otherDevice'), device='otherDevice')
+        with patch.object(AppInstance, 'shutdown') as mock_shutdown:
+            self.pool.shutdown()
+            self.assertEqual(mock_shutdown.call_count, 1)
+            self.release(app_instance)
+            self.assertEqual(mock_shutdown.call_count, 2)
+        self.assertEqual(self.pool.get_idle_count(), 0)
+
+    def test_from_config(self):
+        config = MagicMock(APP_INSTANCE_POOL=False)
+        self.assertIsNone(AppInstancePool.from_config(config))
+        config = MagicMock(APP_INSTANCE_POOL=True, APP_INSTANCE_POOL_MAX_IDLE_SECONDS=1,
+                           APP_INSTANCE_POOL_MAX_LIFETIME_SECONDS=2, APP_INSTANCE_POOL_MAX_LEASES_PER_DEVICE=3,
+                           APP_INSTANCE_POOL_LEASE_TIMEOUT_SECONDS=4)
+        pool = AppInstancePool.from_config(config)
+        self.assertEqual(
+            (pool.max_idle_seconds, pool.max_lifetime_seconds, pool.max_leases_per_device, pool.lease_timeout),
+            (1, 2, 3, 4))
+
+
+class TestAppInstanceRepoWithPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        execution_db_help.setup_dbs()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def setUp(self):
+        self.pool = AppInstancePool()
+        self.action = MagicMock(app_name='HelloWorld')
+        self.action.device_id.get_value.return_value = 'testDevice'
+        self.workflow_ctx = MagicMock(execution_id=uuid4(), id=uuid4())
+        self.workflow_ctx.name = 'wf'
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_instances_returned_to_pool(self):
+        repo = AppInstanceRepo(pool=self.pool)
+        device_id = repo.setup_app_instance(self.action, self.workflow_ctx)
+        app_instance = repo.get_app_instance(device_id)
+        self.assertEqual(self.pool.get_leased_count(), 1)
+
+        with patch.object(AppInstance, 'shutdown') as mock_shutdown:
+            repo.shutdown_instances()
+        mock_shutdown.assert_not_called()
+        self.assertEqual(self.pool.get_idle_count(), 1)
+
+        other_repo = AppInstanceRepo(pool=self.pool)
+        other_repo.setup_app_instance(self.action, self.workflow_ctx)
+        self.assertIs(other_repo.get_app_instance(device_id), app_instance)
+
+    def test_release_instances(self):
+        repo = AppInstanceRepo(pool=self.pool)
+        repo.setup_app_instance(self.action, self.workflow_ctx)
+        with patch.object(self.pool, 'release', wraps=self.pool.release) as mock_release:
+            repo.release_instances()
+            repo.release_instances()
+        self.assertEqual(mock_release.call_count, 1)
+        self.assertFalse(mock_release.call_args[1]['clear_cache'])
+        self.assertEqual(self.pool.get_leased_count(), 0)
+
+    def test_resumed_instances_shut_down(self):
+        restored = AppInstance.create('HelloWorld', 'testDevice', {'workflow_execution_id': uuid4()})
+        repo = AppInstanceRepo({('HelloWorld', 'testDevice'): restored}, pool=self.pool)
+        with patch.object(AppInstance, 'shutdown') as mock_shutdown:
+            repo.shutdown_instances()
+        mock_shutdown.assert_called_once_with()
+        self.assertEqual(self.pool.get_idle_count(), 0)
@@ -127,3 +127,34 @@ class TestCondition(unittest.TestCase):
         self.assertFalse(
             Condition('HelloWorld', action_name='mod1_flag2', arguments=[Argument('arg1', value=4)],
                       transforms=transforms).execute(LocalActionExecutionStrategy(), 'invalid', accumulator))
+
+    def test_execute_segments_grouped_by_app(self):
+        class SegmentStrategy(LocalActionExecutionStrategy):
+            supports_segments = True
+
+            def __init__(self):
+                super(SegmentStrategy, self).__init__()
+                self.segments = []
+
+            def execute_segment(self, executables, data_in, accumulator):
+                self.segments.append([executable.action_name for executable in executables])
+                return ['Success'] * len(executables), 6
+
+        transforms = [Transform('HelloWorldBounded', action_name='Top Transform'),
+                      Transform('HelloWorld', action_name='mod1_filter2', arguments=[Argument('arg1', value='5')]),
+                      Transform('HelloWorld', action_name='Top Transform')]
+        strategy = SegmentStrategy()
+        self.assertEqual(Condition('HelloWorld', action_name='mod1_flag2', arguments=[Argument('arg1', value=4)],
+                                   transforms=transforms).execute(strategy, '1', {}), 6)
+        self.assertListEqual(strategy.segments, [['mod1_filter2', 'Top Transform', 'mod1_flag2']])
+
+    def test_execute_segments_condition_error(self):
+        class SegmentStrategy(LocalActionExecutionStrategy):
+            supports_segments = True
+
+            def execute_segment(self, executables, data_in, accumulator):
+                return ['Success', 'InvalidArguments'], data_in
+
+        transforms = [Transform('HelloWorld', action_name='Top Transform')]
+        self.assertFalse(Condition('HelloWorld', action_name='mod1_flag2', arguments=[Argument('arg1', value=4)],
+                                   transforms=transforms, is_negated=True).execute(SegmentStrategy(), '1', {}))
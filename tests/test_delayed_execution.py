@@ -0,0 +1,162 @@
+import unittest
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from mock import MagicMock, patch
+
+import walkoff.appgateway
+import walkoff.config
+from tests.util import execution_db_help, initialize_test_config
+from tests.util.mock_objects import MockRedisCacheAdapter
+from walkoff.executiondb.workflowresults import WorkflowStatus
+from walkoff.multiprocessedexecutor.delayed import DELAYED_MESSAGES, DELAYED_PROCESSING, DELAYED_QUEUE, \
+    DelayedExecutionQueue
+from walkoff.multiprocessedexecutor.multiprocessedexecutor import MultiprocessedExecutor
+
+
+class TestDelayedExecutionQueue(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cache = MockRedisCacheAdapter()
+
+    def setUp(self):
+        self.queue = DelayedExecutionQueue(self.cache)
+        self.now = datetime.utcnow()
+
+    def tearDown(self):
+        for key in (DELAYED_QUEUE, DELAYED_PROCESSING, DELAYED_MESSAGES):
+            self.cache.delete(key)
+
+    def add(self, seconds, user=None):
+        execution_id = str(uuid4())
+        self.queue.add(execution_id, uuid4(), self.now + timedelta(seconds=seconds), b'message', user=user)
+        return execution_id
+
+    def test_claim_due(self):
+        first, second = self.add(-20, user='admin'), self.add(-10)
+        self.add(60)
+        requests = self.queue.claim_due(self.now)
+        self.assertListEqual([request.execution_id for request in requests], [first, second])
+        self.assertEqual(requests[0].user, 'admin')
+        self.assertEqual(requests[0].message, b'message')
+        self.assertEqual(self.queue.count(), 1)
+        self.assertEqual(self.cache.zcard(DELAYED_PROCESSING), 2)
+        self.assertListEqual(self.queue.claim_due(self.now), [])
+
+        self.queue.release(requests)
+        self.assertEqual(self.cache.zcard(DELAYED_PROCESSING), 0)
+        self.assertEqual(self.cache.cache.hlen(DELAYED_MESSAGES), 1)
+
+    def test_claim_due_limit(self):
+        execution_ids = [self.add(-seconds) for seconds in range(5, 0, -1)]
+        self.assertListEqual([request.execution_id for request in self.queue.claim_due(self.now, limit=3)],
+                             execution_ids[:3])
+        self.assertEqual(self.queue.count(), 2)
+
+    def test_claim_due_already_claimed(self):
+        execution_id = self.add(-10)
+        self.cache.cache.zadd(DELAYED_PROCESSING, {execution_id: 0})
+        self.assertListEqual(self.queue.claim_due(self.now), [])
+        self.assertEqual(self.queue.count(), 0)
+
+    def test_recover(self):
+        execution_id = self.add(-10)
+        self.assertEqual(len(self.queue.claim_due(self.now)), 1)
+        self.assertListEqual(self.queue.recover(60, self.now + timedelta(seconds=30)), [])
+        self.assertListEqual(self.queue.recover(60, self.now + timedelta(seconds=90)), [execution_id])
+        self.assertEqual(self.cache.zcard(DELAYED_PROCESSING), 0)
+        self.assertListEqual([request.execution_id for request in self.queue.claim_due(self.now)], [execution_id])
+
+    def test_remove_orphans(self):
+        due, claimed, orphan = self.add(60), self.add(-20), self.add(-10)
+        self.queue.claim_due(self.now, limit=1)
+        self.cache.zrem(DELAYED_QUEUE, orphan)
+        self.assertEqual(self.queue.remove_orphans(batch_size=2), 1)
+        self.assertSetEqual(set(self.cache.hscan(DELAYED_MESSAGES)), {due, claimed})
+
+    def test_cancel(self):
+        execution_id = self.add(60)
+        self.assertEqual(self.queue.cancel(execution_id), (execution_id, []))
+        self.assertIsNone(self.queue.cancel(execution_id))
+        self.assertEqual(self.queue.count(), 0)
+        self.assertEqual(self.cache.cache.hlen(DELAYED_MESSAGES), 0)
+
+
+class TestDelayedExecution(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def setUp(self):
+        self.executor = MultiprocessedExecutor(MockRedisCacheAdapter(), walkoff.config.Config)
+        self.executor.results_sender = MagicMock()
+        self.executor.results_sender.create_workflow_request_message.return_value = b'message'
+        self.workflow = execution_db_help.load_workflow('basicWorkflowTest', 'helloWorldWorkflow')
+
+    def tearDown(self):
+        for key in ('request_queue', DELAYED_QUEUE, DELAYED_PROCESSING, DELAYED_MESSAGES):
+            self.executor.cache.delete(key)
+        for pattern in ('idempotency:*', 'coalesce:*'):
+            for key in self.executor.cache.scan(pattern):
+                self.executor.cache.delete(key)
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def test_execute_workflow_not_before(self):
+        not_before = datetime.utcnow() + timedelta(minutes=5)
+        execution_id = self.executor.execute_workflow(self.workflow.id, user='admin', not_before=not_before)
+        self.assertEqual(self.executor.delayed.count(), 1)
+        self.assertEqual(self.executor.cache.llen('request_queue'), 0)
+        self.executor.results_sender.handle_event.assert_not_called()
+
+        self.assertListEqual(self.executor.move_due_executions(), [])
+        self.assertListEqual(self.executor.move_due_executions(not_before), [execution_id])
+        self.assertEqual(self.executor.delayed.count(), 0)
+        self.assertEqual(self.executor.cache.llen('request_queue'), 1)
+        self.assertEqual(self.executor.results_sender.handle_event.call_args[1]['data'], {'user': 'admin'})
+
+    def test_execute_workflow_not_before_past(self):
+        self.executor.execute_workflow(self.workflow.id, not_before=datetime.utcnow() - timedelta(minutes=5))
+        self.assertEqual(self.executor.delayed.count(), 0)
+        self.assertEqual(self.executor.cache.llen('request_queue'), 1)
+
+    def test_delayed_not_coalesced_with_immediate(self):
+        not_before = datetime.utcnow() + timedelta(hours=2)
+        delayed_id = self.executor.execute_workflow(self.workflow.id, coalesce=True, not_before=not_before)
+        self.assertEqual(self.executor.execute_workflow(self.workflow.id, coalesce=True, not_before=not_before),
+                         delayed_id)
+        self.assertNotEqual(self.executor.execute_workflow(self.workflow.id, coalesce=True), delayed_id)
+        self.assertNotEqual(self.executor.execute_workflow(self.workflow.id, coalesce=True,
+                                                           not_before=not_before + timedelta(hours=1)), delayed_id)
+
+    def test_cancel_releases_deduplication_keys(self):
+        not_before = datetime.utcnow() + timedelta(hours=2)
+        execution_id = self.executor.execute_workflow(self.workflow.id, idempotency_key='key', coalesce=True,
+                                                      not_before=not_before)
+        self.assertTrue(self.executor.cancel_delayed_execution(execution_id))
+        self.assertFalse(self.executor.cancel_delayed_execution(execution_id))
+        self.assertIsNone(self.executor.get_idempotent_execution(self.workflow.id, 'key'))
+        self.assertNotEqual(self.executor.execute_workflow(self.workflow.id, coalesce=True, not_before=not_before),
+                            execution_id)
+        self.assertNotEqual(self.executor.execute_workflow(self.workflow.id, idempotency_key='key'), execution_id)
+
+    def test_move_due_executions_in_batches(self):
+        not_before = datetime.utcnow() + timedelta(minutes=5)
+        execution_ids = [self.executor.execute_workflow(self.workflow.id, not_before=not_before) for _ in range(5)]
+        with patch.object(walkoff.config.Config, 'DELAYED_EXECUTION_BATCH_SIZE', 2):
+            moved = self.executor.move_due_executions(not_before)
+        self.assertSetEqual(set(moved), set(execution_ids))
+        self.assertEqual(self.executor.cache.llen('request_queue'), 5)
+        self.assertEqual(self.executor.cache.cache.hlen(DELAYED_MESSAGES), 0)
+
+    def test_move_deleted_workflow(self):
+        not_before = datetime.utcnow() + timedelta(minutes=5)
+        self.executor.delayed.add(str(uuid4()), uuid4(), not_before, b'message')
+        self.assertListEqual(self.executor.move_due_executions(not_before), [])
+        self.assertEqual(self.executor.cache.llen('request_queue'), 0)
+        self.assertEqual(self.execution_db.session.query(WorkflowStatus).count(), 0)
@@ -0,0 +1,128 @@
+import threading
+import unittest
+from uuid import uuid4
+
+from sqlalchemy.pool import NullPool
+
+import walkoff.config
+from tests.util import execution_db_help, initialize_test_config
+from walkoff.executiondb import ExecutionDatabase
+from walkoff.executiondb.workflowresults import WorkflowStatus
+from walkoff.executiondb.writer import ExecutionDatabaseWriter
+
+
+class MockConfig(object):
+    EXECUTION_DB_POOL_SIZE = 3
+    EXECUTION_DB_MAX_OVERFLOW = 2
+    EXECUTION_DB_POOL_TIMEOUT = 10
+    EXECUTION_DB_POOL_RECYCLE = 600
+    EXECUTION_DB_POOL_PRE_PING = True
+
+
+class TestExecutionDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+
+    def test_get_pool_options(self):
+        self.assertDictEqual(ExecutionDatabase.get_pool_options(MockConfig),
+                             {'pool_size': 3, 'max_overflow': 2, 'pool_timeout': 10, 'pool_recycle': 600,
+                              'pool_pre_ping': True})
+
+    def test_get_pool_options_pooling_disabled(self):
+        class NoPoolConfig(MockConfig):
+            EXECUTION_DB_POOL_SIZE = 0
+
+        self.assertDictEqual(ExecutionDatabase.get_pool_options(NoPoolConfig), {'poolclass': NullPool})
+
+    def test_sessions_are_per_thread(self):
+        sessions = []
+
+        def get_session():
+            sessions.append(self.execution_db.session())
+            self.execution_db.remove_session()
+
+        thread = threading.Thread(target=get_session)
+        thread.start()
+        thread.join()
+        self.assertIsNot(sessions[0], self.execution_db.session())
+
+    def test_remove_session(self):
+        session = self.execution_db.session()
+        self.execution_db.remove_session()
+        self.assertIsNot(session, self.execution_db.session())
+
+    def test_sqlite_tuning_pragmas(self):
+        connection = self.execution_db.engine.connect()
+        self.assertEqual(connection.execute('PRAGMA journal_mode').scalar().lower(), 'wal')
+        self.assertEqual(connection.execute('PRAGMA busy_timeout').scalar(),
+                         walkoff.config.Config.EXECUTION_DB_SQLITE_BUSY_TIMEOUT_MS)
+        connection.close()
+
+
+class TestExecutionDatabaseWriter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def tearDown(self):
+        self.execution_db.stop_writer()
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+
+    @staticmethod
+    def add_workflow_status(execution_id):
+        def write(session):
+            session.add(WorkflowStatus(execution_id, uuid4(), 'test'))
+
+        return write
+
+    def count_workflow_statuses(self):
+        self.execution_db.session.expire_all()
+        return self.execution_db.session.query(WorkflowStatus).count()
+
+    def test_persist_without_writer(self):
+        self.execution_db.persist(self.add_workflow_status(uuid4()))
+        self.assertEqual(self.count_workflow_statuses(), 1)
+
+    def test_persist_with_writer(self):
+        self.execution_db.start_writer()
+        for _ in range(10):
+            self.execution_db.persist(self.add_workflow_status(uuid4()))
+        self.execution_db.flush_writer()
+        self.assertEqual(self.count_workflow_statuses(), 10)
+        self.assertEqual(self.execution_db.writer.writes, 10)
+        self.assertLessEqual(self.execution_db.writer.batches, 10)
+
+    def test_writer_batches(self):
+        writer = ExecutionDatabaseWriter(self.execution_db, batch_size=4)
+        for _ in range(10):
+            writer.submit(self.add_workflow_status(uuid4()))
+        writer.start()
+        writer.stop()
+        self.assertEqual(writer.writes, 10)
+        self.assertEqual(writer.batches, 3)
+        self.assertEqual(self.count_workflow_statuses(), 10)
+
+    def test_writer_failed_write_does_not_lose_batch(self):
+        def fail(session):
+            raise ValueError()
+
+        writer = ExecutionDatabaseWriter(self.execution_db)
+        writer.submit(self.add_workflow_status(uuid4()))
+        writer.submit(fail)
+        writer.submit(self.add_workflow_status(uuid4()))
+        writer.start()
+        writer.stop()
+        self.assertEqual(writer.errors, 1)
+        self.assertEqual(writer.writes, 2)
+        self.assertEqual(self.count_workflow_statuses(), 2)
@@ -0,0 +1,150 @@
+import unittest
+from datetime import datetime
+from uuid import uuid4
+
+from mock import MagicMock, patch
+
+import walkoff.appgateway
+import walkoff.config
+from tests.util import execution_db_help, initialize_test_config
+from tests.util.mock_objects import MockRedisCacheAdapter
+from walkoff.executiondb.argument import Argument
+from walkoff.executiondb.environment_variable import EnvironmentVariable
+from walkoff.executiondb.workflowresults import WorkflowStatus
+from walkoff.multiprocessedexecutor.deduplication import ExecutionDeduplicator, get_coalesce_key, \
+    get_idempotency_key
+from walkoff.multiprocessedexecutor.multiprocessedexecutor import MultiprocessedExecutor
+
+
+class TestCoalesceKey(unittest.TestCase):
+    def test_same_inputs(self):
+        workflow_id = uuid4()
+        key = get_coalesce_key(workflow_id, start_arguments=[Argument('a', value=1), Argument('b', value='x')])
+        self.assertEqual(
+            get_coalesce_key(workflow_id, start_arguments=[Argument('b', value='x'), Argument('a', value=1)]), key)
+
+    def test_different_inputs(self):
+        workflow_id = uuid4()
+        key = get_coalesce_key(workflow_id, start_arguments=[Argument('a', value=1)])
+        self.assertNotEqual(get_coalesce_key(workflow_id, start_arguments=[Argument('a', value=2)]), key)
+        self.assertNotEqual(get_coalesce_key(uuid4(), start_arguments=[Argument('a', value=1)]), key)
+        self.assertNotEqual(get_coalesce_key(workflow_id, start=uuid4(), start_arguments=[Argument('a', value=1)]),
+                            key)
+        env_var = EnvironmentVariable(value='x', id=uuid4())
+        self.assertNotEqual(get_coalesce_key(workflow_id, start_arguments=[Argument('a', value=1)],
+                                             environment_variables=[env_var]), key)
+        self.assertNotEqual(get_coalesce_key(workflow_id, start_arguments=[Argument('a', value=1)],
+                                             not_before=datetime(2050, 1, 1)), key)
+
+
+class TestExecutionDeduplicator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+        cls.cache = MockRedisCacheAdapter()
+
+    def setUp(self):
+        self.deduplicator = ExecutionDeduplicator(self.cache, self.execution_db.session, window_seconds=60)
+        self.workflow_id = uuid4()
+        self.idempotency_key = get_idempotency_key(self.workflow_id, 'alert-1')
+        self.coalesce_key = get_coalesce_key(self.workflow_id)
+
+    def tearDown(self):
+        self.cache.delete(self.idempotency_key)
+        self.cache.delete(self.coalesce_key)
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def add_workflow_status(self, execution_id, running=False):
+        workflow_status = WorkflowStatus(execution_id, self.workflow_id, 'wf')
+        if running:
+            workflow_status.running()
+        self.execution_db.session.add(workflow_status)
+        self.execution_db.session.commit()
+
+    def test_idempotency_key(self):
+        first, second = str(uuid4()), str(uuid4())
+        self.assertIsNone(self.deduplicator.claim(first, idempotency_key=self.idempotency_key))
+        self.add_workflow_status(first, running=True)
+        self.assertEqual(self.deduplicator.claim(second, idempotency_key=self.idempotency_key), first)
+        self.assertLessEqual(self.cache.cache.pttl(self.idempotency_key), 60000)
+
+    def test_coalesce_pending(self):
+        first, second = str(uuid4()), str(uuid4())
+        self.assertIsNone(self.deduplicator.claim(first, coalesce_key=self.coalesce_key))
+        self.assertEqual(self.deduplicator.claim(second, coalesce_key=self.coalesce_key), first)
+        self.add_workflow_status(first)
+        self.assertEqual(self.deduplicator.claim(second, coalesce_key=self.coalesce_key), first)
+
+    def test_coalesce_started(self):
+        first, second, third = str(uuid4()), str(uuid4()), str(uuid4())
+        self.deduplicator.claim(first, coalesce_key=self.coalesce_key)
+        self.add_workflow_status(first, running=True)
+        self.assertIsNone(self.deduplicator.claim(second, coalesce_key=self.coalesce_key))
+        self.assertEqual(self.deduplicator.claim(third, coalesce_key=self.coalesce_key), second)
+
+    def test_coalesced_idempotency_key(self):
+        first, second, third = str(uuid4()), str(uuid4()), str(uuid4())
+        self.deduplicator.claim(first, coalesce_key=self.coalesce_key)
+        self.assertEqual(self.deduplicator.claim(second, idempotency_key=self.idempotency_key,
+                                                 coalesce_key=self.coalesce_key), first)
+        self.assertEqual(self.deduplicator.claim(third, idempotency_key=self.idempotency_key), first)
+
+    def test_release(self):
+        first, second = str(uuid4()), str(uuid4())
+        self.deduplicator.claim(first, idempotency_key=self.idempotency_key, coalesce_key=self.coalesce_key)
+        self.cache.set(self.coalesce_key, second)
+        self.deduplicator.release(first, [self.idempotency_key, self.coalesce_key])
+        self.assertIsNone(self.cache.get(self.idempotency_key))
+        self.assertEqual(self.cache.get(self.coalesce_key), second)
+
+
+class TestDeduplicatedExecution(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def setUp(self):
+        self.executor = MultiprocessedExecutor(MockRedisCacheAdapter(), walkoff.config.Config)
+        self.executor.results_sender = MagicMock()
+        self.executor.results_sender.create_workflow_request_message.return_value = b'message'
+        self.workflow = execution_db_help.load_workflow('basicWorkflowTest', 'helloWorldWorkflow')
+
+    def tearDown(self):
+        for pattern in ('idempotency:*', 'coalesce:*'):
+            for key in list(self.executor.cache.scan(pattern)):
+                self.executor.cache.delete(key)
+        self.executor.cache.delete('request_queue')
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def test_duplicate_not_queued(self):
+        execution_id = self.executor.execute_workflow(self.workflow.id, idempotency_key='alert-1')
+        self.assertEqual(self.executor.execute_workflow(self.workflow.id, idempotency_key='alert-1'), execution_id)
+        self.assertNotEqual(self.executor.execute_workflow(self.workflow.id, idempotency_key='alert-2'), execution_id)
+        self.assertEqual(self.executor.cache.cache.llen('request_queue'), 2)
+
+    def test_coalesce(self):
+        arguments = [Argument('call', value='a')]
+        execution_id = self.executor.execute_workflow(self.workflow.id, start_arguments=arguments, coalesce=True)
+        self.assertEqual(self.executor.execute_workflow(self.workflow.id, start_arguments=[Argument('call', value='a')],
+                                                        coalesce=True), execution_id)
+        self.assertNotEqual(self.executor.execute_workflow(self.workflow.id, start_arguments=arguments),
+                            execution_id)
+        self.assertEqual(self.executor.cache.cache.llen('request_queue'), 2)
+
+    def test_window(self):
+        with patch.object(walkoff.config.Config, 'WORKFLOW_IDEMPOTENCY_WINDOW_SECONDS', 5):
+            self.executor.execute_workflow(self.workflow.id, idempotency_key='alert-1')
+        pttl = self.executor.cache.cache.pttl(get_idempotency_key(self.workflow.id, 'alert-1'))
+        self.assertTrue(0 < pttl <= 5000)
@@ -0,0 +1,230 @@
+import pickle
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import requests
+from mock import patch
+
+import walkoff.appgateway.httpclient
+from apps import App as AppBase
+from apps.DailyQuote.app import DailyQuote
+from apps.Walkoff.app import Walkoff
+from tests.util import execution_db_help, initialize_test_config
+from walkoff.appgateway.appinstance import AppInstance
+from walkoff.appgateway.httpclient import HttpClient, HttpClientPool
+from walkoff.executiondb.device import App, Device, DeviceField, EncryptedDeviceField
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        self.server.paths.append(self.path)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = b'ok'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = _Server(('127.0.0.1', 0), _Handler)
+        cls.base_url = 'http://127.0.0.1:{}/api'.format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.connections = set()
+        self.server.paths = []
+        self.server.statuses = []
+        self.client = HttpClient(self.base_url, backoff_factor=0)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_format_url(self):
+        client = HttpClient('http://host/api/')
+        self.assertEqual(client._format_url('/users'), 'http://host/api/users')
+        self.assertEqual(client._format_url('users'), 'http://host/api/users')
+        self.assertEqual(client._format_url(''), 'http://host/api')
+        self.assertEqual(client._format_url('https://other/path'), 'https://other/path')
+
+    def test_connections_reused(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/status').status_code, 200)
+        self.assertListEqual(self.server.paths, ['/api/status'] * 3)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_default_timeout(self):
+        client = HttpClient(self.base_url, timeout=7)
+        with patch.object(client.session, 'request') as mock_request:
+            client.get('/status')
+            client.get('/status', timeout=3)
+        self.assertEqual(mock_request.call_args_list[0][1]['timeout'], 7)
+        self.assertEqual(mock_request.call_args_list[1][1]['timeout'], 3)
+
+    def test_retry_unavailable(self):
+        self.server.statuses = [503, 503]
+        self.assertEqual(self.client.get('/status').status_code, 200)
+        self.assertEqual(len(self.server.paths), 3)
+        metrics = self.client.get_metrics()
+        self.assertEqual(metrics['requests'], 1)
+        self.assertEqual(metrics['retries'], 2)
+
+    def test_retries_exhausted(self):
+        client = HttpClient(self.base_url, max_retries=1, backoff_factor=0)
+        self.server.statuses = [503, 503, 503]
+        self.assertEqual(client.get('/status').status_code, 503)
+        self.assertEqual(len(self.server.paths), 2)
+
+    def test_connection_error(self):
+        client = HttpClient('http://127.0.0.1:1', max_retries=0)
+        with self.assertRaises(requests.ConnectionError):
+            client.get('/status')
+        metrics = client.get_metrics()
+        self.assertEqual((metrics['requests'], metrics['errors']), (1, 1))
+
+
+class TestHttpClientPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = HttpClientPool(max_idle_seconds=10)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_acquire_shared(self):
+        client = self.pool.acquire('http://host/api', timeout=5)
+        self.assertIs(self.pool.acquire('http://host/api/', timeout=5), client)
+        self.assertIsNot(self.pool.acquire('http://host/api', timeout=6), client)
+        self.assertIsNot(self.pool.acquire('http://other/api', timeout=5), client)
+
+    def test_released_client_kept_until_idle(self):
+        client = self.pool.acquire('http://host')
+        self.pool.release(client)
+        self.assertIs(self.pool.acquire('http://host'), client)
+        self.pool.release(client)
+        with patch('walkoff.appgateway.httpclient.time.time', return_value=10 ** 10):
+            with patch.object(client, 'close') as mock_close:
+                self.pool.evict()
+        mock_close.assert_called_once_with()
+        self.assertIsNot(self.pool.acquire('http://host'), client)
+
+    def test_client_in_use_not_evicted(self):
+        pool = HttpClientPool(max_idle_seconds=0)
+        client = pool.acquire('http://host')
+        pool.acquire('http://host')
+        pool.release(client)
+        self.assertIs(pool.acquire('http://host'), client)
+        pool.shutdown()
+
+    def test_get_metrics(self):
+        client = self.pool.acquire('http://host')
+        client._record(0, retries=2)
+        metrics = self.pool.get_metrics()
+        self.assertEqual(metrics['http://host']['requests'], 1)
+        self.assertEqual(metrics['http://host']['retries'], 2)
+
+    def test_pickle_acquires_from_pool(self):
+        options = {'timeout': 5, 'max_connections': 2, 'max_retries': 1, 'backoff_factor': 0, 'verify': False}
+        client = self.pool.acquire('http://host', **options)
+        with patch.object(walkoff.appgateway.httpclient, '_pool', self.pool):
+            self.assertIs(pickle.loads(pickle.dumps(client)), client)
+            other_client = pickle.loads(pickle.dumps(HttpClient('http://other', **options)))
+        self.assertIs(self.pool.acquire('http://other', **options), other_client)
+
+    def test_shutdown(self):
+        client = self.pool.acquire('http://host')
+        with patch.object(client, 'close') as mock_close:
+            self.pool.shutdown()
+        mock_close.assert_called_once_with()
+        self.assertDictEqual(self.pool.get_metrics(), {})
+
+
+class TestAppHttpClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+
+    def setUp(self):
+        self.pool = HttpClientPool(max_idle_seconds=0)
+        patcher = patch.object(walkoff.appgateway.httpclient, '_pool', self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_get_http_client(self):
+        app = AppBase('TestApp', None, {'workflow_execution_id': 'abc'})
+        client = app.get_http_client('http://host', timeout=3)
+        self.assertEqual(client.timeout, 3)
+        other_app = AppBase('TestApp', None, {'workflow_execution_id': 'def'})
+        self.assertIs(other_app.get_http_client('http://host', timeout=3), client)
+
+    def test_clients_released_on_shutdown(self):
+        app = AppBase('TestApp', None, {'workflow_execution_id': 'abc'})
+        client = app.get_http_client('http://host')
+        with patch.object(client, 'close') as mock_close:
+            AppInstance(instance=app).shutdown()
+        mock_close.assert_called_once_with()
+        self.assertListEqual(app._http_clients, [])
+
+    def test_clients_not_pickled(self):
+        app = AppBase('TestApp', None, {'workflow_execution_id': 'abc'})
+        app.get_http_client('http://host')
+        self.assertNotIn('_http_clients', app.__getstate__())
+
+    def test_clients_acquired_when_unpickled(self):
+        app = AppBase('TestApp', None, {'workflow_execution_id': 'abc'})
+        app.client = app.get_http_client('http://host')
+        unpickled_app = pickle.loads(pickle.dumps(app))
+        self.assertIs(unpickled_app.client, app.client)
+        self.assertListEqual(unpickled_app._http_clients, [app.client])
+        app._release_http_clients()
+        with patch.object(app.client, 'close') as mock_close:
+            AppInstance(instance=unpickled_app).shutdown()
+        mock_close.assert_called_once_with()
+
+    def test_pickle_daily_quote(self):
+        app = DailyQuote('DailyQuote', None, {'workflow_execution_id': 'abc'})
+        self.assertIs(pickle.loads(pickle.dumps(app)).s, app.s)
+
+    def test_pickle_walkoff(self):
+        fields = [DeviceField('username', 'string', 'admin'), DeviceField('https', 'boolean', False),
+                  DeviceField('ip', 'string', '127.0.0.1'), DeviceField('port', 'integer', 5000)]
+        device = Device('walkoff', fields, [EncryptedDeviceField('password', 'string', 'admin')], 'Walkoff')
+        db_app = App('Walkoff', [device])
+        self.execution_db.session.add(db_app)
+        self.execution_db.session.commit()
+        try:
+            app = Walkoff('Walkoff', device.id, {'workflow_execution_id': 'abc'})
+            unpickled_app = pickle.loads(pickle.dumps(app))
+            self.assertIs(unpickled_app.client, app.client)
+            self.assertEqual(unpickled_app.walkoff_address, 'http://127.0.0.1:5000')
+        finally:
+            self.execution_db.session.delete(db_app)
+            self.execution_db.session.commit()
@@ -0,0 +1,94 @@
+import unittest
+
+from mock import patch
+from sqlalchemy.orm import Session
+
+import walkoff.config
+from tests.util import execution_db_help, initialize_test_config
+from tests.util.mock_objects import MockRedisCacheAdapter
+from walkoff.extensions import db
+from walkoff.security import ResourcePermissions
+from walkoff.server.app import create_app
+from walkoff.server.blueprints.root import create_user
+from walkoff.serverdb import Role, get_roles_by_resource_permissions
+from walkoff.serverdb.permissionmap import PermissionMap, permission_map
+
+
+class TestPermissionMap(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+
+        app = create_app()
+        cls.context = app.test_request_context()
+        cls.context.push()
+
+        execution_db_help.setup_dbs()
+
+        create_user()
+        cls.cache = MockRedisCacheAdapter()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+
+    def setUp(self):
+        self.version_key = 'permissions:version:test'
+        self.permission_map = PermissionMap(version_key=self.version_key)
+
+    def tearDown(self):
+        db.session.rollback()
+        for role in [role for role in Role.query.all() if role.name != 'admin' and role.name != 'guest']:
+            db.session.delete(role)
+        db.session.commit()
+        self.cache.delete(self.version_key)
+
+    def test_get_roles(self):
+        for resource_permission in (ResourcePermissions('playbooks', ['execute']),
+                                    ResourcePermissions('playbooks', ['read', 'update']),
+                                    ResourcePermissions('users', ['create']),
+                                    ResourcePermissions('nothing', ['read'])):
+            self.assertSetEqual(self.permission_map.get_roles(resource_permission, self.cache),
+                                get_roles_by_resource_permissions(resource_permission))
+
+    def test_loaded_once(self):
+        with patch.object(PermissionMap, '_load', wraps=PermissionMap._load) as mock_load:
+            for _ in range(5):
+                self.permission_map.get_roles(ResourcePermissions('playbooks', ['execute']), self.cache)
+        self.assertEqual(mock_load.call_count, 1)
+
+    def test_role_change_in_process(self):
+        resource_permission = ResourcePermissions('playbooks', ['execute'])
+        permission_map.get_roles(resource_permission)
+        role = Role('executor', resources=[{'name': 'playbooks', 'permissions': ['execute']}])
+        db.session.add(role)
+        db.session.commit()
+        self.assertIn(role.id, permission_map.get_roles(resource_permission))
+
+        role.set_resources([{'name': 'playbooks', 'permissions': ['read']}])
+        self.assertNotIn(role.id, permission_map.get_roles(resource_permission))
+
+    def test_changes_tracked_in_server_db_session_only(self):
+        session = Session(bind=db.engine)
+        session.add(Role('executor'))
+        session.flush()
+        self.assertNotIn('permissions_changed', session.info)
+        session.rollback()
+        session.close()
+
+        db.session.add(Role('executor'))
+        db.session.flush()
+        self.assertTrue(db.session.info['permissions_changed'])
+
+    def test_role_change_in_other_process(self):
+        resource_permission = ResourcePermissions('playbooks', ['execute'])
+        self.permission_map.get_roles(resource_permission, self.cache)
+        with patch.object(PermissionMap, '_load', wraps=PermissionMap._load) as mock_load:
+            PermissionMap(version_key=self.version_key).invalidate(self.cache)
+            with patch.object(walkoff.config.Config, 'PERMISSION_MAP_CHECK_INTERVAL_SECONDS', 60):
+                self.permission_map.get_roles(resource_permission, self.cache)
+            self.assertEqual(mock_load.call_count, 0)
+            with patch.object(walkoff.config.Config, 'PERMISSION_MAP_CHECK_INTERVAL_SECONDS', 0):
+                self.permission_map.get_roles(resource_permission, self.cache)
+                self.permission_map.get_roles(resource_permission, self.cache)
+            self.assertEqual(mock_load.call_count, 1)
@@ -0,0 +1,225 @@
+import json
+import os
+import unittest
+from io import BytesIO
+from uuid import uuid4
+
+import walkoff.appgateway
+import walkoff.config
+from tests.util import execution_db_help
+from tests.util import initialize_test_config
+from walkoff.executiondb.argument import Argument
+from walkoff.executiondb.bulk import AppApiIndex, PlaybookImporter, WorkflowCopier, iter_json_documents
+from walkoff.executiondb.playbook import Playbook
+from walkoff.executiondb.schemas import PlaybookSchema
+from walkoff.executiondb.workflow import Workflow
+
+
+def strip_ids(element):
+    for key in ('id', 'start', 'source_id', 'destination_id', 'reference'):
+        element.pop(key, None)
+    for value in element.values():
+        if isinstance(value, list):
+            for list_element in (list_element_ for list_element_ in value if isinstance(list_element_, dict)):
+                strip_ids(list_element)
+        elif isinstance(value, dict):
+            strip_ids(value)
+    return element
+
+
+class TestIterJsonDocuments(unittest.TestCase):
+    def read_documents(self, text, chunk_size=65536):
+        return list(iter_json_documents(BytesIO(text.encode('utf-8')), chunk_size=chunk_size))
+
+    def test_single_document(self):
+        self.assertListEqual(self.read_documents('{"name": "a"}'), [{'name': 'a'}])
+
+    def test_array(self):
+        self.assertListEqual(self.read_documents(' [{"name": "a"}, {"name": "b"}] '), [{'name': 'a'}, {'name': 'b'}])
+
+    def test_empty_array(self):
+        self.assertListEqual(self.read_documents('[]'), [])
+
+    def test_newline_delimited(self):
+        self.assertListEqual(self.read_documents('{"name": "a"}\n{"name": "b"}\n'), [{'name': 'a'}, {'name': 'b'}])
+
+    def test_small_chunks(self):
+        playbooks = [{'name': 'playbook{}'.format(i), 'workflows': [{'name': 'ü' * i}]} for i in range(50)]
+        self.assertListEqual(self.read_documents(json.dumps(playbooks), chunk_size=3), playbooks)
+
+    def test_byte_order_mark(self):
+        self.assertListEqual(list(iter_json_documents(BytesIO(u'[{"name": "a"}]'.encode('utf-8-sig')))),
+                             [{'name': 'a'}])
+
+    def test_invalid_json(self):
+        with self.assertRaises(ValueError):
+            self.read_documents('[{"name": "a"}, {"name": ')
+
+    def test_unterminated_array(self):
+        with self.assertRaises(ValueError):
+            self.read_documents('[{"name": "a"}')
+
+
+class TestPlaybookImporter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def tearDown(self):
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        walkoff.appgateway.clear_cache()
+        execution_db_help.tear_down_execution_db()
+
+    @staticmethod
+    def load_playbook_json(name):
+        with open(os.path.join(walkoff.config.Config.WORKFLOWS_PATH, name + '.playbook')) as playbook_file:
+            return json.load(playbook_file)
+
+    def import_playbooks(self, *playbooks, **kwargs):
+        importer = PlaybookImporter(self.execution_db.session, **kwargs)
+        for playbook_json in playbooks:
+            importer.add_playbook(playbook_json)
+        importer.flush()
+        self.execution_db.session.commit()
+        return importer
+
+    def get_playbook(self, name):
+        return self.execution_db.session.query(Playbook).filter_by(name=name).first()
+
+    def test_import_matches_schema_load(self):
+        for name in ('basicWorkflowTest', 'dataflowTest', 'triggerActionWorkflow', 'environmentVariables'):
+            self.import_playbooks(self.load_playbook_json(name), regenerate_ids=True)
+            imported = PlaybookSchema().dump(self.get_playbook(name))
+
+            expected = PlaybookSchema().dump(PlaybookSchema().load(self.load_playbook_json(name)))
+            self.execution_db.session.rollback()
+            self.assertDictEqual(strip_ids(imported), strip_ids(expected))
+
+    def test_import_keeps_ids(self):
+        playbook_json = self.load_playbook_json('basicWorkflowTest')
+        self.import_playbooks(playbook_json)
+        playbook = self.get_playbook('basicWorkflowTest')
+        self.assertEqual(str(playbook.workflows[0].actions[0].id),
+                         playbook_json['workflows'][0]['actions'][0]['id'])
+        self.assertEqual(str(playbook.workflows[0].start), playbook_json['workflows'][0]['start'])
+
+    def test_import_regenerate_ids(self):
+        playbook_json = self.load_playbook_json('dataflowTest')
+        original = self.load_playbook_json('dataflowTest')
+        self.import_playbooks(playbook_json, regenerate_ids=True)
+        workflow = self.get_playbook('dataflowTest').workflows[0]
+        original_action_ids = {action['id'] for action in original['workflows'][0]['actions']}
+        action_ids = {action.id for action in workflow.actions}
+        self.assertFalse(original_action_ids & {str(action_id) for action_id in action_ids})
+        self.assertIn(workflow.start, action_ids)
+        for branch in workflow.branches:
+            self.assertIn(branch.source_id, action_ids)
+            self.assertIn(branch.destination_id, action_ids)
+        references = [argument.reference for action in workflow.actions for argument in action.arguments
+                      if argument.reference]
+        self.assertTrue(references)
+        for reference in references:
+            self.assertIn(reference, action_ids)
+
+    def test_import_validates(self):
+        start = str(uuid4())
+        playbook_json = {'name': 'invalid', 'workflows': [
+            {'name': 'unknown_app', 'start': start,
+             'actions': [{'id': start, 'app_name': 'Nope', 'action_name': 'helloWorld', 'name': 'a'}]},
+            {'name': 'bad_arguments', 'start': start,
+             'actions': [{'id': start, 'app_name': 'HelloWorld', 'action_name': 'repeatBackToMe', 'name': 'a',
+                          'arguments': [{'name': 'call', 'value': 1}, {'name': 'extra', 'value': 1}]}]},
+            {'name': 'bad_branch', 'start': start,
+             'actions': [{'id': start, 'app_name': 'HelloWorld', 'action_name': 'helloWorld', 'name': 'a'}],
+             'branches': [{'source_id': start, 'destination_id': str(uuid4())}]},
+            {'name': 'valid', 'start': start,
+             'actions': [{'id': start, 'app_name': 'HelloWorld', 'action_name': 'helloWorld', 'name': 'a'}]}]}
+        importer = self.import_playbooks(playbook_json, regenerate_ids=True)
+        self.assertEqual(importer.playbooks[0]['workflows'], 4)
+        self.assertEqual(importer.playbooks[0]['invalid_workflows'], 3)
+
+        workflows = {workflow.name: workflow for workflow in self.get_playbook('invalid').workflows}
+        self.assertListEqual(workflows['unknown_app'].actions[0].errors, ['Unknown app Nope'])
+        self.assertFalse(workflows['unknown_app'].is_valid)
+        self.assertTrue(workflows['bad_arguments'].actions[0].errors)
+        self.assertEqual(len(workflows['bad_branch'].errors), 1)
+        self.assertTrue(workflows['valid'].is_valid)
+
+    def test_import_invalid_argument(self):
+        playbook_json = {'name': 'invalid', 'workflows': [
+            {'name': 'wf', 'actions': [{'app_name': 'HelloWorld', 'action_name': 'helloWorld', 'name': 'a',
+                                        'arguments': [{'name': 'call'}]}]}]}
+        with self.assertRaises(ValueError):
+            self.import_playbooks(playbook_json)
+
+    def test_import_batches(self):
+        playbooks = []
+        for i in range(5):
+            playbook_json = self.load_playbook_json('basicWorkflowTest')
+            playbook_json['name'] += str(i)
+            playbooks.append(playbook_json)
+        importer = self.import_playbooks(*playbooks, batch_size=2, regenerate_ids=True)
+        self.assertEqual(len(importer.playbooks), 5)
+        self.assertEqual(self.execution_db.session.query(Workflow).count(), 5)
+
+    def test_app_api_index_resolves_once(self):
+        index = AppApiIndex()
+        self.assertIs(index.get_action_api('HelloWorld', 'repeatBackToMe'),
+                      index.get_action_api('HelloWorld', 'repeatBackToMe'))
+        with self.assertRaises(walkoff.appgateway.apiutil.UnknownApp):
+            index.get_condition_api('Nope', 'regMatch')
+
+
+class TestWorkflowCopier(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def tearDown(self):
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        walkoff.appgateway.clear_cache()
+        execution_db_help.tear_down_execution_db()
+
+    def test_copy_workflow(self):
+        execution_db_help.load_playbooks(['triggerActionWorkflow', 'dataflowTest'])
+        for name in ('triggerActionWorkflow', 'dataflowWorkflow'):
+            original = self.execution_db.session.query(Workflow).filter_by(name=name).first()
+            new_id = WorkflowCopier(self.execution_db.session).copy_workflow(original.id, original.playbook_id,
+                                                                             name + '_copy')
+            self.execution_db.session.commit()
+
+            copy = self.execution_db.session.query(Workflow).filter_by(id=new_id).first()
+            self.assertEqual(copy.name, name + '_copy')
+            self.assertNotEqual(copy.start, original.start)
+            self.assertIn(copy.start, {action.id for action in copy.actions})
+            self.assertFalse({action.id for action in copy.actions} & {action.id for action in original.actions})
+            copy_json = PlaybookSchema().dump(copy.playbook)['workflows']
+            copy_json = [strip_ids(workflow) for workflow in copy_json if workflow['name'] == name + '_copy'][0]
+            original_json = strip_ids(PlaybookSchema().dump(original.playbook)['workflows'][0])
+            copy_json.pop('name')
+            original_json.pop('name')
+            self.assertDictEqual(copy_json, original_json)
+
+    def test_copy_playbook(self):
+        execution_db_help.load_playbooks(['dataflowTest'])
+        original = self.execution_db.session.query(Playbook).filter_by(name='dataflowTest').first()
+        original_arguments = self.execution_db.session.query(Argument).count()
+        new_id = WorkflowCopier(self.execution_db.session, batch_size=3).copy_playbook(original.id, 'copy')
+        self.execution_db.session.commit()
+
+        copy = self.execution_db.session.query(Playbook).filter_by(id=new_id).first()
+        self.assertEqual(copy.name, 'copy')
+        self.assertEqual(self.execution_db.session.query(Argument).count(), 2 * original_arguments)
+        copy_json = strip_ids(PlaybookSchema().dump(copy))
+        original_json = strip_ids(PlaybookSchema().dump(original))
+        copy_json.pop('name')
+        original_json.pop('name')
+        self.assertDictEqual(copy_json, original_json)
@@ -96,6 +96,14 @@ class TestRedisCacheAdapter(TestCase):
         self.assertEqual(self.cache.lpop('big'), '10')
         self.assertEqual(self.cache.rpop('big'), '12')
 
+    def test_brpop_first_nonempty_deque(self):
+        self.cache.rpush('second', 10, 11)
+        self.cache.rpush('third', 12)
+        self.assertTupleEqual(self.cache.brpop(['first', 'second', 'third'], timeout=1), ('second', '11'))
+
+    def test_brpop_timeout(self):
+        self.assertIsNone(self.cache.brpop(['first', 'second'], timeout=1))
+
     def test_scan_no_pattern(self):
         keys = ('a', 'b', 'c', 'd')
         for i, key in enumerate(keys):
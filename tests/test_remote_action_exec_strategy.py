@@ -1,10 +1,21 @@
 from unittest import TestCase
 from uuid import uuid4
 
+import requests
 import requests_mock
+from mock import patch
 
+from walkoff.executiondb.argument import Argument
 from walkoff.helpers import ExecutionError
-from walkoff.worker.action_exec_strategy import RemoteActionExecutionStrategy, ExecutableContext
+from walkoff.worker.action_exec_strategy import RemoteActionExecutionStrategy, ExecutableContext, CircuitBreaker
+
+
+class MockTransform(object):
+    def __init__(self, action_name, arguments=None, app_name='HelloWorld'):
+        self.app_name = app_name
+        self.action_name = action_name
+        self.id = uuid4()
+        self.arguments = arguments or []
 
 
 class MockWorkflowExecContext(object):
@@ -18,6 +29,9 @@ class TestRemoteActionExecStrategy(TestCase):
     def setUp(self):
         self.strategy = RemoteActionExecutionStrategy(MockWorkflowExecContext)
 
+    def tearDown(self):
+        RemoteActionExecutionStrategy.clear_services()
+
     @staticmethod
     def make_execution_context(
             executable_type='action',
@@ -108,3 +122,145 @@ class TestRemoteActionExecStrategy(TestCase):
             result = self.strategy.execute_from_context(context, acc, {})
             self.assertEqual(result.status, 'CustomSuccess')
             self.assertIsNone(result.result)
+
+    def test_execute_action_inline_result(self):
+        execution_id = str(uuid4())
+        context = self.make_execution_context(execution_id=execution_id)
+        url = RemoteActionExecutionStrategy.format_url('HelloWorld', MockWorkflowExecContext.execution_id, execution_id)
+
+        with requests_mock.Mocker() as mocker:
+            mocker.post(url, status_code=200, json={'status': 'Success', 'result_key': 'key', 'result': [1, 2]})
+            result = self.strategy.execute_from_context(context, {}, {})
+            self.assertEqual(result.status, 'Success')
+            self.assertListEqual(result.result, [1, 2])
+
+    def test_execute_non_action_inline_result(self):
+        execution_id = str(uuid4())
+        context = self.make_execution_context(execution_id=execution_id, executable_type='condition')
+        url = RemoteActionExecutionStrategy.format_url('HelloWorld', MockWorkflowExecContext.execution_id, execution_id)
+
+        with requests_mock.Mocker() as mocker:
+            mocker.post(url, status_code=200, json={'status': 'Success', 'result_key': 'key', 'result': False})
+            self.assertFalse(self.strategy.execute_from_context(context, {}, {}))
+
+    def test_connection_error_action(self):
+        context = self.make_execution_context()
+        with requests_mock.Mocker() as mocker:
+            mocker.post(requests_mock.ANY, exc=requests.ConnectionError)
+            result = self.strategy.execute_from_context(context, {}, {})
+            self.assertEqual(result.status, 'UnhandledException')
+
+    def test_connection_error_non_action(self):
+        context = self.make_execution_context(executable_type='transform')
+        with requests_mock.Mocker() as mocker:
+            mocker.post(requests_mock.ANY, exc=requests.Timeout)
+            with self.assertRaises(ExecutionError):
+                self.strategy.execute_from_context(context, {}, {})
+
+    def test_circuit_breaker_opens(self):
+        strategy = RemoteActionExecutionStrategy(MockWorkflowExecContext, failure_threshold=2)
+        with requests_mock.Mocker() as mocker:
+            mocker.post(requests_mock.ANY, status_code=503, json={'title': 'Unavailable'})
+            for _ in range(3):
+                result = strategy.execute_from_context(self.make_execution_context(), {}, {})
+                self.assertEqual(result.status, 'UnhandledException')
+            self.assertEqual(mocker.call_count, 2)
+            self.assertTrue(strategy.get_service('HelloWorld')[1].is_open())
+
+    def test_services_shared(self):
+        other_strategy = RemoteActionExecutionStrategy(MockWorkflowExecContext)
+        self.assertIs(other_strategy.get_service('HelloWorld')[0], self.strategy.get_service('HelloWorld')[0])
+        self.assertIsNot(self.strategy.get_service('Utilities')[0], self.strategy.get_service('HelloWorld')[0])
+
+    def test_from_config(self):
+        class MockConfig:
+            REMOTE_ACTION_TIMEOUT_SECONDS = 3
+            REMOTE_ACTION_CIRCUIT_BREAKER_THRESHOLD = 7
+
+        strategy = RemoteActionExecutionStrategy.from_config(MockConfig, MockWorkflowExecContext)
+        self.assertEqual((strategy.timeout, strategy.failure_threshold, strategy.max_retries), (3, 7, 2))
+
+    def test_execute_segment(self):
+        reference = uuid4()
+        executables = [MockTransform('select', [Argument('element', value='a')]),
+                       MockTransform('length', [Argument('extra', reference=reference, selection=['b', '1'])])]
+        url = RemoteActionExecutionStrategy.format_segment_url('HelloWorld', MockWorkflowExecContext.execution_id)
+        results = [{'status': 'Success', 'result_key': 'key1'}, {'status': 'Success', 'result_key': 'key2'}]
+        with requests_mock.Mocker() as mocker:
+            mocker.post(url, status_code=200, json={'results': results, 'result_index': 1, 'result': 3})
+            statuses, data = self.strategy.execute_segment(executables, {'a': [1, 2, 3]}, {})
+            request_json = mocker.request_history[0].json()
+        self.assertListEqual(statuses, ['Success', 'Success'])
+        self.assertEqual(data, 3)
+        self.assertEqual(request_json['data_in'], {'a': [1, 2, 3]})
+        self.assertDictEqual(request_json['executables'][0]['executable_context'],
+                             {'name': 'select', 'type': 'mocktransform', 'id': str(executables[0].id)})
+        self.assertListEqual(request_json['executables'][0]['arguments'], [{'name': 'element', 'value': 'a'}])
+        self.assertListEqual(request_json['executables'][1]['arguments'],
+                             [{'name': 'extra', 'reference': str(reference), 'selection': ['b', '1']}])
+
+    def test_execute_segment_result_in_cache(self):
+        executables = [MockTransform('select'), MockTransform('length')]
+        url = RemoteActionExecutionStrategy.format_segment_url('HelloWorld', MockWorkflowExecContext.execution_id)
+        results = [{'status': 'Success', 'result_key': 'key1'}, {'status': 'UnhandledException', 'result_key': 'key2'}]
+        acc = {str(executables[0].id): 'cached'}
+        with requests_mock.Mocker() as mocker:
+            mocker.post(url, status_code=200, json={'results': results, 'result_index': 0})
+            self.assertEqual(self.strategy.execute_segment(executables, 'in', acc),
+                             (['Success', 'UnhandledException'], 'cached'))
+
+    def test_execute_segment_no_success(self):
+        executables = [MockTransform('select'), MockTransform('length')]
+        results = [{'status': 'InvalidArguments', 'result_key': 'key1'}, {'status': 'Success', 'result_key': 'key2'}]
+        with requests_mock.Mocker() as mocker:
+            mocker.post(requests_mock.ANY, status_code=200, json={'results': results, 'result_index': -1})
+            self.assertEqual(self.strategy.execute_segment(executables, 'in', {}),
+                             (['InvalidArguments', 'Success'], 'in'))
+
+    def test_execute_segment_error(self):
+        executables = [MockTransform('select'), MockTransform('length')]
+        with requests_mock.Mocker() as mocker:
+            mocker.post(requests_mock.ANY, status_code=404, json={'title': 'Unknown transform'})
+            self.assertEqual(self.strategy.execute_segment(executables, 'in', {}),
+                             (['UnhandledException', 'UnhandledException'], 'in'))
+            mocker.post(requests_mock.ANY, exc=requests.ConnectionError)
+            self.assertEqual(self.strategy.execute_segment(executables, 'in', {}),
+                             (['UnhandledException', 'UnhandledException'], 'in'))
+
+
+class TestCircuitBreaker(TestCase):
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+
+    def test_disabled(self):
+        breaker = CircuitBreaker(failure_threshold=0)
+        for _ in range(10):
+            breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+
+    def test_probe_after_reset_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        with patch('walkoff.worker.action_exec_strategy.time.time', return_value=100):
+            breaker.record_failure()
+        with patch('walkoff.worker.action_exec_strategy.time.time', return_value=111):
+            self.assertTrue(breaker.allow_request())
+            self.assertFalse(breaker.allow_request())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow_request())
+        with patch('walkoff.worker.action_exec_strategy.time.time', return_value=122):
+            self.assertTrue(breaker.allow_request())
+            breaker.record_success()
+            self.assertTrue(breaker.allow_request())
+            self.assertFalse(breaker.is_open())
@@ -0,0 +1,155 @@
+import datetime
+import gzip
+import json
+import os
+import shutil
+import time
+import unittest
+import zlib
+from uuid import uuid4
+
+from mock import patch
+
+import walkoff.config
+from tests.util import execution_db_help, initialize_test_config
+from walkoff.executiondb import ExecutionDatabase, WorkflowStatusEnum
+from walkoff.executiondb.retention import (make_retention_policies, WorkflowStatusArchiver, RetentionJob,
+                                           RetentionManager)
+from walkoff.executiondb.workflowresults import WorkflowStatus, ActionStatus
+
+
+class TestRetention(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+        cls.archive_path = os.path.join('.', 'tests', 'tmp', 'archive')
+
+    def tearDown(self):
+        execution_db_help.cleanup_execution_db()
+        shutil.rmtree(self.archive_path, ignore_errors=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+
+    def add_workflow_statuses(self, number, status='completed', age_days=40, actions=1):
+        for _ in range(number):
+            workflow_status = WorkflowStatus(uuid4(), uuid4(), 'test')
+            workflow_status.running()
+            for _ in range(actions):
+                workflow_status._action_statuses.append(ActionStatus(uuid4(), uuid4(), 'name', 'app', 'action'))
+            getattr(workflow_status, status)()
+            if workflow_status.completed_at:
+                workflow_status.completed_at -= datetime.timedelta(days=age_days)
+            self.execution_db.session.add(workflow_status)
+        self.execution_db.session.commit()
+
+    def count(self, status=None):
+        query = self.execution_db.session.query(WorkflowStatus)
+        if status:
+            query = query.filter(WorkflowStatus.status == status)
+        return query.count()
+
+    def test_make_retention_policies(self):
+        self.assertDictEqual(make_retention_policies({'completed': 30, 'aborted': None}),
+                             {WorkflowStatusEnum.completed: 30})
+
+    def test_make_retention_policies_invalid(self):
+        for policies in ({'running': 30}, {'invalid': 30}, {'completed': -1}):
+            with self.assertRaises(ValueError):
+                make_retention_policies(policies)
+
+    def test_job_deletes_in_chunks(self):
+        self.add_workflow_statuses(7)
+        report = RetentionJob(self.execution_db.session, {WorkflowStatusEnum.completed: 30}, chunk_size=3).run()
+        self.assertEqual(report.status, 'completed')
+        self.assertEqual(report.deleted, 7)
+        self.assertEqual(report.chunks, 3)
+        self.assertEqual(self.count(), 0)
+        self.assertEqual(self.execution_db.session.query(ActionStatus).count(), 0)
+
+    def test_job_applies_policies_per_status(self):
+        self.add_workflow_statuses(2, age_days=10)
+        self.add_workflow_statuses(3, status='aborted', age_days=10)
+        self.add_workflow_statuses(2, status='running')
+        policies = {WorkflowStatusEnum.completed: 30, WorkflowStatusEnum.aborted: 7}
+        report = RetentionJob(self.execution_db.session, policies).run()
+        self.assertEqual(report.deleted, 3)
+        self.assertEqual(self.count(WorkflowStatusEnum.completed), 2)
+        self.assertEqual(self.count(WorkflowStatusEnum.aborted), 0)
+        self.assertEqual(self.count(WorkflowStatusEnum.running), 2)
+
+    def test_job_zero_days_deletes_all(self):
+        self.add_workflow_statuses(2, age_days=0)
+        RetentionJob(self.execution_db.session, {WorkflowStatusEnum.completed: 0}).run()
+        self.assertEqual(self.count(), 0)
+
+    def test_job_archives(self):
+        self.add_workflow_statuses(4, actions=2)
+        archiver = WorkflowStatusArchiver(self.archive_path, compression='gzip')
+        report = RetentionJob(self.execution_db.session, {WorkflowStatusEnum.completed: 30}, archiver=archiver).run()
+        self.assertEqual(report.archived, 4)
+
+        archived = []
+        for directory, _, filenames in os.walk(self.archive_path):
+            for filename in filenames:
+                self.assertTrue(filename.endswith('.ndjson.gz'))
+                with gzip.open(os.path.join(directory, filename), 'rt') as archive:
+                    archived.extend(json.loads(line) for line in archive)
+        self.assertEqual(len(archived), 4)
+        self.assertTrue(all(len(workflow['action_statuses']) == 2 for workflow in archived))
+
+    def test_job_archives_chunk_before_deleting(self):
+        self.add_workflow_statuses(3)
+        archiver = WorkflowStatusArchiver(self.archive_path, compression='gzip')
+        job = RetentionJob(self.execution_db.session, {WorkflowStatusEnum.completed: 30}, chunk_size=2,
+                           archiver=archiver)
+        archived_at_commit = []
+        commit = self.execution_db.session.commit
+
+        def read_archive_and_commit():
+            archived = 0
+            for directory, _, filenames in os.walk(self.archive_path):
+                for filename in filenames:
+                    with open(os.path.join(directory, filename), 'rb') as archive:
+                        data = zlib.decompressobj(zlib.MAX_WBITS | 16).decompress(archive.read())
+                    archived += data.count(b'\n')
+            archived_at_commit.append(archived)
+            commit()
+
+        with patch.object(self.execution_db.session, 'commit', side_effect=read_archive_and_commit):
+            job.run()
+        self.assertListEqual(archived_at_commit, [2, 3])
+
+    def test_archiver_partitions_by_completion_date(self):
+        workflow_status = WorkflowStatus(uuid4(), uuid4(), 'test')
+        workflow_status.completed()
+        workflow_status.completed_at = datetime.datetime(2018, 3, 9)
+        archiver = WorkflowStatusArchiver(self.archive_path, compression='none')
+        archiver.write(workflow_status, 'job')
+        archiver.close()
+        with open(os.path.join(self.archive_path, '2018', '03', '09', 'job.ndjson')) as archive:
+            self.assertEqual(json.loads(archive.readline())['execution_id'], str(workflow_status.execution_id))
+
+    def test_archiver_invalid_compression(self):
+        with self.assertRaises(ValueError):
+            WorkflowStatusArchiver(self.archive_path, compression='invalid')
+
+    def test_manager_background(self):
+        self.add_workflow_statuses(3)
+        manager = RetentionManager(ExecutionDatabase.instance, walkoff.config.Config)
+        report = manager.purge({WorkflowStatusEnum.completed: 30}, background=True)
+        for _ in range(50):
+            if not report.is_active:
+                break
+            time.sleep(0.1)
+        self.assertIs(manager.report, report)
+        self.assertEqual(report.as_json()['deleted'], 3)
+        self.assertEqual(self.count(), 0)
+
+    def test_manager_one_job_at_a_time(self):
+        manager = RetentionManager(ExecutionDatabase.instance, walkoff.config.Config)
+        report = manager.purge({WorkflowStatusEnum.completed: 30})
+        report.status = 'running'
+        self.assertIs(manager.purge({WorkflowStatusEnum.completed: 30}), report)
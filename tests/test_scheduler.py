@@ -1,6 +1,23 @@
+import datetime
+import os
+import shutil
+import tempfile
 import unittest
-
+from uuid import uuid4
+
+import gevent
+from mock import MagicMock, patch
+from redis.exceptions import LockError
+from sqlalchemy import create_engine
+from sqlalchemy.exc import ArgumentError
+
+import walkoff.appgateway
+import walkoff.config
+from tests.util import execution_db_help, initialize_test_config
+from tests.util.mock_objects import MockRedisCacheAdapter
+from walkoff.multiprocessedexecutor.multiprocessedexecutor import MultiprocessedExecutor
 from walkoff.scheduler import *
+from walkoff.scheduler import SchedulerLease, utc
 
 
 class MockWorkflow(object):
@@ -261,3 +278,269 @@ class TestScheduler(unittest.TestCase):
         self.assertEqual(self.scheduler.resume(), STATE_RUNNING)
         self.assert_event_count(1)
         self.assert_scheduler_state_is(STATE_RUNNING)
+
+
+    def test_get_scheduled_workflows(self):
+        self.scheduler.start()
+        task_id, workflow_ids = self.add_task_set_one()
+        task_id2, workflow_ids2 = self.add_task_set_two()
+        self.add_tasks(1, ['g'], self.trigger)
+        self.assertDictEqual(self.scheduler.get_all_scheduled_workflows(),
+                             {task_id: workflow_ids, task_id2: workflow_ids2, '1': ['g']})
+        self.assertListEqual(self.scheduler.get_scheduled_workflows(task_id), workflow_ids)
+        self.assertListEqual(self.scheduler.get_scheduled_workflows(1), ['g'])
+        self.assertListEqual(self.scheduler.get_scheduled_workflows('invalid'), [])
+
+    def test_get_scheduled_workflows_after_unschedule(self):
+        self.scheduler.start()
+        task_id, workflow_ids = self.add_task_set_one()
+        self.scheduler.unschedule_workflows(task_id, workflow_ids[:2])
+        self.assertListEqual(self.scheduler.get_scheduled_workflows(task_id), workflow_ids[2:])
+        self.scheduler.unschedule_workflows(task_id, workflow_ids[2:])
+        self.assertDictEqual(self.scheduler.get_all_scheduled_workflows(), {})
+
+    def test_get_scheduled_workflows_stopped(self):
+        task_id, workflow_ids = self.add_task_set_one()
+        self.assertDictEqual(self.scheduler.get_all_scheduled_workflows(), {task_id: workflow_ids})
+
+    def test_update_workflows(self):
+        self.scheduler.start()
+        workflow_id = str(uuid4())
+        self.add_tasks(1, [workflow_id], self.trigger)
+        self.scheduler.update_workflows(1, IntervalTrigger(minutes=1))
+        self.assertIsInstance(self.scheduler.scheduler.get_job(construct_task_id(1, workflow_id)).trigger,
+                              IntervalTrigger)
+
+class TestSchedulerLease(unittest.TestCase):
+    def setUp(self):
+        self.cache = MagicMock()
+        self.lock = self.cache.lock.return_value
+        self.lease = SchedulerLease(self.cache, lease_seconds=5)
+
+    def test_init(self):
+        self.cache.lock.assert_called_once_with('scheduler:leader', timeout=5)
+        self.assertFalse(self.lease.leader)
+
+    def test_renew_takes_lease(self):
+        self.lock.acquire.return_value = True
+        self.assertTrue(self.lease.renew())
+        self.lock.acquire.assert_called_once_with(blocking=False)
+        self.assertTrue(self.lease.renew())
+        self.lock.reacquire.assert_called_once_with()
+
+    def test_renew_lease_held_elsewhere(self):
+        self.lock.acquire.return_value = False
+        self.assertFalse(self.lease.renew())
+        self.lock.reacquire.assert_not_called()
+
+    def test_renew_lease_lost(self):
+        self.lock.acquire.return_value = True
+        self.lease.renew()
+        self.lock.reacquire.side_effect = LockError
+        self.assertFalse(self.lease.renew())
+        self.assertFalse(self.lease.leader)
+
+    def test_release(self):
+        self.lease.release()
+        self.lock.release.assert_not_called()
+        self.lock.acquire.return_value = True
+        self.lease.renew()
+        self.lease.release()
+        self.lock.release.assert_called_once_with()
+        self.assertFalse(self.lease.leader)
+
+
+def persistent_job_store_supported():
+    jobstore = SQLAlchemyJobStore(engine=create_engine('sqlite://'))
+    try:
+        jobstore.start(MagicMock(), 'default')
+        jobstore.lookup_job('job')
+    except ArgumentError:
+        return False
+    return True
+
+
+class TestDistributedScheduler(unittest.TestCase):
+    def setUp(self):
+        self.schedulers = []
+
+    def tearDown(self):
+        for scheduler in self.schedulers:
+            if scheduler.scheduler.state != STATE_STOPPED:
+                scheduler.stop()
+
+    def make_scheduler(self, leader=True, execution_db=None):
+        cache = MagicMock()
+        cache.lock.return_value.acquire.return_value = leader
+        scheduler = Scheduler(execution_db, cache)
+        self.schedulers.append(scheduler)
+        return scheduler
+
+    def make_due(self, scheduler, job_ids, seconds=1):
+        run_time = datetime.datetime.now(utc) - datetime.timedelta(seconds=seconds)
+        for job_id in job_ids:
+            scheduler.scheduler.modify_job(job_id, next_run_time=run_time)
+
+    @staticmethod
+    def wait_for_call(mock_execute, timeout=1):
+        for _ in range(int(timeout / 0.05)):
+            if mock_execute.called:
+                return
+            gevent.sleep(0.05)
+
+    def test_follower_does_not_fire(self):
+        follower = self.make_scheduler(leader=False)
+        follower.start()
+        self.assertEqual(follower.state, STATE_RUNNING)
+        self.assertEqual(follower.scheduler.state, STATE_PAUSED)
+        follower.schedule_workflows('task', execute, ['a'], IntervalTrigger(minutes=1))
+        self.make_due(follower, ['task-a'])
+        with patch('walkoff.scheduler.execute_scheduled_workflows') as mock_execute:
+            gevent.sleep(0.05)
+            mock_execute.assert_not_called()
+
+            follower.lease.lock.acquire.return_value = True
+            self.assertTrue(follower.check_lease())
+            self.wait_for_call(mock_execute)
+        mock_execute.assert_called_once_with(['a'])
+
+    def test_follower_does_not_fire_when_stopped(self):
+        follower = self.make_scheduler(leader=False)
+        follower.start()
+        follower.schedule_workflows('task', execute, ['a'], IntervalTrigger(minutes=1))
+        gevent.sleep(0.05)
+        self.make_due(follower, ['task-a'])
+        with patch('walkoff.scheduler.execute_scheduled_workflows') as mock_execute:
+            follower.stop()
+            gevent.sleep(0.05)
+        mock_execute.assert_not_called()
+
+    def test_leader_loses_lease(self):
+        scheduler = self.make_scheduler()
+        scheduler.start()
+        self.assertEqual(scheduler.scheduler.state, STATE_RUNNING)
+        scheduler.lease.lock.reacquire.side_effect = LockError
+        self.assertFalse(scheduler.check_lease())
+        self.assertEqual(scheduler.scheduler.state, STATE_PAUSED)
+        self.assertEqual(scheduler.state, STATE_RUNNING)
+
+    def test_pause_releases_lease(self):
+        scheduler = self.make_scheduler()
+        scheduler.start()
+        self.assertTrue(scheduler.lease.leader)
+        scheduler.pause()
+        self.assertEqual(scheduler.state, STATE_PAUSED)
+        self.assertFalse(scheduler.lease.leader)
+        scheduler.lease.lock.release.assert_called_once_with()
+        self.assertFalse(scheduler.check_lease())
+
+        scheduler.resume()
+        self.assertEqual(scheduler.scheduler.state, STATE_RUNNING)
+        self.assertTrue(scheduler.lease.leader)
+
+    def test_due_jobs_fired_in_one_batch(self):
+        scheduler = self.make_scheduler()
+        scheduler.start()
+        scheduler.schedule_workflows('task', execute, ['a', 'b'], IntervalTrigger(minutes=1))
+        with patch('walkoff.scheduler.execute_scheduled_workflows') as mock_execute:
+            self.make_due(scheduler, ['task-a', 'task-b'])
+            self.wait_for_call(mock_execute)
+        mock_execute.assert_called_once_with(['a', 'b'])
+        for job in scheduler.scheduler.get_jobs():
+            self.assertGreater(job.next_run_time, datetime.datetime.now(utc))
+
+
+@unittest.skipUnless(persistent_job_store_supported(),
+                     'The installed APScheduler does not support the installed SQLAlchemy')
+class TestPersistentScheduler(TestDistributedScheduler):
+    def setUp(self):
+        super(TestPersistentScheduler, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.execution_db = MagicMock()
+        self.execution_db.engine = create_engine('sqlite:///{}'.format(os.path.join(self.directory, 'jobs.db')))
+        patcher = patch.object(walkoff.config.Config, 'SCHEDULER_PERSISTENT', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        super(TestPersistentScheduler, self).tearDown()
+        self.execution_db.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def make_scheduler(self, leader=True, execution_db=None):
+        return super(TestPersistentScheduler, self).make_scheduler(leader, self.execution_db)
+
+    def test_jobs_persisted(self):
+        scheduler = self.make_scheduler()
+        scheduler.start()
+        scheduler.schedule_workflows('task', execute, ['a', 'b'], DateTrigger(run_date='2050-12-31 23:59:59'))
+        scheduler.stop()
+
+        other_scheduler = self.make_scheduler()
+        other_scheduler.start()
+        self.assertDictEqual(other_scheduler.get_all_scheduled_workflows(), {'task': ['a', 'b']})
+
+    def test_missed_fires_coalesced_after_restart(self):
+        scheduler = self.make_scheduler(leader=False)
+        scheduler.start()
+        scheduler.schedule_workflows('task', execute, ['a'], IntervalTrigger(minutes=1))
+        self.make_due(scheduler, ['task-a'], seconds=7200)
+        scheduler.stop()
+
+        restarted = self.make_scheduler()
+        restarted.schedule_workflows('task', execute, ['a'], IntervalTrigger(minutes=1))
+        with patch('walkoff.scheduler.execute_scheduled_workflows') as mock_execute:
+            restarted.start()
+            self.wait_for_call(mock_execute)
+        mock_execute.assert_called_once_with(['a'])
+        self.assertGreater(restarted.scheduler.get_job('task-a').next_run_time, datetime.datetime.now(utc))
+
+    def test_changed_trigger_replaces_job(self):
+        scheduler = self.make_scheduler(leader=False)
+        scheduler.start()
+        scheduler.schedule_workflows('task', execute, ['a'], IntervalTrigger(minutes=1))
+        self.make_due(scheduler, ['task-a'], seconds=7200)
+        scheduler.schedule_workflows('task', execute, ['a'], IntervalTrigger(minutes=5))
+        self.assertGreater(scheduler.scheduler.get_job('task-a').next_run_time, datetime.datetime.now(utc))
+
+    def test_get_scheduled_workflows_persisted(self):
+        scheduler = self.make_scheduler()
+        scheduler.start()
+        scheduler.schedule_workflows('1', execute, ['a', 'b'], DateTrigger(run_date='2050-12-31 23:59:59'))
+        scheduler.schedule_workflows('10', execute, ['c'], DateTrigger(run_date='2050-12-31 23:59:59'))
+        self.assertDictEqual(scheduler.get_all_scheduled_workflows(), {'1': ['a', 'b'], '10': ['c']})
+        self.assertListEqual(scheduler.get_scheduled_workflows(1), ['a', 'b'])
+        scheduler.unschedule_workflows('1', ['a'])
+        self.assertListEqual(scheduler.get_scheduled_workflows('1'), ['b'])
+
+
+class TestScheduledWorkflowExecution(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def setUp(self):
+        self.executor = MultiprocessedExecutor(MockRedisCacheAdapter(), walkoff.config.Config)
+        self.executor.results_sender = MagicMock()
+        self.executor.results_sender.create_workflow_request_message.return_value = b'message'
+
+    def tearDown(self):
+        self.executor.cache.delete('request_queue')
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def test_execute_workflows(self):
+        workflow = execution_db_help.load_workflow('test', 'helloWorldWorkflow')
+        missing_workflow_id = uuid4()
+        execution_ids = self.executor.execute_workflows([workflow.id, missing_workflow_id, str(workflow.id)])
+        self.assertIsNone(execution_ids[1])
+        self.assertEqual(len({execution_ids[0], execution_ids[2]}), 2)
+        self.assertEqual(self.executor.cache.cache.llen('request_queue'), 2)
+        sent_execution_ids = [args[0][1] for args in
+                              self.executor.results_sender.create_workflow_request_message.call_args_list]
+        self.assertListEqual(sent_execution_ids, [execution_ids[0], execution_ids[2]])
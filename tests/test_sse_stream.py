@@ -5,7 +5,7 @@ import gevent
 from gevent.monkey import patch_all
 
 from tests.util.mock_objects import MockRedisCacheAdapter
-from walkoff.sse import SseEvent, SseStream, InterfaceSseStream, create_interface_channel_name
+from walkoff.sse import SseEvent, SseStream, InterfaceSseStream, create_interface_channel_name, SseProjectionCache
 
 
 class TestSseEvent(TestCase):
@@ -42,6 +42,59 @@ class TestSseEvent(TestCase):
         event = SseEvent('ev', data)
         self.assertEqual(event.format(11), 'id: 11\nevent: ev\ndata: {}\n\n'.format(str(data)))
 
+    def test_serialize(self):
+        self.assertEqual(SseEvent.serialize({'a': 1}), json.dumps({'a': 1}))
+        self.assertEqual(SseEvent.serialize('abc'), 'abc')
+
+
+class CountingProjection(object):
+    def __init__(self, key='a'):
+        self.key = key
+        self.calls = 0
+
+    def __call__(self, data, event):
+        self.calls += 1
+        if data['a'] % 2:
+            return None
+        return {'b': data['a']}, event
+
+
+class TestSseProjectionCache(TestCase):
+    def setUp(self):
+        self.cache = SseProjectionCache(max_size=2)
+
+    @staticmethod
+    def make_message(a, event='ev'):
+        return json.dumps({'data': {'a': a}, 'event': event})
+
+    def test_get(self):
+        sse = self.cache.get(CountingProjection(), self.make_message(2))
+        self.assertEqual(sse.format(1), 'id: 1\nevent: ev\ndata: {}\n\n'.format(json.dumps({'b': 2})))
+
+    def test_get_filtered(self):
+        self.assertIsNone(self.cache.get(CountingProjection(), self.make_message(1)))
+
+    def test_get_projects_once_per_key(self):
+        projection = CountingProjection()
+        for _ in range(3):
+            self.cache.get(projection, self.make_message(2))
+            self.cache.get(projection, self.make_message(1))
+        self.assertEqual(projection.calls, 2)
+
+    def test_get_different_keys(self):
+        projection1 = CountingProjection('a')
+        projection2 = CountingProjection('b')
+        self.cache.get(projection1, self.make_message(2))
+        self.cache.get(projection2, self.make_message(2))
+        self.assertEqual(projection1.calls, 1)
+        self.assertEqual(projection2.calls, 1)
+
+    def test_get_evicts_oldest(self):
+        projection = CountingProjection()
+        for a in (2, 4, 6, 2):
+            self.cache.get(projection, self.make_message(a))
+        self.assertEqual(projection.calls, 4)
+
 
 class SseStreamTestBase(object):
 
@@ -129,6 +182,37 @@ class SseStreamTestBase(object):
         thread2.join(timeout=2)
         self.assertListEqual(result, formatted_sses)
 
+    def test_send_with_projection(self):
+
+        @self.stream.push('event1')
+        def pusher(a, ev):
+            gevent.sleep(0.1)
+            return {'a': a}, ev
+
+        result = []
+
+        def listen():
+            for event in self.stream.send(projection=CountingProjection()):
+                result.append(event)
+
+        args = [('event1', 1), ('event2', 2), ('event3', 4)]
+        sses = [SseEvent('event2', {'b': 2}), SseEvent('event3', {'b': 4})]
+        formatted_sses = [sse.format(i + 1) for i, sse in enumerate(sses)]
+
+        def publish():
+            for event, data in args:
+                pusher(data, event)
+            self.stream.unsubscribe()
+
+        thread = gevent.spawn(listen)
+        thread2 = gevent.spawn(publish)
+        thread.start()
+        thread2.start()
+        gevent.sleep(0.1)
+        thread.join(timeout=2)
+        thread2.join(timeout=2)
+        self.assertListEqual(result, formatted_sses)
+
     def test_stream_with_data(self):
         @self.stream.push('event1')
         def pusher(a, ev):
@@ -0,0 +1,251 @@
+import unittest
+from uuid import uuid4
+
+from mock import MagicMock, patch
+
+import walkoff.appgateway
+import walkoff.config
+from tests.util import execution_db_help, initialize_test_config
+from tests.util.mock_objects import MockRedisCacheAdapter
+from walkoff.appgateway.appinstancerepo import AppInstanceRepo
+from walkoff.events import WalkoffEvent
+from walkoff.executiondb import WorkflowStatusEnum
+from walkoff.executiondb.action import Action
+from walkoff.executiondb.argument import Argument
+from walkoff.executiondb.condition import Condition
+from walkoff.executiondb.conditionalexpression import ConditionalExpression
+from walkoff.executiondb.playbook import Playbook
+from walkoff.executiondb.saved_workflow import SavedWorkflow
+from walkoff.executiondb.workflow import Workflow
+from walkoff.executiondb.workflowresults import WorkflowStatus
+from walkoff.multiprocessedexecutor.multiprocessedexecutor import MultiprocessedExecutor
+from walkoff.multiprocessedexecutor.triggermatching import TriggerMatcher, claim_awaiting_executions
+from walkoff.worker.workflow_exec_strategy import WorkflowExecutor
+
+
+class TestTriggerDispatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def setUp(self):
+        self.executor = MultiprocessedExecutor(MockRedisCacheAdapter(), walkoff.config.Config)
+        self.executor.results_sender = MagicMock()
+        self.executor.results_sender.create_workflow_request_message.return_value = b'message'
+
+    def tearDown(self):
+        self.execution_db.session.query(SavedWorkflow).delete()
+        self.executor.cache.delete('request_queue')
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def add_execution(self, workflow_id, action_id, awaiting_data=True):
+        execution_id = str(uuid4())
+        workflow_status = WorkflowStatus(execution_id, workflow_id, 'wf')
+        if awaiting_data:
+            workflow_status.awaiting_data()
+        else:
+            workflow_status.running()
+        self.execution_db.session.add(workflow_status)
+        self.execution_db.session.add(SavedWorkflow(execution_id, workflow_id, action_id, {}))
+        self.execution_db.session.commit()
+        return execution_id
+
+    def test_get_waiting_workflows(self):
+        workflow_id, action_id = uuid4(), uuid4()
+        waiting = {self.add_execution(workflow_id, action_id), self.add_execution(uuid4(), uuid4())}
+        self.add_execution(workflow_id, action_id, awaiting_data=False)
+        self.assertSetEqual(set(self.executor.get_waiting_workflows()), waiting)
+
+    def test_get_waiting_workflows_by_workflow_and_action(self):
+        workflow_id, action_id = uuid4(), uuid4()
+        execution_id = self.add_execution(workflow_id, action_id)
+        other_action_execution_id = self.add_execution(workflow_id, uuid4())
+        self.add_execution(uuid4(), action_id)
+        self.assertListEqual(self.executor.get_waiting_workflows(workflow_id=workflow_id, action_id=action_id),
+                             [execution_id])
+        self.assertSetEqual(set(self.executor.get_waiting_workflows(workflow_id=workflow_id)),
+                            {execution_id, other_action_execution_id})
+
+    def test_get_waiting_workflows_by_execution_ids(self):
+        workflow_id, action_id = uuid4(), uuid4()
+        execution_id = self.add_execution(workflow_id, action_id)
+        self.add_execution(workflow_id, action_id)
+        running_execution_id = self.add_execution(workflow_id, action_id, awaiting_data=False)
+        self.assertListEqual(
+            self.executor.get_waiting_workflows(execution_ids=[execution_id, running_execution_id, str(uuid4())]),
+            [execution_id])
+
+    def test_resume_trigger_steps(self):
+        workflow_id, action_id = uuid4(), uuid4()
+        execution_ids = {self.add_execution(workflow_id, action_id), self.add_execution(workflow_id, action_id)}
+        sent = self.executor.resume_trigger_steps(list(execution_ids) + [str(uuid4())], {'a': 1}, user='admin')
+        self.assertSetEqual(set(sent), execution_ids)
+        self.assertEqual(self.executor.cache.cache.llen('request_queue'), 2)
+        for args in self.executor.results_sender.create_workflow_request_message.call_args_list:
+            self.assertEqual(args[0][0], workflow_id)
+            self.assertIn(args[0][1], execution_ids)
+            self.assertEqual(args[0][2], str(action_id))
+            self.assertTrue(args[0][4])
+            self.assertEqual(args[0][6:], ('admin', {'a': 1}))
+
+
+class TestWorkerTrigger(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def setUp(self):
+        self.workflow = execution_db_help.load_workflow('triggerActionWorkflow', 'triggerActionWorkflow')
+        self.action = self.workflow.actions[0]
+        self.executor = WorkflowExecutor(walkoff.config.Config, 1, self.execution_db, AppInstanceRepo)
+        self.execution_id = str(uuid4())
+        workflow_status = WorkflowStatus(self.execution_id, self.workflow.id, self.workflow.name)
+        workflow_status.awaiting_data()
+        self.execution_db.session.add(workflow_status)
+        self.execution_db.session.commit()
+        self.workflow_context = self.executor.make_new_context(self.workflow, self.execution_id)
+        self.events = []
+
+        @WalkoffEvent.CommonWorkflowSignal.connect
+        def log_event(sender, **kwargs):
+            self.events.append(kwargs['event'])
+
+        self.log_event = log_event
+
+    def tearDown(self):
+        WalkoffEvent.CommonWorkflowSignal.signal.disconnect(self.log_event)
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def take_trigger(self, accepted):
+        with patch.object(Action, 'execute_trigger', return_value=accepted) as mock_execute_trigger:
+            taken = self.executor._take_trigger(self.workflow_context, None, str(self.action.id), {'data': 1})
+        mock_execute_trigger.assert_called_once_with(None, {'data': 1}, self.workflow_context.accumulator)
+        return taken
+
+    def get_status(self):
+        self.execution_db.session.expire_all()
+        return self.execution_db.session.query(WorkflowStatus).filter_by(execution_id=self.execution_id).first().status
+
+    def test_trigger_not_taken(self):
+        self.assertFalse(self.take_trigger(False))
+        self.assertListEqual(self.events, [WalkoffEvent.TriggerActionNotTaken])
+        self.assertEqual(self.get_status(), WorkflowStatusEnum.awaiting_data)
+
+    def test_trigger_taken(self):
+        self.assertTrue(self.take_trigger(True))
+        self.assertListEqual(self.events, [WalkoffEvent.TriggerActionTaken])
+        self.assertEqual(self.get_status(), WorkflowStatusEnum.pending)
+
+    def test_trigger_taken_only_once(self):
+        self.assertTrue(self.take_trigger(True))
+        self.assertFalse(self.take_trigger(True))
+        self.assertListEqual(self.events, [WalkoffEvent.TriggerActionTaken])
+
+
+class TestTriggerMatching(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def setUp(self):
+        self.executor = MultiprocessedExecutor(MockRedisCacheAdapter(), walkoff.config.Config)
+        self.executor.results_sender = MagicMock()
+        self.executor.results_sender.create_workflow_request_message.return_value = b'message'
+
+    def tearDown(self):
+        self.execution_db.session.query(SavedWorkflow).delete()
+        self.executor.cache.delete('request_queue')
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def add_trigger_workflow(self, regex='1', reference=None, executions=1):
+        if reference is not None:
+            argument = Argument('regex', reference=reference)
+        else:
+            argument = Argument('regex', value=regex)
+        trigger = ConditionalExpression(conditions=[Condition('HelloWorld', 'regMatch', arguments=[argument])])
+        action = Action('HelloWorld', 'helloWorld', 'trigger', id=uuid4(), trigger=trigger)
+        workflow = Workflow('wf{}'.format(uuid4()), action.id, actions=[action])
+        self.execution_db.session.add(Playbook('play{}'.format(uuid4()), workflows=[workflow]))
+        self.execution_db.session.commit()
+
+        execution_ids = []
+        for _ in range(executions):
+            execution_id = str(uuid4())
+            workflow_status = WorkflowStatus(execution_id, workflow.id, workflow.name)
+            workflow_status.awaiting_data()
+            self.execution_db.session.add(workflow_status)
+            self.execution_db.session.add(SavedWorkflow(execution_id, workflow.id, action.id, {}))
+            execution_ids.append(execution_id)
+        self.execution_db.session.commit()
+        return execution_ids
+
+    @staticmethod
+    def match_regex(trigger, action_execution_strategy, data_in, accumulator):
+        return data_in == trigger.conditions[0].arguments[0].value
+
+    def test_identical_triggers_share_predicate(self):
+        execution_ids = self.add_trigger_workflow(executions=2) + self.add_trigger_workflow(executions=3)
+        matcher = TriggerMatcher(self.execution_db.session, execution_ids)
+        self.assertEqual(len(matcher.predicates), 1)
+        self.assertListEqual(matcher.unshared_execution_ids, [])
+        with patch.object(ConditionalExpression, 'execute', autospec=True,
+                          side_effect=self.match_regex) as mock_execute:
+            matches = matcher.match(['0', '1', '1'], lambda predicate: None)
+        self.assertEqual(mock_execute.call_count, 2)
+        self.assertSetEqual({match.execution_id for match in matches}, set(execution_ids))
+
+    def test_distinct_triggers(self):
+        first_execution_ids = self.add_trigger_workflow(regex='1', executions=2)
+        second_execution_ids = self.add_trigger_workflow(regex='2')
+        matcher = TriggerMatcher(self.execution_db.session, first_execution_ids + second_execution_ids)
+        self.assertEqual(len(matcher.predicates), 2)
+        with patch.object(ConditionalExpression, 'execute', autospec=True, side_effect=self.match_regex):
+            matches = matcher.match(['1', '3'], lambda predicate: None)
+        self.assertSetEqual({match.execution_id for match in matches}, set(first_execution_ids))
+
+    def test_referencing_trigger_not_shared(self):
+        execution_ids = self.add_trigger_workflow(reference=uuid4(), executions=2)
+        matcher = TriggerMatcher(self.execution_db.session, execution_ids)
+        self.assertEqual(len(matcher.predicates), 0)
+        self.assertSetEqual(set(matcher.unshared_execution_ids), set(execution_ids))
+
+    def test_send_events_to_triggers(self):
+        execution_ids = self.add_trigger_workflow(executions=3)
+        unmatched_execution_ids = self.add_trigger_workflow(regex='2')
+        claimed = claim_awaiting_executions(self.execution_db.session, execution_ids[:1])
+        self.assertListEqual(claimed, execution_ids[:1])
+
+        with patch.object(ConditionalExpression, 'execute', autospec=True, side_effect=self.match_regex):
+            resumed, sent = self.executor.send_events_to_triggers(['1'], execution_ids + unmatched_execution_ids)
+
+        self.assertSetEqual(set(resumed), set(execution_ids[1:]))
+        self.assertListEqual(sent, [])
+        events = [(call[1]['event'], call[1]['data']['workflow']['execution_id'])
+                  for call in self.executor.results_sender.handle_event.call_args_list]
+        self.assertSetEqual(set(events), {(WalkoffEvent.TriggerActionTaken, execution_id)
+                                          for execution_id in execution_ids[1:]})
+        for call in self.executor.results_sender.handle_event.call_args_list:
+            sender, workflow = call[0][1], call[1]['data']['workflow']
+            self.assertSetEqual(set(sender), {'name', 'id', 'app_name', 'action_name'})
+            self.assertEqual(sender['name'], 'trigger')
+            self.assertSetEqual(set(workflow), {'name', 'id', 'execution_id'})
+        self.assertEqual(self.executor.cache.cache.llen('request_queue'), 2)
+        self.assertListEqual(claim_awaiting_executions(self.execution_db.session, execution_ids), [])
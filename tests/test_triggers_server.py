@@ -61,7 +61,7 @@ class TestTriggersServer(ServerTestCase):
 
         @WalkoffEvent.TriggerActionTaken.connect
         def trigger_taken_callback(sender, **kwargs):
-            self.assertEqual(sender.id, action_id)
+            self.assertEqual(sender['id'], str(action_id))
             callback_count[WalkoffEvent.TriggerActionTaken] += 1
 
         @WalkoffEvent.ActionExecutionSuccess.connect
@@ -0,0 +1,155 @@
+import unittest
+from uuid import uuid4
+
+from mock import patch
+
+import walkoff.appgateway
+import walkoff.cache
+import walkoff.config
+from tests.util import execution_db_help, initialize_test_config
+from tests.util.mock_objects import MockRedisCacheAdapter
+from walkoff.executiondb.action import Action
+from walkoff.executiondb.argument import Argument
+from walkoff.executiondb.branch import Branch
+from walkoff.executiondb.playbook import Playbook
+from walkoff.executiondb.workflow import Workflow
+from walkoff.multiprocessedexecutor.affinity import BULK_QUEUE, ConsistentHashRing, REQUEST_QUEUE, get_affinity_key, \
+    get_lane, get_request_queue, get_worker_lanes
+from walkoff.worker.zmq_workflow_receivers import WorkflowReceiver
+
+
+class TestConsistentHashRing(unittest.TestCase):
+    def test_get_node_is_stable(self):
+        ring = ConsistentHashRing(range(4))
+        self.assertEqual(ring.get_node('HelloWorld:1'), ConsistentHashRing(range(4)).get_node('HelloWorld:1'))
+
+    def test_get_node_empty(self):
+        self.assertIsNone(ConsistentHashRing([]).get_node('key'))
+
+    def test_keys_spread_over_nodes(self):
+        ring = ConsistentHashRing(range(4))
+        counts = {node: 0 for node in range(4)}
+        for i in range(4000):
+            counts[ring.get_node('app:{}'.format(i))] += 1
+        for count in counts.values():
+            self.assertGreater(count, 500)
+
+    def test_adding_node_moves_few_keys(self):
+        keys = ['app:{}'.format(i) for i in range(4000)]
+        ring = ConsistentHashRing(range(4))
+        larger_ring = ConsistentHashRing(range(5))
+        moved = [key for key in keys if ring.get_node(key) != larger_ring.get_node(key)]
+        self.assertLess(len(moved), 1400)
+        self.assertTrue(all(larger_ring.get_node(key) == 4 for key in moved))
+
+
+class TestAffinityRouting(unittest.TestCase):
+    def test_get_request_queue_disabled(self):
+        self.assertEqual(get_request_queue('HelloWorld:1', 0), REQUEST_QUEUE)
+
+    def test_get_request_queue_no_affinity_key(self):
+        self.assertEqual(get_request_queue(None, 4), REQUEST_QUEUE)
+
+    def test_get_request_queue(self):
+        queue = get_request_queue('HelloWorld:1', 4)
+        self.assertIn(queue, [get_lane(shard) for shard in range(4)])
+        self.assertEqual(get_request_queue('HelloWorld:1', 4), queue)
+
+    def test_get_worker_lanes_disabled(self):
+        self.assertListEqual(get_worker_lanes(1, 0, 4), [REQUEST_QUEUE, BULK_QUEUE])
+
+    def test_get_worker_lanes(self):
+        self.assertListEqual(get_worker_lanes(1, 4, 4),
+                             [get_lane(1), REQUEST_QUEUE, get_lane(2), get_lane(3), get_lane(0), BULK_QUEUE])
+        self.assertListEqual(get_worker_lanes(3, 4, 4),
+                             [get_lane(3), REQUEST_QUEUE, get_lane(0), get_lane(1), get_lane(2), BULK_QUEUE])
+
+    def test_get_worker_lanes_more_shards_than_workers(self):
+        lanes = get_worker_lanes(0, 4, 2)
+        self.assertListEqual(lanes[:3], [get_lane(0), get_lane(2), REQUEST_QUEUE])
+        self.assertSetEqual(set(lanes[3:-1]), {get_lane(1), get_lane(3)})
+        self.assertEqual(lanes[-1], BULK_QUEUE)
+
+    def test_every_lane_is_consumed(self):
+        lanes = set()
+        for worker_id in range(4):
+            lanes.update(get_worker_lanes(worker_id, 4, 4)[:1])
+        self.assertSetEqual(lanes, {get_lane(shard) for shard in range(4)})
+
+
+class TestAffinityKey(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def tearDown(self):
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        execution_db_help.tear_down_execution_db()
+        walkoff.appgateway.clear_cache()
+
+    def make_workflow(self, actions):
+        branches = [Branch(source.id, destination.id) for source, destination in zip(actions, actions[1:])]
+        workflow = Workflow('wf', actions[0].id, actions=actions, branches=branches)
+        self.execution_db.session.add(Playbook('play', workflows=[workflow]))
+        self.execution_db.session.commit()
+        return workflow
+
+    def test_get_affinity_key(self):
+        actions = [Action('HelloWorld', 'helloWorld', 'a', id=uuid4(), device_id=Argument('__device__', value=2)),
+                   Action('HelloWorld', 'helloWorld', 'b', id=uuid4(), device_id=Argument('__device__', value=1)),
+                   Action('DailyQuote', 'quoteIntro', 'c', id=uuid4(), device_id=Argument('__device__', value=1)),
+                   Action('HelloWorld', 'helloWorld', 'd', id=uuid4(), device_id=Argument('__device__', value=1))]
+        workflow = self.make_workflow(actions)
+        self.assertEqual(get_affinity_key(self.execution_db.session, workflow.id),
+                         'DailyQuote:1,HelloWorld:1,HelloWorld:2')
+
+    def test_get_affinity_key_no_devices(self):
+        workflow = self.make_workflow([Action('HelloWorld', 'helloWorld', 'a', id=uuid4())])
+        self.assertIsNone(get_affinity_key(self.execution_db.session, workflow.id))
+
+    def test_get_affinity_key_referenced_device(self):
+        first_id = uuid4()
+        actions = [Action('HelloWorld', 'helloWorld', 'a', id=first_id),
+                   Action('HelloWorld', 'helloWorld', 'b', id=uuid4(),
+                          device_id=Argument('__device__', reference=first_id))]
+        workflow = self.make_workflow(actions)
+        self.assertIsNone(get_affinity_key(self.execution_db.session, workflow.id))
+
+
+class TestWorkflowReceiverLanes(unittest.TestCase):
+    @patch.object(walkoff.cache, 'make_cache', return_value=MockRedisCacheAdapter())
+    def setUp(self, mock_make_cache):
+        self.lanes = get_worker_lanes(0, 2, 2)
+        self.receiver = WorkflowReceiver(None, None, walkoff.config.Config.CACHE, lanes=self.lanes)
+        for lane in self.lanes:
+            self.receiver.cache.delete(lane)
+
+    def tearDown(self):
+        for lane in self.lanes:
+            self.receiver.cache.delete(lane)
+
+    def test_default_lanes(self):
+        with patch.object(walkoff.cache, 'make_cache', return_value=MockRedisCacheAdapter()):
+            self.assertListEqual(WorkflowReceiver(None, None, walkoff.config.Config.CACHE).lanes, [REQUEST_QUEUE])
+
+    def test_own_lane_first(self):
+        self.receiver.cache.lpush(get_lane(1), 'stolen')
+        self.receiver.cache.lpush(REQUEST_QUEUE, 'shared')
+        self.receiver.cache.lpush(get_lane(0), 'own')
+        self.assertListEqual([self.receiver._receive_message() for _ in range(4)], ['own', 'shared', 'stolen', None])
+
+    def test_bulk_lane_last(self):
+        self.receiver.cache.lpush(BULK_QUEUE, 'bulk')
+        self.receiver.cache.lpush(get_lane(1), 'stolen')
+        self.receiver.cache.lpush(REQUEST_QUEUE, 'shared')
+        self.assertListEqual([self.receiver._receive_message() for _ in range(4)], ['shared', 'stolen', 'bulk', None])
+
+    def test_lanes_popped_together(self):
+        self.receiver.cache.lpush(get_lane(1), 'stolen')
+        with patch.object(self.receiver.cache, 'rpop') as mock_rpop:
+            self.assertEqual(self.receiver._receive_message(), 'stolen')
+        mock_rpop.assert_not_called()
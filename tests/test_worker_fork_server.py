@@ -0,0 +1,81 @@
+import errno
+import os
+import shutil
+import signal
+import tempfile
+import time
+import unittest
+
+from mock import patch
+
+from start_workers import shutdown_procs
+from walkoff.worker.forkserver import WorkerForkServer, WorkerProcess
+
+
+class MockWorker(object):
+    directory = None
+
+    def __init__(self, id_, config_path, preloaded=False):
+        with open(os.path.join(self.directory, str(id_)), 'w') as worker_file:
+            worker_file.write('{0} {1} {2}'.format(os.getppid(), config_path, preloaded))
+        signal.signal(signal.SIGABRT, lambda signum, frame: os._exit(0))
+        time.sleep(30)
+
+
+class TestWorkerForkServer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        MockWorker.directory = self.directory
+        self.processes = []
+
+    def tearDown(self):
+        shutdown_procs(self.processes)
+        shutil.rmtree(self.directory)
+
+    def wait_for_file(self, name):
+        path = os.path.join(self.directory, name)
+        for _ in range(100):
+            if os.path.exists(path):
+                with open(path) as worker_file:
+                    contents = worker_file.read()
+                if contents:
+                    return contents
+            time.sleep(0.05)
+        self.fail('Worker {} did not start'.format(name))
+
+    @patch.object(WorkerForkServer, '_load')
+    def test_spawn_workers(self, mock_load):
+        fork_server = WorkerForkServer('config.json', worker_class=MockWorker)
+        self.assertTrue(fork_server.start())
+        self.processes.append(fork_server.process)
+        workers = [fork_server.spawn_worker(i) for i in range(2)]
+        self.processes[:0] = workers
+
+        for i, worker in enumerate(workers):
+            self.assertTrue(worker.is_alive())
+            self.assertEqual(self.wait_for_file(str(i)),
+                             '{0} config.json True'.format(fork_server.process.pid))
+
+    @patch.object(WorkerForkServer, '_load')
+    def test_shutdown_workers(self, mock_load):
+        fork_server = WorkerForkServer('config.json', worker_class=MockWorker)
+        fork_server.start()
+        worker = fork_server.spawn_worker(0)
+        self.processes = [worker, fork_server.process]
+        self.wait_for_file('0')
+
+        shutdown_procs(self.processes)
+        self.assertFalse(worker.is_alive())
+        self.assertFalse(fork_server.process.is_alive())
+
+    @patch.object(WorkerForkServer, '_load', side_effect=ValueError)
+    def test_start_load_fails(self, mock_load):
+        fork_server = WorkerForkServer('config.json', worker_class=MockWorker)
+        self.assertFalse(fork_server.start())
+        self.assertFalse(fork_server.process.is_alive())
+
+    def test_worker_process_not_alive(self):
+        worker = WorkerProcess(os.getpid())
+        self.assertTrue(worker.is_alive())
+        with patch('os.kill', side_effect=OSError(errno.ESRCH, 'No such process')):
+            self.assertFalse(worker.is_alive())
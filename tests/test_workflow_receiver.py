@@ -1,3 +1,4 @@
+import json
 import os.path
 from unittest import TestCase
 from uuid import uuid4
@@ -77,7 +78,7 @@ class TestWorkflowReceiver(TestCase):
         message.workflow_id = workflow_id
         message.workflow_execution_id = execution_id
         message.resume = True
-        self.check_workflow_message(message, (workflow_id, execution_id, '', [], True, [], ''))
+        self.check_workflow_message(message, (workflow_id, execution_id, '', [], True, [], '', None))
 
     def test_receive_workflow_with_start(self):
         workflow_id = str(uuid4())
@@ -88,7 +89,19 @@ class TestWorkflowReceiver(TestCase):
         message.workflow_execution_id = execution_id
         message.resume = True
         message.start = start
-        self.check_workflow_message(message, (workflow_id, execution_id, start, [], True, [], ''))
+        self.check_workflow_message(message, (workflow_id, execution_id, start, [], True, [], '', None))
+
+    def test_receive_workflow_with_trigger_data(self):
+        workflow_id = str(uuid4())
+        execution_id = str(uuid4())
+        start = str(uuid4())
+        message = ExecuteWorkflowMessage()
+        message.workflow_id = workflow_id
+        message.workflow_execution_id = execution_id
+        message.resume = True
+        message.start = start
+        message.trigger_data_in = json.dumps({'a': [1, 2]})
+        self.check_workflow_message(message, (workflow_id, execution_id, start, [], True, [], '', {'a': [1, 2]}))
 
     def test_receive_workflow_with_arguments(self):
         workflow_id = str(uuid4())
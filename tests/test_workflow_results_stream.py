@@ -5,9 +5,9 @@ from uuid import uuid4
 from flask import Response
 from mock import patch
 
+import walkoff.config
 from tests.util.mock_objects import MockRedisCacheAdapter
 from tests.util.servertestcase import ServerTestCase
-from walkoff.executiondb.workflowresults import ActionStatus
 from walkoff.server.blueprints.workflowresults import *
 from walkoff.server.returncodes import SUCCESS
 
@@ -21,9 +21,7 @@ class TestWorkflowResultsStream(ServerTestCase):
 
     def tearDown(self):
         self.cache.clear()
-        for status in self.app.running_context.execution_db.session.query(WorkflowStatus).all():
-            self.app.running_context.execution_db.session.delete(status)
-        self.app.running_context.execution_db.session.commit()
+        workflow_metadata.clear()
 
     def assert_and_strip_timestamp(self, data, field='timestamp'):
         timestamp = data.pop(field, None)
@@ -98,6 +96,85 @@ class TestWorkflowResultsStream(ServerTestCase):
         self.assert_and_strip_timestamp(result)
         self.assertDictEqual(result, expected)
 
+    def test_format_action_data_with_long_json_results(self):
+        size_limit = 1
+        self.app.config['MAX_STREAM_RESULTS_SIZE_KB'] = size_limit
+        workflow_id = str(uuid4())
+        action_result = {'values': list(range(1024))}
+        kwargs = {'data': {'workflow': {'execution_id': workflow_id},
+                           'data': {'result': action_result}}}
+        result = format_action_data_with_results(self.get_sample_action_sender(), kwargs, ActionStatusEnum.success)
+        self.assertDictEqual(result['result'], {'truncated': json.dumps(action_result)[:1024 * size_limit]})
+
+    def test_truncate_result(self):
+        self.assertEqual(truncate_result('abc', 3), 'abc')
+        self.assertDictEqual(truncate_result('abcd', 3), {'truncated': 'abc'})
+        self.assertDictEqual(truncate_result({'a': 1}, 100), {'a': 1})
+        self.assertDictEqual(truncate_result([1, 2, 3, 4], 4), {'truncated': '[1, '})
+
+    def test_truncate_result_unserializable(self):
+        class A(object):
+            def __str__(self):
+                return 'x' * 10
+
+        self.assertDictEqual(truncate_result(A(), 4), {'truncated': 'xxxx'})
+
+    def get_projection_data(self, status=ActionStatusEnum.success, result='some result'):
+        kwargs = {'data': {'workflow': {'execution_id': str(uuid4())}, 'data': {'result': result}}}
+        return format_action_data_with_results(self.get_sample_action_sender(), kwargs, status)
+
+    def test_action_stream_projection_filters(self):
+        data = self.get_projection_data()
+        self.assertIsNotNone(ActionStreamProjection()(deepcopy(data), 'success'))
+        self.assertIsNotNone(ActionStreamProjection(apps=['HelloWorld'])(deepcopy(data), 'success'))
+        self.assertIsNone(ActionStreamProjection(apps=['Other'])(deepcopy(data), 'success'))
+        self.assertIsNotNone(ActionStreamProjection(actions=['some_action_name'])(deepcopy(data), 'success'))
+        self.assertIsNone(ActionStreamProjection(actions=['other'])(deepcopy(data), 'success'))
+        self.assertIsNotNone(ActionStreamProjection(statuses=['success'])(deepcopy(data), 'success'))
+        self.assertIsNone(ActionStreamProjection(statuses=['failure'])(deepcopy(data), 'success'))
+
+    def test_action_stream_projection_summary(self):
+        data = self.get_projection_data()
+        projected, event = ActionStreamProjection(summary=True)(deepcopy(data), 'success')
+        self.assertDictEqual(projected, {key: data[key] for key in action_summary_keys})
+        self.assertEqual(event, 'success')
+
+    def test_action_stream_projection_no_result(self):
+        data = self.get_projection_data()
+        projected, _ = ActionStreamProjection(include_result=False)(deepcopy(data), 'success')
+        data.pop('result')
+        self.assertDictEqual(projected, data)
+
+    def test_action_stream_projection_max_result_size(self):
+        data = self.get_projection_data(result='x' * 10)
+        projected, _ = ActionStreamProjection(max_result_size=4)(deepcopy(data), 'success')
+        self.assertDictEqual(projected['result'], {'truncated': 'xxxx'})
+
+    def test_action_stream_projection_key(self):
+        self.assertEqual(ActionStreamProjection(apps=['b', 'a'], statuses=['failure']).key,
+                         ActionStreamProjection(apps=['a', 'b'], statuses=['failure']).key)
+        self.assertNotEqual(ActionStreamProjection(apps=['a']).key, ActionStreamProjection(actions=['a']).key)
+        self.assertEqual(ActionStreamProjection(summary=True, max_result_size=10).key,
+                         ActionStreamProjection(summary=True).key)
+
+    def test_action_stream_projection_from_request_args(self):
+        self.assertIsNone(ActionStreamProjection.from_request_args({}))
+        self.assertIsNone(ActionStreamProjection.from_request_args({'summary': 'true'}))
+        projection = ActionStreamProjection.from_request_args(
+            {'apps': 'HelloWorld, DailyQuote', 'statuses': 'failure', 'max_result_size_kb': '2'})
+        self.assertSetEqual(projection.apps, {'HelloWorld', 'DailyQuote'})
+        self.assertSetEqual(projection.statuses, {'failure'})
+        self.assertIsNone(projection.actions)
+        self.assertEqual(projection.max_result_size, 2048)
+        self.assertTrue(projection.include_result)
+        projection = ActionStreamProjection.from_request_args({'include_result': 'false'})
+        self.assertFalse(projection.include_result)
+
+    def test_action_stream_projection_from_request_args_invalid(self):
+        for args in ({'statuses': 'invalid'}, {'max_result_size_kb': 'a'}, {'max_result_size_kb': '-1'}):
+            with self.assertRaises(ValueError):
+                ActionStreamProjection.from_request_args(args)
+
     def check_action_callback(self, callback, status, event, mock_publish, mock_summary, with_result=False):
         sender = self.get_sample_action_sender()
         kwargs = self.get_action_kwargs(with_result=with_result)
@@ -185,20 +262,21 @@ class TestWorkflowResultsStream(ServerTestCase):
 
     def get_workflow_status(self, workflow_execution_id, status):
         workflow_id = uuid4()
-        workflow_status = WorkflowStatus(workflow_execution_id, workflow_id, 'workflow1')
-        action_execution_id = uuid4()
-        action_id = uuid4()
-        self.app.running_context.execution_db.session.add(workflow_status)
-        action_status = ActionStatus(action_execution_id, action_id, 'my action', 'the_app', 'the_action')
-        self.app.running_context.execution_db.session.add(action_status)
-        workflow_status.add_action_status(action_status)
+        workflow_metadata.add(workflow_execution_id, workflow_id, 'workflow1')
+        current_action = {
+            'execution_id': str(uuid4()),
+            'action_id': str(uuid4()),
+            'name': 'my action',
+            'app_name': 'the_app',
+            'action_name': 'the_action'}
+        workflow_metadata.set_current_action(workflow_execution_id, current_action)
         expected = {
             'execution_id': str(workflow_execution_id),
             'workflow_id': str(workflow_id),
             'name': 'workflow1',
             'status': status.name,
-            'current_action': action_status.as_json(summary=True)}
-        return expected, workflow_status
+            'current_action': current_action}
+        return expected, current_action
 
     def test_format_workflow_result_with_current_step(self):
         workflow_execution_id = uuid4()
@@ -208,11 +286,10 @@ class TestWorkflowResultsStream(ServerTestCase):
         self.assert_and_strip_timestamp(result)
         self.assertDictEqual(result, expected)
 
-    def test_format_workflow_result_with_current_step_mismatched_status(self):
+    def test_format_workflow_result_with_current_step_str_execution_id(self):
         workflow_execution_id = uuid4()
-        expected, status = self.get_workflow_status(workflow_execution_id, WorkflowStatusEnum.running)
-        status.paused()
-        result = format_workflow_result_with_current_step(workflow_execution_id, WorkflowStatusEnum.running)
+        expected, _ = self.get_workflow_status(workflow_execution_id, WorkflowStatusEnum.running)
+        result = format_workflow_result_with_current_step(str(workflow_execution_id), WorkflowStatusEnum.running)
         self.assert_and_strip_timestamp(result)
         self.assertDictEqual(result, expected)
 
@@ -223,6 +300,70 @@ class TestWorkflowResultsStream(ServerTestCase):
         self.assert_and_strip_timestamp(result)
         self.assertDictEqual(result, expected)
 
+    def test_format_workflow_result_with_user(self):
+        sender = self.get_workflow_sender()
+        workflow_metadata.add(sender['execution_id'], sender['id'], sender['name'], user='admin')
+        result = format_workflow_result(sender, WorkflowStatusEnum.running)
+        self.assert_and_strip_timestamp(result)
+        self.assertEqual(result['user'], 'admin')
+
+    def test_workflow_metadata_add_existing_execution(self):
+        sender = self.get_workflow_sender()
+        workflow_metadata.add(sender['execution_id'], sender['id'], sender['name'], user='admin')
+        workflow_metadata.add(sender['execution_id'], sender['id'], sender['name'], user='other')
+        self.assertEqual(workflow_metadata.get(sender['execution_id'])['user'], 'admin')
+
+    def test_workflow_metadata_loaded_from_workflow_status(self):
+        execution_id = str(uuid4())
+        workflow_id = uuid4()
+        workflow_status = WorkflowStatus(execution_id, workflow_id, 'workflow1', user='admin')
+        workflow_status.running()
+        execution_db = current_app.running_context.execution_db
+        execution_db.session.add(workflow_status)
+        execution_db.session.commit()
+
+        result = format_workflow_result({'execution_id': execution_id, 'id': str(workflow_id), 'name': 'workflow1'},
+                                        WorkflowStatusEnum.running)
+        self.assertEqual(result['user'], 'admin')
+        workflow_metadata.set_current_action(execution_id, {'name': 'my action'})
+        result = format_workflow_result_with_current_step(execution_id, WorkflowStatusEnum.running)
+        self.assertEqual(result['name'], 'workflow1')
+        self.assertEqual(result['current_action'], {'name': 'my action'})
+
+    def test_workflow_metadata_set_current_action_not_cached(self):
+        execution_id = str(uuid4())
+        workflow_metadata.set_current_action(execution_id, {'name': 'my action'})
+        self.assertIsNone(workflow_metadata.get(execution_id))
+
+    def test_workflow_metadata_missing_execution_cached(self):
+        execution_id = str(uuid4())
+        with patch.object(current_app.running_context.execution_db.session, 'query',
+                          wraps=current_app.running_context.execution_db.session.query) as mock_query:
+            self.assertIsNone(workflow_metadata.get(execution_id))
+            self.assertIsNone(workflow_metadata.get(execution_id))
+        self.assertEqual(mock_query.call_count, 1)
+        workflow_metadata.add(execution_id, uuid4(), 'workflow1')
+        self.assertEqual(workflow_metadata.get(execution_id)['name'], 'workflow1')
+
+    def test_workflow_metadata_least_recently_used_evicted(self):
+        execution_ids = [str(uuid4()) for _ in range(3)]
+        with patch.object(walkoff.config.Config, 'WORKFLOW_METADATA_CACHE_SIZE', 2):
+            workflow_metadata.add(execution_ids[0], uuid4(), 'workflow1')
+            workflow_metadata.add(execution_ids[1], uuid4(), 'workflow2')
+            workflow_metadata.get(execution_ids[0])
+            workflow_metadata.add(execution_ids[2], uuid4(), 'workflow3')
+        self.assertEqual(workflow_metadata.get(execution_ids[0])['name'], 'workflow1')
+        self.assertEqual(workflow_metadata.get(execution_ids[2])['name'], 'workflow3')
+        self.assertIsNone(workflow_metadata.get(execution_ids[1]))
+
+    def test_workflow_metadata_add_many(self):
+        execution_ids = [str(uuid4()) for _ in range(2)]
+        workflow_id = uuid4()
+        workflow_metadata.add_many(execution_ids, workflow_id, 'workflow1', user='admin')
+        for execution_id in execution_ids:
+            self.assertDictEqual(workflow_metadata.get(execution_id),
+                                 {'workflow_id': str(workflow_id), 'name': 'workflow1', 'user': 'admin'})
+
     def check_workflow_callback(self, callback, sender, status, event, mock_publish, expected=None, **kwargs):
         if not expected:
             expected = format_workflow_result(deepcopy(sender), status)
@@ -241,6 +382,37 @@ class TestWorkflowResultsStream(ServerTestCase):
             WorkflowStatusEnum.pending,
             'queued',
             mock_publish)
+        self.assertIsNotNone(workflow_metadata.get(sender['execution_id']))
+
+    @patch.object(workflow_stream, 'publish')
+    def test_workflow_pending_callback_with_user(self, mock_publish):
+        sender = self.get_workflow_sender()
+        expected = format_workflow_result(deepcopy(sender), WorkflowStatusEnum.pending)
+        expected.pop('timestamp')
+        expected['user'] = 'admin'
+        self.check_workflow_callback(
+            workflow_pending_callback,
+            sender,
+            WorkflowStatusEnum.pending,
+            'queued',
+            mock_publish,
+            expected=expected,
+            data={'user': 'admin'})
+
+    @patch.object(action_summary_stream, 'publish')
+    @patch.object(action_stream, 'publish')
+    def test_action_started_callback_sets_current_action(self, mock_publish, mock_summary):
+        sender = self.get_sample_action_sender()
+        kwargs = self.get_action_kwargs()
+        workflow_execution_id = kwargs['workflow']['execution_id']
+        workflow_metadata.add(workflow_execution_id, uuid4(), 'workflow1')
+        action_started_callback(sender, data=kwargs)
+        expected = {'execution_id': sender['execution_id'],
+                    'action_id': sender['id'],
+                    'name': sender['name'],
+                    'app_name': sender['app_name'],
+                    'action_name': sender['action_name']}
+        self.assertDictEqual(workflow_metadata.get(workflow_execution_id)['current_action'], expected)
 
     @patch.object(workflow_stream, 'publish')
     def test_workflow_started_callback(self, mock_publish):
@@ -308,34 +480,35 @@ class TestWorkflowResultsStream(ServerTestCase):
             'triggered',
             mock_publish,
             expected=expected,
-            data={'workflow_execution_id': str(workflow_execution_id)})
+            data={'workflow': {'execution_id': str(workflow_execution_id)}})
 
     @patch.object(workflow_stream, 'publish')
     def test_workflow_aborted_callback(self, mock_publish):
         sender = self.get_workflow_sender()
+        workflow_metadata.add(sender['execution_id'], sender['id'], sender['name'])
         self.check_workflow_callback(
             workflow_aborted_callback,
             sender,
             WorkflowStatusEnum.aborted,
             'aborted',
             mock_publish)
+        self.assertIsNone(workflow_metadata.get(sender['execution_id']))
 
     @patch.object(workflow_stream, 'publish')
     def test_workflow_shutdown_callback(self, mock_publish):
         sender = self.get_workflow_sender()
+        workflow_metadata.add(sender['execution_id'], sender['id'], sender['name'])
         self.check_workflow_callback(
             workflow_shutdown_callback,
             sender,
             WorkflowStatusEnum.completed,
             'completed',
             mock_publish)
+        self.assertIsNone(workflow_metadata.get(sender['execution_id']))
 
     def check_stream_endpoint(self, endpoint, mock_stream, execution_id=None, summary=False):
         mock_stream.return_value = Response('something', status=SUCCESS)
-        post = self.test_client.post('/api/auth', content_type="application/json",
-                                     data=json.dumps(dict(username='admin', password='admin')), follow_redirects=True)
-        key = json.loads(post.get_data(as_text=True))['access_token']
-        url = '/api/streams/workflowqueue/{}?access_token={}'.format(endpoint, key)
+        url = self.get_stream_url(endpoint)
         if execution_id:
             url += '&workflow_execution_id={}'.format(execution_id)
         if summary:
@@ -350,6 +523,30 @@ class TestWorkflowResultsStream(ServerTestCase):
             mock_stream.assert_not_called()
             self.assertEqual(response.status_code, BAD_REQUEST)
 
+    def get_stream_url(self, endpoint):
+        post = self.test_client.post('/api/auth', content_type="application/json",
+                                     data=json.dumps(dict(username='admin', password='admin')), follow_redirects=True)
+        key = json.loads(post.get_data(as_text=True))['access_token']
+        return '/api/streams/workflowqueue/{}?access_token={}'.format(endpoint, key)
+
+    @patch.object(action_stream, 'stream')
+    def test_action_stream_endpoint_with_projection(self, mock_stream):
+        mock_stream.return_value = Response('something', status=SUCCESS)
+        url = self.get_stream_url('actions') + '&statuses=failure&apps=HelloWorld&summary=true'
+        response = self.test_client.get(url)
+        self.assertEqual(response.status_code, SUCCESS)
+        mock_stream.assert_called_once()
+        self.assertEqual(mock_stream.call_args[1]['subchannel'], 'all')
+        self.assertEqual(mock_stream.call_args[1]['projection'].key,
+                         ActionStreamProjection(apps=['HelloWorld'], statuses=['failure'], summary=True).key)
+
+    @patch.object(action_stream, 'stream')
+    def test_action_stream_endpoint_with_invalid_projection(self, mock_stream):
+        url = self.get_stream_url('actions') + '&statuses=invalid'
+        response = self.test_client.get(url)
+        mock_stream.assert_not_called()
+        self.assertEqual(response.status_code, BAD_REQUEST)
+
     def check_stream_endpoint_no_key(self, endpoint, mock_stream):
         mock_stream.return_value = Response('something', status=SUCCESS)
         response = self.test_client.get('/api/streams/workflowqueue/{}?access_token=invalid'.format(endpoint))
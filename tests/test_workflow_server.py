@@ -1,5 +1,6 @@
 import json
 import os
+from io import BytesIO
 from uuid import uuid4, UUID
 
 from tests.util import execution_db_help
@@ -491,3 +492,48 @@ class TestWorkflowServer(ServerTestCase):
         strip_device_ids(expected)
         strip_argument_ids(expected)
         self.assertDictEqual(response, expected)
+
+    def import_playbooks(self, playbooks_json, status_code=OBJECT_CREATED, **kwargs):
+        files = {'file': (BytesIO(playbooks_json.encode('utf-8')), 'playbooks.json')}
+        return self.post_with_status_check('/api/playbooks/import', headers=self.headers, status_code=status_code,
+                                           data=files, content_type='multipart/form-data', **kwargs)
+
+    def test_import_playbooks(self):
+        playbooks = []
+        for name in ('basicWorkflowTest', 'dataflowTest'):
+            with open(os.path.join(self.conf.WORKFLOWS_PATH, name + '.playbook')) as playbook_file:
+                playbooks.append(json.load(playbook_file))
+        response = self.import_playbooks(json.dumps(playbooks))
+        self.assertListEqual([playbook['name'] for playbook in response['playbooks']],
+                             ['basicWorkflowTest', 'dataflowTest'])
+        for playbook in response['playbooks']:
+            self.assertEqual(playbook['workflows'], 1)
+            self.assertEqual(playbook['invalid_workflows'], 0)
+            self.assertIsNotNone(self.app.running_context.execution_db.session.query(Playbook).filter_by(
+                id=playbook['id']).first())
+
+    def test_import_playbooks_duplicate_name(self):
+        playbook = json.dumps({'name': self.add_playbook_name})
+        self.import_playbooks(playbook)
+        self.import_playbooks(playbook, status_code=OBJECT_EXISTS_ERROR)
+
+    def test_import_playbooks_invalid_json(self):
+        self.import_playbooks('[{"name": "a"}, {"name": ', status_code=BAD_REQUEST)
+        self.assertIsNone(self.app.running_context.execution_db.session.query(Playbook).filter_by(name='a').first())
+
+    def test_export_import_playbooks(self):
+        playbook = execution_db_help.standard_load()
+        expected = self.get_with_status_check('/api/playbooks/{}?mode=export'.format(playbook.id),
+                                              headers=self.headers)
+        response = self.test_client.get('/api/playbooks/export', headers=self.headers)
+        self.assertEqual(response.status_code, SUCCESS)
+        exported = json.loads(response.get_data(as_text=True))
+        self.assertListEqual([playbook_json['name'] for playbook_json in exported], ['dataflowTest', 'test'])
+        self.assertDictEqual(exported[1], expected)
+
+        execution_db_help.cleanup_execution_db()
+        self.import_playbooks(response.get_data(as_text=True))
+        imported = self.app.running_context.execution_db.session.query(Playbook).filter_by(name='test').first()
+        self.assertListEqual([workflow.name for workflow in imported.workflows],
+                             [workflow['name'] for workflow in expected['workflows']])
+        self.assertEqual(len(imported.workflows[0].actions), len(expected['workflows'][0]['actions']))
@@ -1,9 +1,12 @@
 import datetime
 import json
+import time
 from uuid import uuid4, UUID
 
-from flask import current_app
+from flask import Request, current_app
+from mock import patch
 
+import walkoff.config
 import walkoff.executiondb.schemas
 import walkoff.server.workflowresults
 from tests.util import execution_db_help
@@ -14,6 +17,7 @@ from walkoff.executiondb.executionelement import ExecutionElement
 from walkoff.executiondb.workflow import Workflow
 from walkoff.executiondb.workflowresults import WorkflowStatus, ActionStatus
 from walkoff.multiprocessedexecutor.multiprocessedexecutor import MultiprocessedExecutor
+from walkoff.server.endpoints import workflowqueue
 from walkoff.server.returncodes import *
 
 
@@ -132,6 +136,77 @@ class TestWorkflowStatus(ServerTestCase):
                         'name': 'name'}}
         self.assertDictEqual(response, expected)
 
+    def test_current_action_set_on_append(self):
+        workflow_status = self.make_generic_workflow_status()
+        action_statuses = self.make_generic_action_statuses(2)
+        for action_status in action_statuses:
+            workflow_status._action_statuses.append(action_status)
+        self.assertDictEqual(json.loads(workflow_status.current_action), action_statuses[-1].as_json(summary=True))
+
+    def add_workflow_statuses(self, number, status='running', **kwargs):
+        workflow_statuses = []
+        for _ in range(number):
+            workflow_status = WorkflowStatus(uuid4(), kwargs.get('workflow_id', uuid4()), 'test',
+                                             user=kwargs.get('user'))
+            getattr(workflow_status, status)()
+            workflow_statuses.append(workflow_status)
+            self.app.running_context.execution_db.session.add(workflow_status)
+        self.app.running_context.execution_db.session.commit()
+        return workflow_statuses
+
+    def test_read_all_workflow_status_cursor_pagination(self):
+        self.add_workflow_statuses(5)
+        self.add_workflow_statuses(3, status='completed')
+
+        response = self.test_client.get('/api/workflowqueue?limit=3', headers=self.headers)
+        self.assertEqual(response.status_code, SUCCESS)
+        execution_ids = [status['execution_id'] for status in json.loads(response.get_data(as_text=True))]
+        while 'X-Next-Cursor' in response.headers:
+            response = self.test_client.get(
+                '/api/workflowqueue?limit=3&cursor={}'.format(response.headers['X-Next-Cursor']),
+                headers=self.headers)
+            self.assertEqual(response.status_code, SUCCESS)
+            execution_ids.extend(status['execution_id'] for status in json.loads(response.get_data(as_text=True)))
+
+        self.assertEqual(len(execution_ids), 8)
+        self.assertEqual(len(set(execution_ids)), 8)
+
+    def test_read_all_workflow_status_last_page_no_cursor(self):
+        self.add_workflow_statuses(2)
+        response = self.test_client.get('/api/workflowqueue?limit=2', headers=self.headers)
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_read_all_workflow_status_invalid_cursor(self):
+        self.get_with_status_check('/api/workflowqueue?cursor=invalid', headers=self.headers,
+                                   status_code=BAD_REQUEST)
+
+    def test_read_all_workflow_status_filter_by_workflow_id(self):
+        workflow_id = uuid4()
+        self.add_workflow_statuses(2, workflow_id=workflow_id)
+        self.add_workflow_statuses(3)
+        response = self.get_with_status_check('/api/workflowqueue?workflow_id={}'.format(workflow_id),
+                                              headers=self.headers)
+        self.assertEqual(len(response), 2)
+        self.assertTrue(all(status['workflow_id'] == str(workflow_id) for status in response))
+
+    def test_read_all_workflow_status_filter_by_status_and_user(self):
+        self.add_workflow_statuses(2, user='admin')
+        self.add_workflow_statuses(1, status='completed', user='admin')
+        self.add_workflow_statuses(3, status='completed', user='other')
+        response = self.get_with_status_check('/api/workflowqueue?status=completed,aborted&username=admin',
+                                              headers=self.headers)
+        self.assertEqual(len(response), 1)
+        self.assertEqual(response[0]['status'], 'completed')
+
+    def test_read_all_workflow_status_filter_by_started_at(self):
+        workflow_statuses = self.add_workflow_statuses(2)
+        workflow_statuses[0].started_at = datetime.datetime(2018, 1, 1)
+        self.app.running_context.execution_db.session.commit()
+        response = self.get_with_status_check('/api/workflowqueue?started_after=2018-06-01T00:00:00Z',
+                                              headers=self.headers)
+        self.assertEqual(len(response), 1)
+        self.assertEqual(response[0]['execution_id'], str(workflow_statuses[1].execution_id))
+
     def test_read_workflow_status(self):
         wf_exec_id = uuid4()
         wf_id = uuid4()
@@ -257,6 +332,209 @@ class TestWorkflowStatus(ServerTestCase):
         self.assertEqual(arguments[0]["name"], "call")
         self.assertIn('reference', arguments[0])
 
+    def test_execute_workflow_idempotency_key(self):
+        playbook = execution_db_help.standard_load()
+        workflow = self.app.running_context.execution_db.session.query(Workflow).filter_by(
+            playbook_id=playbook.id).first()
+
+        data = {'workflow_id': str(workflow.id), 'idempotency_key': 'alert-{}'.format(uuid4())}
+        response = self.post_with_status_check('/api/workflowqueue', headers=self.headers, status_code=SUCCESS_ASYNC,
+                                               content_type="application/json", data=json.dumps(data))
+        current_app.running_context.executor.wait_and_reset(1)
+        duplicate = self.post_with_status_check('/api/workflowqueue', headers=self.headers, status_code=SUCCESS_ASYNC,
+                                                content_type="application/json", data=json.dumps(data))
+        self.assertEqual(duplicate['id'], response['id'])
+
+        headers = dict(self.headers, **{'Idempotency-Key': data['idempotency_key']})
+        duplicate = self.post_with_status_check('/api/workflowqueue', headers=headers, status_code=SUCCESS_ASYNC,
+                                                content_type="application/json",
+                                                data=json.dumps({'workflow_id': str(workflow.id)}))
+        self.assertEqual(duplicate['id'], response['id'])
+
+        sample = {'queue_depth': 11, 'bulk_queue_depth': 0, 'queue_age': 0, 'estimated_wait': None}
+        with patch.object(walkoff.config.Config, 'ADMISSION_MAX_QUEUE_DEPTH', 10), \
+                patch.object(self.app.running_context.admission, 'sample', return_value=sample):
+            duplicate = self.post_with_status_check('/api/workflowqueue', headers=self.headers,
+                                                    status_code=SUCCESS_ASYNC, content_type="application/json",
+                                                    data=json.dumps(data))
+        self.assertEqual(duplicate['id'], response['id'])
+        self.assertEqual(self.app.running_context.execution_db.session.query(WorkflowStatus).count(), 1)
+
+    def test_execute_workflow_over_admission_limit(self):
+        playbook = execution_db_help.standard_load()
+        workflow = self.app.running_context.execution_db.session.query(Workflow).filter_by(
+            playbook_id=playbook.id).first()
+
+        sample = {'queue_depth': 11, 'bulk_queue_depth': 0, 'queue_age': 0, 'estimated_wait': None}
+        with patch.object(walkoff.config.Config, 'ADMISSION_MAX_QUEUE_DEPTH', 10), \
+                patch.object(self.app.running_context.admission, 'sample', return_value=sample):
+            response = self.test_client.post('/api/workflowqueue', headers=self.headers,
+                                             content_type="application/json",
+                                             data=json.dumps({'workflow_id': str(workflow.id)}))
+            self.assertEqual(response.status_code, TOO_MANY_REQUESTS)
+            self.assertEqual(response.headers['Retry-After'], str(walkoff.config.Config.ADMISSION_RETRY_AFTER_SECONDS))
+
+            data = {'workflow_id': str(workflow.id), 'argument_sets': [[], []]}
+            self.post_with_status_check('/api/workflowqueue/batch', headers=self.headers,
+                                        status_code=TOO_MANY_REQUESTS, content_type='application/json',
+                                        data=json.dumps(data))
+
+        metrics = self.get_with_status_check('/api/metrics/admission', headers=self.headers)
+        self.assertEqual(metrics['rejected']['queue_depth'], 3)
+        self.assertEqual(self.app.running_context.execution_db.session.query(WorkflowStatus).count(), 0)
+
+    def test_execute_workflow_not_before(self):
+        playbook = execution_db_help.standard_load()
+        workflow = self.app.running_context.execution_db.session.query(Workflow).filter_by(
+            playbook_id=playbook.id).first()
+        delayed = self.app.running_context.executor.delayed
+        count = delayed.count()
+
+        not_before = (datetime.datetime.utcnow() + datetime.timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        data = {'workflow_id': str(workflow.id), 'not_before': not_before}
+        response = self.post_with_status_check('/api/workflowqueue', headers=self.headers, status_code=SUCCESS_ASYNC,
+                                               content_type="application/json", data=json.dumps(data))
+        self.assertEqual(delayed.count(), count + 1)
+        self.assertEqual(self.app.running_context.execution_db.session.query(WorkflowStatus).count(), 0)
+
+        self.delete_with_status_check('/api/workflowqueue/delayed/{}'.format(response['id']), headers=self.headers,
+                                      status_code=NO_CONTENT)
+        self.delete_with_status_check('/api/workflowqueue/delayed/{}'.format(response['id']), headers=self.headers,
+                                      status_code=OBJECT_DNE_ERROR)
+        self.assertEqual(delayed.count(), count)
+
+    def test_execute_workflow_invalid_not_before(self):
+        playbook = execution_db_help.standard_load()
+        workflow = self.app.running_context.execution_db.session.query(Workflow).filter_by(
+            playbook_id=playbook.id).first()
+        data = {'workflow_id': str(workflow.id), 'not_before': 'tomorrow'}
+        self.post_with_status_check('/api/workflowqueue', headers=self.headers, status_code=BAD_REQUEST,
+                                    content_type="application/json", data=json.dumps(data))
+
+    def load_standard_workflow(self):
+        playbook = execution_db_help.standard_load()
+        return self.app.running_context.execution_db.session.query(Workflow).filter_by(
+            playbook_id=playbook.id).first()
+
+    def test_execute_workflow_batch(self):
+        workflow = self.load_standard_workflow()
+        outputs = []
+
+        @WalkoffEvent.ActionExecutionSuccess.connect
+        def y(sender, **kwargs):
+            outputs.append(kwargs['data']['data']['result'])
+
+        data = {'workflow_id': str(workflow.id),
+                'argument_sets': [[{'name': 'call', 'value': 'a'}], [{'name': 'call', 'value': 'b'}]]}
+        with patch.object(walkoff.config.Config, 'WORKFLOW_BATCH_CHUNK_SIZE', 1):
+            with patch.object(workflowqueue.workflow_metadata, 'add_many') as mock_add_many:
+                response = self.post_with_status_check('/api/workflowqueue/batch', headers=self.headers,
+                                                       status_code=SUCCESS_ASYNC, content_type='application/json',
+                                                       data=json.dumps(data))
+        current_app.running_context.executor.wait_and_reset(2)
+
+        self.assertEqual(len(response['execution_ids']), 2)
+        mock_add_many.assert_called_once_with(response['execution_ids'], str(workflow.id), workflow.name,
+                                              user='admin')
+        self.assertSetEqual(set(outputs), {'REPEATING: a', 'REPEATING: b'})
+        workflow_statuses = self.app.running_context.execution_db.session.query(WorkflowStatus).filter_by(
+            batch_id=UUID(response['batch_id'])).all()
+        self.assertSetEqual({str(workflow_status.execution_id) for workflow_status in workflow_statuses},
+                            set(response['execution_ids']))
+
+        response = self.get_with_status_check('/api/workflowqueue/batch/{}'.format(response['batch_id']),
+                                              headers=self.headers)
+        self.assertEqual(response['total'], 2)
+        self.assertEqual(response['statuses']['completed'], 2)
+        self.assertEqual(response['statuses']['pending'], 0)
+
+    def test_execute_workflow_batch_ndjson(self):
+        workflow = self.load_standard_workflow()
+        outputs = []
+
+        @WalkoffEvent.ActionExecutionSuccess.connect
+        def y(sender, **kwargs):
+            outputs.append(kwargs['data']['data']['result'])
+
+        lines = [{'workflow_id': str(workflow.id)}, [{'name': 'call', 'value': 'a'}], [],
+                 [{'name': 'call', 'value': 'c'}]]
+        response = self.post_with_status_check('/api/workflowqueue/batch/stream', headers=self.headers,
+                                               status_code=SUCCESS_ASYNC, content_type='application/x-ndjson',
+                                               data='\n'.join(json.dumps(line) for line in lines) + '\n')
+        current_app.running_context.executor.wait_and_reset(3)
+
+        self.assertEqual(len(response['execution_ids']), 3)
+        self.assertListEqual(sorted(outputs), ['REPEATING: Hello World', 'REPEATING: a', 'REPEATING: c'])
+
+    def test_execute_workflow_batch_invalid_ndjson(self):
+        workflow = self.load_standard_workflow()
+        for body in ('', '[]\n', '{{"workflow_id": "{}"}}\n{{"name": "call"}}\n'.format(workflow.id),
+                     '{{"workflow_id": "{}"}}\nnot json\n'.format(workflow.id), '{"workflow_id": 1}\n[]\n',
+                     '{"workflow_id": "invalid"}\n[]\n',
+                     '{{"workflow_id": "{}", "start": "invalid"}}\n[]\n'.format(workflow.id),
+                     '{{"workflow_id": "{}", "environment_variables": ["invalid"]}}\n[]\n'.format(workflow.id)):
+            self.post_with_status_check('/api/workflowqueue/batch/stream', headers=self.headers,
+                                        status_code=BAD_REQUEST, content_type='application/x-ndjson', data=body)
+
+    def test_execute_workflow_batch_too_large(self):
+        workflow = self.load_standard_workflow()
+        data = {'workflow_id': str(workflow.id), 'argument_sets': [[], [], []]}
+        with patch.dict(self.app.config, {'WORKFLOW_BATCH_MAX_SIZE': 2}):
+            self.post_with_status_check('/api/workflowqueue/batch', headers=self.headers,
+                                        status_code=INVALID_INPUT_ERROR, content_type='application/json',
+                                        data=json.dumps(data))
+
+    def test_execute_workflow_batch_ndjson_too_large(self):
+        workflow = self.load_standard_workflow()
+        body = '{{"workflow_id": "{}"}}\n[]\n[]\n[]\n'.format(workflow.id)
+        with patch.dict(self.app.config, {'WORKFLOW_BATCH_MAX_SIZE': 2}):
+            with patch('walkoff.server.endpoints.workflowqueue._read_json_line',
+                       wraps=workflowqueue._read_json_line) as mock_read:
+                self.post_with_status_check('/api/workflowqueue/batch/stream', headers=self.headers,
+                                            status_code=BAD_REQUEST, content_type='application/x-ndjson', data=body)
+        self.assertEqual(mock_read.call_count, 3)
+
+    def test_execute_workflow_batch_ndjson_authenticated_before_reading(self):
+        workflow = self.load_standard_workflow()
+        body = '{{"workflow_id": "{}"}}\n[]\n'.format(workflow.id)
+        with patch.object(Request, 'get_data') as mock_get_data:
+            self.post_with_status_check('/api/workflowqueue/batch/stream', status_code=UNAUTHORIZED_ERROR,
+                                        content_type='application/x-ndjson', data=body)
+        mock_get_data.assert_not_called()
+
+    def test_execute_workflow_batch_ndjson_over_max_bytes(self):
+        workflow = self.load_standard_workflow()
+        body = '{{"workflow_id": "{}"}}\n[]\n'.format(workflow.id)
+        with patch.dict(self.app.config, {'WORKFLOW_BATCH_STREAM_MAX_BYTES': len(body) - 1}):
+            with patch.object(Request, 'get_data') as mock_get_data:
+                self.post_with_status_check('/api/workflowqueue/batch/stream', headers=self.headers,
+                                            status_code=PAYLOAD_TOO_LARGE, content_type='application/x-ndjson',
+                                            data=body)
+        mock_get_data.assert_not_called()
+
+    def test_execute_workflow_batch_invalid_workflow(self):
+        data = {'workflow_id': str(uuid4()), 'argument_sets': [[]]}
+        self.post_with_status_check('/api/workflowqueue/batch', headers=self.headers, status_code=OBJECT_DNE_ERROR,
+                                    content_type='application/json', data=json.dumps(data))
+
+    def test_read_workflow_batch_status(self):
+        batch_id = uuid4()
+        for status in ('pending', 'running', 'running'):
+            workflow_status = WorkflowStatus(uuid4(), uuid4(), 'wf1', batch_id=batch_id)
+            workflow_status.status = WorkflowStatusEnum[status]
+            self.app.running_context.execution_db.session.add(workflow_status)
+        self.app.running_context.execution_db.session.add(WorkflowStatus(uuid4(), uuid4(), 'wf1'))
+        self.app.running_context.execution_db.session.commit()
+
+        response = self.get_with_status_check('/api/workflowqueue/batch/{}'.format(batch_id), headers=self.headers)
+        self.assertEqual(response['total'], 3)
+        self.assertDictEqual(response['statuses'], {'pending': 1, 'running': 2, 'paused': 0, 'awaiting_data': 0,
+                                                    'completed': 0, 'aborted': 0})
+
+    def test_read_workflow_batch_status_invalid_id(self):
+        self.get_with_status_check('/api/workflowqueue/batch/{}'.format(uuid4()), headers=self.headers,
+                                   status_code=OBJECT_DNE_ERROR)
+
     def test_execute_workflow_pause_resume(self):
         result = {'paused': False, 'resumed': False}
         wf_exec_id = uuid4()
@@ -403,3 +681,27 @@ class TestWorkflowStatus(ServerTestCase):
         self.assertEqual(len(wf_stats), 0)
         action_stats = self.app.running_context.execution_db.session.query(ActionStatus).all()
         self.assertEqual(len(action_stats), 0)
+
+    def test_clear_workflow_status_report(self):
+        self.add_workflow_statuses(3, status='completed')
+        self.app.running_context.retention.report = None
+        self.get_with_status_check('/api/workflowqueue/cleardb', headers=self.headers, status_code=OBJECT_DNE_ERROR)
+
+        self.delete_with_status_check('/api/workflowqueue/cleardb?all=true', headers=self.headers,
+                                      status_code=NO_CONTENT)
+        response = self.get_with_status_check('/api/workflowqueue/cleardb', headers=self.headers)
+        self.assertEqual(response['status'], 'completed')
+        self.assertEqual(response['deleted'], 3)
+        self.assertDictEqual(response['policies'], {'completed': 0, 'aborted': 0})
+
+    def test_clear_workflow_status_background(self):
+        self.add_workflow_statuses(3, status='completed')
+        response = self.delete_with_status_check('/api/workflowqueue/cleardb?all=true&background=true',
+                                                 headers=self.headers, status_code=SUCCESS_ASYNC)
+        self.assertIn(response['status'], ('pending', 'running', 'completed'))
+        report = self.app.running_context.retention.report
+        for _ in range(50):
+            if not report.is_active:
+                break
+            time.sleep(0.1)
+        self.assertEqual(report.deleted, 3)
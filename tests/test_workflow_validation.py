@@ -0,0 +1,153 @@
+import unittest
+from uuid import uuid4
+
+from mock import patch
+from sqlalchemy import event
+
+import walkoff.appgateway
+from tests.util import execution_db_help, initialize_test_config
+from walkoff.executiondb.action import Action
+from walkoff.executiondb.argument import Argument
+from walkoff.executiondb.branch import Branch
+from walkoff.executiondb.conditionalexpression import ConditionalExpression
+from walkoff.executiondb.playbook import Playbook
+from walkoff.executiondb.schemas import WorkflowSchema
+from walkoff.executiondb.workflow import Workflow, get_unconditional_loops
+
+
+class TestWorkflowValidation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        initialize_test_config()
+        cls.execution_db = execution_db_help.setup_dbs()
+
+    def tearDown(self):
+        execution_db_help.cleanup_execution_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        walkoff.appgateway.clear_cache()
+        execution_db_help.tear_down_execution_db()
+
+    @staticmethod
+    def make_actions(count):
+        return [Action('HelloWorld', 'repeatBackToMe', str(i), id=uuid4(), arguments=[Argument('call', value='x')])
+                for i in range(count)]
+
+    def save(self, workflow):
+        self.execution_db.session.add(Playbook('test', workflows=[workflow]))
+        self.execution_db.session.commit()
+
+    def test_start_not_in_actions(self):
+        workflow = Workflow('wf', uuid4(), actions=self.make_actions(1))
+        self.assertEqual(len(workflow.errors), 1)
+        self.assertFalse(workflow.is_valid)
+
+    def test_branch_to_unknown_action(self):
+        actions = self.make_actions(1)
+        workflow = Workflow('wf', actions[0].id, actions=actions, branches=[Branch(actions[0].id, uuid4())])
+        self.assertEqual(len(workflow.errors), 1)
+        self.assertListEqual(workflow.warnings, [])
+
+    def test_unreachable_action_is_warning(self):
+        actions = self.make_actions(3)
+        workflow = Workflow('wf', actions[0].id, actions=actions, branches=[Branch(actions[0].id, actions[1].id)])
+        self.assertTrue(workflow.is_valid)
+        self.assertListEqual(workflow.warnings,
+                             ['Actions {} are not reachable from the start action'.format(actions[2].id)])
+
+    def test_unconditional_loop_is_warning(self):
+        actions = self.make_actions(3)
+        branches = [Branch(actions[0].id, actions[1].id), Branch(actions[1].id, actions[2].id),
+                    Branch(actions[2].id, actions[1].id)]
+        workflow = Workflow('wf', actions[0].id, actions=actions, branches=branches)
+        self.assertTrue(workflow.is_valid)
+        self.assertEqual(len(workflow.warnings), 1)
+        self.assertIn(str(actions[1].id), workflow.warnings[0])
+        self.assertIn(str(actions[2].id), workflow.warnings[0])
+
+    def test_conditional_loop_is_not_warning(self):
+        actions = self.make_actions(2)
+        branches = [Branch(actions[0].id, actions[1].id),
+                    Branch(actions[1].id, actions[0].id, condition=ConditionalExpression())]
+        workflow = Workflow('wf', actions[0].id, actions=actions, branches=branches)
+        self.assertListEqual(workflow.warnings, [])
+
+    def test_get_unconditional_loops(self):
+        branches = [(1, 2, False), (2, 3, False), (3, 1, False), (3, 4, False), (4, 4, False), (4, 5, False),
+                    (5, 4, True)]
+        self.assertListEqual(sorted(sorted(loop) for loop in get_unconditional_loops(branches)), [[1, 2, 3], [4]])
+
+    def test_large_workflow_graph_checks(self):
+        ids = list(range(5000))
+        branches = [(source, source + 1, False) for source in ids[:-1]] + [(ids[-1], ids[0], False)]
+        loops = get_unconditional_loops(branches)
+        self.assertEqual(len(loops), 1)
+        self.assertEqual(len(loops[0]), 5000)
+
+    def test_unchanged_elements_not_revalidated(self):
+        actions = self.make_actions(3)
+        workflow = Workflow('wf', actions[0].id, actions=actions,
+                            branches=[Branch(actions[0].id, actions[1].id), Branch(actions[1].id, actions[2].id)])
+        self.save(workflow)
+
+        workflow.name = 'renamed'
+        with patch.object(Action, 'validate') as mock_action_validate:
+            with patch.object(Workflow, 'validate') as mock_workflow_validate:
+                self.execution_db.session.commit()
+        mock_action_validate.assert_not_called()
+        mock_workflow_validate.assert_not_called()
+
+    def test_changed_argument_revalidates_ancestors(self):
+        actions = self.make_actions(3)
+        workflow = Workflow('wf', actions[0].id, actions=actions,
+                            branches=[Branch(actions[0].id, actions[1].id), Branch(actions[1].id, actions[2].id)])
+        self.save(workflow)
+        self.assertTrue(workflow.is_valid)
+
+        workflow_json = WorkflowSchema().dump(workflow)
+        workflow_json['actions'][1]['arguments'][0]['name'] = 'invalid'
+        with patch.object(Action, 'validate', autospec=True, side_effect=Action.validate) as mock_action_validate:
+            WorkflowSchema().load(workflow_json, instance=workflow)
+            self.execution_db.session.commit()
+        self.assertSetEqual({call[0][0] for call in mock_action_validate.call_args_list}, {workflow.actions[1]})
+        self.assertFalse(workflow.is_valid)
+        self.assertTrue(workflow.actions[1].errors)
+        self.assertFalse(workflow.actions[0].errors)
+
+    def test_new_action_is_validated(self):
+        actions = self.make_actions(1)
+        workflow = Workflow('wf', actions[0].id, actions=actions)
+        self.save(workflow)
+
+        workflow.actions.append(Action('HelloWorld', 'repeatBackToMe', 'new', id=uuid4()))
+        self.execution_db.session.commit()
+        self.assertFalse(workflow.is_valid)
+        self.assertListEqual(workflow.warnings,
+                             ['Actions {} are not reachable from the start action'.format(workflow.actions[1].id)])
+
+    def test_update_loads_workflow_tree_in_bulk(self):
+        actions = self.make_actions(50)
+        workflow = Workflow('wf', actions[0].id, actions=actions,
+                            branches=[Branch(source.id, destination.id)
+                                      for source, destination in zip(actions, actions[1:])])
+        self.save(workflow)
+        workflow_json = WorkflowSchema().dump(workflow)
+        workflow_json['actions'][1]['arguments'][0]['value'] = 'y'
+        self.execution_db.session.expunge_all()
+        workflow = self.execution_db.session.query(Workflow).first()
+
+        statements = []
+
+        def count_statement(*args):
+            statements.append(args)
+
+        event.listen(self.execution_db.engine, 'before_cursor_execute', count_statement)
+        try:
+            WorkflowSchema().load(workflow_json, instance=workflow)
+            self.execution_db.session.commit()
+        finally:
+            event.remove(self.execution_db.engine, 'before_cursor_execute', count_statement)
+        self.assertLess(len(statements), 25)
+        self.assertTrue(workflow.is_valid)
+        self.assertEqual(workflow.actions[1].arguments[0].value, 'y')
@@ -146,6 +146,7 @@ class MockReceiveQueue(ZmqWorkflowResultsReceiver):
 class MockRequestQueue(object):
     def __init__(self):
         self.queue = Queue()
+        self.values = {}
 
         key = PrivateKey(walkoff.config.Config.CLIENT_PRIVATE_KEY[:nacl.bindings.crypto_box_SECRETKEYBYTES])
         server_key = PrivateKey(
@@ -181,8 +182,22 @@ class MockRequestQueue(object):
         except:
             self.push(data)
 
-    def lpush(self, topic, message):
-        self.push(self._decrypt_unpack(message))
+    def add(self, key, value, expire=None):
+        if key in self.values:
+            return False
+        self.values[key] = value
+        return True
+
+    def set(self, key, value, expire=None):
+        self.values[key] = value
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def lpush(self, topic, *messages):
+        for message in messages:
+            self.push(self._decrypt_unpack(message))
 
     def _decrypt_unpack(self, message):
         decrypted_msg = self.__box.decrypt(message)
@@ -123,6 +123,61 @@ def cache_apps(path):
     _cache.cache_apps(path)
 
 
+def cache_app(path, app_name):
+    """Imports and caches a single app from a given path into the global cache
+
+    Args:
+        path (str): Path to apps module
+        app_name (str): The name of the app
+    """
+    _cache.cache_app(path, app_name)
+
+
+def cache_lazy_app(path, app_name, registry):
+    """Caches the functions of an app into the global cache without importing the app. The app is imported the first
+        time its class or one of its functions is needed
+
+    Args:
+        path (str): Path to apps module
+        app_name (str): The name of the app
+        registry (dict{str: dict}): The function registry of the app, as returned by get_function_registry
+    """
+    _cache.cache_lazy_app(path, app_name, registry)
+
+
+def is_app_cached(app_name):
+    """Determines if an app is in the global cache, whether or not it has been imported
+
+    Args:
+        app_name (str): The name of the app
+
+    Returns:
+        (bool): Is the app cached?
+    """
+    return _cache.is_app_cached(app_name)
+
+
+def get_function_registry(app_name):
+    """Gets the functions of an app in the global cache in a form which can be serialized
+
+    Args:
+        app_name (str): The name of the app
+
+    Returns:
+        (dict{str: dict}): A lookup of qualified function name to whether or not the function is bound and the names of
+            its tags
+
+    Raises:
+        UnknownApp: If the app is not found in the cache
+    """
+    return _cache.get_function_registry(app_name)
+
+
+def import_lazy_apps():
+    """Imports all of the apps in the global cache which were cached lazily"""
+    _cache.import_lazy_apps()
+
+
 def clear_cache():
     """Clears the global cache"""
     _cache.clear()
@@ -3,6 +3,7 @@ import logging
 import os.path
 import pkgutil
 import sys
+import threading
 from collections import namedtuple
 from importlib import import_module
 
@@ -80,6 +81,28 @@ class AppCacheEntry(object):
                         qualified_action_name))
             self.functions[qualified_action_name] = FunctionEntry(run=function_, is_bound=False, tags=tags)
 
+    def cache_function_registry(self, registry):
+        """Caches functions from a registry without importing them. Their executables are resolved when the app is
+            imported
+
+        Args:
+            registry (dict{str: dict}): A lookup of qualified function name to whether or not the function is bound and
+                the names of its tags, as returned by get_function_registry
+        """
+        for function_name, entry in registry.items():
+            self.functions[function_name] = FunctionEntry(
+                run=None, is_bound=entry['is_bound'], tags={WalkoffTag(tag) for tag in entry['tags']})
+
+    def get_function_registry(self):
+        """Gets the functions in the app in a form which can be serialized
+
+        Returns:
+            (dict{str: dict}): A lookup of qualified function name to whether or not the function is bound and the
+                names of its tags
+        """
+        return {function_name: {'is_bound': entry.is_bound, 'tags': sorted(tag.value for tag in entry.tags)}
+                for function_name, entry in self.functions.items()}
+
     def clear_bound_functions(self):
         """Clears any bounded functions from the object"""
         self.functions = {action_name: action for action_name, action in self.functions.items() if not action.is_bound}
@@ -144,6 +167,8 @@ class AppCache(object):
     def __init__(self):
         """Initializes a new AppCache object"""
         self._cache = {}
+        self._lazy_apps = {}
+        self._import_lock = threading.Lock()
 
     def cache_apps(self, path):
         """Cache apps from a given path
@@ -161,9 +186,73 @@ class AppCache(object):
             for app in apps:
                 self._import_and_cache_submodules('{0}.{1}'.format(app_path, app), app, app_path)
 
+    def cache_app(self, path, app_name):
+        """Imports and caches a single app from a given path
+
+        Args:
+            path (str): Path to apps module
+            app_name (str): The name of the app
+        """
+        app_path = AppCache._path_to_module(path)
+        self._lazy_apps.pop(app_name, None)
+        self._cache.pop(app_name, None)
+        self._import_and_cache_submodules('{0}.{1}'.format(app_path, app_name), app_name, app_path)
+
+    def cache_lazy_app(self, path, app_name, registry):
+        """Caches the functions of an app from a registry without importing the app. The app is imported the first
+            time its class or one of its functions is needed
+
+        Args:
+            path (str): Path to apps module
+            app_name (str): The name of the app
+            registry (dict{str: dict}): The function registry of the app, as returned by get_function_registry
+        """
+        entry = AppCacheEntry(app_name)
+        entry.cache_function_registry(registry)
+        self._cache[app_name] = entry
+        self._lazy_apps[app_name] = AppCache._path_to_module(path)
+
+    def is_app_cached(self, app_name):
+        """Determines if an app is in the cache, whether or not it has been imported
+
+        Args:
+            app_name (str): The name of the app
+
+        Returns:
+            (bool): Is the app cached?
+        """
+        return app_name in self._cache
+
+    def get_function_registry(self, app_name):
+        """Gets the functions of an app in a form which can be serialized and later passed to cache_lazy_app
+
+        Args:
+            app_name (str): The name of the app
+
+        Returns:
+            (dict{str: dict}): A lookup of qualified function name to whether or not the function is bound and the
+                names of its tags
+
+        Raises:
+            UnknownApp: If the app is not found in the cache
+        """
+        try:
+            return self._cache[app_name].get_function_registry()
+        except KeyError:
+            raise UnknownApp(app_name)
+
+    def import_lazy_apps(self):
+        """Imports all of the apps which were cached lazily"""
+        for app_name in list(self._lazy_apps):
+            try:
+                self._get_imported_entry(app_name)
+            except KeyError:
+                pass
+
     def clear(self):
         """Clears the cache"""
         self._cache = {}
+        self._lazy_apps = {}
 
     def get_app_names(self):
         """Gets a list of all the app names
@@ -186,7 +275,7 @@ class AppCache(object):
             UnknownApp: If the app is not found in the cache or the app has only global actions
         """
         try:
-            app_cache = self._cache[app_name]
+            app_cache = self._get_imported_entry(app_name)
         except KeyError:
             _logger.error('Cannot locate app {} in cache!'.format(app_name))
             raise UnknownApp(app_name)
@@ -349,7 +438,7 @@ class AppCache(object):
             UnknownTransform: if the function_type is 'transforms' and the given transform name isn't found
         """
         try:
-            app_cache = self._cache[app_name]
+            app_cache = self._get_imported_entry(app_name)
             if not app_cache.functions:
                 _logger.warning('App {0} has no actions.'.format(app_name))
                 raise self.exception_lookup[function_type](app_name, function_name)
@@ -362,6 +451,33 @@ class AppCache(object):
             _logger.error('App {0} has no {1} {2}'.format(app_name, function_type.name, function_name))
             raise self.exception_lookup[function_type](app_name, function_name)
 
+    def _get_imported_entry(self, app_name):
+        """Gets the cache entry for an app, importing the app first if it was cached lazily
+
+        Args:
+            app_name (str): The name of the app
+
+        Returns:
+            (AppCacheEntry): The entry for the app
+
+        Raises:
+            KeyError: If the app is not found in the cache
+        """
+        if app_name in self._lazy_apps:
+            with self._import_lock:
+                if app_name in self._lazy_apps:
+                    _logger.info('Importing app {}'.format(app_name))
+                    app_cache = AppCache()
+                    app_path = self._lazy_apps[app_name]
+                    app_cache._import_and_cache_submodules('{0}.{1}'.format(app_path, app_name), app_name, app_path)
+                    if app_name in app_cache._cache:
+                        self._cache[app_name] = app_cache._cache[app_name]
+                    else:
+                        _logger.error('Could not import app {}'.format(app_name))
+                        self._cache.pop(app_name, None)
+                    del self._lazy_apps[app_name]
+        return self._cache[app_name]
+
     @staticmethod
     def _path_to_module(path):
         """Converts a path to a module. Can only handle relative paths without '..' in them.
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+try:
+    from os import replace as replace_file
+except ImportError:
+    # Python 2. On POSIX, os.rename atomically replaces an existing file
+    from os import rename as replace_file
+
+_logger = logging.getLogger(__name__)
+
+_ignored_directories = {'__pycache__', '.git'}
+_ignored_extensions = ('.pyc', '.pyo')
+
+
+def hash_app(apps_path, app_name, *dependency_paths):
+    """Computes a hash of the contents of all the files of an app
+
+    Args:
+        apps_path (str): The path to the apps directory
+        app_name (str): The name of the app
+        *dependency_paths (str): The paths of files which are not part of the app, but on which its validation depends
+
+    Returns:
+        (str): The hexadecimal SHA-256 hash of the app
+    """
+    app_hash = hashlib.sha256()
+    for path in dependency_paths:
+        _update_hash(app_hash, path, os.path.basename(path))
+    app_directory = os.path.join(apps_path, app_name)
+    for directory, directories, files in os.walk(app_directory):
+        directories[:] = sorted(name for name in directories if name not in _ignored_directories)
+        for name in sorted(files):
+            if not name.endswith(_ignored_extensions):
+                path = os.path.join(directory, name)
+                _update_hash(app_hash, path, os.path.relpath(path, app_directory))
+    return app_hash.hexdigest()
+
+
+def _update_hash(app_hash, path, name):
+    app_hash.update(name.replace(os.path.sep, '/').encode('utf-8'))
+    app_hash.update(b'\0')
+    with open(path, 'rb') as file_:
+        for chunk in iter(lambda: file_.read(65536), b''):
+            app_hash.update(chunk)
+    app_hash.update(b'\0')
+
+
+class AppIndex(object):
+    """A persisted index of the validated APIs and function registries of apps, keyed by a hash of the contents of each
+        app. An app whose hash matches its entry does not need to be imported or validated again
+
+    Attributes:
+        path (str): The path to the index file
+        apps (dict{str: dict}): The entries of the index by app name
+
+    Args:
+        path (str): The path to the index file
+    """
+    version = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.apps = {}
+        self._is_modified = False
+
+    def load(self):
+        """Loads the index from its file. A missing, unreadable, or outdated index is treated as empty"""
+        try:
+            with open(self.path, 'r') as index_file:
+                index = json.load(index_file)
+        except (IOError, OSError):
+            return
+        except ValueError:
+            _logger.warning('App API index {} is invalid. Rebuilding it'.format(self.path))
+            return
+        if isinstance(index, dict) and index.get('version') == self.version:
+            self.apps = index.get('apps', {})
+
+    def get(self, app_name, app_hash):
+        """Gets the entry for an app if it is up to date
+
+        Args:
+            app_name (str): The name of the app
+            app_hash (str): The current hash of the app
+
+        Returns:
+            (dict): The entry, containing the app's 'api' and function 'registry', or None if there is no entry for the
+                app or the app has changed since the entry was made
+        """
+        entry = self.apps.get(app_name)
+        if entry is not None and entry.get('hash') == app_hash:
+            return entry
+        return None
+
+    def update(self, app_name, app_hash, api, registry):
+        """Updates the entry for an app
+
+        Args:
+            app_name (str): The name of the app
+            app_hash (str): The hash of the app
+            api (dict): The validated API of the app
+            registry (dict{str: dict}): The function registry of the app
+        """
+        entry = {'hash': app_hash, 'api': api, 'registry': registry}
+        try:
+            json.dumps(entry)
+        except (TypeError, ValueError):
+            _logger.warning('API for app {} cannot be stored in the app API index'.format(app_name))
+            self.remove(app_name)
+        else:
+            self.apps[app_name] = entry
+            self._is_modified = True
+
+    def remove(self, app_name):
+        """Removes the entry for an app
+
+        Args:
+            app_name (str): The name of the app
+        """
+        if self.apps.pop(app_name, None) is not None:
+            self._is_modified = True
+
+    def prune(self, app_names):
+        """Removes the entries of apps which no longer exist
+
+        Args:
+            app_names (iterable(str)): The names of the apps which exist
+        """
+        for app_name in set(self.apps) - set(app_names):
+            self.remove(app_name)
+
+    def save(self):
+        """Saves the index to its file if it was modified. The file is replaced atomically, so processes which load it
+            concurrently see either the old or the new index
+        """
+        if not self._is_modified:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.app_api_index')
+            try:
+                with os.fdopen(file_descriptor, 'w') as index_file:
+                    json.dump({'version': self.version, 'apps': self.apps}, index_file)
+                replace_file(temp_path, self.path)
+            except Exception:
+                os.remove(temp_path)
+                raise
+        except (IOError, OSError) as e:
+            _logger.warning('Could not save app API index {0}: {1}'.format(self.path, e))
+        else:
+            self._is_modified = False
@@ -40,7 +40,10 @@ class AppInstance(object):
 
     def shutdown(self):
         """Shuts down the Instance object."""
-        self.instance.shutdown()
+        try:
+            self.instance.shutdown()
+        finally:
+            self.instance._release_http_clients()
         self.instance._clear_cache()
 
     def __repr__(self):
@@ -0,0 +1,235 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from walkoff.appgateway.appinstance import AppInstance
+from walkoff.helpers import format_exception_message
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledAppInstance(object):
+    __slots__ = ['app_instance', 'created_at', 'released_at']
+
+    def __init__(self, app_instance, created_at):
+        self.app_instance = app_instance
+        self.created_at = created_at
+        self.released_at = created_at
+
+
+class AppInstancePool(object):
+    """A pool of AppInstance objects shared by the workflows executing in a worker, so that apps which log in to their
+        devices do not have to do so for every workflow execution. Workflows lease an instance for an app and device,
+        and release it when they are done with it
+
+    Args:
+        max_idle_seconds (float, optional): The number of seconds an instance may go unused before it is shut down.
+            Defaults to 300. 0 disables the limit.
+        max_lifetime_seconds (float, optional): The number of seconds after which an instance is shut down rather than
+            being reused. Defaults to 3600. 0 disables the limit.
+        max_leases_per_device (int, optional): The number of instances of an app which may be leased for a device at
+            the same time. Defaults to 0, for no limit.
+        lease_timeout (float, optional): The number of seconds to wait for an instance when max_leases_per_device
+            instances are already leased. Defaults to 30.
+    """
+
+    def __init__(self, max_idle_seconds=300, max_lifetime_seconds=3600, max_leases_per_device=0, lease_timeout=30):
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.max_leases_per_device = max_leases_per_device
+        self.lease_timeout = lease_timeout
+        self._idle = defaultdict(list)
+        self._leased = {}
+        self._lease_counts = defaultdict(int)
+        self._condition = threading.Condition()
+        self._is_shut_down = False
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates an AppInstancePool from the Walkoff configuration
+
+        Args:
+            config (Config): The Walkoff configuration
+
+        Returns:
+            (AppInstancePool): The pool, or None if APP_INSTANCE_POOL is not set
+        """
+        if not config.APP_INSTANCE_POOL:
+            return None
+        return cls(max_idle_seconds=config.APP_INSTANCE_POOL_MAX_IDLE_SECONDS,
+                   max_lifetime_seconds=config.APP_INSTANCE_POOL_MAX_LIFETIME_SECONDS,
+                   max_leases_per_device=config.APP_INSTANCE_POOL_MAX_LEASES_PER_DEVICE,
+                   lease_timeout=config.APP_INSTANCE_POOL_LEASE_TIMEOUT_SECONDS)
+
+    def lease(self, app_name, device_id, context):
+        """Leases an instance of an app for a device. An idle instance is reused if it has not expired and is healthy,
+            otherwise a new one is created
+
+        Args:
+            app_name (str): The name of the app
+            device_id (int): The ID of the device
+            context (dict): The context of the workflow leasing the instance
+
+        Returns:
+            (AppInstance): The leased instance. Its instance is None if the app could not be created, or if no instance
+                became available within the lease timeout
+        """
+        key = (app_name, device_id)
+        with self._condition:
+            if not self._wait_for_lease(key):
+                logger.error('Timed out waiting for an instance of app {0} for device {1}'.format(*key))
+                return AppInstance(instance=None)
+            self._lease_counts[key] += 1
+
+        pooled = self._take_idle(key)
+        if pooled is not None:
+            pooled.app_instance().context = context
+            logger.debug('Reusing pooled app instance: App {0}, device {1}'.format(*key))
+        else:
+            app_instance = AppInstance.create(app_name, device_id, context)
+            if app_instance() is None:
+                with self._condition:
+                    self._end_lease(key)
+                return app_instance
+            pooled = _PooledAppInstance(app_instance, time.time())
+
+        with self._condition:
+            self._leased[id(pooled.app_instance)] = pooled
+        return pooled.app_instance
+
+    def release(self, app_name, device_id, app_instance, clear_cache=True):
+        """Returns a leased instance to the pool
+
+        Args:
+            app_name (str): The name of the app
+            device_id (int): The ID of the device
+            app_instance (AppInstance): The instance which was leased
+            clear_cache (bool, optional): Whether or not to clear the fields the instance cached for the workflow which
+                leased it. Defaults to True.
+
+        Returns:
+            (bool): Whether or not the instance was leased from this pool
+        """
+        key = (app_name, device_id)
+        with self._condition:
+            pooled = self._leased.pop(id(app_instance), None)
+            if pooled is None:
+                return False
+
+        if clear_cache:
+            try:
+                app_instance()._clear_cache()
+            except Exception as e:
+                logger.exception('Error caught while clearing the cache of app instance. App {0}, device {1}. '
+                                 'Error {2}'.format(app_name, device_id, format_exception_message(e)))
+
+        now = time.time()
+        with self._condition:
+            is_reusable = not self._is_shut_down and not self._is_too_old(pooled, now)
+            if is_reusable:
+                pooled.released_at = now
+                self._idle[key].append(pooled)
+            self._end_lease(key)
+        if not is_reusable:
+            _shutdown(key, pooled)
+        self.evict()
+        return True
+
+    def evict(self):
+        """Shuts down the idle instances which have been unused for longer than max_idle_seconds, or which are older
+            than max_lifetime_seconds
+        """
+        now = time.time()
+        expired = []
+        with self._condition:
+            for key, idle in list(self._idle.items()):
+                expired.extend((key, pooled) for pooled in idle if self._is_expired(pooled, now))
+                idle[:] = [pooled for pooled in idle if not self._is_expired(pooled, now)]
+                if not idle:
+                    del self._idle[key]
+        for key, pooled in expired:
+            _shutdown(key, pooled)
+
+    def shutdown(self):
+        """Shuts down all of the idle instances. Leased instances are shut down when they are released"""
+        with self._condition:
+            idle = [(key, pooled) for key, instances in self._idle.items() for pooled in instances]
+            self._idle.clear()
+            self._is_shut_down = True
+        for key, pooled in idle:
+            _shutdown(key, pooled)
+
+    def get_idle_count(self):
+        """Gets the number of idle instances in the pool
+
+        Returns:
+            (int): The number of idle instances
+        """
+        with self._condition:
+            return sum(len(idle) for idle in self._idle.values())
+
+    def get_leased_count(self):
+        """Gets the number of leased instances
+
+        Returns:
+            (int): The number of leased instances
+        """
+        with self._condition:
+            return len(self._leased)
+
+    def _wait_for_lease(self, key):
+        if not self.max_leases_per_device:
+            return True
+        deadline = time.time() + self.lease_timeout
+        while self._lease_counts[key] >= self.max_leases_per_device:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            self._condition.wait(remaining)
+        return True
+
+    def _end_lease(self, key):
+        self._lease_counts[key] -= 1
+        if not self._lease_counts[key]:
+            del self._lease_counts[key]
+        self._condition.notify_all()
+
+    def _take_idle(self, key):
+        while True:
+            now = time.time()
+            with self._condition:
+                idle = self._idle.get(key)
+                if not idle:
+                    return None
+                pooled = idle.pop()
+                if not idle:
+                    del self._idle[key]
+            if not self._is_expired(pooled, now) and _is_healthy(key, pooled):
+                return pooled
+            _shutdown(key, pooled)
+
+    def _is_expired(self, pooled, now):
+        return (self._is_too_old(pooled, now)
+                or (self.max_idle_seconds and now - pooled.released_at > self.max_idle_seconds))
+
+    def _is_too_old(self, pooled, now):
+        return self.max_lifetime_seconds and now - pooled.created_at > self.max_lifetime_seconds
+
+
+def _is_healthy(key, pooled):
+    try:
+        return pooled.app_instance().is_healthy()
+    except Exception as e:
+        logger.warning('Error caught while checking the health of app instance. App {0}, device {1}. '
+                       'Error {2}'.format(key[0], key[1], format_exception_message(e)))
+        return False
+
+
+def _shutdown(key, pooled):
+    try:
+        logger.debug('Shutting down pooled app instance: App {0}, device {1}'.format(*key))
+        pooled.app_instance.shutdown()
+    except Exception as e:
+        logger.exception('Error caught while shutting down app instance. App {0}, device {1}. '
+                         'Error {2}'.format(key[0], key[1], format_exception_message(e)))
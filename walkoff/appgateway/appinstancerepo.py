@@ -12,14 +12,20 @@ class AppInstanceRepo(object):
 
     Attributes:
         _instances (dict): The in-memory repository of AppInstance objects
+        _pool (AppInstancePool): The pool from which new AppInstance objects are leased, if any
+        _leased (set(tuple(app_name, device_id))): The device IDs of the AppInstance objects leased from the pool
 
     Args:
         instances (dict{tuple(app_name, device_id): AppInstance}, optional): An existing repository of device ID to
             AppInstance to initialize this repository to.
+        pool (AppInstancePool, optional): A pool from which to lease AppInstance objects instead of creating them.
+            Defaults to None.
     """
 
-    def __init__(self, instances=None):
+    def __init__(self, instances=None, pool=None):
         self._instances = instances or {}
+        self._pool = pool
+        self._leased = set()
 
     def setup_app_instance(self, action, workflow_ctx):
         """Sets up an AppInstance for a device in an action
@@ -39,7 +45,12 @@ class AppInstanceRepo(object):
                     'workflow_id': workflow_ctx.id,
                     'workflow_name': workflow_ctx.name
                 }
-                self._instances[device_id] = AppInstance.create(device_id[0], device_id[1], context)
+                if self._pool is not None:
+                    self._instances[device_id] = self._pool.lease(device_id[0], device_id[1], context)
+                    if self._instances[device_id]() is not None:
+                        self._leased.add(device_id)
+                else:
+                    self._instances[device_id] = AppInstance.create(device_id[0], device_id[1], context)
                 WalkoffEvent.CommonWorkflowSignal.send(workflow_ctx.workflow, event=WalkoffEvent.AppInstanceCreated)
                 logger.debug('Created new app instance: App {0}, device {1}'.format(*device_id))
             return device_id
@@ -76,9 +87,26 @@ class AppInstanceRepo(object):
         """
         self._instances = instances
 
+    def release_instances(self, clear_cache=False):
+        """Returns the AppInstance objects leased from the pool to it, without shutting them down
+
+        Args:
+            clear_cache (bool, optional): Whether or not to clear the fields the AppInstance objects cached for this
+                workflow. Defaults to False, since a paused workflow may need them when it is resumed.
+        """
+        for device_id in self._leased:
+            self._pool.release(device_id[0], device_id[1], self._instances[device_id], clear_cache=clear_cache)
+        self._leased = set()
+
     def shutdown_instances(self):
-        """Calls the shutdown() method on all of the AppInstance objects"""
+        """Calls the shutdown() method on all of the AppInstance objects which were not leased from the pool, and
+            returns those which were to it
+        """
+        leased = self._leased
+        self.release_instances(clear_cache=True)
         for instance_name, instance in self._instances.items():
+            if instance_name in leased:
+                continue
             try:
                 if instance() is not None:
                     logger.debug('Shutting down app instance: Device: {0}'.format(instance_name))
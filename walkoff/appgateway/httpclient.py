@@ -0,0 +1,239 @@
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import walkoff.config
+
+logger = logging.getLogger(__name__)
+
+_retry_status_codes = (429, 502, 503, 504)
+
+
+class HttpClient(object):
+    def __init__(self, base_url, timeout=10, max_connections=10, max_retries=3, backoff_factor=0.5, verify=True):
+        """Initializes an HttpClient, which sends requests to a base URL over a pool of keep-alive connections. Failed
+            connections, and responses with a status of 429, 502, 503, or 504, are retried with exponential backoff.
+            Requests which are not idempotent, such as POST, are only retried if they could not connect.
+
+        Args:
+            base_url (str): The URL which relative request paths are joined to, for example 'https://host:8080/api'
+            timeout (float, optional): The default number of seconds to wait for the server to respond. Defaults to 10.
+            max_connections (int, optional): The maximum number of connections kept open to the server. Defaults to
+                10.
+            max_retries (int, optional): The maximum number of times to retry a request. Defaults to 3.
+            backoff_factor (float, optional): The backoff between retries is backoff_factor * 2 ** (retry - 1)
+                seconds. Defaults to 0.5.
+            verify (bool|str, optional): Whether or not to verify the server's TLS certificate, or the path to the CA
+                bundle to verify it with. Defaults to True.
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.options = {'timeout': timeout, 'max_connections': max_connections, 'max_retries': max_retries,
+                        'backoff_factor': backoff_factor, 'verify': verify}
+        self.session = requests.Session()
+        self.session.verify = verify
+        retry = Retry(total=max_retries, connect=max_retries, read=0, status=max_retries,
+                      backoff_factor=backoff_factor, status_forcelist=_retry_status_codes, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self._metrics = {'requests': 0, 'errors': 0, 'retries': 0, 'seconds': 0.}
+
+    def request(self, method, path, **kwargs):
+        """Sends a request
+
+        Args:
+            method (str): The HTTP method, such as 'get' or 'post'
+            path (str): The path of the request relative to the base URL, or an absolute URL
+            **kwargs: Any other arguments accepted by requests.Session.request. The timeout defaults to the timeout of
+                the client.
+
+        Returns:
+            (requests.Response): The response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.time()
+        try:
+            response = self.session.request(method.upper(), self._format_url(path), **kwargs)
+        except requests.RequestException:
+            self._record(start, error=True)
+            raise
+        retries = response.raw.retries.history if response.raw is not None and response.raw.retries else ()
+        self._record(start, retries=len(retries))
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('get', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('post', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('put', path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request('patch', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('delete', path, **kwargs)
+
+    def get_metrics(self):
+        """Gets the metrics of the client
+
+        Returns:
+            (dict): The number of requests sent, requests which failed with an error, retries, and the total number of
+                seconds spent on requests
+        """
+        with self._lock:
+            return dict(self._metrics)
+
+    def close(self):
+        """Closes the connections of the client"""
+        self.session.close()
+
+    def __reduce__(self):
+        # The connections of a client cannot be pickled, for example with the app instances of a paused workflow, so
+        # an unpickled client is the client of the same base URL and options acquired from the pool of the process
+        return _acquire_pooled_client, (self.base_url, self.options)
+
+    def _format_url(self, path):
+        if '://' in path:
+            return path
+        if not path:
+            return self.base_url
+        return '{0}/{1}'.format(self.base_url, path.lstrip('/'))
+
+    def _record(self, start, error=False, retries=0):
+        with self._lock:
+            self._metrics['requests'] += 1
+            self._metrics['errors'] += int(error)
+            self._metrics['retries'] += retries
+            self._metrics['seconds'] += time.time() - start
+
+
+class _PooledHttpClient(object):
+    __slots__ = ['client', 'references', 'released_at']
+
+    def __init__(self, client):
+        self.client = client
+        self.references = 0
+        self.released_at = None
+
+
+class HttpClientPool(object):
+    def __init__(self, max_idle_seconds=300):
+        """Initializes an HttpClientPool, which shares HttpClients between the app instances in a process. Each app
+            instance which acquires a client for a base URL and options gets the same client, so that their requests
+            reuse its connections.
+
+        Args:
+            max_idle_seconds (float, optional): The number of seconds a client may go unused by any app instance before
+                its connections are closed. Defaults to 300. 0 closes them as soon as the last app instance releases it.
+        """
+        self.max_idle_seconds = max_idle_seconds
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, base_url, **options):
+        """Acquires the client for a base URL
+
+        Args:
+            base_url (str): The base URL of the client
+            **options: The other arguments of the HttpClient. Clients with different options are not shared.
+
+        Returns:
+            (HttpClient): The client
+        """
+        self.evict()
+        key = (base_url.rstrip('/'), tuple(sorted(options.items())))
+        with self._lock:
+            pooled = self._clients.get(key)
+            if pooled is None:
+                pooled = self._clients[key] = _PooledHttpClient(HttpClient(base_url, **options))
+            pooled.references += 1
+            return pooled.client
+
+    def release(self, client):
+        """Releases a client acquired from the pool
+
+        Args:
+            client (HttpClient): The client
+        """
+        with self._lock:
+            for pooled in self._clients.values():
+                if pooled.client is client and pooled.references:
+                    pooled.references -= 1
+                    if not pooled.references:
+                        pooled.released_at = time.time()
+                    break
+        self.evict()
+
+    def evict(self):
+        """Closes the clients which have not been used by any app instance for longer than max_idle_seconds"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, pooled in self._clients.items()
+                       if not pooled.references and now - pooled.released_at >= self.max_idle_seconds]
+            closed = [self._clients.pop(key).client for key in expired]
+        for client in closed:
+            client.close()
+
+    def get_metrics(self):
+        """Gets the metrics of the clients in the pool
+
+        Returns:
+            (dict): The metrics of each client, keyed by its base URL. The metrics of clients with the same base URL are
+                added together.
+        """
+        metrics = {}
+        with self._lock:
+            clients = [pooled.client for pooled in self._clients.values()]
+        for client in clients:
+            client_metrics = metrics.setdefault(client.base_url, {'requests': 0, 'errors': 0, 'retries': 0,
+                                                                  'seconds': 0.})
+            for name, value in client.get_metrics().items():
+                client_metrics[name] += value
+        return metrics
+
+    def shutdown(self):
+        """Closes all of the clients in the pool"""
+        with self._lock:
+            clients = [pooled.client for pooled in self._clients.values()]
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_http_client_pool():
+    """Gets the HttpClientPool of this process, creating it from the Walkoff configuration if it does not exist
+
+    Returns:
+        (HttpClientPool): The pool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HttpClientPool(max_idle_seconds=walkoff.config.Config.HTTP_CLIENT_MAX_IDLE_SECONDS)
+        return _pool
+
+
+def _acquire_pooled_client(base_url, options):
+    return get_http_client_pool().acquire(base_url, **options)
+
+
+def shutdown_http_client_pool():
+    """Closes all of the clients of this process"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
@@ -163,6 +163,23 @@ class RedisCacheAdapter(object):
         """
         return self._decode_response(self.cache.rpop(key))
 
+    def brpop(self, keys, timeout=0):
+        """Pops a value from the right of the first of several deques which is not empty, waiting for a value to be
+            pushed to one of them if they are all empty.
+
+        Args:
+            keys (list): The keys of the deques, in the order in which to check them
+            timeout (int, optional): The number of seconds to wait for a value. Defaults to 0, which waits forever.
+
+        Returns:
+            (tuple): The key of the deque and the rightmost value on it, or None if no value was pushed in time
+        """
+        response = self.cache.brpop(keys, timeout=timeout)
+        if response is None:
+            return None
+        key, value = response
+        return self._decode_response(key), self._decode_response(value)
+
     def lpush(self, key, *values):
         """Pushes a value to the left of a deque.
 
@@ -175,6 +192,17 @@ class RedisCacheAdapter(object):
         """
         return self.cache.lpush(key, *values)
 
+    def llen(self, key):
+        """Gets the length of a deque
+
+        Args:
+            key: The key of the deque
+
+        Returns:
+            (int): The number of values in the deque. 0 if the deque does not exist
+        """
+        return self.cache.llen(key)
+
     def lpop(self, key):
         """Pops a value from the left of a deque.
 
@@ -189,6 +217,95 @@ class RedisCacheAdapter(object):
         """
         return self._decode_response(self.cache.lpop(key))
 
+    def zcard(self, key):
+        """Gets the number of members of a sorted set
+
+        Args:
+            key: The key of the sorted set
+
+        Returns:
+            (int): The number of members in the sorted set. 0 if the sorted set does not exist
+        """
+        return self.cache.zcard(key)
+
+    def zrangebyscore(self, key, min_score, max_score, start=None, num=None, withscores=False):
+        """Gets the members of a sorted set with scores between a minimum and a maximum, lowest score first
+
+        Args:
+            key: The key of the sorted set
+            min_score: The minimum score, inclusive. May be '-inf'
+            max_score: The maximum score, inclusive. May be '+inf'
+            start (int, optional): The offset of the first member to get. Must be specified with num
+            num (int, optional): The maximum number of members to get. Must be specified with start
+            withscores (bool, optional): Whether to get the scores of the members as well. Defaults to False.
+
+        Returns:
+            (list[str]|list[tuple(str, float)]): The members, or the members and their scores
+        """
+        members = self.cache.zrangebyscore(key, min_score, max_score, start=start, num=num, withscores=withscores)
+        if withscores:
+            return [(self._decode_response(member), score) for member, score in members]
+        return [self._decode_response(member) for member in members]
+
+    def zrem(self, key, *members):
+        """Removes some members of a sorted set
+
+        Args:
+            key: The key of the sorted set
+            *members: The members to remove
+
+        Returns:
+            (int): The number of members removed
+        """
+        return self.cache.zrem(key, *members)
+
+    def hmget(self, key, fields):
+        """Gets the values of some fields of a hash
+
+        Args:
+            key: The key of the hash
+            fields (list[str]): The fields
+
+        Returns:
+            (list): The values of the fields, in the same order. The value of a field which does not exist is None
+        """
+        return self.cache.hmget(key, fields)
+
+    def hdel(self, key, *fields):
+        """Deletes some fields of a hash
+
+        Args:
+            key: The key of the hash
+            *fields: The fields to delete
+
+        Returns:
+            (int): The number of fields deleted
+        """
+        return self.cache.hdel(key, *fields)
+
+    def hscan(self, key, count=None):
+        """Scans through the fields of a hash
+
+        Args:
+            key: The key of the hash
+            count (int, optional): A hint of the number of fields to get from the cache at a time
+
+        Returns:
+            Iterator(str): The fields of the hash
+        """
+        return (self._decode_response(field) for field, _ in self.cache.hscan_iter(key, count=count))
+
+    def pipeline(self, transaction=True):
+        """Gets a pipeline, which sends a sequence of commands to the cache in one round trip
+
+        Args:
+            transaction (bool, optional): Whether the commands are executed atomically. Defaults to True.
+
+        Returns:
+            A pipeline. Its commands are sent when execute() is called on it
+        """
+        return self.cache.pipeline(transaction=transaction)
+
     @staticmethod
     def _decode_response(response):
         if response is None:
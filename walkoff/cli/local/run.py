@@ -70,6 +70,8 @@ def _run_server(app, host, port):
 
     app.running_context.inject_app(app)
     app.running_context.executor.initialize_threading(app, pids)
+    if walkoff.config.Config.RETENTION_INTERVAL_MINUTES:
+        app.running_context.retention.start_periodic(walkoff.config.Config.RETENTION_INTERVAL_MINUTES)
     # The order of these imports matter for initialization (should probably be fixed)
 
     server = setup_server(app, host, port)
@@ -17,15 +17,21 @@ logger = logging.getLogger(__name__)
 
 app_apis = {}
 
+_YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 def load_app_apis(apps_path=None):
-    """Loads App APIs
+    """Loads App APIs. If Config.APP_API_INDEX_PATH is set, apps which have not changed since they were last validated
+        are loaded from the index without being imported or validated again, and are imported the first time one of
+        their functions is needed. Other apps are imported, validated, and added to the index.
     
     Args:
         apps_path (str, optional): Optional path to specify for the apps. Defaults to None, but will be set to the
             apps_path variable in Config object
     """
     from walkoff.helpers import list_apps, format_exception_message
+    from walkoff.appgateway import cache_app, cache_lazy_app, get_function_registry, is_app_cached
+    from walkoff.appgateway.appindex import AppIndex, hash_app
     global app_apis
     if apps_path is None:
         apps_path = Config.APPS_PATH
@@ -36,17 +42,38 @@ def load_app_apis(apps_path=None):
         logger.fatal('Could not load JSON schema for apps. Shutting down...: ' + str(e))
         sys.exit(1)
     else:
-        for app in list_apps(apps_path):
+        index = None
+        if Config.APP_API_INDEX_PATH:
+            index = AppIndex(Config.APP_API_INDEX_PATH)
+            index.load()
+        apps = list_apps(apps_path)
+        for app in apps:
             try:
+                app_hash = hash_app(apps_path, app, Config.WALKOFF_SCHEMA_PATH) if index is not None else None
+                entry = index.get(app, app_hash) if index is not None else None
+                if entry is not None:
+                    if not is_app_cached(app):
+                        cache_lazy_app(apps_path, app, entry['registry'])
+                    app_apis[app] = entry['api']
+                    continue
+                if not is_app_cached(app):
+                    cache_app(apps_path, app)
                 url = join(apps_path, app, 'api.yaml')
                 with open(url) as function_file:
-                    api = yaml.load(function_file.read())
+                    api = yaml.load(function_file.read(), Loader=_YamlLoader)
                     from walkoff.appgateway.validator import validate_app_spec
                     validate_app_spec(api, app, Config.WALKOFF_SCHEMA_PATH)
                     app_apis[app] = api
+                if index is not None:
+                    index.update(app, app_hash, api, get_function_registry(app))
             except Exception as e:
                 logger.error(
                     'Cannot load apps api for app {0}: Error {1}'.format(app, str(format_exception_message(e))))
+                if index is not None:
+                    index.remove(app)
+        if index is not None:
+            index.prune(apps)
+            index.save()
 
 
 def setup_logger():
@@ -94,6 +121,37 @@ class Config(object):
     NUMBER_PROCESSES = 4
     NUMBER_THREADS_PER_PROCESS = 3
 
+    # Route the executions of workflows which use the same app devices to the same worker process, so that its app
+    # instances and connections for those devices stay warm. Requests are spread over this many queues by consistent
+    # hashing, and a worker with nothing in its own queues takes requests from the others. 0 disables routing.
+    WORKER_AFFINITY_SHARDS = 0
+
+    # Workers wait up to WORKFLOW_RECEIVER_TIMEOUT_SECONDS for a request to be queued before checking whether to exit.
+    WORKFLOW_RECEIVER_TIMEOUT_SECONDS = 1
+
+    # Reuse app instances across workflow executions in each worker process, so that apps do not have to log in to
+    # their devices for every execution. Pooled instances are shut down once they have been idle or alive for the given
+    # number of seconds (0 for no limit), and at most the given number of instances of an app are used for a device at
+    # the same time (0 for no limit).
+    APP_INSTANCE_POOL = False
+    APP_INSTANCE_POOL_MAX_IDLE_SECONDS = 300
+    APP_INSTANCE_POOL_MAX_LIFETIME_SECONDS = 3600
+    APP_INSTANCE_POOL_MAX_LEASES_PER_DEVICE = 0
+    APP_INSTANCE_POOL_LEASE_TIMEOUT_SECONDS = 30
+
+    # Connections of the HTTP clients which apps get from App.get_http_client. Clients are shared by the app instances
+    # in each worker process which use the same base URL, and are closed once no app instance has used them for the
+    # given number of seconds. Failed requests are retried with exponential backoff.
+    HTTP_CLIENT_TIMEOUT_SECONDS = 10
+    HTTP_CLIENT_MAX_CONNECTIONS = 10
+    HTTP_CLIENT_MAX_RETRIES = 3
+    HTTP_CLIENT_BACKOFF_FACTOR = 0.5
+    HTTP_CLIENT_MAX_IDLE_SECONDS = 300
+
+    # Start the worker processes by forking them from a template process which has already loaded the configuration and
+    # imported the apps, so that they start quickly and share its memory. Not available on Windows.
+    WORKER_FORK_SERVER = True
+
     # Database types
     WALKOFF_DB_TYPE = 'sqlite'
     EXECUTION_DB_TYPE = 'sqlite'
@@ -117,6 +175,8 @@ class Config(object):
     LOGGING_CONFIG_PATH = join(DATA_PATH, 'log', 'logging.json')
 
     WALKOFF_SCHEMA_PATH = join(DATA_PATH, 'walkoff_schema.json')
+    # Validated app APIs, keyed by a hash of each app's files. Set to '' to import and validate every app on startup
+    APP_API_INDEX_PATH = join(DATA_PATH, 'app_api_index.json')
     WORKFLOWS_PATH = join('.', 'data', 'workflows')
 
     KEYS_PATH = join('.', '.certificates')
@@ -135,17 +195,116 @@ class Config(object):
     JWT_TOKEN_LOCATION = 'headers'
 
     JWT_BLACKLIST_PRUNE_FREQUENCY = 1000
+
+    # Authorization looks up the roles with each permission in an in-process map. Changes to the roles made by other
+    # processes are seen within PERMISSION_MAP_CHECK_INTERVAL_SECONDS.
+    PERMISSION_MAP_CHECK_INTERVAL_SECONDS = 1
+
     MAX_STREAM_RESULTS_SIZE_KB = 156
 
+    # The workflow stream keeps the metadata of up to WORKFLOW_METADATA_CACHE_SIZE workflow executions in memory.
+    WORKFLOW_METADATA_CACHE_SIZE = 10000
+
     SEPARATE_WORKERS = False
     SEPARATE_RECEIVER = False
     SEPARATE_INTERFACES = False
     ITEMS_PER_PAGE = 20
+
+    # Workflow status retention. Policies map a completed workflow status to the number of days to keep it (0 prunes
+    # all of them). Pruned statuses are archived to RETENTION_ARCHIVE_PATH if it is set. An interval of 0 disables the
+    # periodic retention job.
+    RETENTION_POLICIES = {'completed': 30, 'aborted': 30}
+    RETENTION_INTERVAL_MINUTES = 0
+    RETENTION_CHUNK_SIZE = 500
+    RETENTION_CHUNK_PAUSE_SECONDS = 0.1
+    RETENTION_ARCHIVE_PATH = ''
+    RETENTION_ARCHIVE_COMPRESSION = 'zstd'
     ACTION_EXECUTION_STRATEGY = 'local'
 
+    # Requests to app services made by the remote action execution strategy. Connections to each app service are kept
+    # open and shared by the workflows in a worker process. Requests which cannot connect are retried with exponential
+    # backoff, and after the given number of consecutive failures requests to the service fail immediately for the given
+    # number of seconds (a threshold of 0 disables this).
+    REMOTE_ACTION_TIMEOUT_SECONDS = 30
+    REMOTE_ACTION_MAX_RETRIES = 2
+    REMOTE_ACTION_BACKOFF_FACTOR = 0.2
+    REMOTE_ACTION_MAX_CONNECTIONS = 10
+    REMOTE_ACTION_CIRCUIT_BREAKER_THRESHOLD = 5
+    REMOTE_ACTION_CIRCUIT_BREAKER_RESET_SECONDS = 30
+
     EXECUTION_DB_USERNAME = ''
     EXECUTION_DB_PASSWORD = ''
 
+    # Connection pool for client/server execution databases. Each worker process needs up to
+    # NUMBER_THREADS_PER_PROCESS + 1 connections. A pool size of 0 opens a new connection for every session.
+    EXECUTION_DB_POOL_SIZE = 5
+    EXECUTION_DB_MAX_OVERFLOW = 10
+    EXECUTION_DB_POOL_TIMEOUT = 30
+    EXECUTION_DB_POOL_RECYCLE = 3600
+    EXECUTION_DB_POOL_PRE_PING = True
+
+    # SQLite execution database tuning. If EXECUTION_DB_SQLITE_WRITER is set, workflow results are written by a single
+    # thread which commits them in batches of up to EXECUTION_DB_WRITER_BATCH_SIZE.
+    EXECUTION_DB_SQLITE_JOURNAL_MODE = 'WAL'
+    EXECUTION_DB_SQLITE_SYNCHRONOUS = 'NORMAL'
+    EXECUTION_DB_SQLITE_CACHE_SIZE_KB = 16384
+    EXECUTION_DB_SQLITE_BUSY_TIMEOUT_MS = 5000
+    EXECUTION_DB_SQLITE_WRITER = True
+    EXECUTION_DB_WRITER_BATCH_SIZE = 100
+
+    # If SCHEDULER_PERSISTENT is set, scheduled workflows are stored in the execution database, so they survive
+    # restarts. This needs a version of SQLAlchemy which the installed APScheduler supports. Of the controllers sharing
+    # the cache, only the one holding the scheduler lease fires them, and the others check the lease every
+    # SCHEDULER_LEASE_CHECK_SECONDS to take over if it is not renewed within SCHEDULER_LEASE_SECONDS. Fires missed by up
+    # to SCHEDULER_MISFIRE_GRACE_SECONDS, for example while no controller was running, run once.
+    SCHEDULER_PERSISTENT = False
+    SCHEDULER_LEASE_SECONDS = 30
+    SCHEDULER_LEASE_CHECK_SECONDS = 10
+    SCHEDULER_MISFIRE_GRACE_SECONDS = 3600
+
+    # Requests to execute a workflow with the idempotency key of an earlier request get the earlier execution for
+    # WORKFLOW_IDEMPOTENCY_WINDOW_SECONDS, even while admission control rejects new requests. If
+    # WORKFLOW_COALESCE_PENDING is set, requests whose workflow and inputs are the same as those of a pending execution
+    # in the window get that execution unless they ask not to be coalesced.
+    WORKFLOW_IDEMPOTENCY_WINDOW_SECONDS = 3600
+    WORKFLOW_COALESCE_PENDING = False
+
+    # Requests to execute workflows are admitted only while the request queues hold at most ADMISSION_MAX_QUEUE_DEPTH
+    # requests, the oldest queued request has waited at most ADMISSION_MAX_QUEUE_AGE_SECONDS, and the estimated wait
+    # of a new request is at most ADMISSION_MAX_ESTIMATED_WAIT_SECONDS. A limit of 0 is disabled. Over a limit, requests
+    # are rejected with a 429 ('reject'), or diverted to the bulk lane, which the workers drain last ('divert'). The
+    # bulk lane holds at most ADMISSION_MAX_BULK_QUEUE_DEPTH requests, or ADMISSION_MAX_QUEUE_DEPTH if it is 0, and
+    # requests which would not fit are rejected, as are all requests over a limit if neither is set. Rejected requests
+    # are told to retry after the estimated time to drain the excess, or ADMISSION_RETRY_AFTER_SECONDS if it is
+    # unknown. The queues are sampled at most once every ADMISSION_CHECK_INTERVAL_SECONDS.
+    ADMISSION_MAX_QUEUE_DEPTH = 0
+    ADMISSION_MAX_QUEUE_AGE_SECONDS = 0
+    ADMISSION_MAX_ESTIMATED_WAIT_SECONDS = 0
+    ADMISSION_OVERLOAD_ACTION = 'reject'
+    ADMISSION_MAX_BULK_QUEUE_DEPTH = 0
+    ADMISSION_RETRY_AFTER_SECONDS = 5
+    ADMISSION_CHECK_INTERVAL_SECONDS = 1
+
+    # A batch execution of a workflow takes up to WORKFLOW_BATCH_MAX_SIZE argument sets. Their workflow statuses are
+    # inserted and their requests are queued in chunks of WORKFLOW_BATCH_CHUNK_SIZE executions. Newline-delimited JSON
+    # batch requests over WORKFLOW_BATCH_STREAM_MAX_BYTES are rejected before their bodies are read.
+    WORKFLOW_BATCH_MAX_SIZE = 10000
+    WORKFLOW_BATCH_CHUNK_SIZE = 500
+    WORKFLOW_BATCH_STREAM_MAX_BYTES = 16 * 1024 * 1024
+
+    # Requests to execute a workflow which are not due yet are held in the cache, and moved onto the request queues once
+    # they are due. Due requests are looked for every DELAYED_EXECUTION_POLL_SECONDS, and moved in batches of
+    # DELAYED_EXECUTION_BATCH_SIZE. Requests claimed by a controller which did not queue them within
+    # DELAYED_EXECUTION_CLAIM_TIMEOUT_SECONDS are moved again, and the messages of lost requests are deleted every
+    # DELAYED_EXECUTION_CLEANUP_SECONDS.
+    DELAYED_EXECUTION_POLL_SECONDS = 1
+    DELAYED_EXECUTION_BATCH_SIZE = 500
+    DELAYED_EXECUTION_CLAIM_TIMEOUT_SECONDS = 60
+    DELAYED_EXECUTION_CLEANUP_SECONDS = 3600
+
+    # Bulk playbook imports and server-side copies insert rows in batches of up to this many rows
+    PLAYBOOK_IMPORT_BATCH_SIZE = 1000
+
     WALKOFF_DB_USERNAME = ''
     WALKOFF_DB_PASSWORD = ''
 
@@ -243,8 +402,6 @@ def initialize(config_path=None, load=True):
         Config.load_env_vars()
         Config.read_and_set_zmq_keys()
     setup_logger()
-    from walkoff.appgateway import cache_apps
-    cache_apps(Config.APPS_PATH)
     load_app_apis()
 
 
@@ -28,7 +28,7 @@ class ExecutionDatabase(object):
     instance = None
     db_type = ""
 
-    def __init__(self, execution_db_type, execution_db_path, execution_db_host="localhost"):
+    def __init__(self, execution_db_type, execution_db_path, execution_db_host="localhost", create_schema=True):
         # All of these imports are necessary
         from walkoff.executiondb.device import App, Device, DeviceField, EncryptedDeviceField
         from walkoff.executiondb.argument import Argument
@@ -50,41 +50,102 @@ class ExecutionDatabase(object):
         if 'sqlite' in execution_db_type:
             self.engine = create_engine(format_db_path(execution_db_type, execution_db_path),
                                         connect_args={'check_same_thread': False}, poolclass=NullPool)
+            event.listen(self.engine, 'connect', set_sqlite_tuning_pragmas)
         else:
             self.engine = create_engine(
                 format_db_path(execution_db_type, execution_db_path, 'WALKOFF_DB_USERNAME', 'WALKOFF_DB_PASSWORD',
                                execution_db_host),
-                poolclass=NullPool)
+                **self.get_pool_options(walkoff.config.Config))
             if not database_exists(self.engine.url):
                 try:
                     create_database(self.engine.url)
                 except IntegrityError as e:
                     pass
 
-        self.connection = self.engine.connect()
-        self.transaction = self.connection.begin()
+        self.writer = None
 
         Session = sessionmaker()
         Session.configure(bind=self.engine)
         self.session = scoped_session(Session)
 
         Execution_Base.metadata.bind = self.engine
-        Execution_Base.metadata.create_all(self.engine)
+        if create_schema:
+            Execution_Base.metadata.create_all(self.engine)
 
-        alembic_cfg = Config(walkoff.config.Config.ALEMBIC_CONFIG, ini_section="execution",
-                             attributes={'configure_logger': False})
-        command.stamp(alembic_cfg, "head")
+            alembic_cfg = Config(walkoff.config.Config.ALEMBIC_CONFIG, ini_section="execution",
+                                 attributes={'configure_logger': False})
+            command.stamp(alembic_cfg, "head")
 
     def __new__(cls, *args, **kwargs):
         if cls.instance is None:
             cls.instance = super(ExecutionDatabase, cls).__new__(cls)
         return cls.instance
 
+    @staticmethod
+    def get_pool_options(config):
+        """Gets the connection pool options for a client/server database engine
+
+        Args:
+            config (Config): The Walkoff configuration. A pool size of 0 disables pooling
+
+        Returns:
+            (dict): The keyword arguments to pass to create_engine
+        """
+        if not config.EXECUTION_DB_POOL_SIZE:
+            return {'poolclass': NullPool}
+        return {'pool_size': config.EXECUTION_DB_POOL_SIZE,
+                'max_overflow': config.EXECUTION_DB_MAX_OVERFLOW,
+                'pool_timeout': config.EXECUTION_DB_POOL_TIMEOUT,
+                'pool_recycle': config.EXECUTION_DB_POOL_RECYCLE,
+                'pool_pre_ping': config.EXECUTION_DB_POOL_PRE_PING}
+
+    def remove_session(self):
+        """Closes the session of the current thread and returns its connection to the pool. Threads which use the
+            execution database must call this when they are done with it
+        """
+        self.session.remove()
+
+    def start_writer(self):
+        """Starts serializing the writes made through persist() through a single writer thread. This is only done for
+            SQLite databases, and only if EXECUTION_DB_SQLITE_WRITER is set
+        """
+        if ('sqlite' in self.db_type and walkoff.config.Config.EXECUTION_DB_SQLITE_WRITER
+                and self.writer is None):
+            from walkoff.executiondb.writer import ExecutionDatabaseWriter
+            self.writer = ExecutionDatabaseWriter(self, walkoff.config.Config.EXECUTION_DB_WRITER_BATCH_SIZE)
+            self.writer.start()
+
+    def stop_writer(self):
+        """Commits the queued writes and stops the writer thread, if there is one"""
+        if self.writer is not None:
+            self.writer.stop()
+            self.writer = None
+
+    def flush_writer(self):
+        """Blocks until the queued writes have been committed, if there is a writer thread"""
+        if self.writer is not None:
+            self.writer.flush()
+
+    def persist(self, write):
+        """Writes to the database, through the writer thread if there is one
+
+        Args:
+            write (func): A function which takes a Session and modifies it. It must not commit the Session, and it
+                must not use objects loaded by any other Session.
+        """
+        if self.writer is not None:
+            self.writer.submit(write)
+        else:
+            self.session.expire_all()
+            write(self.session)
+            self.session.commit()
+
     def tear_down(self):
         """Clean up the database
         """
+        self.stop_writer()
         self.session.rollback()
-        self.connection.close()
+        self.session.remove()
         self.engine.dispose()
 
 
@@ -98,6 +159,19 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
         cursor.close()
 
 
+def set_sqlite_tuning_pragmas(dbapi_connection, connection_record):
+    """Configures a connection to a SQLite execution database for concurrent access. The write-ahead log lets readers
+        proceed while a write is in progress, and the busy timeout makes writers wait for the lock instead of failing
+    """
+    config = walkoff.config.Config
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode={}".format(config.EXECUTION_DB_SQLITE_JOURNAL_MODE))
+    cursor.execute("PRAGMA synchronous={}".format(config.EXECUTION_DB_SQLITE_SYNCHRONOUS))
+    cursor.execute("PRAGMA cache_size=-{}".format(int(config.EXECUTION_DB_SQLITE_CACHE_SIZE_KB)))
+    cursor.execute("PRAGMA busy_timeout={}".format(int(config.EXECUTION_DB_SQLITE_BUSY_TIMEOUT_MS)))
+    cursor.close()
+
+
 class WorkflowStatusEnum(enum.Enum):
     running = 1
     paused = 2
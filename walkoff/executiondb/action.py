@@ -1,7 +1,7 @@
 import logging
 import uuid
 
-from sqlalchemy import Column, ForeignKey, String, orm, event
+from sqlalchemy import Column, ForeignKey, String, orm
 from sqlalchemy.orm import relationship
 from sqlalchemy_utils import UUIDType
 
@@ -30,6 +30,7 @@ class Action(ExecutionElement, Execution_Base):
     trigger = relationship('ConditionalExpression', cascade='all, delete-orphan', uselist=False, passive_deletes=True)
     position = relationship('Position', uselist=False, cascade='all, delete-orphan', passive_deletes=True)
     children = ('arguments', 'trigger')
+    validation_attributes = ('app_name', 'action_name', 'device_id', 'arguments', 'trigger')
 
     def __init__(self, app_name, action_name, name, device_id=None, id=None, arguments=None, trigger=None,
                  position=None, errors=None):
@@ -200,8 +201,3 @@ class Action(ExecutionElement, Execution_Base):
 
     def get_resolved_device_id(self):
         return self._resolved_device_id
-
-
-@event.listens_for(Action, 'before_update')
-def validate_before_update(mapper, connection, target):
-    target.validate()
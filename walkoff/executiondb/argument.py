@@ -1,6 +1,6 @@
 import logging
 
-from sqlalchemy import Column, Integer, ForeignKey, String, orm, event
+from sqlalchemy import Column, Integer, ForeignKey, String, orm
 from sqlalchemy_utils import UUIDType, JSONType, ScalarListType
 
 from walkoff.appgateway.apiutil import InvalidArgument
@@ -22,6 +22,7 @@ class Argument(Execution_Base, Validatable):
     reference = Column(UUIDType(binary=False))
     selection = Column(ScalarListType())
     errors = Column(ScalarListType())
+    validation_attributes = ('name', 'value', 'reference', 'selection')
 
     def __init__(self, name, value=None, reference=None, selection=None):
         """Initializes an Argument object.
@@ -143,8 +144,3 @@ class Argument(Execution_Base, Validatable):
 
     def __hash__(self):
         return hash(self.id)
-
-
-@event.listens_for(Argument, 'before_update')
-def validate_before_update(mapper, connection, target):
-    target.validate()
@@ -1,6 +1,6 @@
 import logging
 
-from sqlalchemy import Column, Integer, ForeignKey, String, event, orm
+from sqlalchemy import Column, Integer, ForeignKey, String, orm
 from sqlalchemy.orm import relationship
 from sqlalchemy_utils import UUIDType
 
@@ -20,6 +20,7 @@ class Branch(ExecutionElement, Execution_Base):
     condition = relationship('ConditionalExpression', cascade='all, delete-orphan', uselist=False, passive_deletes=True)
     priority = Column(Integer)
     children = ('condition',)
+    validation_attributes = ('source_id', 'destination_id', 'condition')
 
     def __init__(self, source_id, destination_id, id=None, status='Success', condition=None, priority=999, errors=None):
         """Initializes a new Branch object.
@@ -85,8 +86,3 @@ class Branch(ExecutionElement, Execution_Base):
                 return None
         else:
             return None
-
-
-@event.listens_for(Branch, 'before_update')
-def validate_before_update(mapper, connection, target):
-    target.validate()
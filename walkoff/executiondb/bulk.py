@@ -0,0 +1,629 @@
+import codecs
+import json
+from collections import OrderedDict
+from functools import partial
+from uuid import uuid4, UUID
+
+from sqlalchemy import select
+
+from walkoff.appgateway import get_app_action, get_condition, get_transform, is_app_action_bound
+from walkoff.appgateway.apiutil import (get_app_action_api, get_condition_api, get_transform_api, split_api_params,
+                                        UnknownApp, UnknownFunction, UnknownAppAction, UnknownCondition,
+                                        UnknownTransform, InvalidArgument)
+from walkoff.appgateway.validator import (validate_app_action_parameters, validate_condition_parameters,
+                                          validate_transform_parameters)
+from .action import Action
+from .argument import Argument
+from .branch import Branch
+from .condition import Condition
+from .conditionalexpression import ConditionalExpression, valid_operators
+from .environment_variable import EnvironmentVariable
+from .playbook import Playbook
+from .position import Position
+from .transform import Transform
+from .workflow import Workflow, get_graph_warnings
+
+# Parents come before their children so that queued rows can be inserted in this order without violating foreign keys
+_insert_order = (Playbook, Workflow, EnvironmentVariable, Action, Position, Branch, ConditionalExpression, Condition,
+                 Transform, Argument)
+
+_argument_parent_columns = ('action_id', 'action_device_id', 'condition_id', 'transform_id')
+
+
+def iter_json_documents(stream, chunk_size=65536):
+    """Iterates over the JSON documents in a file without reading all of it into memory
+
+    The file may hold a single document, a JSON array of documents, or whitespace-separated documents such as
+    newline-delimited JSON.
+
+    Args:
+        stream (file): A binary file-like object
+        chunk_size (int, optional): The number of bytes to read at a time. Defaults to 65536
+
+    Yields:
+        (dict|list): The next document
+
+    Raises:
+        ValueError: If the file is not valid JSON
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    eof = False
+    in_array = None
+    read_size = chunk_size
+    while True:
+        buffer = buffer.lstrip()
+        if in_array and buffer.startswith(','):
+            buffer = buffer[1:]
+            continue
+        if not buffer:
+            if eof:
+                if in_array:
+                    raise ValueError('Unterminated JSON array')
+                return
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += text_decoder.decode(chunk, final=eof)
+            continue
+        if in_array is None:
+            in_array = buffer.startswith('[')
+            if in_array:
+                buffer = buffer[1:]
+            continue
+        if in_array and buffer.startswith(']'):
+            return
+        try:
+            document, end = decoder.raw_decode(buffer)
+        except ValueError:
+            if eof:
+                raise
+            # The document is incomplete. Read geometrically larger chunks so that a large document is re-parsed
+            # only a logarithmic number of times
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer += text_decoder.decode(chunk, final=eof)
+            read_size *= 2
+            continue
+        buffer = buffer[end:]
+        read_size = chunk_size
+        yield document
+
+
+class AppApiIndex(object):
+    def __init__(self):
+        """Resolves the API of each app action, condition, and transform once, so that validating many elements which
+            use the same function does not look it up for every element
+        """
+        self._apis = {}
+
+    def get_action_api(self, app_name, action_name):
+        """Gets the API of an app action
+
+        Args:
+            app_name (str): The name of the app
+            action_name (str): The name of the action
+
+        Returns:
+            (tuple(list[dict], bool)): The parameters of the action, and whether or not the action is bound
+
+        Raises:
+            UnknownApp: If the app does not exist
+            UnknownAppAction: If the action does not exist
+        """
+        return self._get(('action', app_name, action_name), self._resolve_action)
+
+    def get_condition_api(self, app_name, condition_name):
+        """Gets the API of a condition
+
+        Args:
+            app_name (str): The name of the app
+            condition_name (str): The name of the condition
+
+        Returns:
+            (list[dict]): The parameters of the condition, without its data parameter
+
+        Raises:
+            UnknownApp: If the app does not exist
+            UnknownCondition: If the condition does not exist
+        """
+        return self._get(('condition', app_name, condition_name), self._resolve_condition)
+
+    def get_transform_api(self, app_name, transform_name):
+        """Gets the API of a transform
+
+        Args:
+            app_name (str): The name of the app
+            transform_name (str): The name of the transform
+
+        Returns:
+            (list[dict]): The parameters of the transform, without its data parameter
+
+        Raises:
+            UnknownApp: If the app does not exist
+            UnknownTransform: If the transform does not exist
+        """
+        return self._get(('transform', app_name, transform_name), self._resolve_transform)
+
+    def _get(self, key, resolve):
+        try:
+            api = self._apis[key]
+        except KeyError:
+            try:
+                api = resolve(*key[1:])
+            except (UnknownApp, UnknownFunction) as e:
+                api = e
+            self._apis[key] = api
+        if isinstance(api, Exception):
+            raise api
+        return api
+
+    @staticmethod
+    def _resolve_action(app_name, action_name):
+        run, parameters = get_app_action_api(app_name, action_name)
+        get_app_action(app_name, run)
+        return parameters, is_app_action_bound(app_name, run)
+
+    @staticmethod
+    def _resolve_condition(app_name, condition_name):
+        data_param_name, run, parameters = get_condition_api(app_name, condition_name)
+        get_condition(app_name, run)
+        return split_api_params(parameters, data_param_name)
+
+    @staticmethod
+    def _resolve_transform(app_name, transform_name):
+        data_param_name, run, parameters = get_transform_api(app_name, transform_name)
+        get_transform(app_name, run)
+        return split_api_params(parameters, data_param_name)
+
+
+class _ArgumentRow(object):
+    """Exposes the row of an Argument the way the parameter validators read an Argument"""
+    __slots__ = ('name', 'value', 'reference', 'is_ref')
+
+    def __init__(self, row):
+        self.name = row['name']
+        self.value = row['value']
+        self.reference = row['reference']
+        self.is_ref = row['value'] is None
+
+    def get_value(self, accumulator):
+        return self.value if self.value is not None else self.reference
+
+
+class _BulkInserter(object):
+    def __init__(self, session, batch_size):
+        """Queues rows of execution elements and inserts them in batches, bypassing the ORM unit of work
+
+        Args:
+            session (Session): The execution database session. The caller commits it
+            batch_size (int): The number of queued rows at which they are inserted
+
+        Attributes:
+            rows_inserted (int): The number of rows inserted so far
+        """
+        self.session = session
+        self.batch_size = batch_size
+        self.rows_inserted = 0
+        self._rows = OrderedDict((model, []) for model in _insert_order)
+        self._queued = 0
+
+    def _queue(self, model, row):
+        self._rows[model].append(row)
+        self._queued += 1
+
+    def _flush_if_full(self):
+        if self._queued >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Inserts all of the queued rows"""
+        for model, rows in self._rows.items():
+            if rows:
+                self.session.bulk_insert_mappings(model, rows, render_nulls=True)
+                del rows[:]
+        self.rows_inserted += self._queued
+        self._queued = 0
+
+
+class _IdMap(object):
+    def __init__(self, regenerate):
+        self.regenerate = regenerate
+        self._ids = {}
+
+    def new(self, id_):
+        if id_ is None:
+            return uuid4()
+        id_ = _to_uuid(id_)
+        new_id = uuid4() if self.regenerate else id_
+        self._ids[id_] = new_id
+        return new_id
+
+    def get(self, id_):
+        if id_ is None:
+            return None
+        id_ = _to_uuid(id_)
+        return self._ids.get(id_, id_)
+
+
+def _to_uuid(id_):
+    return id_ if isinstance(id_, UUID) else UUID(str(id_))
+
+
+def _required(element_json, field, element_type):
+    try:
+        return element_json[field]
+    except KeyError:
+        raise ValueError('{} is missing required field "{}"'.format(element_type, field))
+
+
+class PlaybookImporter(_BulkInserter):
+    def __init__(self, session, batch_size=1000, regenerate_ids=False, api_index=None):
+        """Imports playbooks from their JSON representation by building their rows directly and inserting them in
+            batches. Elements are validated in a single pass over each workflow once its rows are built, resolving
+            each app API once for the whole import.
+
+        Args:
+            session (Session): The execution database session. The caller commits it
+            batch_size (int, optional): The number of queued rows at which they are inserted. Defaults to 1000
+            regenerate_ids (bool, optional): Give every imported element a new ID. Defaults to False
+            api_index (AppApiIndex, optional): The index used to resolve app APIs. Defaults to a new one
+
+        Attributes:
+            playbooks (list[dict]): A summary of each playbook imported so far
+        """
+        super(PlaybookImporter, self).__init__(session, batch_size)
+        self.regenerate_ids = regenerate_ids
+        self.api_index = api_index if api_index is not None else AppApiIndex()
+        self.playbooks = []
+
+    def add_playbook(self, playbook_json):
+        """Queues the rows of a playbook and its workflows
+
+        Args:
+            playbook_json (dict): The JSON representation of the playbook
+
+        Returns:
+            (dict): A summary of the playbook, with its ID, name, and number of workflows and invalid workflows
+
+        Raises:
+            ValueError: If the JSON is not a valid playbook
+        """
+        if not isinstance(playbook_json, dict):
+            raise ValueError('Playbooks must be JSON objects')
+        playbook_id = self._new_id(playbook_json)
+        name = _required(playbook_json, 'name', 'Playbook')
+        self._queue(Playbook, {'id': playbook_id, 'name': name, 'errors': None})
+
+        summary = {'id': playbook_id, 'name': name, 'workflows': 0, 'invalid_workflows': 0}
+        for workflow_json in playbook_json.get('workflows', []):
+            if not self._add_workflow(playbook_id, workflow_json):
+                summary['invalid_workflows'] += 1
+            summary['workflows'] += 1
+            self._flush_if_full()
+        self.playbooks.append(summary)
+        return summary
+
+    def _new_id(self, element_json):
+        id_ = element_json.get('id')
+        if id_ is None or self.regenerate_ids:
+            return uuid4()
+        return _to_uuid(id_)
+
+    def _add_workflow(self, playbook_id, workflow_json):
+        actions_json = workflow_json.get('actions', [])
+        action_ids = _IdMap(self.regenerate_ids)
+        new_action_ids = [action_ids.new(action_json.get('id')) for action_json in actions_json]
+
+        workflow = {'id': self._new_id(workflow_json),
+                    'playbook_id': playbook_id,
+                    'name': _required(workflow_json, 'name', 'Workflow'),
+                    'start': action_ids.get(workflow_json.get('start')),
+                    'is_valid': False,
+                    'errors': [],
+                    'warnings': []}
+        self._queue(Workflow, workflow)
+
+        for variable_json in workflow_json.get('environment_variables', []):
+            self._queue(EnvironmentVariable, {'id': self._new_id(variable_json),
+                                              'workflow_id': workflow['id'],
+                                              'name': variable_json.get('name'),
+                                              'value': _required(variable_json, 'value', 'Environment variable'),
+                                              'description': variable_json.get('description')})
+
+        validations = []
+        for action_id, action_json in zip(new_action_ids, actions_json):
+            self._add_action(workflow['id'], action_id, action_json, action_ids, validations)
+        branches_json = workflow_json.get('branches', [])
+        branches = [self._add_branch(workflow['id'], branch_json, action_ids, validations)
+                    for branch_json in branches_json]
+        has_conditions = [bool(branch_json.get('condition')) for branch_json in branches_json]
+
+        return self._validate_workflow(workflow, set(new_action_ids), branches, has_conditions, validations)
+
+    def _add_action(self, workflow_id, action_id, action_json, action_ids, validations):
+        action = {'id': action_id,
+                  'workflow_id': workflow_id,
+                  'app_name': _required(action_json, 'app_name', 'Action'),
+                  'action_name': _required(action_json, 'action_name', 'Action'),
+                  'name': _required(action_json, 'name', 'Action'),
+                  'errors': []}
+        self._queue(Action, action)
+
+        position_json = action_json.get('position')
+        if position_json:
+            self._queue(Position, {'action_id': action['id'],
+                                   'x': _required(position_json, 'x', 'Position'),
+                                   'y': _required(position_json, 'y', 'Position')})
+        device_json = action_json.get('device_id')
+        if device_json:
+            self._add_argument('action_device_id', action['id'], device_json, action_ids)
+        arguments = self._add_arguments('action_id', action['id'], action_json.get('arguments', []), action_ids)
+        if action_json.get('trigger'):
+            self._add_conditional_expression(action_json['trigger'], action_ids, validations, action_id=action['id'])
+
+        validations.append(partial(self._validate_action, action, arguments, bool(device_json)))
+
+    def _add_branch(self, workflow_id, branch_json, action_ids, validations):
+        branch = {'id': self._new_id(branch_json),
+                  'workflow_id': workflow_id,
+                  'source_id': action_ids.get(_required(branch_json, 'source_id', 'Branch')),
+                  'destination_id': action_ids.get(_required(branch_json, 'destination_id', 'Branch')),
+                  'status': branch_json.get('status', 'Success'),
+                  'priority': branch_json.get('priority', 999),
+                  'errors': None}
+        self._queue(Branch, branch)
+        if branch_json.get('condition'):
+            self._add_conditional_expression(branch_json['condition'], action_ids, validations, branch_id=branch['id'])
+        return branch
+
+    def _add_conditional_expression(self, expression_json, action_ids, validations, action_id=None, branch_id=None,
+                                    parent_id=None):
+        operator = expression_json.get('operator', 'and')
+        if operator not in valid_operators:
+            raise ValueError('Conditional expression operator must be one of {}'.format(', '.join(valid_operators)))
+        expression = {'id': self._new_id(expression_json),
+                      'action_id': action_id,
+                      'branch_id': branch_id,
+                      'parent_id': parent_id,
+                      'operator': operator,
+                      'is_negated': expression_json.get('is_negated', False),
+                      'errors': None}
+        self._queue(ConditionalExpression, expression)
+
+        for condition_json in expression_json.get('conditions', []):
+            self._add_condition(expression['id'], condition_json, action_ids, validations)
+        for child_json in expression_json.get('child_expressions', []):
+            self._add_conditional_expression(child_json, action_ids, validations, parent_id=expression['id'])
+
+    def _add_condition(self, expression_id, condition_json, action_ids, validations):
+        condition = {'id': self._new_id(condition_json),
+                     'conditional_expression_id': expression_id,
+                     'app_name': _required(condition_json, 'app_name', 'Condition'),
+                     'action_name': _required(condition_json, 'action_name', 'Condition'),
+                     'is_negated': condition_json.get('is_negated', False),
+                     'errors': []}
+        self._queue(Condition, condition)
+        arguments = self._add_arguments('condition_id', condition['id'], condition_json.get('arguments', []),
+                                        action_ids)
+        validations.append(partial(self._validate_condition, condition, arguments))
+
+        for transform_json in condition_json.get('transforms', []):
+            transform = {'id': self._new_id(transform_json),
+                         'condition_id': condition['id'],
+                         'app_name': _required(transform_json, 'app_name', 'Transform'),
+                         'action_name': _required(transform_json, 'action_name', 'Transform'),
+                         'errors': []}
+            self._queue(Transform, transform)
+            arguments = self._add_arguments('transform_id', transform['id'], transform_json.get('arguments', []),
+                                            action_ids)
+            validations.append(partial(self._validate_transform, transform, arguments))
+
+    def _add_arguments(self, parent_column, parent_id, arguments_json, action_ids):
+        return [self._add_argument(parent_column, parent_id, argument_json, action_ids)
+                for argument_json in arguments_json]
+
+    def _add_argument(self, parent_column, parent_id, argument_json, action_ids):
+        has_value = 'value' in argument_json
+        has_reference = bool(argument_json.get('reference'))
+        if has_value == has_reference:
+            raise ValueError('Arguments must have either a value or a reference.')
+        argument = {column: None for column in _argument_parent_columns}
+        argument.update({parent_column: parent_id,
+                         'name': _required(argument_json, 'name', 'Argument'),
+                         'value': argument_json.get('value'),
+                         'reference': action_ids.get(argument_json.get('reference')),
+                         'selection': argument_json.get('selection'),
+                         'errors': []})
+        self._queue(Argument, argument)
+        return _ArgumentRow(argument)
+
+    @staticmethod
+    def _validate_workflow(workflow, action_ids, branches, has_conditions, validations):
+        errors = []
+        if not workflow['start'] and action_ids:
+            errors.append('Workflows with actions require a start parameter')
+        elif action_ids and workflow['start'] not in action_ids:
+            errors.append('Workflow start ID {} not found in actions'.format(workflow['start']))
+        for branch in branches:
+            if branch['source_id'] not in action_ids:
+                errors.append('Branch source ID {} not found in workflow actions'.format(branch['source_id']))
+            if branch['destination_id'] not in action_ids:
+                errors.append('Branch destination ID {} not found in workflow actions'.format(
+                    branch['destination_id']))
+        workflow['errors'] = errors
+        workflow['warnings'] = get_graph_warnings(
+            workflow['start'], action_ids,
+            [(branch['source_id'], branch['destination_id'], has_condition)
+             for branch, has_condition in zip(branches, has_conditions)])
+
+        is_valid = not errors
+        for validate in validations:
+            if validate():
+                is_valid = False
+        workflow['is_valid'] = is_valid
+        return is_valid
+
+    def _validate_action(self, action, arguments, has_device):
+        errors = []
+        try:
+            parameters, is_bound = self.api_index.get_action_api(action['app_name'], action['action_name'])
+            if is_bound and not has_device:
+                errors.append('App action is bound but no device ID was provided.')
+            validate_app_action_parameters(parameters, arguments, action['app_name'], action['action_name'])
+        except UnknownApp:
+            errors.append('Unknown app {}'.format(action['app_name']))
+        except UnknownAppAction:
+            errors.append('Unknown app action {}'.format(action['action_name']))
+        except InvalidArgument as e:
+            errors.extend(e.errors)
+        action['errors'] = errors
+        return errors
+
+    def _validate_condition(self, condition, arguments):
+        errors = []
+        try:
+            parameters = self.api_index.get_condition_api(condition['app_name'], condition['action_name'])
+            validate_condition_parameters(parameters, arguments, condition['action_name'])
+        except UnknownApp:
+            errors.append('Unknown app {}'.format(condition['app_name']))
+        except UnknownCondition:
+            errors.append('Unknown condition {}'.format(condition['action_name']))
+        except InvalidArgument as e:
+            errors.extend(e.errors)
+        condition['errors'] = errors
+        return errors
+
+    def _validate_transform(self, transform, arguments):
+        errors = []
+        try:
+            parameters = self.api_index.get_transform_api(transform['app_name'], transform['action_name'])
+            validate_transform_parameters(parameters, arguments, transform['action_name'])
+        except UnknownApp:
+            errors.append('Unknown app {}'.format(transform['app_name']))
+        except UnknownTransform:
+            errors.append('Unknown transform {}'.format(transform['action_name']))
+        except InvalidArgument as e:
+            errors.extend(e.errors)
+        transform['errors'] = errors
+        return errors
+
+
+class WorkflowCopier(_BulkInserter):
+    select_chunk_size = 500
+
+    def __init__(self, session, batch_size=1000):
+        """Copies playbooks and workflows by cloning their rows with new IDs, without loading them into the ORM or
+            serializing them
+
+        Args:
+            session (Session): The execution database session. The caller commits it
+            batch_size (int, optional): The number of queued rows at which they are inserted. Defaults to 1000
+        """
+        super(WorkflowCopier, self).__init__(session, batch_size)
+        self._ids = {}
+
+    def copy_playbook(self, playbook_id, name):
+        """Copies a playbook and all of its workflows
+
+        Args:
+            playbook_id (UUID): The ID of the playbook to copy
+            name (str): The name of the new playbook
+
+        Returns:
+            (UUID): The ID of the new playbook
+        """
+        new_playbook_id = uuid4()
+        self._queue(Playbook, {'id': new_playbook_id, 'name': name, 'errors': None})
+        workflows = self._select(Workflow, Workflow.playbook_id, [playbook_id])
+        self._copy_workflows(workflows, new_playbook_id)
+        self.flush()
+        return new_playbook_id
+
+    def copy_workflow(self, workflow_id, playbook_id, name):
+        """Copies a workflow
+
+        Args:
+            workflow_id (UUID): The ID of the workflow to copy
+            playbook_id (UUID): The ID of the playbook to add the new workflow to
+            name (str): The name of the new workflow
+
+        Returns:
+            (UUID): The ID of the new workflow
+        """
+        workflows = self._select(Workflow, Workflow.id, [workflow_id])
+        for workflow in workflows:
+            workflow['name'] = name
+        self._copy_workflows(workflows, playbook_id)
+        self.flush()
+        return self._ids[_to_uuid(workflow_id)]
+
+    def _select(self, model, column, ids, order_by=None):
+        rows = []
+        ids = list(ids)
+        for i in range(0, len(ids), self.select_chunk_size):
+            query = select([model.__table__]).where(column.in_(ids[i:i + self.select_chunk_size]))
+            if order_by is not None:
+                query = query.order_by(order_by)
+            rows.extend(dict(row) for row in self.session.execute(query))
+        return rows
+
+    def _copy_workflows(self, workflows, playbook_id):
+        workflow_ids = self._assign_ids(workflows)
+        actions = self._select(Action, Action.workflow_id, workflow_ids)
+        action_ids = self._assign_ids(actions)
+        branches = self._select(Branch, Branch.workflow_id, workflow_ids)
+        branch_ids = self._assign_ids(branches)
+        variables = self._select(EnvironmentVariable, EnvironmentVariable.workflow_id, workflow_ids)
+        self._assign_ids(variables)
+        positions = self._select(Position, Position.action_id, action_ids, order_by=Position.id)
+
+        expressions = (self._select(ConditionalExpression, ConditionalExpression.action_id, action_ids)
+                       + self._select(ConditionalExpression, ConditionalExpression.branch_id, branch_ids))
+        expression_ids = self._assign_ids(expressions)
+        level_ids = expression_ids
+        while level_ids:
+            children = self._select(ConditionalExpression, ConditionalExpression.parent_id, level_ids)
+            level_ids = self._assign_ids(children)
+            expressions.extend(children)
+            expression_ids.extend(level_ids)
+
+        conditions = self._select(Condition, Condition.conditional_expression_id, expression_ids)
+        condition_ids = self._assign_ids(conditions)
+        transforms = self._select(Transform, Transform.condition_id, condition_ids)
+        transform_ids = self._assign_ids(transforms)
+        arguments = []
+        for column, parent_ids in zip((Argument.action_id, Argument.action_device_id, Argument.condition_id,
+                                       Argument.transform_id),
+                                      (action_ids, action_ids, condition_ids, transform_ids)):
+            arguments.extend(self._select(Argument, column, parent_ids, order_by=Argument.id))
+
+        for workflow in workflows:
+            workflow['playbook_id'] = playbook_id
+        self._queue_copies(Workflow, workflows, ('start',))
+        self._queue_copies(EnvironmentVariable, variables, ('workflow_id',))
+        self._queue_copies(Action, actions, ('workflow_id',))
+        self._queue_copies(Position, positions, ('action_id',))
+        self._queue_copies(Branch, branches, ('workflow_id', 'source_id', 'destination_id'))
+        self._queue_copies(ConditionalExpression, expressions, ('action_id', 'branch_id', 'parent_id'))
+        self._queue_copies(Condition, conditions, ('conditional_expression_id',))
+        self._queue_copies(Transform, transforms, ('condition_id',))
+        self._queue_copies(Argument, arguments, _argument_parent_columns + ('reference',))
+
+    def _assign_ids(self, rows):
+        ids = []
+        for row in rows:
+            self._ids[row['id']] = uuid4()
+            ids.append(row['id'])
+        return ids
+
+    def _queue_copies(self, model, rows, id_columns):
+        for row in rows:
+            if model in (Position, Argument):
+                row.pop('id')
+            else:
+                row['id'] = self._ids[row['id']]
+            for column in id_columns:
+                row[column] = self._ids.get(row[column], row[column])
+            self._queue(model, row)
+            self._flush_if_full()
@@ -1,6 +1,6 @@
 import logging
 
-from sqlalchemy import Column, ForeignKey, String, orm, Boolean, event
+from sqlalchemy import Column, ForeignKey, String, orm, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy_utils import UUIDType
 
@@ -27,6 +27,7 @@ class Condition(ExecutionElement, executiondb.Execution_Base):
     arguments = relationship('Argument', cascade='all, delete, delete-orphan', passive_deletes=True)
     transforms = relationship('Transform', cascade='all, delete-orphan', passive_deletes=True)
     children = ('arguments', 'transforms')
+    validation_attributes = ('app_name', 'action_name', 'arguments', 'transforms')
 
     def __init__(self, app_name, action_name, id=None, is_negated=False, arguments=None, transforms=None, errors=None):
         """Initializes a new Condition object.
@@ -102,10 +103,58 @@ class Condition(ExecutionElement, executiondb.Execution_Base):
         Returns:
             (bool): True if the Condition evaluated to True, False otherwise
         """
+        if getattr(action_execution_strategy, 'supports_segments', False):
+            return self._execute_segments(action_execution_strategy, data_in, accumulator)
+
         data = data_in
 
         for transform in self.transforms:
             data = transform.execute(action_execution_strategy, data, accumulator)
+        return self._execute_condition(action_execution_strategy, data, data_in, accumulator)
+
+    def _execute_segments(self, action_execution_strategy, data_in, accumulator):
+        """Executes the Transforms and the Condition, sending each run of consecutive steps which belong to the same app
+            to the strategy as a single segment
+
+        Args:
+            action_execution_strategy: The strategy used to execute the action (e.g. RemoteActionExecutionStrategy)
+            data_in (dict): The input to the Transform objects associated with this Condition.
+            accumulator (dict): The accumulated data from previous Actions.
+
+        Returns:
+            (bool): True if the Condition evaluated to True, False otherwise
+        """
+        data = data_in
+        steps = list(self.transforms) + [self]
+        start = 0
+        while start < len(steps):
+            end = start + 1
+            while end < len(steps) and steps[end].app_name == steps[start].app_name:
+                end += 1
+            segment = steps[start:end]
+            start = end
+            if len(segment) == 1:
+                if segment[0] is self:
+                    return self._execute_condition(action_execution_strategy, data, data_in, accumulator)
+                data = segment[0].execute(action_execution_strategy, data, accumulator)
+                continue
+
+            statuses, data = action_execution_strategy.execute_segment(segment, data, accumulator)
+            for step, status in zip(segment, statuses):
+                if step is self:
+                    break
+                event = WalkoffEvent.TransformSuccess if status == 'Success' else WalkoffEvent.TransformError
+                WalkoffEvent.CommonWorkflowSignal.send(step, event=event)
+            if segment[-1] is self:
+                if statuses[-1] != 'Success':
+                    logger.error('Condition {0} could not be executed ({1}). Returning False'.format(
+                        self.action_name, statuses[-1]))
+                    WalkoffEvent.CommonWorkflowSignal.send(self, event=WalkoffEvent.ConditionError)
+                    return False
+                WalkoffEvent.CommonWorkflowSignal.send(self, event=WalkoffEvent.ConditionSuccess)
+                return not data if self.is_negated else data
+
+    def _execute_condition(self, action_execution_strategy, data, data_in, accumulator):
         try:
             arguments = self.__update_arguments_with_data(data)
             args = validate_condition_parameters(self._api, arguments, self.action_name, accumulator=accumulator)
@@ -138,8 +187,3 @@ class Condition(ExecutionElement, executiondb.Execution_Base):
                 arguments.append(argument)
         arguments.append(Argument(self._data_param_name, value=data))
         return arguments
-
-
-@event.listens_for(Condition, 'before_update')
-def validate_before_update(mapper, connection, target):
-    target.validate()
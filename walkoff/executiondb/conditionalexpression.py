@@ -1,7 +1,7 @@
 import logging
 from uuid import uuid4
 
-from sqlalchemy import Column, ForeignKey, Enum, orm, Boolean, event
+from sqlalchemy import Column, ForeignKey, Enum, orm, Boolean
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy_utils import UUIDType
 
@@ -27,6 +27,7 @@ class ConditionalExpression(ExecutionElement, Execution_Base):
                                      backref=backref('parent', remote_side=id), passive_deletes=True)
     conditions = relationship('Condition', cascade='all, delete-orphan', passive_deletes=True)
     children = ('child_expressions', 'conditions')
+    validation_attributes = ('child_expressions', 'conditions')
 
     def __init__(self, operator='and', id=None, is_negated=False, child_expressions=None, conditions=None, errors=None):
         """Initializes a new ConditionalExpression object
@@ -112,8 +113,3 @@ class ConditionalExpression(ExecutionElement, Execution_Base):
                         return False
                     is_one_found = True
         return is_one_found
-
-
-@event.listens_for(ConditionalExpression, 'before_update')
-def validate_before_update(mapper, connection, target):
-    target.validate()
@@ -0,0 +1,344 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy.orm import subqueryload
+
+from walkoff.executiondb import WorkflowStatusEnum
+from walkoff.executiondb.workflowresults import WorkflowStatus, ActionStatus
+from walkoff.helpers import utc_as_rfc_datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+retainable_statuses = (WorkflowStatusEnum.completed, WorkflowStatusEnum.aborted)
+
+
+def make_retention_policies(policies):
+    """Converts retention policies from their configuration format
+
+    Args:
+        policies (dict): A dictionary of workflow status names to the number of days to keep WorkflowStatuses with
+            that status. A value of 0 prunes all of them, and a value of None keeps all of them.
+
+    Returns:
+        (dict{WorkflowStatusEnum: int}): The policies to apply
+
+    Raises:
+        ValueError: If a policy is for a status which is not a completed status or if a number of days is negative
+    """
+    converted = {}
+    for status, days in policies.items():
+        try:
+            status = WorkflowStatusEnum[status]
+        except KeyError:
+            raise ValueError('Unknown workflow status {}'.format(status))
+        if status not in retainable_statuses:
+            raise ValueError('Cannot prune workflows with status {}'.format(status.name))
+        if days is None:
+            continue
+        days = int(days)
+        if days < 0:
+            raise ValueError('Cannot keep workflows with status {} for {} days'.format(status.name, days))
+        converted[status] = days
+    return converted
+
+
+class WorkflowStatusArchiver(object):
+    def __init__(self, path, compression='zstd'):
+        """Writes pruned WorkflowStatuses to newline-delimited JSON files partitioned by their completion date
+
+        Args:
+            path (str): The root directory of the archive
+            compression (str, optional): The compression to use. One of 'zstd', 'gzip', or 'none'. Falls back to gzip
+                if zstd is requested but the zstandard package is not installed. Defaults to 'zstd'.
+        """
+        if compression == 'zstd' and zstandard is None:
+            logger.warning('zstandard is not installed. Archiving workflow statuses using gzip')
+            compression = 'gzip'
+        if compression not in ('zstd', 'gzip', 'none'):
+            raise ValueError('Unknown archive compression {}'.format(compression))
+        self.path = path
+        self.compression = compression
+        self._files = {}
+
+    @property
+    def extension(self):
+        return {'zstd': '.ndjson.zst', 'gzip': '.ndjson.gz', 'none': '.ndjson'}[self.compression]
+
+    def _open(self, partition, name):
+        directory = os.path.join(self.path, *partition)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        filename = os.path.join(directory, '{}{}'.format(name, self.extension))
+        if self.compression == 'zstd':
+            raw = open(filename, 'ab')
+            return raw, zstandard.ZstdCompressor().stream_writer(raw)
+        elif self.compression == 'gzip':
+            return None, gzip.open(filename, 'ab')
+        else:
+            return None, open(filename, 'ab')
+
+    def write(self, workflow_status, name):
+        """Writes a WorkflowStatus and its ActionStatuses to the archive
+
+        Args:
+            workflow_status (WorkflowStatus): The WorkflowStatus to archive
+            name (str): The name of the file to write to in the date partition
+        """
+        timestamp = workflow_status.completed_at or workflow_status.created_at
+        partition = (timestamp.strftime('%Y'), timestamp.strftime('%m'), timestamp.strftime('%d'))
+        if partition not in self._files:
+            self._files[partition] = self._open(partition, name)
+        line = json.dumps(workflow_status.as_json(full_actions=True)) + '\n'
+        self._files[partition][1].write(line.encode('utf-8'))
+
+    def flush(self):
+        """Flushes the WorkflowStatuses written so far to disk. The zstd frame, or the gzip block, being written is
+            ended, so that everything written so far can be read back even if the files are never closed.
+        """
+        for raw, writer in self._files.values():
+            if self.compression == 'zstd':
+                writer.flush(zstandard.FLUSH_FRAME)
+            else:
+                writer.flush()
+            raw = raw if raw is not None else writer
+            raw.flush()
+            os.fsync(raw.fileno())
+
+    def close(self):
+        """Flushes and closes all the files opened by this archiver"""
+        for raw, writer in self._files.values():
+            writer.close()
+            if raw is not None and not raw.closed:
+                raw.close()
+        self._files = {}
+
+
+class RetentionReport(object):
+    def __init__(self, policies):
+        """The progress of a retention job
+
+        Args:
+            policies (dict{WorkflowStatusEnum: int}): The policies being applied
+
+        Attributes:
+            id (str): The ID of the job
+            status (str): One of 'pending', 'running', 'completed', or 'failed'
+            deleted (int): The number of WorkflowStatuses deleted so far
+            archived (int): The number of WorkflowStatuses archived so far
+            chunks (int): The number of chunks committed so far
+            error (str): The error which stopped the job, if any
+        """
+        self.id = str(uuid4())
+        self.policies = policies
+        self.status = 'pending'
+        self.started_at = None
+        self.completed_at = None
+        self.deleted = 0
+        self.archived = 0
+        self.chunks = 0
+        self.error = None
+
+    @property
+    def is_active(self):
+        return self.status in ('pending', 'running')
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return ((self.completed_at or datetime.utcnow()) - self.started_at).total_seconds()
+
+    @property
+    def rate(self):
+        """The number of WorkflowStatuses deleted per second"""
+        elapsed = self.elapsed
+        return self.deleted / elapsed if elapsed else 0.0
+
+    def as_json(self):
+        ret = {'id': self.id,
+               'status': self.status,
+               'policies': {status.name: days for status, days in self.policies.items()},
+               'deleted': self.deleted,
+               'archived': self.archived,
+               'chunks': self.chunks,
+               'elapsed_seconds': round(self.elapsed, 3),
+               'deleted_per_second': round(self.rate, 3)}
+        if self.started_at:
+            ret['started_at'] = utc_as_rfc_datetime(self.started_at)
+        if self.completed_at:
+            ret['completed_at'] = utc_as_rfc_datetime(self.completed_at)
+        if self.error:
+            ret['error'] = self.error
+        return ret
+
+
+class RetentionJob(object):
+    def __init__(self, session, policies, chunk_size=500, chunk_pause=0.0, archiver=None):
+        """Deletes WorkflowStatuses and their ActionStatuses in bounded chunks so that the tables are never locked for
+            longer than it takes to delete one chunk
+
+        Args:
+            session (Session): The execution database session to use
+            policies (dict{WorkflowStatusEnum: int}): The number of days to keep WorkflowStatuses for each status
+            chunk_size (int, optional): The number of WorkflowStatuses to delete in each transaction. Defaults to 500
+            chunk_pause (float, optional): The number of seconds to sleep between chunks to let other writers through.
+                Defaults to 0
+            archiver (WorkflowStatusArchiver, optional): Archives the WorkflowStatuses before they are deleted
+        """
+        self.session = session
+        self.chunk_size = chunk_size
+        self.chunk_pause = chunk_pause
+        self.archiver = archiver
+        self.report = RetentionReport(policies)
+
+    def _criteria(self, status, days, now):
+        if days == 0:
+            return WorkflowStatus.status == status
+        return (WorkflowStatus.status == status) & (WorkflowStatus.completed_at <= now - timedelta(days=days))
+
+    def _delete_chunk(self, criteria):
+        execution_ids = [row.execution_id for row in
+                         self.session.query(WorkflowStatus.execution_id).filter(criteria).limit(self.chunk_size)]
+        if not execution_ids:
+            return 0
+        if self.archiver is not None:
+            workflow_statuses = self.session.query(WorkflowStatus).options(
+                subqueryload(WorkflowStatus._action_statuses)).filter(WorkflowStatus.execution_id.in_(execution_ids))
+            for workflow_status in workflow_statuses:
+                self.archiver.write(workflow_status, self.report.id)
+                self.report.archived += 1
+            # The chunk is only deleted once it is archived on disk
+            self.archiver.flush()
+        self.session.query(ActionStatus).filter(
+            ActionStatus._workflow_status_id.in_(execution_ids)).delete(synchronize_session=False)
+        self.session.query(WorkflowStatus).filter(
+            WorkflowStatus.execution_id.in_(execution_ids)).delete(synchronize_session=False)
+        self.session.commit()
+        self.session.expire_all()
+        return len(execution_ids)
+
+    def run(self):
+        """Applies the retention policies
+
+        Returns:
+            (RetentionReport): The report of the job
+        """
+        self.report.status = 'running'
+        self.report.started_at = now = datetime.utcnow()
+        try:
+            for status, days in self.report.policies.items():
+                criteria = self._criteria(status, days, now)
+                while True:
+                    deleted = self._delete_chunk(criteria)
+                    if not deleted:
+                        break
+                    self.report.deleted += deleted
+                    self.report.chunks += 1
+                    if deleted < self.chunk_size:
+                        break
+                    if self.chunk_pause:
+                        time.sleep(self.chunk_pause)
+        except Exception as e:
+            self.session.rollback()
+            self.report.status = 'failed'
+            self.report.error = str(e)
+            logger.exception('Retention job {} failed'.format(self.report.id))
+        else:
+            self.report.status = 'completed'
+        finally:
+            if self.archiver is not None:
+                self.archiver.close()
+            self.report.completed_at = datetime.utcnow()
+        logger.info('Retention job {} {}. Deleted {} workflow statuses in {:.2f} seconds'.format(
+            self.report.id, self.report.status, self.report.deleted, self.report.elapsed))
+        return self.report
+
+
+class RetentionManager(object):
+    def __init__(self, execution_db, config):
+        """Runs retention jobs against the execution database, one at a time
+
+        Args:
+            execution_db (ExecutionDatabase): The execution database
+            config (Config): The Walkoff configuration
+        """
+        self.execution_db = execution_db
+        self.config = config
+        self.report = None
+        self._lock = threading.Lock()
+        self._periodic_thread = None
+
+    def _make_job(self, policies):
+        archiver = None
+        if self.config.RETENTION_ARCHIVE_PATH:
+            archiver = WorkflowStatusArchiver(self.config.RETENTION_ARCHIVE_PATH,
+                                              self.config.RETENTION_ARCHIVE_COMPRESSION)
+        return RetentionJob(self.execution_db.session, policies, chunk_size=self.config.RETENTION_CHUNK_SIZE,
+                            chunk_pause=self.config.RETENTION_CHUNK_PAUSE_SECONDS, archiver=archiver)
+
+    def _run_in_background(self, job):
+        try:
+            job.run()
+        finally:
+            self.execution_db.session.remove()
+
+    def purge(self, policies=None, background=False):
+        """Starts a retention job unless one is already running
+
+        Args:
+            policies (dict{WorkflowStatusEnum: int}, optional): The policies to apply. Defaults to the
+                RETENTION_POLICIES setting
+            background (bool, optional): Run the job in a separate thread? Defaults to False
+
+        Returns:
+            (RetentionReport): The report of the new job, or of the currently running job if there is one
+        """
+        if policies is None:
+            policies = make_retention_policies(self.config.RETENTION_POLICIES)
+        with self._lock:
+            if self.report is not None and self.report.is_active:
+                return self.report
+            job = self._make_job(policies)
+            self.report = job.report
+        if background:
+            thread = threading.Thread(target=self._run_in_background, args=(job,))
+            thread.daemon = True
+            thread.start()
+        else:
+            job.run()
+        return job.report
+
+    def start_periodic(self, interval_minutes):
+        """Applies the configured retention policies every interval in a background thread
+
+        Args:
+            interval_minutes (float): The number of minutes between retention jobs
+        """
+        if self._periodic_thread is not None:
+            return
+
+        def run_periodically():
+            while True:
+                time.sleep(interval_minutes * 60)
+                try:
+                    self.purge()
+                except ValueError:
+                    logger.exception('Invalid workflow status retention policies')
+                finally:
+                    self.execution_db.session.remove()
+
+        logger.info('Applying workflow status retention policies every {} minutes'.format(interval_minutes))
+        self._periodic_thread = threading.Thread(target=run_periodically)
+        self._periodic_thread.daemon = True
+        self._periodic_thread.start()
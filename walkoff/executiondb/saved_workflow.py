@@ -1,6 +1,6 @@
 import logging
 
-from sqlalchemy import Column, PickleType
+from sqlalchemy import Column, Index, PickleType
 from sqlalchemy_utils import UUIDType
 
 from walkoff.executiondb import Execution_Base
@@ -14,6 +14,7 @@ class SavedWorkflow(Execution_Base):
     workflow_id = Column(UUIDType(binary=False), nullable=False)
     action_id = Column(UUIDType(binary=False), nullable=False)
     app_instances = Column(PickleType(), nullable=False)
+    __table_args__ = (Index('ix_saved_workflow_workflow_id_action_id', 'workflow_id', 'action_id'),)
 
     def __init__(self, workflow_execution_id, workflow_id, action_id, app_instances):
         """Initializes a SavedWorkflow object. This is used when a workflow pauses execution, and must be reloaded
@@ -1,6 +1,8 @@
 from marshmallow import validates_schema, ValidationError, fields, post_dump, post_load
 from marshmallow.validate import OneOf
 from marshmallow_sqlalchemy import ModelSchema, field_for
+from sqlalchemy import inspect
+from sqlalchemy.orm import selectinload
 
 from walkoff.executiondb import ExecutionDatabase
 from .action import Action
@@ -47,6 +49,22 @@ class ExecutionBaseSchema(ModelSchema):
         # Maybe automatically find and use instance if 'id' (or key) is passed
         return super(ExecutionBaseSchema, self).load(data, session=session, instance=instance, *args, **kwargs)
 
+    def get_instance(self, data):
+        """Gets an existing element by its primary key. Elements already in the session are found without a query, and
+            the session is not flushed, since the elements loaded so far are still being modified
+
+        Args:
+            data (dict): The deserialized data
+
+        Returns:
+            (ExecutionElement): The existing element, or None if it does not exist
+        """
+        primary_key = tuple(data.get(column.key) for column in inspect(self.opts.model).primary_key)
+        if None in primary_key:
+            return None
+        with self.session.no_autoflush:
+            return self.session.query(self.opts.model).get(primary_key)
+
 
 class ExecutionElementBaseSchema(ExecutionBaseSchema):
     errors = fields.List(fields.String())
@@ -184,11 +202,35 @@ class WorkflowSchema(ExecutionElementBaseSchema):
     branches = fields.Nested(BranchSchema, many=True)
     environment_variables = fields.Nested(EnvironmentVariableSchema, many=True)
     is_valid = field_for(Workflow, 'is_valid')
+    warnings = fields.List(fields.String())
 
     class Meta:
         model = Workflow
         exclude = ('playbook',)
 
+    def load(self, data, session=None, instance=None, *args, **kwargs):
+        if instance is not None:
+            self.load_workflow_tree(instance)
+        return super(WorkflowSchema, self).load(data, session=session, instance=instance, *args, **kwargs)
+
+    @staticmethod
+    def load_workflow_tree(workflow):
+        """Loads the elements of a persisted workflow with one query per type of element, so that updating it does not
+            look up each of its elements separately
+
+        Args:
+            workflow (Workflow): The workflow to load
+        """
+        actions = selectinload(Workflow.actions)
+        ExecutionDatabase.instance.session.query(Workflow).filter_by(id=workflow.id).options(
+            actions.selectinload(Action.arguments),
+            actions.selectinload(Action.device_id),
+            actions.selectinload(Action.position),
+            actions.selectinload(Action.trigger).selectinload(ConditionalExpression.conditions),
+            selectinload(Workflow.branches).selectinload(Branch.condition).selectinload(
+                ConditionalExpression.conditions),
+            selectinload(Workflow.environment_variables)).all()
+
 
 class PlaybookSchema(ExecutionElementBaseSchema):
     """Schema for playbooks
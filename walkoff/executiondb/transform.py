@@ -1,7 +1,7 @@
 import logging
 from copy import deepcopy
 
-from sqlalchemy import Column, ForeignKey, String, orm, event
+from sqlalchemy import Column, ForeignKey, String, orm
 from sqlalchemy.orm import relationship
 from sqlalchemy_utils import UUIDType
 
@@ -25,6 +25,7 @@ class Transform(ExecutionElement, Execution_Base):
     action_name = Column(String(80), nullable=False)
     arguments = relationship('Argument', cascade='all, delete, delete-orphan', passive_deletes=True)
     children = ('arguments',)
+    validation_attributes = ('app_name', 'action_name', 'arguments')
 
     def __init__(self, app_name, action_name, id=None, arguments=None, errors=None):
         """Initializes a new Transform object. A Transform is used to transform input into a workflow.
@@ -120,8 +121,3 @@ class Transform(ExecutionElement, Execution_Base):
                 arguments.append(argument)
         arguments.append(Argument(self._data_param_name, value=data))
         return arguments
-
-
-@event.listens_for(Transform, 'before_update')
-def validate_before_update(mapper, connection, target):
-    target.validate()
@@ -1,5 +1,12 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history, PASSIVE_NO_INITIALIZE
+
+
 class Validatable(object):
     children = []
+    validation_attributes = ()
+    validation_root = False
 
     @property
     def _is_valid(self):
@@ -18,3 +25,64 @@ class Validatable(object):
 
     def validate(self):
         raise NotImplementedError('Must implement validate_self')
+
+    def revalidate(self):
+        """Validates only the elements of the tree rooted at this element which could have become invalid. An element
+            is validated if any of its validation_attributes changed since it was loaded or last flushed, if it was
+            validated in an earlier flush which did not include its parent, or if any of its descendants was validated.
+            Children which were never loaded cannot have changed, and are skipped without being loaded.
+
+        Returns:
+            (bool): Whether or not this element was validated
+        """
+        return self._revalidate_tree({}, set())
+
+    def _revalidate_tree(self, revalidated, reached):
+        # Elements are tracked by identity, since some of them compare equal by value
+        state = inspect(self)
+        children_revalidated = False
+        for child_name in self.children:
+            child = state.dict.get(child_name)
+            children = child if isinstance(child, list) else [child]
+            for instance in (instance for instance in children if instance is not None):
+                reached.add(id(instance))
+                if id(instance) in revalidated:
+                    children_revalidated = children_revalidated or revalidated[id(instance)][1]
+                elif instance._revalidate_tree(revalidated, reached):
+                    children_revalidated = True
+
+        is_revalidated = children_revalidated or self._has_validation_changes(state)
+        if is_revalidated:
+            self.validate()
+        revalidated[id(self)] = (self, is_revalidated)
+        return is_revalidated
+
+    def _has_validation_changes(self, state):
+        if not state.persistent or self.__dict__.get('_validation_pending', False):
+            return True
+        if not state.modified:
+            return False
+        return any(get_history(self, attribute, passive=PASSIVE_NO_INITIALIZE).has_changes()
+                   for attribute in self.validation_attributes)
+
+
+@event.listens_for(Session, 'before_flush')
+def revalidate_before_flush(session, flush_context, instances):
+    """Revalidates the modified elements in the session before they are flushed. Each element is validated at most once
+        per flush. An element which is not a validation root and is flushed without its parent (as happens during an
+        autoflush) is marked as pending, so that its parent is revalidated when it is next flushed
+    """
+    dirty = sorted((instance for instance in session.dirty if isinstance(instance, Validatable)),
+                   key=lambda instance: not instance.validation_root)
+    if not dirty:
+        return
+    revalidated = {}
+    reached = set()
+    for instance in (instance for instance in dirty if id(instance) not in revalidated):
+        instance._revalidate_tree(revalidated, reached)
+
+    for instance, is_revalidated in revalidated.values():
+        if id(instance) in reached:
+            instance.__dict__.pop('_validation_pending', None)
+        elif is_revalidated and not instance.validation_root:
+            instance._validation_pending = True
@@ -1,11 +1,13 @@
 import logging
+from collections import defaultdict
 
-from sqlalchemy import Column, String, ForeignKey, UniqueConstraint, Boolean, event
-from sqlalchemy.orm import relationship
-from sqlalchemy_utils import UUIDType
+from sqlalchemy import Column, String, ForeignKey, UniqueConstraint, Boolean, inspect
+from sqlalchemy.orm import relationship, object_session
+from sqlalchemy_utils import UUIDType, ScalarListType
 
 from walkoff.executiondb import Execution_Base
 from walkoff.executiondb.action import Action
+from walkoff.executiondb.conditionalexpression import ConditionalExpression
 from walkoff.executiondb.executionelement import ExecutionElement
 
 logger = logging.getLogger(__name__)
@@ -19,11 +21,15 @@ class Workflow(ExecutionElement, Execution_Base):
     branches = relationship('Branch', cascade='all, delete-orphan', passive_deletes=True)
     start = Column(UUIDType(binary=False))
     is_valid = Column(Boolean, default=False)
+    warnings = Column(ScalarListType(), nullable=True)
     children = ('actions', 'branches')
+    validation_attributes = ('start', 'actions', 'branches')
+    validation_root = True
     environment_variables = relationship('EnvironmentVariable', cascade='all, delete-orphan', passive_deletes=True)
     __table_args__ = (UniqueConstraint('playbook_id', 'name', name='_playbook_workflow'),)
 
-    def __init__(self, name, start, id=None, actions=None, branches=None, environment_variables=None, errors=None):
+    def __init__(self, name, start, id=None, actions=None, branches=None, environment_variables=None, errors=None,
+                 warnings=None):
         """Initializes a Workflow object. A Workflow falls under a Playbook, and has many associated Actions
             within it that get executed.
 
@@ -36,6 +42,9 @@ class Workflow(ExecutionElement, Execution_Base):
             branches (list[Branch], optional): A list of Branch objects for the Workflow object. Defaults to None.
             environment_variables (list[EnvironmentVariable], optional): A list of environment variables for the
                 Workflow. Defaults to None.
+            errors (list[str], optional): A list of errors for the Workflow. Defaults to None.
+            warnings (list[str], optional): A list of warnings for the Workflow. These are recomputed when the
+                Workflow is validated. Defaults to None.
         """
         ExecutionElement.__init__(self, id, errors)
         self.name = name
@@ -48,12 +57,14 @@ class Workflow(ExecutionElement, Execution_Base):
         self.validate()
 
     def validate(self):
-        """Validates the object"""
-        action_ids = [action.id for action in self.actions]
+        """Validates the object. Actions which cannot be reached from the start action and loops of branches without
+            conditions are reported as warnings rather than errors, since a workflow containing them can still be run
+        """
+        action_ids = {action.id for action in self.actions}
         errors = []
-        if not self.start and self.actions:
+        if not self.start and action_ids:
             errors.append('Workflows with actions require a start parameter')
-        elif self.actions and self.start not in action_ids:
+        elif action_ids and self.start not in action_ids:
             errors.append('Workflow start ID {} not found in actions'.format(self.start))
         for branch in self.branches:
             if branch.source_id not in action_ids:
@@ -61,8 +72,35 @@ class Workflow(ExecutionElement, Execution_Base):
             if branch.destination_id not in action_ids:
                 errors.append('Branch destination ID {} not found in workflow actions'.format(branch.destination_id))
         self.errors = errors
+        conditional_branch_ids = self._get_conditional_branch_ids()
+        self.warnings = get_graph_warnings(
+            self.start, action_ids,
+            [(branch.source_id, branch.destination_id, branch.id in conditional_branch_ids)
+             for branch in self.branches])
         self.is_valid = self._is_valid
 
+    def _get_conditional_branch_ids(self):
+        """Gets the IDs of the branches which have a condition. The conditions of persisted branches which have not
+            been loaded are looked up in batches, rather than loading each of them separately
+        """
+        conditional_branch_ids = set()
+        unloaded_branch_ids = []
+        for branch in self.branches:
+            state = inspect(branch)
+            if 'condition' in state.dict or not state.persistent:
+                if branch.condition is not None:
+                    conditional_branch_ids.add(branch.id)
+            else:
+                unloaded_branch_ids.append(branch.id)
+
+        session = object_session(self)
+        if unloaded_branch_ids and session is not None:
+            for i in range(0, len(unloaded_branch_ids), 500):
+                conditional_branch_ids.update(
+                    branch_id for branch_id, in session.query(ConditionalExpression.branch_id).filter(
+                        ConditionalExpression.branch_id.in_(unloaded_branch_ids[i:i + 500])))
+        return conditional_branch_ids
+
     def get_branches_by_action_id(self, id_):
         branches = []
         if self.branches:
@@ -72,6 +110,109 @@ class Workflow(ExecutionElement, Execution_Base):
         return branches
 
 
-@event.listens_for(Workflow, 'before_update')
-def validate_before_update(mapper, connection, target):
-    target.validate()
+def get_graph_warnings(start, action_ids, branches):
+    """Checks the graph formed by the branches of a workflow
+
+    Args:
+        start (UUID): The ID of the starting action
+        action_ids (set(UUID)): The IDs of the actions in the workflow
+        branches (list[tuple(UUID, UUID, bool)]): The source ID, destination ID, and whether or not the branch has a
+            condition for each branch in the workflow
+
+    Returns:
+        (list[str]): The warnings found in the graph
+    """
+    warnings = []
+    branches = [branch for branch in branches if branch[0] in action_ids and branch[1] in action_ids]
+    if start in action_ids:
+        unreachable = action_ids - get_reachable_action_ids(start, branches)
+        if unreachable:
+            warnings.append('Actions {} are not reachable from the start action'.format(_format_ids(unreachable)))
+    for loop in get_unconditional_loops(branches):
+        warnings.append('Actions {} form a loop of branches with no condition to end it'.format(_format_ids(loop)))
+    return warnings
+
+
+def get_reachable_action_ids(start, branches):
+    """Gets the IDs of the actions which can be reached from the start action by following branches
+
+    Args:
+        start (UUID): The ID of the starting action
+        branches (list[tuple]): The branches, whose first two elements are the source and destination IDs
+
+    Returns:
+        (set(UUID)): The IDs of the reachable actions, including the start action
+    """
+    destinations = defaultdict(list)
+    for branch in branches:
+        destinations[branch[0]].append(branch[1])
+    reachable = {start}
+    to_visit = [start]
+    while to_visit:
+        for destination_id in destinations[to_visit.pop()]:
+            if destination_id not in reachable:
+                reachable.add(destination_id)
+                to_visit.append(destination_id)
+    return reachable
+
+
+def get_unconditional_loops(branches):
+    """Finds the strongly connected components of the graph of branches which have no condition, using an iterative
+        version of Tarjan's algorithm. Each one is a loop which the workflow can only leave if one of its actions
+        returns a status which no branch in the loop expects
+
+    Args:
+        branches (list[tuple(UUID, UUID, bool)]): The source ID, destination ID, and whether or not the branch has a
+            condition for each branch
+
+    Returns:
+        (list[set(UUID)]): The IDs of the actions in each loop
+    """
+    destinations = defaultdict(set)
+    for source_id, destination_id, has_condition in branches:
+        if not has_condition:
+            destinations[source_id].add(destination_id)
+
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    loops = []
+    for root in list(destinations):
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(destinations[root]))]
+        while work:
+            node, neighbors = work[-1]
+            for neighbor in neighbors:
+                if neighbor not in index:
+                    index[neighbor] = lowlink[neighbor] = len(index)
+                    stack.append(neighbor)
+                    on_stack.add(neighbor)
+                    work.append((neighbor, iter(destinations[neighbor])))
+                    break
+                elif neighbor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[neighbor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.add(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in destinations[node]:
+                        loops.append(component)
+    return loops
+
+
+def _format_ids(ids):
+    return ', '.join(sorted(str(id_) for id_ in ids))
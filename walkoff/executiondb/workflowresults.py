@@ -1,7 +1,7 @@
 import json
 from datetime import datetime
 
-from sqlalchemy import Column, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Enum, Index, event
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy_utils import UUIDType
 
@@ -17,28 +17,37 @@ class WorkflowStatus(Execution_Base):
         workflow_id (UUID): ID of the Workflow
         name (str): Name of the Workflow
         status (str): Status of the Workflow
+        created_at (datetime): Time the Workflow was queued for execution
         started_at (datetime): Time the Workflow started
         completed_at (datetime): Time the Workflow ended
         user (str): The user who initially executed this workflow
+        batch_id (UUID): The ID of the batch this Workflow was executed in, if it was executed in a batch
+        current_action (str): The summary JSON of the most recently started Action. This is denormalized from the
+            ActionStatuses so that listing WorkflowStatuses does not need to load them
         _action_statuses (list[ActionStatus]): A list of ActionStatus objects for this WorkflowStatus
     """
     __tablename__ = 'workflow_status'
     execution_id = Column(UUIDType(binary=False), primary_key=True)
-    workflow_id = Column(UUIDType(binary=False), nullable=False)
+    workflow_id = Column(UUIDType(binary=False), nullable=False, index=True)
     name = Column(String, nullable=False)
     status = Column(Enum(WorkflowStatusEnum, name='WorkflowStatusEnum'), nullable=False)
-    started_at = Column(DateTime)
-    completed_at = Column(DateTime)
-    user = Column(String)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, index=True)
+    completed_at = Column(DateTime, index=True)
+    user = Column(String, index=True)
+    batch_id = Column(UUIDType(binary=False), index=True)
+    current_action = Column(String)
     _action_statuses = relationship('ActionStatus', backref=backref("_workflow_status"), passive_deletes=True,
                                     cascade='all, delete-orphan')
 
-    def __init__(self, execution_id, workflow_id, name, user=None):
+    def __init__(self, execution_id, workflow_id, name, user=None, batch_id=None):
         self.execution_id = execution_id
         self.workflow_id = workflow_id
         self.name = name
         self.status = WorkflowStatusEnum.pending
+        self.created_at = datetime.utcnow()
         self.user = user
+        self.batch_id = batch_id
 
     def running(self):
         """Sets the status to running"""
@@ -90,19 +99,25 @@ class WorkflowStatus(Execution_Base):
                "status": self.status.name}
         if self.user:
             ret["user"] = self.user
+        if self.batch_id:
+            ret["batch_id"] = str(self.batch_id)
         if self.started_at:
             ret["started_at"] = utc_as_rfc_datetime(self.started_at)
         if self.status in [WorkflowStatusEnum.completed, WorkflowStatusEnum.aborted]:
             ret["completed_at"] = utc_as_rfc_datetime(self.completed_at)
         if full_actions:
             ret["action_statuses"] = [action_status.as_json() for action_status in self._action_statuses]
-        elif self._action_statuses and self.status != WorkflowStatusEnum.completed:
-            current_action = self._action_statuses[-1]
-            ret['current_action'] = current_action.as_json(summary=True)
+        elif self.current_action and self.status != WorkflowStatusEnum.completed:
+            ret['current_action'] = json.loads(self.current_action)
 
         return ret
 
 
+# Matches the order of the workflow status listing, so each page is read from one index scan
+Index('ix_workflow_status_status_created_at', WorkflowStatus.status, WorkflowStatus.created_at.desc(),
+      WorkflowStatus.execution_id.desc())
+
+
 class ActionStatus(Execution_Base):
     """ORM for an Action event in the database
 
@@ -190,3 +205,8 @@ class ActionStatus(Execution_Base):
             ret["result"] = json.loads(self.result)
             ret["completed_at"] = utc_as_rfc_datetime(self.completed_at)
         return ret
+
+
+@event.listens_for(WorkflowStatus._action_statuses, 'append')
+def _set_current_action(workflow_status, action_status, initiator):
+    workflow_status.current_action = json.dumps(action_status.as_json(summary=True))
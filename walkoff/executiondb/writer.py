@@ -0,0 +1,118 @@
+import logging
+import threading
+
+try:
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+
+logger = logging.getLogger(__name__)
+
+_stop = object()
+
+
+class ExecutionDatabaseWriter(object):
+    def __init__(self, execution_db, batch_size=100):
+        """Serializes writes to the execution database through a single thread, committing them in batches. This
+            keeps concurrent writers from contending for the database lock, which SQLite only grants to one
+            connection at a time.
+
+        Args:
+            execution_db (ExecutionDatabase): The execution database
+            batch_size (int, optional): The maximum number of writes to commit in one transaction. Defaults to 100
+
+        Attributes:
+            writes (int): The number of writes committed
+            batches (int): The number of transactions committed
+            errors (int): The number of writes which failed
+        """
+        self.execution_db = execution_db
+        self.batch_size = batch_size
+        self.writes = 0
+        self.batches = 0
+        self.errors = 0
+        self._queue = Queue()
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Starts the writer thread"""
+        if not self.is_running:
+            self._thread = threading.Thread(target=self._run, name='ExecutionDatabaseWriter')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def submit(self, write):
+        """Queues a write
+
+        Args:
+            write (func): A function which takes the writer's Session and modifies it. The writer commits it.
+        """
+        self._queue.put(write)
+
+    def flush(self):
+        """Blocks until all of the queued writes have been committed"""
+        if self.is_running:
+            self._queue.join()
+
+    def stop(self):
+        """Commits all of the queued writes and stops the writer thread"""
+        if self.is_running:
+            self._queue.put(_stop)
+            self._thread.join()
+        self._thread = None
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size and batch[-1] is not _stop:
+            try:
+                batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            batch = self._next_batch()
+            writes = [write for write in batch if write is not _stop]
+            stopped = len(writes) != len(batch)
+            try:
+                if writes:
+                    self._write_batch(writes)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        self.execution_db.remove_session()
+
+    def _write_batch(self, writes):
+        session = self.execution_db.session
+        session.expire_all()
+        try:
+            for write in writes:
+                write(session)
+            session.commit()
+        except Exception:
+            session.rollback()
+            logger.warning('Could not commit a batch of {} execution database writes. Retrying them one at a '
+                           'time'.format(len(writes)), exc_info=True)
+            for write in writes:
+                self._write_one(session, write)
+        else:
+            self.writes += len(writes)
+            self.batches += 1
+
+    def _write_one(self, session, write):
+        try:
+            write(session)
+            session.commit()
+        except Exception:
+            session.rollback()
+            self.errors += 1
+            logger.exception('Could not write to the execution database')
+        else:
+            self.writes += 1
+            self.batches += 1
@@ -233,7 +233,7 @@ def strip_argument_ids(playbook):
                 action['device_id'].pop('id', None)
         for branch in workflow.get('branches', []):
             if 'condition' in branch:
-                strip_argument_ids_from_conditional(branch['conditional'])
+                strip_argument_ids_from_conditional(branch['condition'])
 
 
 def strip_argument_ids_from_conditional(conditional):
@@ -0,0 +1,44 @@
+"""Indexed workflow status and denormalized current action
+
+Revision ID: 8f41c0aa5b3e
+Revises: 67d7e4353f29
+Create Date: 2026-10-18 09:14:52.381204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f41c0aa5b3e'
+down_revision = '67d7e4353f29'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('workflow_status', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('current_action', sa.String(), nullable=True))
+
+    op.execute('UPDATE workflow_status SET created_at = COALESCE(started_at, completed_at, CURRENT_TIMESTAMP)')
+
+    with op.batch_alter_table('workflow_status', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_workflow_status_workflow_id'), ['workflow_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_workflow_status_started_at'), ['started_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_workflow_status_completed_at'), ['completed_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_workflow_status_user'), ['user'], unique=False)
+        batch_op.create_index('ix_workflow_status_status_created_at',
+                              ['status', sa.text('created_at DESC'), sa.text('execution_id DESC')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('workflow_status', schema=None) as batch_op:
+        batch_op.drop_index('ix_workflow_status_status_created_at')
+        batch_op.drop_index(batch_op.f('ix_workflow_status_user'))
+        batch_op.drop_index(batch_op.f('ix_workflow_status_completed_at'))
+        batch_op.drop_index(batch_op.f('ix_workflow_status_started_at'))
+        batch_op.drop_index(batch_op.f('ix_workflow_status_workflow_id'))
+        batch_op.drop_column('current_action')
+        batch_op.drop_column('created_at')
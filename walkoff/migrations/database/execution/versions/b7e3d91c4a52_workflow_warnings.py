@@ -0,0 +1,27 @@
+"""Workflow warnings
+
+Revision ID: b7e3d91c4a52
+Revises: 8f41c0aa5b3e
+Create Date: 2026-10-18 11:02:37.518446
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3d91c4a52'
+down_revision = '8f41c0aa5b3e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('workflow', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('warnings', sqlalchemy_utils.types.scalar_list.ScalarListType(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('workflow', schema=None) as batch_op:
+        batch_op.drop_column('warnings')
@@ -0,0 +1,26 @@
+"""Indexed saved workflow by workflow and action
+
+Revision ID: c4f2a87d19e6
+Revises: b7e3d91c4a52
+Create Date: 2026-10-19 10:21:44.610327
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f2a87d19e6'
+down_revision = 'b7e3d91c4a52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('saved_workflow', schema=None) as batch_op:
+        batch_op.create_index('ix_saved_workflow_workflow_id_action_id', ['workflow_id', 'action_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('saved_workflow', schema=None) as batch_op:
+        batch_op.drop_index('ix_saved_workflow_workflow_id_action_id')
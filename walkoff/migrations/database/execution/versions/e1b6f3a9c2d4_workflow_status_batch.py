@@ -0,0 +1,29 @@
+"""Added batch ID to workflow status
+
+Revision ID: e1b6f3a9c2d4
+Revises: c4f2a87d19e6
+Create Date: 2026-10-19 14:05:12.381904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b6f3a9c2d4'
+down_revision = 'c4f2a87d19e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('workflow_status', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('batch_id', sqlalchemy_utils.types.uuid.UUIDType(binary=False), nullable=True))
+        batch_op.create_index(batch_op.f('ix_workflow_status_batch_id'), ['batch_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('workflow_status', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_workflow_status_batch_id'))
+        batch_op.drop_column('batch_id')
@@ -0,0 +1,202 @@
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func
+
+import walkoff.config
+from walkoff.executiondb import WorkflowStatusEnum
+from walkoff.executiondb.metrics import WorkflowMetric
+from walkoff.executiondb.workflowresults import WorkflowStatus
+from walkoff.multiprocessedexecutor.affinity import BULK_QUEUE, REQUEST_QUEUE, get_lane
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionDecision(object):
+    __slots__ = ['admitted', 'bulk', 'reason', 'retry_after']
+
+    def __init__(self, admitted=True, bulk=False, reason=None, retry_after=None):
+        """Initializes an AdmissionDecision, which is whether and where to queue a request to execute workflows
+
+        Args:
+            admitted (bool, optional): Whether the request is admitted. Defaults to True.
+            bulk (bool, optional): Whether the request is diverted to the bulk lane. Defaults to False.
+            reason (str, optional): The limit which the request queues are over, if they are over one. Defaults to
+                None.
+            retry_after (int, optional): The number of seconds after which a rejected request should be retried.
+                Defaults to None.
+        """
+        self.admitted = admitted
+        self.bulk = bulk
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController(object):
+    def __init__(self, cache, execution_db):
+        """Initializes an AdmissionController, which admits requests to execute workflows only while the request
+            queues are within the configured limits on their depth, the age of their oldest request, and the estimated
+            wait of a new request. Over a limit, requests are rejected, or diverted to the bulk lane, which
+            the workers drain after all the other request queues. The state of the queues is sampled at most once every
+            ADMISSION_CHECK_INTERVAL_SECONDS.
+
+        Args:
+            cache (RedisCacheAdapter): The cache holding the request queues
+            execution_db (ExecutionDatabase): The execution database
+        """
+        self.cache = cache
+        self.execution_db = execution_db
+        self._sample = None
+        self._sampled_at = None
+        self._lock = threading.Lock()
+        self._counts = {'admitted': 0, 'diverted': 0, 'rejected': {}}
+
+    @staticmethod
+    def get_limits():
+        """Gets the effective limits of admission control. A limit of 0 is disabled
+
+        Returns:
+            (dict): The limits on the queue depth, the age in seconds of the oldest queued request, and the estimated
+                wait in seconds
+        """
+        config = walkoff.config.Config
+        return {'queue_depth': config.ADMISSION_MAX_QUEUE_DEPTH,
+                'queue_age': config.ADMISSION_MAX_QUEUE_AGE_SECONDS,
+                'estimated_wait': config.ADMISSION_MAX_ESTIMATED_WAIT_SECONDS}
+
+    @staticmethod
+    def get_bulk_queue_limit():
+        """Gets the limit on the depth of the bulk lane, past which requests are rejected even in divert mode
+
+        Returns:
+            (int): The maximum number of requests on the bulk lane. 0 if the bulk lane is not bounded, in which case
+                requests are never diverted to it
+        """
+        config = walkoff.config.Config
+        return config.ADMISSION_MAX_BULK_QUEUE_DEPTH or config.ADMISSION_MAX_QUEUE_DEPTH
+
+    @property
+    def enabled(self):
+        return any(self.get_limits().values())
+
+    def sample(self):
+        """Samples the state of the request queues, unless it was sampled within the last
+            ADMISSION_CHECK_INTERVAL_SECONDS
+
+        Returns:
+            (dict): The number of queued requests, the number of requests on the bulk lane, the age in seconds of the
+                oldest queued request, and the estimated wait in seconds of a new request, which is None if no workflow
+                has finished yet
+        """
+        config = walkoff.config.Config
+        now = time.time()
+        with self._lock:
+            if self._sample is not None and now - self._sampled_at < config.ADMISSION_CHECK_INTERVAL_SECONDS:
+                return self._sample
+
+        queues = [REQUEST_QUEUE] + [get_lane(shard) for shard in range(config.WORKER_AFFINITY_SHARDS)]
+        depth = sum(self.cache.llen(queue) for queue in queues)
+        bulk_depth = self.cache.llen(BULK_QUEUE)
+        session = self.execution_db.session
+        oldest = self._get_oldest_queued(session, depth + bulk_depth)
+        executed, total_time = session.query(func.sum(WorkflowMetric.count),
+                                             func.sum(WorkflowMetric.count * WorkflowMetric.avg_time)).one()
+        estimated_wait = None
+        if executed:
+            slots = max(config.NUMBER_PROCESSES * config.NUMBER_THREADS_PER_PROCESS, 1)
+            estimated_wait = depth * (total_time / executed) / slots
+        sample = {'queue_depth': depth,
+                  'bulk_queue_depth': bulk_depth,
+                  'queue_age': (datetime.utcnow() - oldest).total_seconds() if oldest is not None else 0,
+                  'estimated_wait': estimated_wait}
+        with self._lock:
+            self._sample, self._sampled_at = sample, now
+        return sample
+
+    @staticmethod
+    def _get_oldest_queued(session, queued):
+        # Requests lost from the queues, or which the workers could not read, leave their executions pending for good.
+        # The queues are first in, first out, so the queued requests are those of the most recent pending executions.
+        if not queued:
+            return None
+        pending = session.query(WorkflowStatus.created_at).filter(WorkflowStatus.status == WorkflowStatusEnum.pending)
+        oldest = pending.order_by(WorkflowStatus.created_at.desc()).offset(queued - 1).limit(1).scalar()
+        if oldest is None:
+            oldest = session.query(func.min(WorkflowStatus.created_at)).filter(
+                WorkflowStatus.status == WorkflowStatusEnum.pending).scalar()
+        return oldest
+
+    def admit(self, count=1):
+        """Decides whether to admit a request to execute workflows
+
+        Args:
+            count (int, optional): The number of executions requested. Defaults to 1.
+
+        Returns:
+            (AdmissionDecision): The decision
+        """
+        if not self.enabled:
+            self._count('admitted', count)
+            return AdmissionDecision()
+
+        limits = self.get_limits()
+        sample = self.sample()
+        over = [name for name, limit in limits.items()
+                if limit and sample[name] is not None and sample[name] > limit]
+        if not over:
+            self._count('admitted', count)
+            return AdmissionDecision()
+
+        reason = over[0]
+        if walkoff.config.Config.ADMISSION_OVERLOAD_ACTION == 'divert':
+            # Diverted requests must not grow the bulk lane without bound
+            bulk_limit = self.get_bulk_queue_limit()
+            if bulk_limit and sample['bulk_queue_depth'] + count <= bulk_limit:
+                self._count('diverted', count)
+                return AdmissionDecision(bulk=True, reason=reason)
+            reason = 'bulk_queue_depth'
+
+        retry_after = self._get_retry_after(sample, limits, over)
+        logger.warning('Rejected request to execute {0} workflows. The request queues are over the {1} limit'.format(
+            count, reason))
+        self._count('rejected', count, reason)
+        return AdmissionDecision(admitted=False, reason=reason, retry_after=retry_after)
+
+    @staticmethod
+    def _get_retry_after(sample, limits, over):
+        retry_after = walkoff.config.Config.ADMISSION_RETRY_AFTER_SECONDS
+        if sample['estimated_wait'] is not None and sample['queue_depth']:
+            seconds_per_request = sample['estimated_wait'] / sample['queue_depth']
+            if 'queue_depth' in over:
+                retry_after = max(retry_after, (sample['queue_depth'] - limits['queue_depth']) * seconds_per_request)
+            if 'estimated_wait' in over:
+                retry_after = max(retry_after, sample['estimated_wait'] - limits['estimated_wait'])
+        return max(int(math.ceil(retry_after)), 1)
+
+    def _count(self, outcome, count, reason=None):
+        with self._lock:
+            if reason is None:
+                self._counts[outcome] += count
+            else:
+                self._counts[outcome][reason] = self._counts[outcome].get(reason, 0) + count
+
+    def get_metrics(self):
+        """Gets the metrics of admission control in this process
+
+        Returns:
+            (dict): The effective limits, the action taken over a limit, the last sampled state of the request queues,
+                and the number of executions admitted, diverted to the bulk lane, and rejected over each limit
+        """
+        with self._lock:
+            counts = {'admitted': self._counts['admitted'],
+                      'diverted': self._counts['diverted'],
+                      'rejected': dict(self._counts['rejected'])}
+        metrics = {'enabled': self.enabled,
+                   'limits': dict(self.get_limits(), bulk_queue_depth=self.get_bulk_queue_limit()),
+                   'overload_action': walkoff.config.Config.ADMISSION_OVERLOAD_ACTION,
+                   'queue': self.sample() if self.enabled else None}
+        metrics.update(counts)
+        return metrics
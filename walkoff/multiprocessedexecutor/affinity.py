@@ -0,0 +1,117 @@
+import bisect
+import hashlib
+import logging
+
+from walkoff.executiondb.action import Action
+from walkoff.executiondb.argument import Argument
+
+logger = logging.getLogger(__name__)
+
+REQUEST_QUEUE = 'request_queue'
+BULK_QUEUE = 'request_queue:bulk'
+
+
+class ConsistentHashRing(object):
+    def __init__(self, nodes, replicas=64):
+        """Initializes a ConsistentHashRing, which maps keys to nodes so that adding or removing a node only moves the
+            keys of that node
+
+        Args:
+            nodes (iterable): The nodes of the ring
+            replicas (int, optional): The number of points each node has on the ring. More points spread the keys more
+                evenly. Defaults to 64.
+        """
+        self._ring = sorted((_hash('{0}:{1}'.format(node, replica)), node)
+                            for node in nodes for replica in range(replicas))
+        self._hashes = [point[0] for point in self._ring]
+
+    def get_node(self, key):
+        """Gets the node for a key
+
+        Args:
+            key (str): The key
+
+        Returns:
+            The node which the key belongs to, or None if the ring has no nodes
+        """
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+def _hash(key):
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+_rings = {}
+
+
+def get_lane(shard):
+    """Gets the name of the request queue for a shard
+
+    Args:
+        shard (int): The shard
+
+    Returns:
+        (str): The name of the queue
+    """
+    return '{0}:{1}'.format(REQUEST_QUEUE, shard)
+
+
+def get_request_queue(affinity_key, shard_count):
+    """Gets the queue to which to send a workflow execution request
+
+    Args:
+        affinity_key (str): The affinity key of the request, or None if it has none
+        shard_count (int): The number of sharded request queues. 0 disables sharding
+
+    Returns:
+        (str): The name of the queue. Requests without an affinity key go to the shared request queue
+    """
+    if not shard_count or not affinity_key:
+        return REQUEST_QUEUE
+    if shard_count not in _rings:
+        _rings[shard_count] = ConsistentHashRing(range(shard_count))
+    return get_lane(_rings[shard_count].get_node(affinity_key))
+
+
+def get_worker_lanes(worker_id, shard_count, worker_count):
+    """Gets the request queues a worker consumes from, in the order in which it checks them. A worker first checks the
+        lanes of the shards it owns, then the shared request queue, and then steals from the lanes of the other shards.
+        Each worker steals starting from a different lane, so that an idle worker does not always drain the same one.
+        The bulk lane, which holds the requests diverted by admission control, is checked last
+
+    Args:
+        worker_id (int): The ID of the worker
+        shard_count (int): The number of sharded request queues. 0 disables sharding
+        worker_count (int): The number of workers
+
+    Returns:
+        (list[str]): The names of the queues
+    """
+    if not shard_count:
+        return [REQUEST_QUEUE, BULK_QUEUE]
+    worker_count = max(worker_count, 1)
+    owned = [shard for shard in range(shard_count) if shard % worker_count == worker_id % worker_count]
+    start = (worker_id + 1) % shard_count
+    others = [shard for shard in (list(range(start, shard_count)) + list(range(start))) if shard not in owned]
+    return [get_lane(shard) for shard in owned] + [REQUEST_QUEUE] + [get_lane(shard) for shard in others] + [BULK_QUEUE]
+
+
+def get_affinity_key(session, workflow_id):
+    """Gets the affinity key of a workflow, which identifies the app devices its actions use. Executions of workflows
+        which use the same devices are routed to the same worker, whose app instances for them are likely to be warm
+
+    Args:
+        session (Session): The execution database session
+        workflow_id (UUID): The ID of the workflow
+
+    Returns:
+        (str): The affinity key, or None if none of the actions of the workflow use a static device ID
+    """
+    devices = session.query(Action.app_name, Argument.value).join(
+        Argument, Argument.action_device_id == Action.id).filter(Action.workflow_id == workflow_id).all()
+    devices = sorted({'{0}:{1}'.format(app_name, device_id) for app_name, device_id in devices
+                      if device_id is not None})
+    return ','.join(devices) if devices else None
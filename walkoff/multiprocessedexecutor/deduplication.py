@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+
+from walkoff.executiondb import WorkflowStatusEnum
+from walkoff.executiondb.workflowresults import WorkflowStatus
+
+logger = logging.getLogger(__name__)
+
+
+def get_idempotency_key(workflow_id, idempotency_key):
+    """Gets the cache key under which the execution of a workflow requested with an idempotency key is stored
+
+    Args:
+        workflow_id (UUID|str): The ID of the workflow
+        idempotency_key (str): The idempotency key of the request
+
+    Returns:
+        (str): The cache key
+    """
+    return 'idempotency:{0}:{1}'.format(workflow_id, idempotency_key)
+
+
+def get_coalesce_key(workflow_id, start=None, start_arguments=None, environment_variables=None, not_before=None):
+    """Gets the cache key under which the pending execution of a workflow with some inputs is stored. Requests to
+        execute a workflow with the same starting action, arguments, and environment variables, which are delayed
+        until the same time, have the same key
+
+    Args:
+        workflow_id (UUID|str): The ID of the workflow
+        start (UUID, optional): The ID of the starting action. Defaults to None.
+        start_arguments (list[Argument], optional): The arguments to the starting action. Defaults to None.
+        environment_variables (list[EnvironmentVariable], optional): The environment variables. Defaults to None.
+        not_before (datetime, optional): The time the request is delayed until, if it is delayed. Defaults to None.
+
+    Returns:
+        (str): The cache key
+    """
+    inputs = {
+        'start': start,
+        'arguments': sorted([argument.name, argument.value, argument.reference, argument.selection]
+                            for argument in (start_arguments or [])),
+        'environment_variables': sorted([env_var.id, env_var.value] for env_var in (environment_variables or []))
+    }
+    if not_before is not None:
+        inputs['not_before'] = not_before
+    digest = hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return 'coalesce:{0}:{1}'.format(workflow_id, digest)
+
+
+class ExecutionDeduplicator(object):
+    def __init__(self, cache, session, window_seconds=3600):
+        """Initializes an ExecutionDeduplicator, which keeps an index in the cache of the executions requested with
+            idempotency keys, or whose identical requests are coalesced. Each entry expires after the window.
+
+        Args:
+            cache (RedisCacheAdapter): The cache
+            session (Session): The execution database session, used to check whether an execution is still pending
+            window_seconds (int, optional): The number of seconds for which a request is deduplicated. Defaults to
+                3600.
+        """
+        self.cache = cache
+        self.session = session
+        self.window_seconds = window_seconds
+
+    def claim(self, execution_id, idempotency_key=None, coalesce_key=None):
+        """Claims the keys of a request to execute a workflow for a new execution, unless they belong to an existing
+            execution. A request with the idempotency key of an earlier request in the window is a duplicate of it. A
+            coalesced request is a duplicate of an earlier request with the same inputs which is still pending.
+
+        Args:
+            execution_id (str): The execution ID of the new execution
+            idempotency_key (str, optional): The cache key of the idempotency key of the request. Defaults to None.
+            coalesce_key (str, optional): The cache key of the inputs of the request, if it is coalesced. Defaults to
+                None.
+
+        Returns:
+            (str): The execution ID of the existing execution the request duplicates, or None if the keys were claimed
+                for the new execution
+        """
+        expire = self.window_seconds * 1000
+        if idempotency_key is not None and not self.cache.add(idempotency_key, execution_id, expire=expire):
+            existing = self.cache.get(idempotency_key)
+            if existing is not None:
+                return existing
+            self.cache.set(idempotency_key, execution_id, expire=expire)
+
+        if coalesce_key is not None and not self.cache.add(coalesce_key, execution_id, expire=expire):
+            existing = self.cache.get(coalesce_key)
+            if existing is not None and self.is_pending(existing):
+                if idempotency_key is not None:
+                    self.cache.set(idempotency_key, existing, expire=expire)
+                return existing
+            self.cache.set(coalesce_key, execution_id, expire=expire)
+        return None
+
+    def release(self, execution_id, keys):
+        """Releases the keys claimed for an execution which will not be executed, such as a cancelled delayed
+            execution, so that later requests are not deduplicated against it
+
+        Args:
+            execution_id (str): The execution ID
+            keys (list[str]): The cache keys claimed for the execution. Keys which have since been claimed for another
+                execution are kept.
+        """
+        for key in keys:
+            if self.cache.get(key) == execution_id:
+                self.cache.delete(key)
+
+    def is_pending(self, execution_id):
+        """Checks whether an execution has yet to start. An execution without a workflow status has been claimed, but
+            its pending status has not been written yet
+
+        Args:
+            execution_id (str): The execution ID
+
+        Returns:
+            (bool): Whether the execution is pending
+        """
+        status = self.session.query(WorkflowStatus.status).filter_by(execution_id=execution_id).scalar()
+        return status in (None, WorkflowStatusEnum.pending)
@@ -0,0 +1,216 @@
+import base64
+import json
+import logging
+from collections import namedtuple
+from datetime import datetime
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+DELAYED_QUEUE = 'delayed_requests'
+DELAYED_PROCESSING = 'delayed_requests:processing'
+DELAYED_MESSAGES = 'delayed_requests:messages'
+
+DelayedRequest = namedtuple('DelayedRequest', ['execution_id', 'workflow_id', 'user', 'message'])
+CancelledRequest = namedtuple('CancelledRequest', ['execution_id', 'deduplication_keys'])
+
+_epoch = datetime(1970, 1, 1)
+
+
+def get_due_timestamp(not_before):
+    """Gets the score of a delayed request in the sorted set of due times
+
+    Args:
+        not_before (datetime): The naive UTC time before which the request must not be executed
+
+    Returns:
+        (float): The number of seconds since the epoch
+    """
+    return (not_before - _epoch).total_seconds()
+
+
+class DelayedExecutionQueue(object):
+    def __init__(self, cache, key=DELAYED_QUEUE, processing_key=DELAYED_PROCESSING, messages_key=DELAYED_MESSAGES):
+        """Initializes a DelayedExecutionQueue, which holds requests to execute workflows in the cache until they are
+            due. The due times are the scores of a sorted set of execution IDs, and the encrypted requests are the
+            values of a hash, so each delayed request costs two small cache entries and no execution database rows.
+            Claimed requests are moved to a second sorted set, scored by the time they were claimed, until they are
+            released.
+
+        Args:
+            cache (RedisCacheAdapter): The cache
+            key (str, optional): The key of the sorted set of due times. Defaults to 'delayed_requests'.
+            processing_key (str, optional): The key of the sorted set of claim times. Defaults to
+                'delayed_requests:processing'.
+            messages_key (str, optional): The key of the hash of requests. Defaults to 'delayed_requests:messages'.
+        """
+        self.cache = cache
+        self.key = key
+        self.processing_key = processing_key
+        self.messages_key = messages_key
+
+    def add(self, execution_id, workflow_id, not_before, message, user=None, deduplication_keys=None):
+        """Adds a request to execute a workflow once it is due
+
+        Args:
+            execution_id (str): The execution ID of the workflow
+            workflow_id (UUID|str): The ID of the workflow
+            not_before (datetime): The naive UTC time before which the workflow must not be executed
+            message (bytes): The encrypted request to execute the workflow
+            user (str, optional): The username of the user who requested the execution. Defaults to None.
+            deduplication_keys (list[str], optional): The idempotency and coalesce keys claimed for the execution,
+                which are released if the request is cancelled. Defaults to None.
+        """
+        request = json.dumps({'workflow_id': str(workflow_id), 'user': user,
+                              'message': base64.b64encode(message).decode('utf-8'),
+                              'deduplication_keys': deduplication_keys or []})
+        pipe = self.cache.pipeline()
+        pipe.hset(self.messages_key, execution_id, request)
+        pipe.zadd(self.key, {execution_id: get_due_timestamp(not_before)})
+        pipe.execute()
+
+    def cancel(self, execution_id):
+        """Cancels a delayed request which is not due yet
+
+        Args:
+            execution_id (str): The execution ID of the workflow
+
+        Returns:
+            (CancelledRequest): The cancelled request, or None if the request was not delayed
+        """
+        pipe = self.cache.pipeline()
+        pipe.hget(self.messages_key, execution_id)
+        pipe.zrem(self.key, execution_id)
+        pipe.hdel(self.messages_key, execution_id)
+        request, removed, _ = pipe.execute()
+        if not removed:
+            return None
+        keys = json.loads(request.decode('utf-8')).get('deduplication_keys', []) if request is not None else []
+        return CancelledRequest(execution_id, keys)
+
+    def count(self):
+        """Counts the delayed requests
+
+        Returns:
+            (int): The number of delayed requests, including those which are due but not moved yet
+        """
+        return self.cache.zcard(self.key)
+
+    def claim_due(self, now=None, limit=500):
+        """Claims the requests which are due. A request is claimed by moving it from the sorted set of due times to
+            the sorted set of claim times in one transaction, which only one of several controllers sharing the cache
+            can do, so each request is claimed once. The claimed requests must be released with release() once they
+            are queued, or they are returned to the due requests by recover().
+
+        Args:
+            now (datetime, optional): The naive UTC time. Defaults to the current time.
+            limit (int, optional): The maximum number of requests to claim. Defaults to 500.
+
+        Returns:
+            (list[DelayedRequest]): The claimed requests, earliest due first
+        """
+        now = get_due_timestamp(now if now is not None else datetime.utcnow())
+        execution_ids = self.cache.zrangebyscore(self.key, '-inf', now, start=0, num=limit)
+        if not execution_ids:
+            return []
+
+        pipe = self.cache.pipeline()
+        for execution_id in execution_ids:
+            pipe.zadd(self.processing_key, {execution_id: now}, nx=True)
+            pipe.zrem(self.key, execution_id)
+        results = pipe.execute()
+        claimed, stale = [], []
+        for execution_id, added, removed in zip(execution_ids, results[::2], results[1::2]):
+            if added and removed:
+                claimed.append(execution_id)
+            elif added:
+                # Released or cancelled since it was read
+                stale.append(execution_id)
+        if stale:
+            self.cache.zrem(self.processing_key, *stale)
+        if not claimed:
+            return []
+
+        requests, missing = [], []
+        for execution_id, request in zip(claimed, self.cache.hmget(self.messages_key, claimed)):
+            if request is None:
+                logger.warning('Delayed request for execution {} has no message'.format(execution_id))
+                missing.append(execution_id)
+                continue
+            request = json.loads(request.decode('utf-8'))
+            requests.append(DelayedRequest(execution_id, request['workflow_id'], request['user'],
+                                           base64.b64decode(request['message'])))
+        if missing:
+            self.cache.zrem(self.processing_key, *missing)
+        return requests
+
+    def release(self, requests):
+        """Releases claimed requests, deleting their messages
+
+        Args:
+            requests (list[DelayedRequest]): The claimed requests
+        """
+        if requests:
+            execution_ids = [request.execution_id for request in requests]
+            pipe = self.cache.pipeline()
+            pipe.zrem(self.processing_key, *execution_ids)
+            pipe.hdel(self.messages_key, *execution_ids)
+            pipe.execute()
+
+    def recover(self, timeout_seconds, now=None):
+        """Returns the requests which were claimed but not released within a timeout, for example because the
+            controller which claimed them stopped, to the due requests
+
+        Args:
+            timeout_seconds (float): The number of seconds after which a claimed request is recovered
+            now (datetime, optional): The naive UTC time. Defaults to the current time.
+
+        Returns:
+            (list[str]): The execution IDs of the recovered requests
+        """
+        now = now if now is not None else datetime.utcnow()
+        cutoff = get_due_timestamp(now) - timeout_seconds
+        claims = self.cache.zrangebyscore(self.processing_key, '-inf', cutoff, withscores=True)
+        if not claims:
+            return []
+
+        pipe = self.cache.pipeline()
+        for execution_id, claimed_at in claims:
+            pipe.zrem(self.processing_key, execution_id)
+            pipe.zadd(self.key, {execution_id: claimed_at})
+        results = pipe.execute()
+        recovered, released = [], []
+        for (execution_id, _), removed in zip(claims, results[::2]):
+            (recovered if removed else released).append(execution_id)
+        if released:
+            # Released since it was read, so it must not be claimed again
+            self.cache.zrem(self.key, *released)
+        if recovered:
+            logger.warning('Recovered {} delayed requests which were claimed but not queued'.format(len(recovered)))
+        return recovered
+
+    def remove_orphans(self, batch_size=500):
+        """Deletes the messages of requests which are neither due nor claimed, so that the messages of lost requests
+            do not accumulate in the cache
+
+        Args:
+            batch_size (int, optional): The number of messages checked at a time. Defaults to 500.
+
+        Returns:
+            (int): The number of messages deleted
+        """
+        removed = 0
+        fields = self.cache.hscan(self.messages_key, count=batch_size)
+        while True:
+            execution_ids = list(islice(fields, batch_size))
+            if not execution_ids:
+                return removed
+            pipe = self.cache.pipeline()
+            for execution_id in execution_ids:
+                pipe.zscore(self.key, execution_id)
+                pipe.zscore(self.processing_key, execution_id)
+            results = pipe.execute()
+            orphans = [execution_id for execution_id, due, claimed in zip(execution_ids, results[::2], results[1::2])
+                       if due is None and claimed is None]
+            if orphans:
+                removed += self.cache.hdel(self.messages_key, *orphans)
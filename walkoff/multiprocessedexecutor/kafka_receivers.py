@@ -35,6 +35,7 @@ class KafkaWorkflowResultsReceiver(object):
 
     def receive_results(self):
         """Constantly receives data from the Kafka Consumer and handles it accordingly"""
+        self.current_app.running_context.execution_db.start_writer()
         logger.info('Starting Kafka workflow results receiver')
         self.receiver.subscribe(['{}.*'.format(self.topic)])
         while not self.thread_exit:
@@ -53,6 +54,8 @@ class KafkaWorkflowResultsReceiver(object):
             with self.current_app.app_context():
                 self._send_callback(raw_message.value())
         self.receiver.close()
+        self.current_app.running_context.execution_db.stop_writer()
+        self.current_app.running_context.execution_db.remove_session()
         return
 
     def _send_callback(self, message_bytes):
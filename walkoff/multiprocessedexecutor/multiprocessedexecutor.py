@@ -1,6 +1,9 @@
 import logging
 import threading
+import time
 import uuid
+from collections import OrderedDict
+from datetime import datetime
 
 import gevent
 import nacl.bindings
@@ -11,14 +14,17 @@ from nacl.public import PrivateKey, Box
 
 import walkoff.config
 from start_workers import shutdown_procs
-from walkoff.appgateway.accumulators import make_accumulator
 from walkoff.events import WalkoffEvent
 from walkoff.executiondb import ExecutionDatabase
 from walkoff.executiondb import WorkflowStatusEnum
 from walkoff.executiondb.saved_workflow import SavedWorkflow
 from walkoff.executiondb.workflow import Workflow
 from walkoff.executiondb.workflowresults import WorkflowStatus
+from walkoff.multiprocessedexecutor.affinity import BULK_QUEUE, get_affinity_key, get_request_queue
+from walkoff.multiprocessedexecutor.deduplication import ExecutionDeduplicator, get_coalesce_key, get_idempotency_key
+from walkoff.multiprocessedexecutor.delayed import DelayedExecutionQueue
 from walkoff.multiprocessedexecutor.threadauthenticator import ThreadAuthenticator
+from walkoff.multiprocessedexecutor.triggermatching import TriggerMatcher, claim_awaiting_executions
 from walkoff.senders_receivers_helpers import make_results_receiver, make_results_sender, make_communication_sender
 from walkoff.worker.action_exec_strategy import make_execution_strategy
 from walkoff.worker.workflow_exec_context import RestrictedWorkflowContext
@@ -41,7 +47,10 @@ class MultiprocessedExecutor(object):
         self.zmq_workflow_comm = None
         self.receiver = None
         self.receiver_thread = None
+        self.delayed_thread = None
+        self.delayed_stop = threading.Event()
         self.cache = cache
+        self.delayed = DelayedExecutionQueue(cache)
         self.config = config
         self.execution_db = ExecutionDatabase.instance
         self.results_sender = None
@@ -86,6 +95,10 @@ class MultiprocessedExecutor(object):
             self.receiver_thread = threading.Thread(target=self.receiver.receive_results)
             self.receiver_thread.start()
 
+        self.delayed_stop.clear()
+        self.delayed_thread = threading.Thread(target=self.move_delayed_executions, args=(app,))
+        self.delayed_thread.start()
+
         self.threading_is_initialized = True
         logger.debug('Controller threading initialized')
 
@@ -105,6 +118,7 @@ class MultiprocessedExecutor(object):
             gevent.sleep(0.1)
         assert (num_workflows == self.receiver.workflows_executed)
         self.receiver.workflows_executed = 0
+        self.execution_db.flush_writer()
 
     def shutdown_pool(self):
         """Shuts down the threadpool"""
@@ -116,6 +130,9 @@ class MultiprocessedExecutor(object):
         if self.receiver_thread:
             self.receiver.thread_exit = True
             self.receiver_thread.join(timeout=1)
+        if self.delayed_thread:
+            self.delayed_stop.set()
+            self.delayed_thread.join(timeout=1)
         self.threading_is_initialized = False
         logger.debug('Controller thread pool shutdown')
 
@@ -132,14 +149,18 @@ class MultiprocessedExecutor(object):
         """Once the threadpool has been shutdown, clear out all of the data structures used in the pool"""
         self.pids = []
         self.receiver_thread = None
+        self.delayed_thread = None
         self.workflows_executed = 0
         self.threading_is_initialized = False
         self.zmq_workflow_comm = None
         self.receiver = None
 
     def execute_workflow(self, workflow_id, execution_id_in=None, start=None, start_arguments=None, resume=False,
-                         environment_variables=None, user=None):
-        """Executes a workflow
+                         environment_variables=None, user=None, idempotency_key=None, coalesce=False, bulk=False,
+                         not_before=None):
+        """Executes a workflow. A request with the idempotency key of an earlier request, or a coalesced request with
+            the same inputs as an earlier one which is still pending, is not executed again. A request which is not due
+            yet is delayed until it is due, and its pending workflow status is only written then.
 
         Args:
             workflow_id (Workflow): The Workflow to be executed.
@@ -152,9 +173,18 @@ class MultiprocessedExecutor(object):
                 the workflow. These will not be persistent.
             user (str, Optional): The username of the user who requested that this workflow be executed. Defaults
                 to None.
+            idempotency_key (str, optional): The key identifying this request among its retries. Requests with the
+                same key within the WORKFLOW_IDEMPOTENCY_WINDOW_SECONDS window get the same execution. Defaults to
+                None.
+            coalesce (bool, optional): Whether to coalesce this request into a pending execution of the workflow with
+                the same starting action, arguments, and environment variables. Defaults to False.
+            bulk (bool, optional): Whether to queue the request on the bulk lane, which the workers drain after all
+                the other request queues. Defaults to False.
+            not_before (datetime, optional): The naive UTC time before which the workflow must not be executed.
+                Defaults to None.
 
         Returns:
-            (UUID): The execution ID of the Workflow.
+            (UUID): The execution ID of the Workflow, or of the earlier execution this request duplicates.
         """
         workflow = self.execution_db.session.query(Workflow).filter_by(id=workflow_id).first()
         if not workflow:
@@ -162,6 +192,33 @@ class MultiprocessedExecutor(object):
             return None, 'Attempted to execute workflow which does not exist'
 
         execution_id = execution_id_in if execution_id_in else str(uuid.uuid4())
+        delayed = not_before is not None and not_before > datetime.utcnow()
+
+        deduplication_keys = []
+        if idempotency_key is not None or coalesce:
+            deduplicator = ExecutionDeduplicator(self.cache, self.execution_db.session,
+                                                 walkoff.config.Config.WORKFLOW_IDEMPOTENCY_WINDOW_SECONDS)
+            # Delayed requests are only coalesced with requests delayed until the same time
+            idempotency_cache_key = get_idempotency_key(workflow.id, idempotency_key) if idempotency_key else None
+            coalesce_cache_key = get_coalesce_key(workflow.id, start, start_arguments, environment_variables,
+                                                  not_before if delayed else None) if coalesce else None
+            existing_execution_id = deduplicator.claim(execution_id, idempotency_key=idempotency_cache_key,
+                                                       coalesce_key=coalesce_cache_key)
+            if existing_execution_id is not None:
+                logger.info('User {0} requested a duplicate execution of workflow {1} (id={2}), returning {3}'.format(
+                    user, workflow.name, workflow.id, existing_execution_id))
+                return existing_execution_id
+            deduplication_keys = [key for key in (idempotency_cache_key, coalesce_cache_key) if key is not None]
+
+        if delayed:
+            logger.info('User {0} delaying execution of workflow {1} (id={2}) until {3}'.format(
+                user, workflow.name, workflow.id, not_before))
+            message = self.results_sender.create_workflow_request_message(workflow.id, execution_id, start,
+                                                                          start_arguments, resume,
+                                                                          environment_variables, user)
+            self.delayed.add(execution_id, workflow.id, not_before, self.__box.encrypt(message), user=user,
+                             deduplication_keys=deduplication_keys)
+            return execution_id
 
         if start is not None:
             logger.info('User {0} executing workflow {1} (id={2}) with starting action {3}'.format(
@@ -177,18 +234,249 @@ class MultiprocessedExecutor(object):
             data['user'] = user
         self._log_and_send_event(WalkoffEvent.WorkflowExecutionPending, sender=workflow_data, workflow=workflow,
                                  data=data)
+        # The worker reads the pending WorkflowStatus, so it must be committed before the workflow is queued
+        self.execution_db.flush_writer()
         self.__add_workflow_to_queue(workflow.id, execution_id, start, start_arguments, resume, environment_variables,
-                                     user)
+                                     user, bulk=bulk)
 
         self._log_and_send_event(WalkoffEvent.SchedulerJobExecuted, data=data)
         return execution_id
 
+    def cancel_delayed_execution(self, execution_id):
+        """Cancels a delayed execution which is not due yet. Later requests with its idempotency key, or with the same
+            inputs, are executed rather than deduplicated against it.
+
+        Args:
+            execution_id (str): The execution ID
+
+        Returns:
+            (bool): Whether the execution was delayed
+        """
+        cancelled = self.delayed.cancel(execution_id)
+        if cancelled is None:
+            return False
+        if cancelled.deduplication_keys:
+            ExecutionDeduplicator(self.cache, self.execution_db.session).release(execution_id,
+                                                                                 cancelled.deduplication_keys)
+        return True
+
+    def get_idempotent_execution(self, workflow_id, idempotency_key):
+        """Gets the execution requested earlier in the WORKFLOW_IDEMPOTENCY_WINDOW_SECONDS window with an idempotency
+            key, so that a retry of the request can be answered without executing or admitting it again
+
+        Args:
+            workflow_id (UUID|str): The ID of the workflow
+            idempotency_key (str): The idempotency key of the request
+
+        Returns:
+            (str): The execution ID of the earlier execution, or None if there is none
+        """
+        return self.cache.get(get_idempotency_key(workflow_id, idempotency_key))
+
+    def execute_workflows(self, workflow_ids, user=None):
+        """Executes a batch of workflows, such as those scheduled to run at the same time. The workflows are looked up
+            together, and the requests to execute them are pushed onto each request queue at once.
+
+        Args:
+            workflow_ids (list[UUID|str]): The IDs of the workflows to execute. A workflow is executed once for each
+                time its ID is listed.
+            user (str, Optional): The username of the user who requested that these workflows be executed. Defaults
+                to None.
+
+        Returns:
+            (list[str]): The execution IDs of the workflows, in the order of their IDs. The execution ID of a workflow
+                which does not exist is None.
+        """
+        workflows = {}
+        for chunk in _chunks(list({str(workflow_id) for workflow_id in workflow_ids})):
+            for workflow in self.execution_db.session.query(Workflow).filter(Workflow.id.in_(chunk)):
+                workflows[str(workflow.id)] = workflow
+
+        data = {}
+        if user:
+            data['user'] = user
+        execution_ids = []
+        requests = []
+        for workflow_id in workflow_ids:
+            workflow = workflows.get(str(workflow_id))
+            if workflow is None:
+                logger.error('Attempted to execute workflow {} which does not exist'.format(workflow_id))
+                execution_ids.append(None)
+                continue
+            execution_id = str(uuid.uuid4())
+            workflow_data = {'execution_id': execution_id, 'id': str(workflow.id), 'name': workflow.name}
+            self._log_and_send_event(WalkoffEvent.WorkflowExecutionPending, sender=workflow_data, workflow=workflow,
+                                     data=data)
+            requests.append((workflow.id, self.results_sender.create_workflow_request_message(
+                workflow.id, execution_id, None, None, False, None, user)))
+            execution_ids.append(execution_id)
+        logger.info('User {0} executing {1} workflows'.format(user, len(requests)))
+
+        # The worker reads the pending WorkflowStatus, so it must be committed before the workflow is queued
+        self.execution_db.flush_writer()
+        self.__add_workflows_to_queues(requests)
+        for _ in requests:
+            self._log_and_send_event(WalkoffEvent.SchedulerJobExecuted, data=data)
+        return execution_ids
+
+    def execute_workflow_batch(self, workflow_id, argument_sets, start=None, environment_variables=None, user=None,
+                               bulk=False):
+        """Executes a workflow once for each of a batch of argument sets. The pending workflow statuses of each chunk
+            of executions are inserted together, and their requests are pushed onto the request queue at once. No
+            WorkflowExecutionPending event is sent for the executions of a batch; their progress is tracked through the
+            batch ID of their workflow statuses.
+
+        Args:
+            workflow_id (UUID): The ID of the Workflow to be executed.
+            argument_sets (list[list[Argument]]): The arguments to the starting action of each execution.
+            start (UUID, optional): The ID of the first, or starting action. Defaults to None.
+            environment_variables (list[EnvironmentVariable]): Optional list of environment variables to pass into
+                each execution. These will not be persistent.
+            user (str, Optional): The username of the user who requested that this workflow be executed. Defaults
+                to None.
+            bulk (bool, optional): Whether to queue the requests on the bulk lane, which the workers drain after all
+                the other request queues. Defaults to False.
+
+        Returns:
+            (tuple(str, list[str])): The ID of the batch and the execution IDs of the workflows, in the order of their
+                argument sets. The batch ID is None if the workflow does not exist.
+        """
+        workflow = self.execution_db.session.query(Workflow).filter_by(id=workflow_id).first()
+        if not workflow:
+            logger.error('Attempted to execute workflow {} which does not exist'.format(workflow_id))
+            return None, []
+
+        batch_id = str(uuid.uuid4())
+        logger.info('User {0} executing workflow {1} (id={2}) {3} times in batch {4}'.format(
+            user, workflow.name, workflow.id, len(argument_sets), batch_id))
+
+        execution_ids = []
+        for chunk in _chunks(argument_sets, walkoff.config.Config.WORKFLOW_BATCH_CHUNK_SIZE):
+            created_at = datetime.utcnow()
+            chunk_execution_ids = [str(uuid.uuid4()) for _ in chunk]
+            workflow_statuses = [{'execution_id': execution_id, 'workflow_id': workflow.id, 'name': workflow.name,
+                                  'status': WorkflowStatusEnum.pending, 'created_at': created_at, 'user': user,
+                                  'batch_id': batch_id}
+                                 for execution_id in chunk_execution_ids]
+
+            def write(session, workflow_statuses=workflow_statuses):
+                session.bulk_insert_mappings(WorkflowStatus, workflow_statuses)
+
+            # The worker reads the pending WorkflowStatus, so it must be committed before the workflow is queued
+            self.execution_db.persist(write)
+            self.execution_db.flush_writer()
+            self.__add_workflows_to_queues(
+                [(workflow.id, self.results_sender.create_workflow_request_message(
+                    workflow.id, execution_id, start, arguments, False, environment_variables, user))
+                 for execution_id, arguments in zip(chunk_execution_ids, chunk)], bulk=bulk)
+            execution_ids.extend(chunk_execution_ids)
+
+        return batch_id, execution_ids
+
+    def move_due_executions(self, now=None):
+        """Moves the delayed requests which are due onto the request queues, in batches of
+            DELAYED_EXECUTION_BATCH_SIZE. The workflows of each batch are looked up together, and their requests are
+            pushed onto each request queue at once. Requests claimed more than DELAYED_EXECUTION_CLAIM_TIMEOUT_SECONDS
+            ago but never queued are moved again.
+
+        Args:
+            now (datetime, optional): The naive UTC time. Defaults to the current time.
+
+        Returns:
+            (list[str]): The execution IDs of the requests moved
+        """
+        batch_size = walkoff.config.Config.DELAYED_EXECUTION_BATCH_SIZE
+        self.delayed.recover(walkoff.config.Config.DELAYED_EXECUTION_CLAIM_TIMEOUT_SECONDS, now)
+        execution_ids = []
+        while True:
+            requests = self.delayed.claim_due(now, limit=batch_size)
+            if requests:
+                execution_ids.extend(self.__queue_delayed_requests(requests))
+                self.delayed.release(requests)
+            if len(requests) < batch_size:
+                return execution_ids
+
+    def move_delayed_executions(self, app):
+        """Moves the delayed requests which are due onto the request queues every DELAYED_EXECUTION_POLL_SECONDS
+            until the executor is shut down, and deletes the messages of lost delayed requests every
+            DELAYED_EXECUTION_CLEANUP_SECONDS
+
+        Args:
+            app (FlaskApp): The current_app object
+        """
+        cleaned_at = time.time()
+        with app.app_context():
+            while not self.delayed_stop.wait(walkoff.config.Config.DELAYED_EXECUTION_POLL_SECONDS):
+                try:
+                    self.move_due_executions()
+                except Exception:
+                    logger.exception('Could not move due delayed executions')
+                if time.time() - cleaned_at >= walkoff.config.Config.DELAYED_EXECUTION_CLEANUP_SECONDS:
+                    cleaned_at = time.time()
+                    try:
+                        removed = self.delayed.remove_orphans(walkoff.config.Config.DELAYED_EXECUTION_BATCH_SIZE)
+                        if removed:
+                            logger.info('Deleted the messages of {} lost delayed executions'.format(removed))
+                    except Exception:
+                        logger.exception('Could not delete the messages of lost delayed executions')
+
+    def __queue_delayed_requests(self, requests):
+        workflows = {}
+        for chunk in _chunks(list({request.workflow_id for request in requests})):
+            for workflow in self.execution_db.session.query(Workflow).filter(Workflow.id.in_(chunk)):
+                workflows[str(workflow.id)] = workflow
+
+        queued = []
+        for request in requests:
+            workflow = workflows.get(request.workflow_id)
+            if workflow is None:
+                logger.error('Delayed workflow {} no longer exists'.format(request.workflow_id))
+                continue
+            data = {'user': request.user} if request.user else {}
+            workflow_data = {'execution_id': request.execution_id, 'id': str(workflow.id), 'name': workflow.name}
+            self._log_and_send_event(WalkoffEvent.WorkflowExecutionPending, sender=workflow_data, workflow=workflow,
+                                     data=data)
+            queued.append(request)
+        logger.info('Moving {} due delayed executions onto the request queues'.format(len(queued)))
+
+        # The worker reads the pending WorkflowStatus, so it must be committed before the workflow is queued
+        self.execution_db.flush_writer()
+        self.__push_to_queues((workflows[request.workflow_id].id, request.message) for request in queued)
+        return [request.execution_id for request in queued]
+
     def __add_workflow_to_queue(self, workflow_id, workflow_execution_id, start=None, start_arguments=None,
-                                resume=False, environment_variables=None, user=None):
+                                resume=False, environment_variables=None, user=None, trigger_data=None, bulk=False):
         message = self.results_sender.create_workflow_request_message(workflow_id, workflow_execution_id, start,
                                                                       start_arguments, resume, environment_variables,
-                                                                      user)
-        self.cache.lpush("request_queue", self.__box.encrypt(message))
+                                                                      user, trigger_data)
+        queue = BULK_QUEUE if bulk else self.__get_request_queue(workflow_id)
+        self.cache.lpush(queue, self.__box.encrypt(message))
+
+    def __add_resumed_workflows_to_queue(self, matches, start_arguments=None, user=None):
+        self.__add_workflows_to_queues(
+            (match.workflow_id, self.results_sender.create_workflow_request_message(
+                match.workflow_id, match.execution_id, str(match.action.id), start_arguments, True, None, user))
+            for match in matches)
+
+    def __add_workflows_to_queues(self, requests, bulk=False):
+        self.__push_to_queues(((workflow_id, self.__box.encrypt(message)) for workflow_id, message in requests),
+                              bulk=bulk)
+
+    def __push_to_queues(self, requests, bulk=False):
+        messages = OrderedDict()
+        queues = {}
+        for workflow_id, message in requests:
+            if workflow_id not in queues:
+                queues[workflow_id] = BULK_QUEUE if bulk else self.__get_request_queue(workflow_id)
+            messages.setdefault(queues[workflow_id], []).append(message)
+        for queue, queue_messages in messages.items():
+            self.cache.lpush(queue, *queue_messages)
+
+    def __get_request_queue(self, workflow_id):
+        affinity_key = None
+        if walkoff.config.Config.WORKER_AFFINITY_SHARDS:
+            affinity_key = get_affinity_key(self.execution_db.session, workflow_id)
+        return get_request_queue(affinity_key, walkoff.config.Config.WORKER_AFFINITY_SHARDS)
 
     def pause_workflow(self, execution_id, user=None):
         """Pauses a workflow that is currently executing.
@@ -272,65 +560,104 @@ class MultiprocessedExecutor(object):
                 'Cannot resume workflow {0}. Invalid key, or workflow already shutdown.'.format(execution_id))
             return False
 
-    def resume_trigger_step(self, execution_id, data_in, arguments=None, user=None):
-        """Resumes a workflow awaiting trigger data, if the conditions are met.
+    def resume_trigger_steps(self, execution_ids, data_in, arguments=None, user=None):
+        """Sends data to the triggers of workflows awaiting data. The triggers are evaluated by the workers, which
+            resume the workflows whose triggers accept the data.
 
         Args:
-            execution_id (UUID): The execution ID of the workflow
-            data_in (dict): The data to send to the trigger
-            arguments (list[Argument], optional): Optional list of new Arguments for the trigger action.
+            execution_ids (list[UUID]): The execution IDs of the workflows
+            data_in (dict): The data to send to the triggers
+            arguments (list[Argument], optional): Optional list of new Arguments for the trigger actions.
                 Defaults to None.
-            user (str, Optional): The username of the user who requested that this workflow be resumed. Defaults
+            user (str, Optional): The username of the user who requested that these workflows be resumed. Defaults
                 to None.
 
         Returns:
-            (bool): True if successfully resumed trigger step, false otherwise
+            (list[str]): The execution IDs of the workflows which were sent the data
         """
-        logger.info('User {0} resuming workflow {1} from trigger'.format(user, execution_id))
-        saved_state = self.execution_db.session.query(SavedWorkflow).filter_by(
-            workflow_execution_id=execution_id).first()
-        workflow = self.execution_db.session.query(Workflow).filter_by(id=saved_state.workflow_id).first()
-
-        action_execution_strategy = make_execution_strategy(
-            self.config,
-            RestrictedWorkflowContext.from_workflow(workflow, execution_id)
-        )
-
-        accumulator = make_accumulator(execution_id)
-        executed = False
-        exec_action = None
-        for action in workflow.actions:
-            if action.id == saved_state.action_id:
-                exec_action = action
-                executed = action.execute_trigger(action_execution_strategy, data_in, accumulator)
-                break
-
-        data = {'workflow_execution_id': execution_id}
-        if user:
-            data['user'] = user
+        sent_execution_ids = []
+        for chunk in _chunks(list(execution_ids)):
+            saved_states = self.execution_db.session.query(SavedWorkflow).filter(
+                SavedWorkflow.workflow_execution_id.in_(chunk)).all()
+            for saved_state in saved_states:
+                execution_id = str(saved_state.workflow_execution_id)
+                logger.info('User {0} sending data to trigger of workflow {1}'.format(user, execution_id))
+                self.__add_workflow_to_queue(saved_state.workflow_id, execution_id, start=str(saved_state.action_id),
+                                             start_arguments=arguments, resume=True, user=user, trigger_data=data_in)
+                sent_execution_ids.append(execution_id)
+        return sent_execution_ids
+
+    def send_events_to_triggers(self, events, execution_ids, arguments=None, user=None):
+        """Matches a batch of events against the triggers of workflows awaiting data, and resumes the workflows whose
+            triggers match one of the events. Workflows with identical triggers share a predicate, which is evaluated
+            once per event. Triggers which reference the results of previous actions are evaluated per execution by
+            the workers instead.
 
-        if executed:
-
-            self._log_and_send_event(WalkoffEvent.TriggerActionTaken, sender=exec_action,
-                                     data={'workflow_execution_id': execution_id}, workflow=workflow)
-            self.execute_workflow(workflow.id, execution_id_in=execution_id, start=str(saved_state.action_id),
-                                  start_arguments=arguments, resume=True, user=user)
-            return True
-        else:
-            self._log_and_send_event(WalkoffEvent.TriggerActionNotTaken, sender=exec_action,
-                                     data={'workflow_execution_id': execution_id}, workflow=workflow)
-            return False
+        Args:
+            events (list): The data of the events, in the order in which they arrived
+            execution_ids (list[UUID]): The execution IDs of the workflows awaiting data which may be resumed
+            arguments (list[Argument], optional): Optional list of new Arguments for the trigger actions.
+                Defaults to None.
+            user (str, Optional): The username of the user who sent the events. Defaults to None.
 
-    def get_waiting_workflows(self):
+        Returns:
+            (tuple(list[str], list[str])): The execution IDs of the workflows which were resumed, and the execution IDs
+                of the workflows whose triggers were sent to the workers to evaluate
+        """
+        matcher = TriggerMatcher(self.execution_db.session, execution_ids)
+
+        def make_strategy(predicate):
+            return make_execution_strategy(
+                self.config,
+                RestrictedWorkflowContext(str(uuid.uuid4()), predicate.workflow_id, predicate.workflow_name))
+
+        matches = matcher.match(events, make_strategy)
+        claimed = set(claim_awaiting_executions(self.execution_db.session,
+                                                [match.execution_id for match in matches]))
+        matches = [match for match in matches if match.execution_id in claimed]
+        logger.info('User {0} resuming {1} workflows matching {2} events'.format(user, len(matches), len(events)))
+        self.__add_resumed_workflows_to_queue(matches, start_arguments=arguments, user=user)
+        for match in matches:
+            sender = {'name': match.action.name, 'id': str(match.action.id), 'app_name': match.action.app_name,
+                      'action_name': match.action.action_name}
+            workflow = {'name': match.workflow_name, 'id': str(match.workflow_id), 'execution_id': match.execution_id}
+            self._log_and_send_event(WalkoffEvent.TriggerActionTaken, sender=sender, data={'workflow': workflow})
+
+        sent_execution_ids = set()
+        if matcher.unshared_execution_ids:
+            for event in events:
+                sent_execution_ids.update(self.resume_trigger_steps(matcher.unshared_execution_ids, event,
+                                                                    arguments=arguments, user=user))
+        return [match.execution_id for match in matches], list(sent_execution_ids)
+
+    def get_waiting_workflows(self, execution_ids=None, workflow_id=None, action_id=None):
         """Gets a list of the execution IDs of workflows currently awaiting data to be sent to a trigger.
 
+        Args:
+            execution_ids (list[UUID], optional): Only get the workflows with these execution IDs. Defaults to None,
+                which gets the workflows with any execution ID.
+            workflow_id (UUID, optional): Only get the executions of this workflow. Defaults to None.
+            action_id (UUID, optional): Only get the workflows awaiting data at this action. Defaults to None.
+
         Returns:
             (list[UUID]): A list of execution IDs of workflows currently awaiting data to be sent to a trigger.
         """
         self.execution_db.session.expire_all()
-        wf_statuses = self.execution_db.session.query(WorkflowStatus).filter_by(
-            status=WorkflowStatusEnum.awaiting_data).all()
-        return [str(wf_status.execution_id) for wf_status in wf_statuses]
+        query = self.execution_db.session.query(WorkflowStatus.execution_id).filter(
+            WorkflowStatus.status == WorkflowStatusEnum.awaiting_data)
+        if workflow_id is not None or action_id is not None:
+            query = query.join(SavedWorkflow, SavedWorkflow.workflow_execution_id == WorkflowStatus.execution_id)
+            if workflow_id is not None:
+                query = query.filter(SavedWorkflow.workflow_id == workflow_id)
+            if action_id is not None:
+                query = query.filter(SavedWorkflow.action_id == action_id)
+
+        if execution_ids is None:
+            return [str(execution_id) for execution_id, in query]
+        waiting = []
+        for chunk in _chunks(list(execution_ids)):
+            waiting.extend(str(execution_id) for execution_id, in query.filter(WorkflowStatus.execution_id.in_(chunk)))
+        return waiting
 
     def get_workflow_status(self, execution_id):
         """Gets the current status of a workflow by its execution ID
@@ -351,3 +678,8 @@ class MultiprocessedExecutor(object):
     def _log_and_send_event(self, event, sender=None, data=None, workflow=None):
         sender = sender or self
         self.results_sender.handle_event(workflow, sender, event=event, data=data)
+
+
+def _chunks(values, size=500):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
@@ -306,7 +306,7 @@ class ProtobufWorkflowResultsConverter(object):
 
     @staticmethod
     def create_workflow_request_message(workflow_id, workflow_execution_id, start=None, start_arguments=None,
-                                        resume=False, environment_variables=None, user=None):
+                                        resume=False, environment_variables=None, user=None, trigger_data=None):
         """Creates a workflow request message to be placed on the redis queue
         """
         message = ExecuteWorkflowMessage()
@@ -322,6 +322,8 @@ class ProtobufWorkflowResultsConverter(object):
             ProtobufWorkflowResultsConverter.add_env_vars_to_proto(message, environment_variables)
         if user:
             message.user = user
+        if trigger_data is not None:
+            message.trigger_data_in = json.dumps(trigger_data)
         return message.SerializeToString()
 
 
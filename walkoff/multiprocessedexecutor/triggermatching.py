@@ -0,0 +1,167 @@
+import json
+import logging
+from collections import OrderedDict
+
+from walkoff.executiondb import WorkflowStatusEnum
+from walkoff.executiondb.action import Action
+from walkoff.executiondb.saved_workflow import SavedWorkflow
+from walkoff.executiondb.schemas import ConditionalExpressionSchema
+from walkoff.executiondb.workflowresults import WorkflowStatus
+
+logger = logging.getLogger(__name__)
+
+_query_chunk_size = 500
+
+
+class TriggerPredicate(object):
+    __slots__ = ['key', 'trigger', 'action', 'workflow_id', 'workflow_name', 'waiting']
+
+    def __init__(self, key, action, workflow_id, workflow_name):
+        """Initializes a TriggerPredicate, which is a trigger shared by the workflows awaiting data whose triggers are
+            identical
+
+        Args:
+            key (str): The canonical form of the trigger
+            action (Action): The first trigger action found with this trigger
+            workflow_id (UUID): The ID of the workflow of the action
+            workflow_name (str): The name of the workflow of the action
+        """
+        self.key = key
+        self.trigger = action.trigger
+        self.action = action
+        self.workflow_id = workflow_id
+        self.workflow_name = workflow_name
+        self.waiting = []
+
+
+class TriggerMatch(object):
+    __slots__ = ['execution_id', 'workflow_id', 'workflow_name', 'action']
+
+    def __init__(self, execution_id, workflow_id, workflow_name, action):
+        self.execution_id = execution_id
+        self.workflow_id = workflow_id
+        self.workflow_name = workflow_name
+        self.action = action
+
+
+class TriggerMatcher(object):
+    def __init__(self, session, execution_ids):
+        """Initializes a TriggerMatcher, which compiles the triggers of workflows awaiting data into predicates. The
+            workflows whose triggers are identical share a predicate, so each distinct trigger is evaluated once per
+            event no matter how many workflows are waiting on it. Triggers which reference the results of previous
+            actions depend on the execution, and cannot be shared.
+
+        Args:
+            session (Session): The execution database session
+            execution_ids (iterable(str)): The execution IDs of the workflows awaiting data
+        """
+        self.predicates = OrderedDict()
+        self.unshared_execution_ids = []
+        waiting = self._get_waiting(session, list(execution_ids))
+        actions = self._get_actions(session, {action_id for _, _, action_id, _ in waiting})
+        action_predicates = {}
+        for execution_id, workflow_id, action_id, workflow_name in waiting:
+            action = actions.get(action_id)
+            if action is None or action.trigger is None:
+                logger.warning('Workflow {} is awaiting data at action {}, which has no trigger'.format(
+                    execution_id, action_id))
+                continue
+            if action_id not in action_predicates:
+                action_predicates[action_id] = self._compile(action, workflow_id, workflow_name)
+            predicate = action_predicates[action_id]
+            if predicate is None:
+                self.unshared_execution_ids.append(execution_id)
+            else:
+                predicate.waiting.append((execution_id, workflow_id, workflow_name, action))
+
+    def _compile(self, action, workflow_id, workflow_name):
+        trigger_json = ConditionalExpressionSchema().dump(action.trigger)
+        if _has_reference(trigger_json):
+            return None
+        key = json.dumps(_strip_ids(trigger_json), sort_keys=True, default=str)
+        if key not in self.predicates:
+            self.predicates[key] = TriggerPredicate(key, action, workflow_id, workflow_name)
+        return self.predicates[key]
+
+    @staticmethod
+    def _get_waiting(session, execution_ids):
+        waiting = []
+        for i in range(0, len(execution_ids), _query_chunk_size):
+            waiting.extend(session.query(SavedWorkflow.workflow_execution_id, SavedWorkflow.workflow_id,
+                                         SavedWorkflow.action_id, WorkflowStatus.name).join(
+                WorkflowStatus, WorkflowStatus.execution_id == SavedWorkflow.workflow_execution_id).filter(
+                WorkflowStatus.status == WorkflowStatusEnum.awaiting_data).filter(
+                SavedWorkflow.workflow_execution_id.in_(execution_ids[i:i + _query_chunk_size])).all())
+        return [(str(execution_id), workflow_id, action_id, workflow_name)
+                for execution_id, workflow_id, action_id, workflow_name in waiting]
+
+    @staticmethod
+    def _get_actions(session, action_ids):
+        action_ids = list(action_ids)
+        actions = {}
+        for i in range(0, len(action_ids), _query_chunk_size):
+            for action in session.query(Action).filter(Action.id.in_(action_ids[i:i + _query_chunk_size])):
+                actions[action.id] = action
+        return actions
+
+    def match(self, events, make_strategy):
+        """Evaluates the shared predicates against a batch of events. A predicate stops being evaluated once an event
+            matches it, because all of the workflows waiting on it resume with that event
+
+        Args:
+            events (list): The data of the events, in the order in which they arrived
+            make_strategy (func): A function which takes a TriggerPredicate and returns the action execution strategy
+                with which to evaluate it
+
+        Returns:
+            (list[TriggerMatch]): The workflows whose triggers matched an event
+        """
+        matches = []
+        for predicate in self.predicates.values():
+            strategy = make_strategy(predicate)
+            for event in events:
+                if predicate.trigger.execute(strategy, data_in=event, accumulator={}):
+                    matches.extend(TriggerMatch(*waiting) for waiting in predicate.waiting)
+                    break
+        return matches
+
+
+def _strip_ids(element):
+    if isinstance(element, dict):
+        return {key: _strip_ids(value) for key, value in element.items() if key not in ('id', 'action_id')}
+    if isinstance(element, list):
+        return [_strip_ids(value) for value in element]
+    return element
+
+
+def _has_reference(element):
+    if isinstance(element, dict):
+        return element.get('reference') is not None or any(_has_reference(value) for value in element.values())
+    if isinstance(element, list):
+        return any(_has_reference(value) for value in element)
+    return False
+
+
+def claim_awaiting_executions(session, execution_ids):
+    """Moves workflows out of awaiting data, so that only one of several concurrent requests which send data to them
+        resumes each of them. The workflows are locked and claimed in chunks, with one select and one update per chunk
+
+    Args:
+        session (Session): The execution database session
+        execution_ids (iterable(str)): The execution IDs of the workflows
+
+    Returns:
+        (list[str]): The execution IDs of the workflows which were awaiting data, and are now pending
+    """
+    execution_ids = list(execution_ids)
+    claimed = set()
+    for i in range(0, len(execution_ids), _query_chunk_size):
+        awaiting = [execution_id for execution_id, in session.query(WorkflowStatus.execution_id).filter(
+            WorkflowStatus.status == WorkflowStatusEnum.awaiting_data).filter(
+            WorkflowStatus.execution_id.in_(execution_ids[i:i + _query_chunk_size])).with_for_update().all()]
+        if awaiting:
+            session.query(WorkflowStatus).filter(WorkflowStatus.execution_id.in_(awaiting)).update(
+                {'status': WorkflowStatusEnum.pending}, synchronize_session=False)
+            claimed.update(str(execution_id) for execution_id in awaiting)
+    session.commit()
+    return [execution_id for execution_id in execution_ids if str(execution_id) in claimed]
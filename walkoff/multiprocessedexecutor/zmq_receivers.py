@@ -43,6 +43,7 @@ class ZmqWorkflowResultsReceiver(object):
 
     def receive_results(self):
         """Keep receiving results from execution elements over a ZMQ socket, and trigger the callbacks"""
+        self.current_app.running_context.execution_db.start_writer()
         while True:
             if self.thread_exit:
                 break
@@ -56,6 +57,8 @@ class ZmqWorkflowResultsReceiver(object):
                 self._send_callback(message_bytes)
 
         self.results_sock.close()
+        self.current_app.running_context.execution_db.stop_writer()
+        self.current_app.running_context.execution_db.remove_session()
         return
 
     def _send_callback(self, message_bytes):
@@ -89,10 +89,10 @@ class ZmqWorkflowResultsSender(object):
                                                event=WalkoffEvent.WorkerReady)
 
     def create_workflow_request_message(self, workflow_id, workflow_execution_id, start=None, start_arguments=None,
-                                        resume=False, environment_variables=None, user=None):
+                                        resume=False, environment_variables=None, user=None, trigger_data=None):
         return self.message_converter.create_workflow_request_message(workflow_id, workflow_execution_id, start,
                                                                       start_arguments, resume, environment_variables,
-                                                                      user)
+                                                                      user, trigger_data)
 
 
 class ZmqWorkflowCommunicationSender(object):
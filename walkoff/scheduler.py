@@ -1,19 +1,41 @@
+import datetime
 import logging
+import sys
+from traceback import format_tb
 
+import gevent
 from apscheduler.events import (EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_ADDED, EVENT_JOB_REMOVED,
-                                EVENT_SCHEDULER_START, EVENT_SCHEDULER_SHUTDOWN,
-                                EVENT_SCHEDULER_PAUSED, EVENT_SCHEDULER_RESUMED)
+                                EVENT_JOB_MISSED, EVENT_SCHEDULER_START, EVENT_SCHEDULER_SHUTDOWN, JobExecutionEvent)
+from apscheduler.executors.base import BaseExecutor
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.base import JobLookupError
 from apscheduler.schedulers.base import STATE_PAUSED, STATE_RUNNING, STATE_STOPPED
 from apscheduler.schedulers.gevent import GeventScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+from flask import current_app
+from redis.exceptions import LockError, RedisError
+from sqlalchemy import Column, MetaData, Table, Unicode
 
+import walkoff.config
 from walkoff.events import WalkoffEvent
 
+try:
+    from datetime import timezone
+
+    utc = timezone.utc
+except ImportError:
+    # Python 2, on which APScheduler depends on pytz
+    from pytz import utc
+
 logger = logging.getLogger(__name__)
 
+_scheduler = None
+
+SCHEDULER_JOBS_TABLE = 'apscheduler_jobs'
+
 
 class InvalidTriggerArgs(Exception):
     def __init__(self, message):
@@ -67,17 +89,248 @@ def split_task_id(task_id):
     return task_id.split(task_id_separator)[:2]
 
 
+def execute_scheduled_workflow(workflow_id):
+    """Executes a scheduled workflow through the Scheduler of this process. Jobs refer to this function rather than to
+        the Scheduler, so that they can be stored in the execution database. The BatchExecutor executes the workflows
+        of all the jobs due at the same time together instead of calling it.
+
+    Args:
+        workflow_id (str): The ID of the workflow to execute
+    """
+    _scheduler.execute_workflows([workflow_id])
+
+
+def _group_job_ids(job_ids, task_id=None):
+    tasks = {}
+    for job_id in job_ids:
+        task, _, workflow_id = job_id.partition(task_id_separator)
+        if task_id is None or task == task_id:
+            tasks.setdefault(task, []).append(workflow_id)
+    return tasks
+
+
+class SchedulerLease(object):
+    def __init__(self, cache, name='scheduler:leader', lease_seconds=30):
+        """Initializes a SchedulerLease, which elects the one scheduler out of those sharing a cache which fires jobs
+
+        Args:
+            cache (RedisCacheAdapter): The cache holding the lease
+            name (str, optional): The name of the lock backing the lease. Defaults to 'scheduler:leader'.
+            lease_seconds (float, optional): The number of seconds the lease is held for if it is not renewed. Defaults
+                to 30.
+        """
+        self.lock = cache.lock(name, timeout=lease_seconds)
+        self.leader = False
+
+    def renew(self):
+        """Renews the lease if this scheduler holds it, and tries to take it otherwise
+
+        Returns:
+            (bool): Whether or not this scheduler holds the lease
+        """
+        try:
+            if self.leader:
+                self.lock.reacquire()
+            else:
+                self.leader = self.lock.acquire(blocking=False)
+                if self.leader:
+                    logger.info('Scheduler took the leader lease')
+        except LockError:
+            logger.warning('Scheduler lost the leader lease')
+            self.leader = False
+        except RedisError:
+            logger.exception('Could not renew the scheduler leader lease')
+            self.leader = False
+        return self.leader
+
+    def release(self):
+        """Releases the lease if this scheduler holds it"""
+        if self.leader:
+            self.leader = False
+            try:
+                self.lock.release()
+            except (LockError, RedisError):
+                logger.warning('Could not release the scheduler leader lease')
+
+
+class TaskIndexedMemoryJobStore(MemoryJobStore):
+    def __init__(self):
+        """Initializes a TaskIndexedMemoryJobStore, which keeps jobs in memory ordered by their next run time, and
+            indexes the IDs of the workflows scheduled by each task
+        """
+        super(TaskIndexedMemoryJobStore, self).__init__()
+        self._task_workflows = {}
+
+    def add_job(self, job):
+        super(TaskIndexedMemoryJobStore, self).add_job(job)
+        task, _, workflow_id = job.id.partition(task_id_separator)
+        self._task_workflows.setdefault(task, {})[workflow_id] = None
+
+    def remove_job(self, job_id):
+        super(TaskIndexedMemoryJobStore, self).remove_job(job_id)
+        task, _, workflow_id = job_id.partition(task_id_separator)
+        workflows = self._task_workflows[task]
+        del workflows[workflow_id]
+        if not workflows:
+            del self._task_workflows[task]
+
+    def remove_all_jobs(self):
+        super(TaskIndexedMemoryJobStore, self).remove_all_jobs()
+        self._task_workflows = {}
+
+    def get_scheduled_workflows(self, task_id=None):
+        """Gets the IDs of the scheduled workflows
+
+        Args:
+            task_id (str, optional): The ID of the task to get the workflows of. Defaults to all the tasks.
+
+        Returns:
+            (dict{str: list[str]}): The IDs of the workflows scheduled by each task
+        """
+        if task_id is not None:
+            workflows = self._task_workflows.get(task_id)
+            return {task_id: list(workflows)} if workflows else {}
+        return {task: list(workflows) for task, workflows in self._task_workflows.items()}
+
+
+class SQLAlchemyJobIndex(object):
+    def __init__(self, engine, tablename=SCHEDULER_JOBS_TABLE):
+        """Initializes a SQLAlchemyJobIndex, which finds the workflows scheduled by a task in the table of an
+            SQLAlchemyJobStore without loading their jobs. The job IDs all begin with the ID of their task, so the
+            workflows of a task are found through a range scan of the primary key.
+
+        Args:
+            engine (Engine): The engine of the database holding the jobs
+            tablename (str, optional): The name of the table of jobs. Defaults to 'apscheduler_jobs'.
+        """
+        self.engine = engine
+        self.jobs_t = Table(tablename, MetaData(), Column('id', Unicode(191), primary_key=True))
+
+    def get_scheduled_workflows(self, task_id=None):
+        """Gets the IDs of the scheduled workflows
+
+        Args:
+            task_id (str, optional): The ID of the task to get the workflows of. Defaults to all the tasks.
+
+        Returns:
+            (dict{str: list[str]}): The IDs of the workflows scheduled by each task
+        """
+        query = self.jobs_t.select()
+        if task_id is not None:
+            prefix = task_id + task_id_separator
+            query = query.where(self.jobs_t.c.id >= prefix).where(
+                self.jobs_t.c.id < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+        with self.engine.connect() as connection:
+            job_ids = [row[0] for row in connection.execute(query.order_by(self.jobs_t.c.id))]
+        return _group_job_ids(job_ids, task_id)
+
+
+class BatchExecutor(BaseExecutor):
+    def __init__(self):
+        """Initializes a BatchExecutor, which executes the workflows of all the jobs which are due at the same time
+            together. The scheduler submits the due jobs one after another without yielding to other greenlets, so the
+            greenlet spawned when the first of them is submitted runs once all of them have been submitted.
+        """
+        super(BatchExecutor, self).__init__()
+        self._batch = []
+
+    def _do_submit_job(self, job, run_times):
+        if not self._batch:
+            gevent.spawn(self.flush)
+        self._batch.append((job, run_times))
+
+    def flush(self):
+        """Executes the workflows of the jobs submitted since the last flush"""
+        batch, self._batch = self._batch, []
+        if batch:
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        now = datetime.datetime.now(utc)
+        workflow_ids = []
+        runs = []
+        for job, run_times in batch:
+            events = []
+            for run_time in run_times:
+                missed_by = now - run_time
+                if job.misfire_grace_time is not None and missed_by > datetime.timedelta(
+                        seconds=job.misfire_grace_time):
+                    self._logger.warning('Run time of job "%s" was missed by %s', job, missed_by)
+                    events.append(JobExecutionEvent(EVENT_JOB_MISSED, job.id, job._jobstore_alias, run_time))
+                else:
+                    workflow_ids.append(job.args[0])
+                    events.append(JobExecutionEvent(EVENT_JOB_EXECUTED, job.id, job._jobstore_alias, run_time))
+            runs.append((job, events))
+
+        try:
+            if workflow_ids:
+                self._logger.info('Running %d scheduled workflows', len(workflow_ids))
+                execute_scheduled_workflows(workflow_ids)
+        except Exception:
+            exc, tb = sys.exc_info()[1:]
+            self._logger.exception('Scheduled workflows raised an exception')
+            formatted_tb = ''.join(format_tb(tb))
+            runs = [(job, [JobExecutionEvent(EVENT_JOB_ERROR, job.id, job._jobstore_alias, event.scheduled_run_time,
+                                             exception=exc, traceback=formatted_tb)
+                           if event.code == EVENT_JOB_EXECUTED else event for event in events])
+                    for job, events in runs]
+        for job, events in runs:
+            self._run_job_success(job.id, events)
+
+
+def execute_scheduled_workflows(workflow_ids):
+    """Executes a batch of scheduled workflows through the Scheduler of this process
+
+    Args:
+        workflow_ids (list[str]): The IDs of the workflows to execute
+    """
+    _scheduler.execute_workflows(workflow_ids)
+
+
 # A thin wrapper around APScheduler
 class Scheduler(object):
-    def __init__(self):
-        self.scheduler = GeventScheduler()
+    def __init__(self, execution_db=None, cache=None):
+        """Initializes a Scheduler. Of the schedulers sharing a cache, only the one holding the leader lease processes
+            its jobs. The others keep their APScheduler paused, and check the lease every SCHEDULER_LEASE_CHECK_SECONDS
+            to take over if it is not renewed within SCHEDULER_LEASE_SECONDS.
+
+        Args:
+            execution_db (ExecutionDatabase, optional): The execution database to store the jobs in. If it is not
+                specified, or SCHEDULER_PERSISTENT is not set, the jobs are kept in memory.
+            cache (RedisCacheAdapter, optional): The cache holding the leader lease shared by the schedulers of all the
+                controllers. If it is not specified, this scheduler always processes its jobs.
+        """
+        global _scheduler
+        config = walkoff.config.Config
+        if execution_db is not None and config.SCHEDULER_PERSISTENT:
+            self.jobstore = SQLAlchemyJobStore(engine=execution_db.engine, tablename=SCHEDULER_JOBS_TABLE)
+            self.job_index = SQLAlchemyJobIndex(execution_db.engine, SCHEDULER_JOBS_TABLE)
+        else:
+            self.jobstore = self.job_index = TaskIndexedMemoryJobStore()
+        self.lease = SchedulerLease(cache, lease_seconds=config.SCHEDULER_LEASE_SECONDS) if cache is not None else None
+        self.lease_check_seconds = config.SCHEDULER_LEASE_CHECK_SECONDS
+        self.scheduler = GeventScheduler(
+            executors={'default': BatchExecutor()},
+            job_defaults={'coalesce': True, 'misfire_grace_time': config.SCHEDULER_MISFIRE_GRACE_SECONDS})
         self.scheduler.add_listener(self.__scheduler_listener(),
                                     EVENT_SCHEDULER_START | EVENT_SCHEDULER_SHUTDOWN
-                                    | EVENT_SCHEDULER_PAUSED | EVENT_SCHEDULER_RESUMED
                                     | EVENT_JOB_ADDED | EVENT_JOB_REMOVED
                                     | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
         self.id = 'controller'
         self.app = None
+        self.executable = None
+        self._paused = False
+        self._lease_checker = None
+        _scheduler = self
+
+    @property
+    def state(self):
+        """(int): The state of the scheduler. A scheduler which does not hold the leader lease is running, even though
+            its APScheduler is paused
+        """
+        if self.scheduler.state == STATE_STOPPED:
+            return STATE_STOPPED
+        return STATE_PAUSED if self._paused else STATE_RUNNING
 
     def schedule_workflows(self, task_id, executable, workflow_ids, trigger):
         """
@@ -85,19 +338,48 @@ class Scheduler(object):
 
         Args:
             task_id (int): Id of the scheduled task
-            executable (func): A callable to execute must take in one argument -- a workflow id
+            executable (func): A callable which executes a batch of workflows. It must take in one argument -- a list
+                of workflow ids
             workflow_ids (iterable(str)): An iterable of workflow ids
             trigger (Trigger): The trigger to use for this scheduled task
         """
-
-        def execute(id_):
-            with self.app.app_context():
-                executable(id_)
-
+        self.executable = executable
         for workflow_id in workflow_ids:
-            self.scheduler.add_job(execute, args=(workflow_id,),
-                                   id=construct_task_id(task_id, workflow_id),
-                                   trigger=trigger, replace_existing=True)
+            self.__add_job(construct_task_id(task_id, workflow_id), workflow_id, trigger)
+
+    def __add_job(self, job_id, workflow_id, trigger, paused=False):
+        # A stored job which is scheduled again with the same trigger, as every running task is when the server starts,
+        # keeps its next run time so that the fires it missed are coalesced rather than dropped
+        existing = self.scheduler.get_job(job_id) if self.scheduler.state != STATE_STOPPED else None
+        if existing is not None and existing.next_run_time is not None and str(existing.trigger) == str(trigger):
+            if paused:
+                self.scheduler.pause_job(job_id)
+            return
+        options = {'next_run_time': None} if paused else {}
+        self.scheduler.add_job(execute_scheduled_workflow, args=(workflow_id,), id=job_id, trigger=trigger,
+                               replace_existing=True, **options)
+
+    def execute_workflows(self, workflow_ids):
+        """Executes a batch of scheduled workflows. Jobs loaded from the execution database before any workflows are
+            scheduled by this scheduler are executed by the executor of the app.
+
+        Args:
+            workflow_ids (list[str]): The IDs of the workflows to execute
+        """
+        if self.lease is not None and not self.lease.leader:
+            logger.warning('Not executing {} scheduled workflows. The scheduler lost the leader lease'.format(
+                len(workflow_ids)))
+            return
+        with self.app.app_context():
+            executable = self.executable
+            if executable is None:
+                executable = current_app.running_context.executor.execute_workflows
+            executable(workflow_ids)
+
+    def __get_scheduled_workflows(self, task_id=None):
+        if self.scheduler.state == STATE_STOPPED:
+            return _group_job_ids([job.id for job in self.scheduler.get_jobs()], task_id)
+        return self.job_index.get_scheduled_workflows(task_id)
 
     def get_all_scheduled_workflows(self):
         """
@@ -106,14 +388,7 @@ class Scheduler(object):
         Returns:
              (dict{str: list[str]}) A dict of task_id to workflow execution ids
         """
-        tasks = {}
-        for job in self.scheduler.get_jobs():
-            task, workflow_execution_id = split_task_id(job.id)
-            if task not in tasks:
-                tasks[task] = [workflow_execution_id]
-            else:
-                tasks[task].append(workflow_execution_id)
-        return tasks
+        return self.__get_scheduled_workflows()
 
     def get_scheduled_workflows(self, task_id):
         """
@@ -125,12 +400,7 @@ class Scheduler(object):
         Returns:
             (list[str]) A list fo workflow execution id associated with this task id
         """
-        tasks = []
-        for job in self.scheduler.get_jobs():
-            task, workflow_execution_id = split_task_id(job.id)
-            if task == task_id:
-                tasks.append(workflow_execution_id)
-        return tasks
+        return self.__get_scheduled_workflows(str(task_id)).get(str(task_id), [])
 
     def update_workflows(self, task_id, trigger):
         """
@@ -168,11 +438,22 @@ class Scheduler(object):
         """
         if self.scheduler.state == STATE_STOPPED:
             logger.info('Starting scheduler')
-            self.scheduler.start()
+            self._paused = False
+            # The jobs scheduled while stopped are added once the job store is started, so that the stored ones keep
+            # their next run times. The jobs are processed once this scheduler holds the leader lease.
+            pending_jobs = self.scheduler.get_jobs()
+            self.scheduler.remove_all_jobs()
+            self.scheduler.add_jobstore(self.jobstore, 'default')
+            self.scheduler.start(paused=True)
+            for job in pending_jobs:
+                self.__add_job(job.id, job.args[0], job.trigger, paused=getattr(job, 'next_run_time', True) is None)
+            self.check_lease()
+            if self.lease is not None:
+                self._lease_checker = gevent.spawn(self.__check_lease_periodically)
         else:
             logger.warning('Cannot start scheduler. Scheduler is already running or is paused')
             return "Scheduler already running."
-        return self.scheduler.state
+        return self.state
 
     def stop(self, wait=True):
         """Stops active execution.
@@ -186,11 +467,19 @@ class Scheduler(object):
         """
         if self.scheduler.state != STATE_STOPPED:
             logger.info('Stopping scheduler')
+            if self._lease_checker is not None:
+                self._lease_checker.kill()
+                self._lease_checker = None
+            # APScheduler processes the due jobs once more as it shuts down, even when it is paused. The job store is
+            # removed first, so that a scheduler which is not the leader does not fire the jobs of the leader.
+            self.scheduler.remove_jobstore('default')
             self.scheduler.shutdown(wait=wait)
+            if self.lease is not None:
+                self.lease.release()
         else:
             logger.warning('Cannot stop scheduler. Scheduler is already stopped')
             return "Scheduler already stopped."
-        return self.scheduler.state
+        return self.state
 
     def pause(self):
         """Pauses active execution.
@@ -198,16 +487,21 @@ class Scheduler(object):
         Returns:
             The state of the scheduler if successful, error message if scheduler is not in the "running" state.
         """
-        if self.scheduler.state == STATE_RUNNING:
+        if self.state == STATE_RUNNING:
             logger.info('Pausing scheduler')
-            self.scheduler.pause()
-        elif self.scheduler.state == STATE_PAUSED:
+            self._paused = True
+            if self.scheduler.state == STATE_RUNNING:
+                self.scheduler.pause()
+            if self.lease is not None:
+                self.lease.release()
+            WalkoffEvent.SchedulerPaused.send(self)
+        elif self.state == STATE_PAUSED:
             logger.warning('Cannot pause scheduler. Scheduler is already paused')
             return "Scheduler already paused."
-        elif self.scheduler.state == STATE_STOPPED:
+        elif self.state == STATE_STOPPED:
             logger.warning('Cannot pause scheduler. Scheduler is stopped')
             return "Scheduler is in STOPPED state and cannot be paused."
-        return self.scheduler.state
+        return self.state
 
     def resume(self):
         """Resumes active execution.
@@ -215,13 +509,43 @@ class Scheduler(object):
         Returns:
             The state of the scheduler if successful, error message if scheduler is not in the "paused" state.
         """
-        if self.scheduler.state == STATE_PAUSED:
+        if self.state == STATE_PAUSED:
             logger.info('Resuming scheduler')
-            self.scheduler.resume()
+            self._paused = False
+            self.check_lease()
+            WalkoffEvent.SchedulerResumed.send(self)
         else:
             logger.warning("Scheduler is not in PAUSED state and cannot be resumed.")
             return "Scheduler is not in PAUSED state and cannot be resumed."
-        return self.scheduler.state
+        return self.state
+
+    def check_lease(self):
+        """Resumes processing the jobs if this scheduler holds or takes the leader lease, and pauses it otherwise. A
+            leader which was already processing the jobs is woken up, so that it picks up the jobs added by the other
+            schedulers.
+
+        Returns:
+            (bool): Whether this scheduler processes the jobs
+        """
+        if self.scheduler.state == STATE_STOPPED or self._paused:
+            return False
+        if self.lease is None or self.lease.renew():
+            if self.scheduler.state == STATE_PAUSED:
+                self.scheduler.resume()
+            else:
+                self.scheduler.wakeup()
+            return True
+        if self.scheduler.state == STATE_RUNNING:
+            self.scheduler.pause()
+        return False
+
+    def __check_lease_periodically(self):
+        while True:
+            gevent.sleep(self.lease_check_seconds)
+            try:
+                self.check_lease()
+            except Exception:
+                logger.exception('Could not check the scheduler leader lease')
 
     def pause_workflows(self, task_id, workflow_execution_ids):
         """
@@ -256,10 +580,10 @@ class Scheduler(object):
                 logger.warning('Cannot resume scheduled workflow {}. Workflow ID not found'.format(job_id))
 
     def __scheduler_listener(self):
+        # The APScheduler is paused and resumed as this scheduler loses and takes the leader lease, so the pause and
+        # resume events are sent by pause() and resume() instead
         event_selector_map = {EVENT_SCHEDULER_START: WalkoffEvent.SchedulerStart,
                               EVENT_SCHEDULER_SHUTDOWN: WalkoffEvent.SchedulerShutdown,
-                              EVENT_SCHEDULER_PAUSED: WalkoffEvent.SchedulerPaused,
-                              EVENT_SCHEDULER_RESUMED: WalkoffEvent.SchedulerResumed,
                               EVENT_JOB_ADDED: WalkoffEvent.SchedulerJobAdded,
                               EVENT_JOB_REMOVED: WalkoffEvent.SchedulerJobRemoved,
                               EVENT_JOB_EXECUTED: WalkoffEvent.SchedulerJobExecuted,
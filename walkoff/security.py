@@ -9,11 +9,11 @@ from flask_jwt_extended.exceptions import NoAuthorizationError
 from flask_jwt_extended.tokens import decode_jwt
 from flask_jwt_extended.view_decorators import _load_user
 
-import walkoff.serverdb
 from walkoff.extensions import jwt
 from walkoff.server.returncodes import FORBIDDEN_ERROR
 from walkoff.server.returncodes import UNAUTHORIZED_ERROR
 from walkoff.serverdb import User
+from walkoff.serverdb.permissionmap import permission_map
 from walkoff.serverdb.tokens import is_token_revoked
 
 try:
@@ -31,7 +31,7 @@ def is_token_blacklisted(decoded_token):
 
 @jwt.user_claims_loader
 def add_claims_to_access_token(user_id):
-    user = User.query.filter(User.id == user_id).first()
+    user = User.query.get(user_id)
     return {'roles': [role.id for role in user.roles], 'username': user.username} if user is not None else {}
 
 
@@ -65,7 +65,7 @@ def _permissions_decorator(resource_permissions, all_required=False):
         def decorated_view(*args, **kwargs):
             _roles_accepted = set()
             for resource_permission in resource_permissions:
-                _roles_accepted |= walkoff.serverdb.get_roles_by_resource_permissions(resource_permission)
+                _roles_accepted |= permission_map.get_roles(resource_permission)
             if user_has_correct_roles(_roles_accepted, all_required=all_required):
                 return fn(*args, **kwargs)
             return "Unauthorized View", FORBIDDEN_ERROR
@@ -15,6 +15,7 @@ from walkoff.extensions import db, jwt
 from walkoff.helpers import import_submodules
 from walkoff.server import context
 from walkoff.server.blueprints import custominterface, workflowresults, notifications, console, root
+from walkoff.server.endpoints import workflowqueue
 
 logger = logging.getLogger(__name__)
 
@@ -110,6 +111,7 @@ def create_app(interface_app=False):
     if not interface_app:
         jwt.init_app(_app)
         connexion_app.add_api('composed_api.yaml')
+        _app.before_request(workflowqueue.check_workflow_batch_stream)
         _app.running_context = context.Context()
         register_blueprints(_app, walkoff.config.Config.SEPARATE_INTERFACES)
         register_swagger_blueprint(_app)
@@ -1,9 +1,14 @@
+import json
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from uuid import UUID
 
 from enum import Enum, unique
 from flask import current_app, request
+from six import string_types
 
+import walkoff.config
 from walkoff.events import WalkoffEvent
 from walkoff.executiondb import ActionStatusEnum, WorkflowStatusEnum
 from walkoff.executiondb.workflowresults import WorkflowStatus
@@ -24,6 +29,130 @@ workflowresults_page = StreamableBlueprint(
 )
 
 action_summary_keys = ('action_name', 'app_name', 'action_id', 'name', 'timestamp', 'workflow_execution_id')
+action_projection_args = ('apps', 'actions', 'statuses', 'include_result', 'max_result_size_kb')
+
+_result_encoder = json.JSONEncoder()
+
+
+class WorkflowMetadataCache(object):
+    """In-memory cache of the metadata of executing workflows used to format the workflow stream events.
+
+    Entries are created when a workflow execution is pending or a batch of executions is created, updated as actions
+    are started, and evicted when the workflow execution is completed or aborted. This keeps the stream callbacks from
+    needing to query the execution database. Executions unknown to this process, such as those executed before a
+    restart, are loaded from their WorkflowStatus once, and executions with no WorkflowStatus are remembered as
+    missing. The least recently used entries are evicted once there are more than WORKFLOW_METADATA_CACHE_SIZE of
+    them, so executions whose terminal event never arrives do not accumulate.
+
+    Attributes:
+        _entries (OrderedDict{str: dict}): A lookup of workflow execution ID to the metadata of that execution, or to
+            None if the execution has no workflow status, from least to most recently used
+        _lock (Lock): The lock used to synchronize access to the entries
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, execution_id, workflow_id, name, user=None):
+        """Adds an entry for a workflow execution. If one already exists (the workflow is being resumed), it is kept
+
+        Args:
+            execution_id (UUID|str): The execution ID of the workflow
+            workflow_id (UUID|str): The ID of the workflow
+            name (str): The name of the workflow
+            user (str, optional): The user who executed the workflow. Defaults to None
+        """
+        self.add_many([execution_id], workflow_id, name, user=user)
+
+    def add_many(self, execution_ids, workflow_id, name, user=None):
+        """Adds entries for several executions of a workflow, such as those of a batch
+
+        Args:
+            execution_ids (iterable(UUID|str)): The execution IDs of the workflow
+            workflow_id (UUID|str): The ID of the workflow
+            name (str): The name of the workflow
+            user (str, optional): The user who executed the workflow. Defaults to None
+        """
+        with self._lock:
+            for execution_id in execution_ids:
+                entry = {'workflow_id': str(workflow_id), 'name': name}
+                if user:
+                    entry['user'] = user
+                self._store(str(execution_id), entry)
+
+    def set_current_action(self, execution_id, current_action):
+        """Sets the current action of a workflow execution
+
+        Args:
+            execution_id (UUID|str): The execution ID of the workflow
+            current_action (dict): The summary JSON of the action currently executing
+        """
+        entry = self._get_entry(str(execution_id))
+        if entry is not None:
+            with self._lock:
+                entry['current_action'] = current_action
+
+    def get(self, execution_id):
+        """Gets a copy of the metadata of a workflow execution
+
+        Args:
+            execution_id (UUID|str): The execution ID of the workflow
+
+        Returns:
+            (dict): The metadata of the workflow execution, or None if the execution has no workflow status
+        """
+        entry = self._get_entry(str(execution_id))
+        if entry is None:
+            return None
+        with self._lock:
+            return dict(entry)
+
+    def _get_entry(self, execution_id):
+        with self._lock:
+            if execution_id in self._entries:
+                entry = self._entries.pop(execution_id)
+                self._entries[execution_id] = entry
+                return entry
+
+        workflow_status = current_app.running_context.execution_db.session.query(WorkflowStatus).filter_by(
+            execution_id=execution_id).first()
+        entry = None
+        if workflow_status is not None:
+            entry = {'workflow_id': str(workflow_status.workflow_id), 'name': workflow_status.name}
+            if workflow_status.user:
+                entry['user'] = workflow_status.user
+            if workflow_status.current_action and workflow_status.status not in (WorkflowStatusEnum.completed,
+                                                                                 WorkflowStatusEnum.aborted):
+                entry['current_action'] = json.loads(workflow_status.current_action)
+        with self._lock:
+            self._store(execution_id, entry)
+            return self._entries.get(execution_id, entry)
+
+    def _store(self, execution_id, entry):
+        if self._entries.get(execution_id) is not None:
+            return
+        self._entries.pop(execution_id, None)
+        self._entries[execution_id] = entry
+        while len(self._entries) > walkoff.config.Config.WORKFLOW_METADATA_CACHE_SIZE:
+            self._entries.popitem(last=False)
+
+    def evict(self, execution_id):
+        """Removes the metadata of a workflow execution
+
+        Args:
+            execution_id (UUID|str): The execution ID of the workflow
+        """
+        with self._lock:
+            self._entries.pop(str(execution_id), None)
+
+    def clear(self):
+        """Removes all cached metadata"""
+        with self._lock:
+            self._entries.clear()
+
+
+workflow_metadata = WorkflowMetadataCache()
 
 
 @unique
@@ -52,14 +181,153 @@ def format_action_data_with_results(sender, kwargs, status):
     action_result = kwargs['data']['data']['result']
     with current_app.app_context():
         max_len = current_app.config['MAX_STREAM_RESULTS_SIZE_KB'] * 1024
-    result_str = str(action_result)
-    if len(result_str) > max_len:
-        result['result'] = {'truncated': result_str[:max_len]}
-    else:
-        result['result'] = action_result
+    result['result'] = truncate_result(action_result, max_len)
     return result
 
 
+def truncate_result(action_result, max_len):
+    """Truncates the result of an action if its size exceeds a limit
+
+    The size of the result is measured by lazily encoding it to JSON, so at most max_len characters of a large result
+    are ever serialized.
+
+    Args:
+        action_result: The result of the action
+        max_len (int): The maximum size of the result in characters
+
+    Returns:
+        The result if it is within the limit, otherwise a dict of {'truncated': the first max_len characters}
+    """
+    if isinstance(action_result, string_types):
+        return {'truncated': action_result[:max_len]} if len(action_result) > max_len else action_result
+    chunks = []
+    length = 0
+    try:
+        for chunk in _result_encoder.iterencode(action_result):
+            chunks.append(chunk)
+            length += len(chunk)
+            if length > max_len:
+                return {'truncated': ''.join(chunks)[:max_len]}
+    except (TypeError, ValueError):
+        result_str = str(action_result)
+        return {'truncated': result_str[:max_len]} if len(result_str) > max_len else action_result
+    return action_result
+
+
+class ActionStreamProjection(object):
+    """A filter and projection of the action results stream requested by a class of subscribers
+
+    Attributes:
+        apps (frozenset(str)): The names of the apps whose actions should be sent. None if all apps should be sent
+        actions (frozenset(str)): The names of the actions which should be sent. None if all actions should be sent
+        statuses (frozenset(str)): The names of the statuses which should be sent. None if all statuses should be sent
+        summary (bool): Should only the summary of the actions be sent?
+        include_result (bool): Should the result of the actions be sent?
+        max_result_size (int): The maximum size of the results to send in characters. None if there is no limit
+            beyond the MAX_STREAM_RESULTS_SIZE_KB of the server
+        key (tuple): The hashable key which uniquely identifies this projection
+
+    Args:
+        apps (iterable(str), optional): The names of the apps whose actions should be sent. Defaults to all apps
+        actions (iterable(str), optional): The names of the actions which should be sent. Defaults to all actions
+        statuses (iterable(str), optional): The names of the statuses which should be sent. Defaults to all statuses
+        summary (bool, optional): Should only the summary of the actions be sent? Defaults to False
+        include_result (bool, optional): Should the result of the actions be sent? Defaults to True
+        max_result_size (int, optional): The maximum size of the results to send in characters. Defaults to None
+    """
+    __slots__ = ['apps', 'actions', 'statuses', 'summary', 'include_result', 'max_result_size', 'key']
+
+    def __init__(self, apps=None, actions=None, statuses=None, summary=False, include_result=True,
+                 max_result_size=None):
+        self.apps = frozenset(apps) if apps else None
+        self.actions = frozenset(actions) if actions else None
+        self.statuses = frozenset(statuses) if statuses else None
+        self.summary = summary
+        self.include_result = include_result and not summary
+        self.max_result_size = max_result_size if self.include_result else None
+        self.key = (
+            tuple(sorted(self.apps)) if self.apps else None,
+            tuple(sorted(self.actions)) if self.actions else None,
+            tuple(sorted(self.statuses)) if self.statuses else None,
+            self.summary,
+            self.include_result,
+            self.max_result_size)
+
+    @classmethod
+    def from_request_args(cls, args):
+        """Creates a projection from the query arguments of a stream request
+
+        Args:
+            args (dict): The query arguments. The apps, actions, and statuses arguments are comma-separated lists,
+                summary and include_result are booleans, and max_result_size_kb is a non-negative integer
+
+        Returns:
+            (ActionStreamProjection): The projection, or None if no projection arguments were provided
+
+        Raises:
+            ValueError: If any of the arguments are invalid
+        """
+        if not any(arg in args for arg in action_projection_args):
+            return None
+
+        def split_arg(name):
+            value = args.get(name)
+            return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+        statuses = split_arg('statuses')
+        if statuses:
+            invalid_statuses = [status for status in statuses if status not in ActionStatusEnum.__members__]
+            if invalid_statuses:
+                raise ValueError('Invalid statuses {}'.format(invalid_statuses))
+
+        max_result_size = None
+        if args.get('max_result_size_kb'):
+            try:
+                max_result_size = int(args['max_result_size_kb']) * 1024
+            except ValueError:
+                raise ValueError('max_result_size_kb must be an integer')
+            if max_result_size < 0:
+                raise ValueError('max_result_size_kb must not be negative')
+
+        return cls(
+            apps=split_arg('apps'),
+            actions=split_arg('actions'),
+            statuses=statuses,
+            summary=_is_true(args.get('summary')),
+            include_result=not _is_false(args.get('include_result')),
+            max_result_size=max_result_size)
+
+    def __call__(self, data, event):
+        """Filters and projects an event of the action results stream
+
+        Args:
+            data (dict): The data of the event
+            event (str): The name of the event
+
+        Returns:
+            (tuple(dict, str)): The projected data and event, or None if the event should not be sent
+        """
+        if ((self.apps is not None and data.get('app_name') not in self.apps)
+                or (self.actions is not None and data.get('action_name') not in self.actions)
+                or (self.statuses is not None and data.get('status') not in self.statuses)):
+            return None
+        if self.summary:
+            return {key: data[key] for key in action_summary_keys if key in data}, event
+        if not self.include_result:
+            data.pop('result', None)
+        elif self.max_result_size is not None and 'result' in data:
+            data['result'] = truncate_result(data['result'], self.max_result_size)
+        return data, event
+
+
+def _is_true(value):
+    return bool(value) and not _is_false(value)
+
+
+def _is_false(value):
+    return value is not None and value.lower() in ('false', '0', 'no')
+
+
 def format_action_return(data, event):
     return data, (data['workflow_execution_id'], 'all'), event
 
@@ -78,6 +346,9 @@ def push_to_action_summary_stream(data, event):
 @WalkoffEvent.ActionStarted.connect
 def action_started_callback(sender, **kwargs):
     data = format_action_data(sender, kwargs, ActionStatusEnum.executing)
+    workflow_metadata.set_current_action(
+        data['workflow_execution_id'],
+        {key: data[key] for key in ('execution_id', 'action_id', 'name', 'app_name', 'action_name')})
     push_to_action_stream(data, ActionStreamEvent.started.name)
     push_to_action_summary_stream(data, ActionStreamEvent.started.name)
 
@@ -117,37 +388,25 @@ class WorkflowStreamEvent(Enum):
 
 
 def format_workflow_result(sender, status):
-    workflow_status = current_app.running_context.execution_db.session.query(WorkflowStatus).filter_by(
-        execution_id=sender['execution_id']).first()
-    if workflow_status is not None:
-        return {'execution_id': str(sender['execution_id']),
-                'workflow_id': str(sender['id']),
-                'name': sender['name'],
-                'status': status.name,
-                'timestamp': utc_as_rfc_datetime(datetime.utcnow()),
-                'user': workflow_status.user}
-    return {'execution_id': str(sender['execution_id']),
-            'workflow_id': str(sender['id']),
-            'name': sender['name'],
-            'status': status.name,
-            'timestamp': utc_as_rfc_datetime(datetime.utcnow())}
+    ret = {'execution_id': str(sender['execution_id']),
+           'workflow_id': str(sender['id']),
+           'name': sender['name'],
+           'status': status.name,
+           'timestamp': utc_as_rfc_datetime(datetime.utcnow())}
+    metadata = workflow_metadata.get(sender['execution_id'])
+    if metadata is not None and 'user' in metadata:
+        ret['user'] = metadata['user']
+    return ret
 
 
 def format_workflow_result_with_current_step(workflow_execution_id, status):
-    workflow_status = current_app.running_context.execution_db.session.query(WorkflowStatus).filter_by(
-        execution_id=workflow_execution_id).first()
-    if workflow_status is not None:
-        status_json = workflow_status.as_json()
-        for field in (field for field in list(status_json.keys())
-                      if field not in ('execution_id', 'workflow_id', 'name', 'status', 'current_action', 'user')):
-            status_json.pop(field)
-        status_json['timestamp'] = utc_as_rfc_datetime(datetime.utcnow())
-        status_json['status'] = status.name  # in case this callback is called before it is properly set in the database
-        return status_json
-    return {
-        'execution_id': str(workflow_execution_id),
-        'timestamp': utc_as_rfc_datetime(datetime.utcnow()),
-        'status': status.name}
+    ret = {'execution_id': str(workflow_execution_id),
+           'timestamp': utc_as_rfc_datetime(datetime.utcnow()),
+           'status': status.name}
+    metadata = workflow_metadata.get(workflow_execution_id)
+    if metadata is not None:
+        ret.update(metadata)
+    return ret
 
 
 def format_workflow_return(data):
@@ -157,6 +416,8 @@ def format_workflow_return(data):
 @WalkoffEvent.WorkflowExecutionPending.connect
 @workflow_stream.push(WorkflowStreamEvent.queued.name)
 def workflow_pending_callback(sender, **kwargs):
+    user = kwargs['data'].get('user') if kwargs.get('data') else None
+    workflow_metadata.add(sender['execution_id'], sender['id'], sender['name'], user=user)
     data = format_workflow_result(sender, WorkflowStatusEnum.pending)
     return format_workflow_return(data)
 
@@ -193,7 +454,7 @@ def trigger_awaiting_data_workflow_callback(sender, **kwargs):
 @WalkoffEvent.TriggerActionTaken.connect
 @workflow_stream.push(WorkflowStreamEvent.triggered.name)
 def trigger_action_taken_callback(sender, **kwargs):
-    workflow_execution_id = kwargs['data']['workflow_execution_id']
+    workflow_execution_id = kwargs['data']['workflow']['execution_id']
     data = format_workflow_result_with_current_step(workflow_execution_id, WorkflowStatusEnum.pending)
     return format_workflow_return(data)
 
@@ -202,6 +463,7 @@ def trigger_action_taken_callback(sender, **kwargs):
 @workflow_stream.push(WorkflowStreamEvent.aborted.name)
 def workflow_aborted_callback(sender, **kwargs):
     data = format_workflow_result(sender, WorkflowStatusEnum.aborted)
+    workflow_metadata.evict(sender['execution_id'])
     return format_workflow_return(data)
 
 
@@ -209,6 +471,7 @@ def workflow_aborted_callback(sender, **kwargs):
 @workflow_stream.push(WorkflowStreamEvent.completed.name)
 def workflow_shutdown_callback(sender, **kwargs):
     data = format_workflow_result(sender, WorkflowStatusEnum.completed)
+    workflow_metadata.evict(sender['execution_id'])
     return format_workflow_return(data)
 
 
@@ -224,6 +487,12 @@ def stream_workflow_action_events():
                 BAD_REQUEST,
                 'Could not connect to action results stream',
                 'workflow_execution_id must be a valid UUID')
+    try:
+        projection = ActionStreamProjection.from_request_args(request.args)
+    except ValueError as e:
+        return Problem(BAD_REQUEST, 'Could not connect to action results stream', str(e))
+    if projection is not None:
+        return action_stream.stream(subchannel=workflow_execution_id, projection=projection)
     if request.args.get('summary'):
         return action_summary_stream.stream(subchannel=workflow_execution_id)
     else:
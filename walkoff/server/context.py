@@ -6,6 +6,7 @@ from sqlalchemy.exc import OperationalError
 import walkoff.cache
 import walkoff.config
 import walkoff.executiondb
+import walkoff.executiondb.retention
 import walkoff.scheduler
 
 logger = logging.getLogger(__name__)
@@ -31,12 +32,16 @@ class Context(object):
                              "correct and try again. Error Message: {}".format(str(e)))
             os._exit(1)
 
+        self.retention = walkoff.executiondb.retention.RetentionManager(self.execution_db, walkoff.config.Config)
+
         if init_all:
             self.cache = walkoff.cache.make_cache(walkoff.config.Config.CACHE)
             if executor:
                 import walkoff.multiprocessedexecutor.multiprocessedexecutor as executor
+                from walkoff.multiprocessedexecutor.admission import AdmissionController
                 self.executor = executor.MultiprocessedExecutor(self.cache, walkoff.config.Config)
-                self.scheduler = walkoff.scheduler.Scheduler()
+                self.admission = AdmissionController(self.cache, self.execution_db)
+                self.scheduler = walkoff.scheduler.Scheduler(self.execution_db, self.cache)
 
     def inject_app(self, app):
         self.scheduler.app = app
@@ -17,7 +17,7 @@ def get_all_messages():
     @permissions_accepted_for_resources(ResourcePermissions('messages', ['read']))
     def __func():
         user_id = get_jwt_identity()
-        user = User.query.filter(User.id == user_id).first()
+        user = User.query.get(user_id)
 
         page = request.args.get('page', 1, type=int)
         messages = user.messages[
@@ -34,7 +34,7 @@ def get_message(message_id):
     @permissions_accepted_for_resources(ResourcePermissions('messages', ['read']))
     def __func():
         user_id = get_jwt_identity()
-        user = User.query.filter(User.id == user_id).first()
+        user = User.query.get(user_id)
         message = Message.query.filter(Message.id == message_id).first()
         if message is None:
             return Problem(OBJECT_DNE_ERROR, 'Cannot read message.', 'Message {} does not exist.'.format(message_id))
@@ -83,7 +83,7 @@ def act_on_message_helper(action):
     from walkoff.messaging import MessageAction, MessageActionEvent
 
     user_id = get_jwt_identity()
-    user = User.query.filter(User.id == user_id).first()
+    user = User.query.get(user_id)
     if user is None:
         return Problem(
             OBJECT_DNE_ERROR,
@@ -104,7 +104,7 @@ def get_recent_notifications():
     @permissions_accepted_for_resources(ResourcePermissions('messages', ['read']))
     def __func():
         user_id = get_jwt_identity()
-        user = User.query.filter(User.id == user_id).first()
+        user = User.query.get(user_id)
         # This should probably be replaced by a better SqlAlchemy command!
         unread_messages = []
         read_messages = []
@@ -24,6 +24,15 @@ def read_workflow_metrics():
     return __func()
 
 
+def read_admission_metrics():
+    @jwt_required
+    @permissions_accepted_for_resources(ResourcePermissions('metrics', ['read']))
+    def __func():
+        return current_app.running_context.admission.get_metrics(), SUCCESS
+
+    return __func()
+
+
 def _convert_action_time_averages():
     app_metrics = current_app.running_context.execution_db.session.query(AppMetric).all()
     return {"apps": [app_metric.as_json() for app_metric in app_metrics]}
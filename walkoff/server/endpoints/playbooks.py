@@ -2,17 +2,18 @@ import json
 from io import BytesIO
 from uuid import uuid4
 
-from flask import request, current_app, send_file
+from flask import request, current_app, send_file, Response, stream_with_context
 from flask_jwt_extended import jwt_required
 from marshmallow import ValidationError
 from sqlalchemy import exists, and_
 from sqlalchemy.exc import IntegrityError, StatementError
 
+import walkoff.config
 from walkoff.appgateway.apiutil import UnknownApp, UnknownFunction, InvalidArgument
+from walkoff.executiondb.bulk import PlaybookImporter, WorkflowCopier, iter_json_documents
 from walkoff.executiondb.playbook import Playbook
 from walkoff.executiondb.schemas import PlaybookSchema, WorkflowSchema
 from walkoff.executiondb.workflow import Workflow
-from walkoff.helpers import regenerate_workflow_ids
 from walkoff.helpers import strip_device_ids, strip_argument_ids
 from walkoff.security import permissions_accepted_for_resources, ResourcePermissions
 from walkoff.server.decorators import with_resource_factory, validate_resource_exists_factory, is_valid_uid
@@ -197,28 +198,17 @@ def copy_playbook(playbook_id):
         else:
             new_playbook_name = playbook.name + "_Copy"
 
-        playbook_json = playbook_schema.dump(playbook)
-        playbook_json['name'] = new_playbook_name
-        playbook_json.pop('id')
-
-        if 'workflows' in playbook_json:
-            for workflow in playbook_json['workflows']:
-                workflow.pop('is_valid', None)
-                regenerate_workflow_ids(workflow)
-
+        session = current_app.running_context.execution_db.session
         try:
-            new_playbook = playbook_schema.load(playbook_json)
-            current_app.running_context.execution_db.session.add(new_playbook)
-            current_app.running_context.execution_db.session.commit()
+            copier = WorkflowCopier(session, walkoff.config.Config.PLAYBOOK_IMPORT_BATCH_SIZE)
+            new_playbook_id = copier.copy_playbook(playbook.id, new_playbook_name)
+            session.commit()
         except IntegrityError:
-            current_app.running_context.execution_db.session.rollback()
+            session.rollback()
             current_app.logger.error('Could not copy Playbook {}. Unique constraint failed'.format(playbook_id))
             return unique_constraint_problem('playbook', 'copy', playbook_id)
-        except ValueError:
-            current_app.running_context.execution_db.session.rollback()
-            current_app.logger.error('Could not copy Playbook {}. Invalid input'.format(playbook_id))
-            return improper_json_problem('playbook', 'copy', playbook_id)
 
+        new_playbook = session.query(Playbook).filter_by(id=new_playbook_id).first()
         current_app.logger.info('Copied playbook {0} to {1}'.format(playbook_id, new_playbook_name))
 
         return playbook_schema.dump(new_playbook), OBJECT_CREATED
@@ -226,6 +216,66 @@ def copy_playbook(playbook_id):
     return __func()
 
 
+def import_playbooks(regenerate_ids=None):
+    @jwt_required
+    @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['create']))
+    def __func():
+        if not request.files or 'file' not in request.files:
+            return Problem(BAD_REQUEST, 'Could not import playbooks.', 'No file was provided.')
+        f = request.files['file']
+        session = current_app.running_context.execution_db.session
+        importer = PlaybookImporter(session, walkoff.config.Config.PLAYBOOK_IMPORT_BATCH_SIZE,
+                                    regenerate_ids=bool(regenerate_ids))
+        try:
+            for playbook_json in iter_json_documents(f.stream):
+                importer.add_playbook(playbook_json)
+            importer.flush()
+            session.commit()
+        except ValueError as e:
+            session.rollback()
+            current_app.logger.error('Could not import playbooks from {}. Invalid input'.format(f.filename))
+            return improper_json_problem('playbooks', 'import', f.filename, [str(e)])
+        except (IntegrityError, StatementError):
+            session.rollback()
+            current_app.logger.error('Could not import playbooks from {}. Unique constraint failed'.format(f.filename))
+            return unique_constraint_problem('playbooks', 'import', f.filename)
+
+        current_app.logger.info('Imported {} playbooks ({} rows) from {}'.format(
+            len(importer.playbooks), importer.rows_inserted, f.filename))
+        return {'playbooks': importer.playbooks}, OBJECT_CREATED
+
+    return __func()
+
+
+def export_playbooks():
+    @jwt_required
+    @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['read']))
+    def __func():
+        session = current_app.running_context.execution_db.session
+        playbook_ids = [playbook_id for playbook_id, in session.query(Playbook.id).order_by(Playbook.name)]
+
+        def stream_playbooks():
+            yield '['
+            separator = ''
+            for playbook_id in playbook_ids:
+                playbook = session.query(Playbook).filter_by(id=playbook_id).first()
+                if playbook is None:
+                    continue
+                playbook_json = playbook_schema.dump(playbook)
+                strip_device_ids(playbook_json)
+                strip_argument_ids(playbook_json)
+                yield separator + json.dumps(playbook_json, sort_keys=True)
+                separator = ','
+                session.expunge_all()
+            yield ']'
+
+        response = Response(stream_with_context(stream_playbooks()), mimetype='application/json')
+        response.headers['Content-Disposition'] = 'attachment; filename=playbooks.json'
+        return response, SUCCESS
+
+    return __func()
+
+
 def get_workflows(playbook=None):
     @jwt_required
     @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['read']))
@@ -356,17 +406,8 @@ def copy_workflow(playbook_id, workflow_id):
         else:
             new_workflow_name = workflow.name + "_Copy"
 
-        workflow_json = workflow_schema.dump(workflow)
-        workflow_json.pop('id')
-        workflow_json.pop('is_valid', None)
-        workflow_json['name'] = new_workflow_name
-
-        regenerate_workflow_ids(workflow_json)
-        if current_app.running_context.execution_db.session.query(exists().where(Playbook.id == playbook_id)).scalar():
-            playbook = current_app.running_context.execution_db.session.query(Playbook).filter_by(
-                id=playbook_id).first()
-        else:
-            current_app.running_context.execution_db.session.rollback()
+        session = current_app.running_context.execution_db.session
+        if not session.query(exists().where(Playbook.id == playbook_id)).scalar():
             current_app.logger.error('Could not copy workflow {}. Playbook does not exist'.format(playbook_id))
             return Problem.from_crud_resource(
                 OBJECT_DNE_ERROR,
@@ -375,17 +416,15 @@ def copy_workflow(playbook_id, workflow_id):
                 'Could not copy workflow {}. Playbook with id {} does not exist.'.format(workflow_id, playbook_id))
 
         try:
-
-            new_workflow = workflow_schema.load(workflow_json)
-
-            current_app.running_context.execution_db.session.add(new_workflow)
-            playbook.add_workflow(new_workflow)
-            current_app.running_context.execution_db.session.commit()
+            copier = WorkflowCopier(session, walkoff.config.Config.PLAYBOOK_IMPORT_BATCH_SIZE)
+            new_workflow_id = copier.copy_workflow(workflow.id, playbook_id, new_workflow_name)
+            session.commit()
         except IntegrityError:
-            current_app.running_context.execution_db.session.rollback()
+            session.rollback()
             current_app.logger.error('Could not copy workflow {}. Unique constraint failed'.format(new_workflow_name))
             return unique_constraint_problem('workflow', 'copy', new_workflow_name)
 
+        new_workflow = session.query(Workflow).filter_by(id=new_workflow_id).first()
         current_app.logger.info('Workflow {0} copied to {1}'.format(workflow_id, new_workflow.id))
         return workflow_schema.dump(new_workflow), OBJECT_CREATED
 
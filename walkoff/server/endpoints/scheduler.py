@@ -28,7 +28,7 @@ def get_scheduler_status():
     @jwt_required
     @permissions_accepted_for_resources(ResourcePermissions('scheduler', ['read']))
     def __func():
-        return {"status": current_app.running_context.scheduler.scheduler.state}, SUCCESS
+        return {"status": current_app.running_context.scheduler.state}, SUCCESS
 
     return __func()
 
@@ -38,7 +38,7 @@ def update_scheduler_status():
     @permissions_accepted_for_resources(ResourcePermissions('scheduler', ['update', 'execute']))
     def __func():
         status = request.get_json()['status']
-        updated_status = current_app.running_context.scheduler.scheduler.state
+        updated_status = current_app.running_context.scheduler.state
         if status == "start":
             updated_status = current_app.running_context.scheduler.start()
             current_app.logger.info('Scheduler started. Status {0}'.format(updated_status))
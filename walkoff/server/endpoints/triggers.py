@@ -1,51 +1,101 @@
 from flask import request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt_claims
+from sqlalchemy.orm import selectinload
 
 from walkoff.executiondb.argument import Argument
 from walkoff.messaging.utils import log_action_taken_on_message
 from walkoff.security import permissions_accepted_for_resources, ResourcePermissions
+from walkoff.server.decorators import is_valid_uid
+from walkoff.server.problem import Problem
 from walkoff.server.returncodes import *
 from walkoff.serverdb.message import Message
 
+_query_chunk_size = 500
+
 
 def send_data_to_trigger():
     @jwt_required
     @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['execute']))
     def __func():
         data = request.get_json()
-        workflows_in = set(data['execution_ids'])
         data_in = data['data_in']
         arguments = data['arguments'] if 'arguments' in data else []
+        workflow_id = data.get('workflow_id')
+        action_id = data.get('action_id')
+        if 'execution_ids' not in data and workflow_id is None:
+            return Problem(BAD_REQUEST, 'Could not send data to triggers.',
+                           'Either execution_ids or workflow_id must be specified')
+        if not is_valid_uid(*[id_ for id_ in (workflow_id, action_id) if id_ is not None]):
+            return Problem(BAD_REQUEST, 'Could not send data to triggers.', 'Invalid workflow_id or action_id')
 
-        workflows_awaiting_data = set(current_app.running_context.executor.get_waiting_workflows())
-        execution_ids = set.intersection(workflows_in, workflows_awaiting_data)
+        execution_ids = None
+        if 'execution_ids' in data:
+            execution_ids = {execution_id for execution_id in data['execution_ids'] if is_valid_uid(execution_id)}
+        execution_ids = current_app.running_context.executor.get_waiting_workflows(
+            execution_ids=execution_ids, workflow_id=workflow_id, action_id=action_id)
 
         user_id = get_jwt_identity()
         authorization_not_required, authorized_execution_ids = get_authorized_execution_ids(
             execution_ids, user_id, get_jwt_claims().get('roles', []))
         execution_ids = list(authorized_execution_ids | authorization_not_required)
-        completed_execution_ids = []
 
         arg_objects = []
         for arg in arguments:
             arg_objects.append(Argument(**arg))
 
-        for execution_id in execution_ids:
-            if current_app.running_context.executor.resume_trigger_step(execution_id, data_in, arg_objects,
-                                                                        user=get_jwt_claims().get('username', None)):
-                completed_execution_ids.append(execution_id)
-                log_action_taken_on_message(user_id, execution_id)
+        sent_execution_ids = current_app.running_context.executor.resume_trigger_steps(
+            execution_ids, data_in, arg_objects, user=get_jwt_claims().get('username', None))
+        for execution_id in set(sent_execution_ids) & authorized_execution_ids:
+            log_action_taken_on_message(user_id, execution_id)
+
+        return sent_execution_ids, SUCCESS
+
+    return __func()
+
+
+def send_events_to_triggers():
+    @jwt_required
+    @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['execute']))
+    def __func():
+        data = request.get_json()
+        events = data['events']
+        arguments = data['arguments'] if 'arguments' in data else []
+        workflow_id = data.get('workflow_id')
+        action_id = data.get('action_id')
+        if not is_valid_uid(*[id_ for id_ in (workflow_id, action_id) if id_ is not None]):
+            return Problem(BAD_REQUEST, 'Could not send events to triggers.', 'Invalid workflow_id or action_id')
+
+        execution_ids = current_app.running_context.executor.get_waiting_workflows(workflow_id=workflow_id,
+                                                                                  action_id=action_id)
+        user_id = get_jwt_identity()
+        authorization_not_required, authorized_execution_ids = get_authorized_execution_ids(
+            execution_ids, user_id, get_jwt_claims().get('roles', []))
+        execution_ids = list(authorized_execution_ids | authorization_not_required)
 
-        return completed_execution_ids, SUCCESS
+        arg_objects = [Argument(**arg) for arg in arguments]
+        resumed_execution_ids, sent_execution_ids = current_app.running_context.executor.send_events_to_triggers(
+            events, execution_ids, arg_objects, user=get_jwt_claims().get('username', None))
+        for execution_id in set(resumed_execution_ids + sent_execution_ids) & authorized_execution_ids:
+            log_action_taken_on_message(user_id, execution_id)
+
+        return {'resumed': resumed_execution_ids, 'sent': sent_execution_ids}, SUCCESS
 
     return __func()
 
 
 def get_authorized_execution_ids(execution_ids, user_id, role_ids):
+    execution_ids = list(execution_ids)
+    messages = {}
+    for i in range(0, len(execution_ids), _query_chunk_size):
+        query = Message.query.options(selectinload(Message.users), selectinload(Message.roles)).filter(
+            Message.workflow_execution_id.in_(execution_ids[i:i + _query_chunk_size])).order_by(Message.id)
+        for message in query:
+            messages.setdefault(str(message.workflow_execution_id), message)
+
     authorized_execution_ids = set()
     authorization_not_required = set()
     for execution_id in execution_ids:
-        message = Message.query.filter(Message.workflow_execution_id == execution_id).first()
+        message = messages.get(str(execution_id))
         if not (message and message.requires_response):
             authorization_not_required.add(execution_id)
         elif message.requires_response and message.is_authorized(user_id, role_ids):
@@ -1,15 +1,22 @@
+import base64
 import datetime
+import json
 from collections import OrderedDict
+from io import BytesIO
+from uuid import UUID
 
 from flask import request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_claims
-from sqlalchemy import exists, and_, or_
+from six import string_types
+from sqlalchemy import exists, and_, or_, func
 
 from walkoff.executiondb.argument import Argument
 from walkoff.executiondb.environment_variable import EnvironmentVariable
+from walkoff.executiondb.retention import make_retention_policies, retainable_statuses
 from walkoff.executiondb.workflow import Workflow
 from walkoff.executiondb.workflowresults import WorkflowStatus, WorkflowStatusEnum
 from walkoff.security import permissions_accepted_for_resources, ResourcePermissions
+from walkoff.server.blueprints.workflowresults import workflow_metadata
 from walkoff.server.decorators import with_resource_factory, validate_resource_exists_factory, is_valid_uid
 from walkoff.server.problem import Problem
 from walkoff.server.returncodes import *
@@ -48,19 +55,109 @@ executing_statuses = (WorkflowStatusEnum.running, WorkflowStatusEnum.awaiting_da
 completed_statuses = (WorkflowStatusEnum.aborted, WorkflowStatusEnum.completed)
 
 
-def get_all_workflow_status():
+cursor_timestamp_format = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def encode_workflow_status_cursor(workflow_status):
+    """Encodes the position of a WorkflowStatus in the workflow status listing as an opaque cursor
+
+    Args:
+        workflow_status (WorkflowStatus): The last WorkflowStatus of a page
+
+    Returns:
+        (str): The cursor to use to get the next page
+    """
+    position = [workflow_status.status.name,
+                workflow_status.created_at.strftime(cursor_timestamp_format),
+                str(workflow_status.execution_id)]
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('utf-8')
+
+
+def decode_workflow_status_cursor(cursor):
+    """Decodes a cursor created by encode_workflow_status_cursor
+
+    Args:
+        cursor (str): The cursor
+
+    Returns:
+        (tuple(WorkflowStatusEnum, datetime, UUID)): The status, creation time, and execution ID of the last
+            WorkflowStatus of the previous page
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    try:
+        status, created_at, execution_id = json.loads(base64.urlsafe_b64decode(cursor.encode('utf-8')).decode('utf-8'))
+        return (WorkflowStatusEnum[status],
+                datetime.datetime.strptime(created_at, cursor_timestamp_format),
+                UUID(execution_id))
+    except (TypeError, ValueError, KeyError):
+        raise ValueError('Invalid cursor {}'.format(cursor))
+
+
+def parse_rfc_datetime(timestamp):
+    """Parses an RFC 3339 UTC timestamp, with or without fractional seconds
+
+    Args:
+        timestamp (str): The timestamp
+
+    Returns:
+        (datetime): The naive UTC datetime
+
+    Raises:
+        ValueError: If the timestamp is invalid
+    """
+    timestamp = timestamp.rstrip('Z')
+    for timestamp_format in (cursor_timestamp_format, '%Y-%m-%dT%H:%M:%S'):
+        try:
+            return datetime.datetime.strptime(timestamp, timestamp_format)
+        except ValueError:
+            pass
+    raise ValueError('Invalid timestamp {}'.format(timestamp))
+
+
+def get_all_workflow_status(page=None, limit=None, cursor=None, workflow_id=None, username=None, status=None,
+                            started_after=None, started_before=None):
     @jwt_required
     @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['read']))
     def __func():
-        page = request.args.get('page', 1, type=int)
-
-        ret = current_app.running_context.execution_db.session.query(WorkflowStatus). \
-            order_by(WorkflowStatus.status, WorkflowStatus.started_at.desc()). \
-            limit(current_app.config['ITEMS_PER_PAGE']). \
-            offset((page - 1) * current_app.config['ITEMS_PER_PAGE'])
-
-        ret = [workflow_status.as_json() for workflow_status in ret]
-        return ret, SUCCESS
+        page_size = limit or current_app.config['ITEMS_PER_PAGE']
+        query = current_app.running_context.execution_db.session.query(WorkflowStatus)
+
+        try:
+            if workflow_id:
+                query = query.filter(WorkflowStatus.workflow_id == UUID(workflow_id))
+            if username:
+                query = query.filter(WorkflowStatus.user == username)
+            if status:
+                query = query.filter(WorkflowStatus.status.in_([WorkflowStatusEnum[status_] for status_ in status]))
+            if started_after:
+                query = query.filter(WorkflowStatus.started_at >= parse_rfc_datetime(started_after))
+            if started_before:
+                query = query.filter(WorkflowStatus.started_at < parse_rfc_datetime(started_before))
+            if cursor:
+                last_status, last_created_at, last_execution_id = decode_workflow_status_cursor(cursor)
+                query = query.filter(or_(
+                    WorkflowStatus.status > last_status,
+                    and_(WorkflowStatus.status == last_status,
+                         or_(WorkflowStatus.created_at < last_created_at,
+                             and_(WorkflowStatus.created_at == last_created_at,
+                                  WorkflowStatus.execution_id < last_execution_id)))))
+        except (ValueError, KeyError) as e:
+            return Problem(BAD_REQUEST, 'Could not read workflow statuses.', str(e))
+
+        query = query.order_by(WorkflowStatus.status, WorkflowStatus.created_at.desc(),
+                               WorkflowStatus.execution_id.desc())
+        if page and not cursor:
+            query = query.offset((page - 1) * page_size)
+        workflow_statuses = query.limit(page_size + 1).all()
+
+        headers = {}
+        if len(workflow_statuses) > page_size:
+            workflow_statuses = workflow_statuses[:page_size]
+            headers['X-Next-Cursor'] = encode_workflow_status_cursor(workflow_statuses[-1])
+
+        return [workflow_status.as_json() for workflow_status in workflow_statuses], SUCCESS, headers
 
     return __func()
 
@@ -75,6 +172,49 @@ def get_workflow_status(execution_id):
     return __func()
 
 
+def make_start_arguments(args):
+    """Constructs the arguments to the starting action of a workflow execution
+
+    Args:
+        args (list[dict]): The JSON representations of the arguments
+
+    Returns:
+        (list[Argument]): The arguments
+
+    Raises:
+        ValueError: If any of the arguments are invalid
+    """
+    try:
+        arguments = [Argument(**arg) for arg in args]
+    except TypeError as e:
+        raise ValueError('Some arguments are invalid. Reason: {}'.format(e))
+    errors = ['Errors in argument {}: {}'.format(argument.name, argument.errors)
+              for argument in arguments if argument.errors]
+    if errors:
+        raise ValueError('Some arguments are invalid. Reason: {}'.format(errors))
+    return arguments
+
+
+def admit_executions(count=1):
+    """Checks whether admission control admits a request to execute workflows
+
+    Args:
+        count (int, optional): The number of executions requested. Defaults to 1.
+
+    Returns:
+        (tuple(AdmissionDecision, Problem)): The decision, and the Problem to return if the request is rejected
+    """
+    decision = current_app.running_context.admission.admit(count)
+    if decision.admitted:
+        return decision, None
+    return decision, Problem(
+        TOO_MANY_REQUESTS,
+        'Cannot execute workflow.',
+        'The request queues are over the {} limit. Retry after {} seconds.'.format(decision.reason,
+                                                                                    decision.retry_after),
+        headers={'Retry-After': str(decision.retry_after)})
+
+
 def execute_workflow():
     data = request.get_json()
     workflow_id = data['workflow_id']
@@ -95,29 +235,224 @@ def execute_workflow():
 
         arguments = []
         if args:
-            errors = []
-            arguments = [Argument(**arg) for arg in args]
-            for argument in arguments:
-                if argument.errors:
-                    errors.append('Errors in argument {}: {}'.format(argument.name, argument.errors))
-            if errors:
+            try:
+                arguments = make_start_arguments(args)
+            except ValueError as e:
                 current_app.logger.error('Could not execute workflow. Invalid Argument construction')
-                return Problem(
-                    INVALID_INPUT_ERROR,
-                    'Cannot execute workflow.',
-                    'Some arguments are invalid. Reason: {}'.format(errors))
+                return Problem(INVALID_INPUT_ERROR, 'Cannot execute workflow.', str(e))
+
+        not_before = None
+        if 'not_before' in data:
+            try:
+                not_before = parse_rfc_datetime(data['not_before'])
+            except ValueError as e:
+                return Problem(INVALID_INPUT_ERROR, 'Cannot execute workflow.', str(e))
+
+        # A retry of an accepted request gets its execution even if the request queues are now over a limit
+        idempotency_key = data.get('idempotency_key', request.headers.get('Idempotency-Key'))
+        if idempotency_key is not None:
+            existing_execution_id = current_app.running_context.executor.get_idempotent_execution(workflow.id,
+                                                                                                  idempotency_key)
+            if existing_execution_id is not None:
+                return {'id': existing_execution_id}, SUCCESS_ASYNC
+
+        # A delayed execution does not add to the request queues until it is due
+        bulk = False
+        if not_before is None or not_before <= datetime.datetime.utcnow():
+            admission, problem = admit_executions()
+            if problem:
+                return problem
+            bulk = admission.bulk
+
+        coalesce = data.get('coalesce', current_app.config['WORKFLOW_COALESCE_PENDING'])
 
         execution_id = current_app.running_context.executor.execute_workflow(workflow_id, start=start,
                                                                              start_arguments=arguments,
                                                                              environment_variables=env_var_objs,
                                                                              user=get_jwt_claims().get('username',
-                                                                                                       None))
+                                                                                                       None),
+                                                                             idempotency_key=idempotency_key,
+                                                                             coalesce=coalesce,
+                                                                             bulk=bulk,
+                                                                             not_before=not_before)
         current_app.logger.info('Executed workflow {0}'.format(workflow_id))
         return {'id': execution_id}, SUCCESS_ASYNC
 
     return __func()
 
 
+def read_workflow_batch_stream(stream, max_size):
+    """Reads a newline-delimited JSON request to execute a workflow in a batch. The first line is the request without
+        its argument sets, and each following line is an argument set. Reading stops at the first argument set over
+        the maximum size of a batch.
+
+    Args:
+        stream (file): The body of the request
+        max_size (int): The maximum number of argument sets
+
+    Returns:
+        (dict): The request to execute the workflow in a batch
+
+    Raises:
+        ValueError: If the request cannot be read
+    """
+    lines = (line for line in stream if line.strip())
+    try:
+        data = _read_json_line(next(lines))
+    except StopIteration:
+        raise ValueError('The request is empty')
+    if not isinstance(data, dict) or not isinstance(data.get('workflow_id'), string_types) \
+            or not is_valid_uid(data['workflow_id']):
+        raise ValueError('The first line must be an object with a valid workflow_id')
+    start = data.get('start')
+    if start is not None and (not isinstance(start, string_types) or not is_valid_uid(start)):
+        raise ValueError('The start must be a valid action ID')
+
+    data['argument_sets'] = []
+    for line in lines:
+        if len(data['argument_sets']) == max_size:
+            raise ValueError('A batch must have between 1 and {} argument sets'.format(max_size))
+        argument_set = _read_json_line(line)
+        if not isinstance(argument_set, list):
+            raise ValueError('Each argument set must be an array of arguments')
+        data['argument_sets'].append(argument_set)
+    return data
+
+
+def _read_json_line(line):
+    try:
+        return json.loads(line.decode('utf-8'))
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid JSON line. Reason: {}'.format(e))
+
+
+def execute_workflow_batch():
+    return __execute_workflow_batch(request.get_json())
+
+
+def check_workflow_batch_stream():
+    """Authenticates a newline-delimited JSON request to execute a workflow in a batch, and checks its size, before its
+        body is read. Connexion reads the whole body of a request before calling its endpoint, so this is registered
+        to run before each request.
+
+    Returns:
+        The response rejecting the request, or None if the request can be read
+    """
+    if request.mimetype != 'application/x-ndjson':
+        return None
+
+    @jwt_required
+    @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['execute']))
+    def __func():
+        max_bytes = current_app.config['WORKFLOW_BATCH_STREAM_MAX_BYTES']
+        content_length = request.content_length
+        # A body without a Content-Length is read as empty, unless the server passes on chunked bodies
+        if content_length is None and not request.environ.get('wsgi.input_terminated'):
+            return None
+        if content_length is None or content_length > max_bytes:
+            return Problem(
+                PAYLOAD_TOO_LARGE,
+                'Cannot execute workflow batch.',
+                'The request must have a Content-Length of at most {} bytes'.format(max_bytes))
+        return None
+
+    return __func()
+
+
+def execute_workflow_batch_stream():
+    @jwt_required
+    @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['execute']))
+    def __func():
+        try:
+            data = read_workflow_batch_stream(BytesIO(request.get_data()),
+                                              current_app.config['WORKFLOW_BATCH_MAX_SIZE'])
+        except ValueError as e:
+            return Problem(BAD_REQUEST, 'Cannot execute workflow batch.', str(e))
+        return __execute_workflow_batch(data)
+
+    return __func()
+
+
+def __execute_workflow_batch(data):
+    workflow_id = data['workflow_id']
+
+    @jwt_required
+    @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['execute']))
+    @with_workflow('execute', workflow_id)
+    def __func(workflow):
+        if not workflow.is_valid:
+            return Problem(INVALID_INPUT_ERROR, 'Cannot execute workflow batch', 'Workflow is invalid')
+        argument_sets = data['argument_sets']
+        max_size = current_app.config['WORKFLOW_BATCH_MAX_SIZE']
+        if not argument_sets or len(argument_sets) > max_size:
+            return Problem(
+                INVALID_INPUT_ERROR,
+                'Cannot execute workflow batch.',
+                'A batch must have between 1 and {} argument sets'.format(max_size))
+
+        env_vars = data.get('environment_variables')
+        try:
+            env_var_objs = [EnvironmentVariable(**env_var) for env_var in env_vars] if env_vars else []
+        except TypeError as e:
+            return Problem(INVALID_INPUT_ERROR, 'Cannot execute workflow batch.',
+                           'Some environment variables are invalid. Reason: {}'.format(e))
+
+        try:
+            argument_sets = [make_start_arguments(args) for args in argument_sets]
+        except ValueError as e:
+            current_app.logger.error('Could not execute workflow batch. Invalid Argument construction')
+            return Problem(INVALID_INPUT_ERROR, 'Cannot execute workflow batch.', str(e))
+
+        admission, problem = admit_executions(len(argument_sets))
+        if problem:
+            return problem
+
+        user = get_jwt_claims().get('username', None)
+        batch_id, execution_ids = current_app.running_context.executor.execute_workflow_batch(
+            workflow_id, argument_sets, start=data.get('start'), environment_variables=env_var_objs, user=user,
+            bulk=admission.bulk)
+        workflow_metadata.add_many(execution_ids, workflow_id, workflow.name, user=user)
+        current_app.logger.info('Executed workflow {0} {1} times in batch {2}'.format(
+            workflow_id, len(execution_ids), batch_id))
+        return {'batch_id': batch_id, 'execution_ids': execution_ids}, SUCCESS_ASYNC
+
+    return __func()
+
+
+def get_workflow_batch_status(batch_id):
+    @jwt_required
+    @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['read']))
+    def __func():
+        counts = dict(current_app.running_context.execution_db.session.query(
+            WorkflowStatus.status, func.count(WorkflowStatus.execution_id)).filter(
+            WorkflowStatus.batch_id == UUID(batch_id)).group_by(WorkflowStatus.status).all())
+        if not counts:
+            return Problem.from_crud_resource(
+                OBJECT_DNE_ERROR,
+                'workflow batch',
+                'read',
+                'Workflow batch {} does not exist.'.format(batch_id))
+        statuses = {status.name: counts.get(status, 0) for status in WorkflowStatusEnum}
+        return {'batch_id': batch_id, 'total': sum(statuses.values()), 'statuses': statuses}, SUCCESS
+
+    return __func()
+
+
+def cancel_delayed_execution(execution_id):
+    @jwt_required
+    @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['execute']))
+    def __func():
+        if not current_app.running_context.executor.cancel_delayed_execution(execution_id):
+            return Problem.from_crud_resource(
+                OBJECT_DNE_ERROR,
+                'delayed execution',
+                'cancel',
+                'Delayed execution {} does not exist or is already due.'.format(execution_id))
+        return None, NO_CONTENT
+
+    return __func()
+
+
 def control_workflow():
     data = request.get_json()
     execution_id = data['execution_id']
@@ -143,22 +478,40 @@ def control_workflow():
     return __func()
 
 
-def clear_workflow_status(all=False, days=30):
+def clear_workflow_status(all=False, days=None, background=False):
     @jwt_required
     @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['read']))
     def __func():
         if all:
-            current_app.running_context.execution_db.session.query(WorkflowStatus).filter(or_(
-                WorkflowStatus.status == WorkflowStatusEnum.aborted,
-                WorkflowStatus.status == WorkflowStatusEnum.completed
-            )).delete()
-        elif days > 0:
-            delete_date = datetime.datetime.today() - datetime.timedelta(days=days)
-            current_app.running_context.execution_db.session.query(WorkflowStatus).filter(and_(
-                WorkflowStatus.status.in_([WorkflowStatusEnum.aborted, WorkflowStatusEnum.completed]),
-                WorkflowStatus.completed_at <= delete_date
-            )).delete(synchronize_session=False)
-        current_app.running_context.execution_db.session.commit()
+            policies = {status: 0 for status in retainable_statuses}
+        elif days is not None:
+            if days <= 0:
+                return None, NO_CONTENT
+            policies = {status: days for status in retainable_statuses}
+        else:
+            try:
+                policies = make_retention_policies(current_app.config['RETENTION_POLICIES'])
+            except ValueError as e:
+                return Problem(SERVER_ERROR, 'Could not clear workflow statuses.', str(e))
+
+        report = current_app.running_context.retention.purge(policies, background=background)
+        if background or report.is_active:
+            return report.as_json(), SUCCESS_ASYNC
+        if report.status == 'failed':
+            return Problem(SERVER_ERROR, 'Could not clear workflow statuses.', report.error)
         return None, NO_CONTENT
 
     return __func()
+
+
+def get_clear_workflow_status_report():
+    @jwt_required
+    @permissions_accepted_for_resources(ResourcePermissions('playbooks', ['read']))
+    def __func():
+        report = current_app.running_context.retention.report
+        if report is None:
+            return Problem(OBJECT_DNE_ERROR, 'Could not read workflow status retention report.',
+                           'No workflow statuses have been cleared.')
+        return report.as_json(), SUCCESS
+
+    return __func()
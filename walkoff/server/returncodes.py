@@ -12,6 +12,8 @@ INVALID_INPUT_ERROR = 400
 UNAUTHORIZED_ERROR = 401
 FORBIDDEN_ERROR = 403
 OBJECT_DNE_ERROR = 404
+PAYLOAD_TOO_LARGE = 413
+TOO_MANY_REQUESTS = 429
 
 # Server Errors
 SERVER_ERROR = 500
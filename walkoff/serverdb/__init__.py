@@ -1,6 +1,7 @@
 import logging
 
 from walkoff.extensions import db
+from walkoff.serverdb.permissionmap import permission_map
 from walkoff.serverdb.resource import Resource, Permission
 from walkoff.serverdb.role import Role
 from walkoff.serverdb.user import User
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from itertools import chain
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+import walkoff.config
+from walkoff.extensions import db
+from walkoff.serverdb.resource import Resource, Permission
+from walkoff.serverdb.role import Role
+
+logger = logging.getLogger(__name__)
+
+PERMISSIONS_VERSION_KEY = 'permissions:version'
+
+
+class PermissionMap(object):
+    def __init__(self, version_key=PERMISSIONS_VERSION_KEY):
+        """Initializes a PermissionMap, which maps each resource and permission to the IDs of the roles which have that
+            permission on that resource. The map is built from the database once, and rebuilt when the roles change.
+            Changes made in this process rebuild it on the next lookup. Changes made in other processes increment a
+            version counter in the cache, which is checked at most once every PERMISSION_MAP_CHECK_INTERVAL_SECONDS.
+
+        Args:
+            version_key (str, optional): The cache key of the version counter. Defaults to 'permissions:version'.
+        """
+        self.version_key = version_key
+        self._roles = None
+        self._version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def get_roles(self, resource_permission, cache=None):
+        """Gets the IDs of the roles which have any of the permissions of a resource
+
+        Args:
+            resource_permission (ResourcePermissions): The resource and its permissions
+            cache (RedisCacheAdapter, optional): The cache holding the version counter. Defaults to the cache of the
+                current app. Without a cache, only changes made in this process are seen.
+
+        Returns:
+            (set[int]): The IDs of the roles
+        """
+        roles = self._get_map(cache if cache is not None else _get_cache())
+        accepted = set()
+        for permission in resource_permission.permissions:
+            accepted |= roles.get((resource_permission.resource, permission), frozenset())
+        return accepted
+
+    def invalidate(self, cache=None):
+        """Invalidates the map in this process, and in every other process sharing the cache
+
+        Args:
+            cache (RedisCacheAdapter, optional): The cache holding the version counter. Defaults to the cache of the
+                current app.
+        """
+        with self._lock:
+            self._roles = None
+        cache = cache if cache is not None else _get_cache()
+        if cache is not None:
+            cache.incr(self.version_key)
+
+    def _get_map(self, cache):
+        now = time.time()
+        with self._lock:
+            roles = self._roles
+            if roles is not None and (cache is None or now - self._checked_at
+                                      < walkoff.config.Config.PERMISSION_MAP_CHECK_INTERVAL_SECONDS):
+                return roles
+
+        version = cache.get(self.version_key) if cache is not None else None
+        with self._lock:
+            if self._roles is not None and version == self._version:
+                self._checked_at = now
+                return self._roles
+
+        roles = self._load()
+        with self._lock:
+            self._roles, self._version, self._checked_at = roles, version, now
+        return roles
+
+    @staticmethod
+    def _load():
+        logger.debug('Loading the permissions of the roles')
+        roles = {}
+        query = db.session.query(Role.id, Resource.name, Permission.name).join(Role.resources).join(
+            Resource.permissions)
+        for role_id, resource, permission in query:
+            roles.setdefault((resource, permission), set()).add(role_id)
+        return {key: frozenset(value) for key, value in roles.items()}
+
+
+permission_map = PermissionMap()
+
+
+def _get_cache():
+    if has_app_context() and hasattr(current_app, 'running_context'):
+        return current_app.running_context.cache
+    return None
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_permission_changes(session, flush_context):
+    if any(isinstance(instance, (Role, Resource, Permission))
+           for instance in chain(session.new, session.dirty, session.deleted)):
+        session.info['permissions_changed'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_permission_map(session):
+    if session.info.pop('permissions_changed', False):
+        permission_map.invalidate()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_permission_changes(session):
+    session.info.pop('permissions_changed', None)
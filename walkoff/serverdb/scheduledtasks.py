@@ -118,7 +118,7 @@ class ScheduledTask(db.Model, TrackModificationsMixIn):
         from flask import current_app
         trigger = trigger if trigger is not None else construct_trigger(self._reconstruct_scheduler_args())
         current_app.running_context.scheduler.schedule_workflows(self.id,
-                                                                 current_app.running_context.executor.execute_workflow,
+                                                                 current_app.running_context.executor.execute_workflows,
                                                                  self._get_workflow_ids_as_list(), trigger)
 
     def _stop_workflows(self):
@@ -137,7 +137,7 @@ class ScheduledTask(db.Model, TrackModificationsMixIn):
             trigger = trigger if trigger is not None else construct_trigger(self._reconstruct_scheduler_args())
             if new:
                 current_app.running_context.scheduler.schedule_workflows(self.id,
-                                                                         current_app.running_context.executor.execute_workflow,
+                                                                         current_app.running_context.executor.execute_workflows,
                                                                          new, trigger)
             if removed:
                 current_app.running_context.scheduler.unschedule_workflows(self.id, removed)
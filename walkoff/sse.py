@@ -1,5 +1,6 @@
 import collections
 import json
+import threading
 from functools import wraps
 
 from flask import Response, Blueprint
@@ -59,11 +60,21 @@ class SseEvent(object):
         self.data = data
 
     @staticmethod
-    def __convert_dict(data):
-        try:
-            return json.dumps(data)
-        except TypeError:
-            return str(data)
+    def serialize(data):
+        """Serializes the data of an event to the form it should be sent to the client
+
+        Args:
+            data: The data to serialize
+
+        Returns:
+            The JSON of the data if it is a `dict`, otherwise the data unchanged
+        """
+        if isinstance(data, dict):
+            try:
+                return json.dumps(data)
+            except TypeError:
+                return str(data)
+        return data
 
     def format(self, event_id, retry=None):
         """Get this SSE formatted as needed to send to the client
@@ -76,10 +87,7 @@ class SseEvent(object):
         Returns:
             (str): This SSE formatted to be sent to the client
         """
-        if isinstance(self.data, dict):
-            data = SseEvent.__convert_dict(self.data)
-        else:
-            data = self.data
+        data = SseEvent.serialize(self.data)
         formatted = 'id: {}\n'.format(event_id)
         if self.event:
             formatted += 'event: {}\n'.format(self.event)
@@ -90,6 +98,62 @@ class SseEvent(object):
         return formatted + '\n'
 
 
+class SseProjectionCache(object):
+    """A bounded cache of projected Server-Sent Events shared by all the subscribers of a process
+
+    Subscribers which use the same projection receive the same raw message from the cache, so the projection and the
+    JSON serialization of its result only need to be done once per projection rather than once per subscriber.
+
+    Attributes:
+        max_size (int): The maximum number of projected events to hold
+        _events (OrderedDict): A lookup of (projection key, raw message) to the projected SseEvent
+        _lock (Lock): The lock used to synchronize access to the events
+
+    Args:
+        max_size (int, optional): The maximum number of projected events to hold. Defaults to 32
+    """
+
+    def __init__(self, max_size=32):
+        self.max_size = max_size
+        self._events = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, projection, message):
+        """Gets the projected event for a raw message, projecting and serializing it if it has not been seen
+
+        Args:
+            projection: The projection to apply. This must have a hashable `key` attribute which uniquely identifies
+                the projection, and must be callable with the (data, event) of the message. It should return the
+                projected (data, event) or None if the message should not be sent.
+            message (str): The raw JSON message received from the cache
+
+        Returns:
+            (SseEvent): The projected event with its data already serialized, or None if the event should be skipped
+        """
+        key = (projection.key, message)
+        with self._lock:
+            if key in self._events:
+                return self._events[key]
+        response = json.loads(message)
+        projected = projection(response['data'], response['event'])
+        if projected is not None:
+            data, event = projected
+            projected = SseEvent(event, SseEvent.serialize(data) if data else data)
+        with self._lock:
+            self._events[key] = projected
+            if len(self._events) > self.max_size:
+                self._events.popitem(last=False)
+        return projected
+
+    def clear(self):
+        """Removes all cached events"""
+        with self._lock:
+            self._events.clear()
+
+
+projection_cache = SseProjectionCache()
+
+
 class SseStream(object):
     """A class to help push data across an Server-Sent Event stream.
 
@@ -171,6 +235,9 @@ class SseStream(object):
                 `_default_headers` attribute, but can be overwritten.
             retry (int): The
 
+        Kwargs:
+            projection (optional): A projection to apply to the events of this stream. See `send`
+
         Returns:
             (Response): A Flask Response object which creates the SSE stream
 
@@ -197,7 +264,7 @@ class SseStream(object):
         """
         return self.cache.subscribe(self.channel)
 
-    def send(self, retry=None, **kwargs):
+    def send(self, retry=None, projection=None, **kwargs):
         """Sends data through the SSE stream to the client.
 
         This function is primarily used by the `stream` function to generate the Response object
@@ -205,6 +272,10 @@ class SseStream(object):
         Args:
             retry (int): The time in milliseconds the client should wait to retry to connect to this SSE stream if the
                 connection is broken. Default is 3 seconds (3000 milliseconds)
+            projection (optional): A projection to apply to each event before it is sent. It must have a hashable
+                `key` attribute and be callable with the (data, event) of the event, returning the (data, event) to
+                send or None to skip the event. Projected events are shared between the subscribers of the process
+                with the same projection key. Defaults to None
 
         Yields:
             (str): The string to push through the SSE stream to the client
@@ -217,9 +288,13 @@ class SseStream(object):
                 continue
             if isinstance(response, binary_type):
                 response = response.decode('utf-8')
-            response = json.loads(response)
-            data, event = response['data'], response['event']
-            sse = SseEvent(event, data)
+            if projection is not None:
+                sse = projection_cache.get(projection, response)
+                if sse is None:
+                    continue
+            else:
+                response = json.loads(response)
+                sse = SseEvent(response['event'], response['data'])
             event_id += 1
             yield sse.format(event_id, retry=retry)
 
@@ -282,7 +357,7 @@ class FilteredSseStream(SseStream):
     def subscribe(self, **kwargs):
         return self.cache.subscribe(self.create_subchannel_name(kwargs.get('subchannel', '')))
 
-    def stream(self, subchannel='', headers=None, retry=None):
+    def stream(self, subchannel='', headers=None, retry=None, projection=None):
         """Returns a response used by Flask to create an SSE stream.
 
         This function should be called as the return from a Flask view function
@@ -292,6 +367,7 @@ class FilteredSseStream(SseStream):
             headers (dict): The headers to use for this steam. Some default headers are included by in the
                 `_default_headers` attribute, but can be overwritten.
             retry (int): The
+            projection (optional): A projection to apply to the events of this stream. See `SseStream.send`
 
         Returns:
             (Response): A Flask Response object which creates the SSE stream
@@ -300,7 +376,7 @@ class FilteredSseStream(SseStream):
         stream_headers = self._default_headers
         if headers:
             stream_headers.update(headers)
-        return Response(self.send(retry=retry, subchannel=subchannel),
+        return Response(self.send(retry=retry, subchannel=subchannel, projection=projection),
                         mimetype='text/event-stream', headers=stream_headers)
 
     def unsubscribe(self, subchannel):
@@ -1,4 +1,6 @@
 import logging
+import threading
+import time
 from collections import namedtuple
 from uuid import uuid4
 
@@ -7,6 +9,7 @@ import requests
 from walkoff.appgateway import get_app_action, get_condition, get_transform
 from walkoff.appgateway.actionresult import ActionResult
 from walkoff.appgateway.apiutil import get_app_action_api, get_condition_api, get_transform_api
+from walkoff.appgateway.httpclient import HttpClient
 from walkoff.helpers import ExecutionError
 
 logger = logging.getLogger(__name__)
@@ -57,6 +60,7 @@ class LocalActionExecutionStrategy(object):
         'condition': _ActionLookupKey(get_condition_api, get_condition),
         'transform': _ActionLookupKey(get_transform_api, get_transform)
     }
+    supports_segments = False
 
     def __init__(self, fully_cached=False):
         self.fully_cached = fully_cached
@@ -104,14 +108,150 @@ class LocalActionExecutionStrategy(object):
         return result
 
 
-class RemoteActionExecutionStrategy(object):
+class CircuitBreaker(object):
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        """Initializes a CircuitBreaker, which stops requests to a service after it has failed too many times in a row.
+            Once reset_timeout seconds have passed, a single request is let through to check whether the service has
+            recovered.
+
+        Args:
+            failure_threshold (int, optional): The number of consecutive failures after which the circuit is opened.
+                Defaults to 5. 0 never opens it.
+            reset_timeout (float, optional): The number of seconds the circuit stays open. Defaults to 30.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._is_probing = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Determines whether a request may be sent to the service
+
+        Returns:
+            (bool): False if the circuit is open
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._is_probing or time.time() - self.opened_at < self.reset_timeout:
+                return False
+            self._is_probing = True
+            return True
+
+    def record_success(self):
+        """Records a request which succeeded, closing the circuit"""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._is_probing = False
+
+    def record_failure(self):
+        """Records a request which failed, opening the circuit if the failure threshold has been reached"""
+        with self._lock:
+            self.failures += 1
+            if self._is_probing or (self.failure_threshold and self.failures >= self.failure_threshold):
+                self.opened_at = time.time()
+            self._is_probing = False
+
+    def is_open(self):
+        with self._lock:
+            return self.opened_at is not None
+
 
-    def __init__(self, workflow_context):
+class RemoteActionExecutionStrategy(object):
+    _services = {}
+    _services_lock = threading.Lock()
+    supports_segments = True
+
+    def __init__(self, workflow_context, timeout=30, max_retries=2, backoff_factor=0.2, max_connections=10,
+                 failure_threshold=5, reset_timeout=30):
+        """Initializes a RemoteActionExecutionStrategy, which executes actions, conditions, and transforms by sending
+            them to the service of their app. The connections to each app service and its circuit breaker are shared by
+            all of the workflows executing in the process.
+
+        Args:
+            workflow_context (RestrictedWorkflowContext): The context of the executing workflow
+            timeout (float, optional): The number of seconds to wait for an app service to respond. Defaults to 30.
+            max_retries (int, optional): The maximum number of times to retry a request which could not connect.
+                Defaults to 2.
+            backoff_factor (float, optional): The factor of the exponential backoff between retries. Defaults to 0.2.
+            max_connections (int, optional): The maximum number of connections kept open to each app service.
+                Defaults to 10.
+            failure_threshold (int, optional): The number of consecutive failures after which requests to an app
+                service fail immediately. Defaults to 5. 0 disables the circuit breaker.
+            reset_timeout (float, optional): The number of seconds to fail requests to an app service for, before
+                trying it again. Defaults to 30.
+        """
         self.workflow_context = workflow_context
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_connections = max_connections
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    @classmethod
+    def from_config(cls, config, workflow_context):
+        """Creates a RemoteActionExecutionStrategy from the Walkoff configuration
+
+        Args:
+            config (Config): The Walkoff configuration
+            workflow_context (RestrictedWorkflowContext): The context of the executing workflow
+
+        Returns:
+            (RemoteActionExecutionStrategy): The strategy
+        """
+        options = {'timeout': 'REMOTE_ACTION_TIMEOUT_SECONDS',
+                   'max_retries': 'REMOTE_ACTION_MAX_RETRIES',
+                   'backoff_factor': 'REMOTE_ACTION_BACKOFF_FACTOR',
+                   'max_connections': 'REMOTE_ACTION_MAX_CONNECTIONS',
+                   'failure_threshold': 'REMOTE_ACTION_CIRCUIT_BREAKER_THRESHOLD',
+                   'reset_timeout': 'REMOTE_ACTION_CIRCUIT_BREAKER_RESET_SECONDS'}
+        kwargs = {option: getattr(config, name) for option, name in options.items() if hasattr(config, name)}
+        return cls(workflow_context, **kwargs)
 
     @staticmethod
-    def format_url(app_name, worfklow_exec_id, executable_exec_id):
-        return 'https://{}-svc/workflows/{}/executables/{}'.format(app_name, worfklow_exec_id, executable_exec_id)
+    def format_service_url(app_name):
+        return 'https://{}-svc'.format(app_name)
+
+    @classmethod
+    def format_url(cls, app_name, worfklow_exec_id, executable_exec_id):
+        return '{}/workflows/{}/executables/{}'.format(
+            cls.format_service_url(app_name), worfklow_exec_id, executable_exec_id)
+
+    @classmethod
+    def format_segment_url(cls, app_name, workflow_exec_id):
+        return '{}/workflows/{}/segments'.format(cls.format_service_url(app_name), workflow_exec_id)
+
+    @classmethod
+    def clear_services(cls):
+        """Closes the connections to all of the app services and resets their circuit breakers"""
+        with cls._services_lock:
+            services = list(cls._services.values())
+            cls._services.clear()
+        for client, _ in services:
+            client.close()
+
+    def get_service(self, app_name):
+        """Gets the HTTP client and circuit breaker of an app service
+
+        Args:
+            app_name (str): The name of the app
+
+        Returns:
+            (tuple(HttpClient, CircuitBreaker)): The client and circuit breaker
+        """
+        with self._services_lock:
+            service = self._services.get(app_name)
+            if service is None:
+                client = HttpClient(self.format_service_url(app_name), timeout=self.timeout,
+                                    max_connections=self.max_connections, max_retries=self.max_retries,
+                                    backoff_factor=self.backoff_factor)
+                service = self._services[app_name] = (
+                    client, CircuitBreaker(self.failure_threshold, self.reset_timeout))
+            return service
 
     def execute(self, executable, accumulator, arguments, instance=None):
         context = ExecutableContext.from_executable(executable)
@@ -141,31 +281,116 @@ class RemoteActionExecutionStrategy(object):
             'executable_context': execution_context,
             'arguments': arguments
         }
-        url = RemoteActionExecutionStrategy.format_url(app_name, self.workflow_context.execution_id, execution_id)
-        response = requests.post(url, json=request_json)
-        data = response.json()
+        url = self.format_url(app_name, self.workflow_context.execution_id, execution_id)
+        client, circuit_breaker = self.get_service(app_name)
+        if not circuit_breaker.allow_request():
+            return self._handle_error(context, 'app service {} is unavailable'.format(app_name))
+        try:
+            response = client.post(url, json=request_json)
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            circuit_breaker.record_failure()
+            return self._handle_error(context, 'request failed: {}'.format(e))
+        if response.status_code >= 500:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+
         if response.status_code == 200:
             if context.is_action():
-                result = ActionResult(None, data['status'])
+                result = ActionResult(data.get('result'), data['status'])
+            elif 'result' in data:
+                result = data['result']
             else:
                 result = accumulator[str(context.id)]
             if data['status'] == 'UnhandledException' and not context.is_action():
                 raise ExecutionError(message=result)
             return result
         else:
-            message = 'Error executing {} {} (id={}) remotely: {{status: {}, data: {}}}'.format(
-                context.type,
-                context.executable_name,
-                context.id,
-                response.status_code,
-                data
-            )
-
-            logger.error(message)
-            if context.is_action():
-                return ActionResult(None, 'UnhandledException')
+            return self._handle_error(context, '{{status: {}, data: {}}}'.format(response.status_code, data))
+
+    def execute_segment(self, executables, data_in, accumulator):
+        """Executes a segment of transforms and a condition which belong to the same app in a single request to its
+            service. The output of each one is the input of the next.
+
+        Args:
+            executables (list[Transform|Condition]): The transforms and condition to execute, in order
+            data_in: The input of the first executable
+            accumulator (dict): The accumulated data from previous Actions.
+
+        Returns:
+            (tuple(list[str], any)): The status of each executable, and the output of the last one which succeeded, or
+                data_in if none of them did
+        """
+        app_name = executables[0].app_name
+        request_json = {
+            'workflow_context': {'id': self.workflow_context.id, 'name': self.workflow_context.name},
+            'data_in': data_in,
+            'executables': [self._format_segment_executable(executable) for executable in executables]
+        }
+        failed = ['UnhandledException'] * len(executables), data_in
+        url = self.format_segment_url(app_name, self.workflow_context.execution_id)
+        client, circuit_breaker = self.get_service(app_name)
+        if not circuit_breaker.allow_request():
+            logger.error('Error executing segment remotely: app service {} is unavailable'.format(app_name))
+            return failed
+        try:
+            response = client.post(url, json=request_json)
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            circuit_breaker.record_failure()
+            logger.error('Error executing segment remotely: request failed: {}'.format(e))
+            return failed
+        if response.status_code >= 500:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+
+        if response.status_code != 200:
+            logger.error('Error executing segment remotely: {{status: {}, data: {}}}'.format(
+                response.status_code, data))
+            return failed
+        statuses = [result['status'] for result in data['results']]
+        result_index = data['result_index']
+        if result_index < 0:
+            return statuses, data_in
+        elif 'result' in data:
+            return statuses, data['result']
+        else:
+            return statuses, accumulator[str(executables[result_index].id)]
+
+    @staticmethod
+    def _format_segment_executable(executable):
+        arguments = []
+        for argument in executable.arguments:
+            if argument.reference:
+                arguments.append({'name': argument.name, 'reference': str(argument.reference),
+                                  'selection': argument.selection or []})
             else:
-                raise ExecutionError(message=message)
+                arguments.append({'name': argument.name, 'value': argument.value})
+        return {
+            'executable_context': {
+                'name': executable.action_name,
+                'type': executable.__class__.__name__.lower(),
+                'id': str(executable.id)
+            },
+            'arguments': arguments
+        }
+
+    @staticmethod
+    def _handle_error(context, reason):
+        message = 'Error executing {} {} (id={}) remotely: {}'.format(
+            context.type,
+            context.executable_name,
+            context.id,
+            reason
+        )
+
+        logger.error(message)
+        if context.is_action():
+            return ActionResult(None, 'UnhandledException')
+        else:
+            raise ExecutionError(message=message)
 
 
 def make_local_execution_strategy(config, workflow_context, **kwargs):
@@ -173,7 +398,7 @@ def make_local_execution_strategy(config, workflow_context, **kwargs):
 
 
 def make_remote_execution_strategy(config, workflow_context, **kwargs):
-    return RemoteActionExecutionStrategy(workflow_context)
+    return RemoteActionExecutionStrategy.from_config(config, workflow_context)
 
 
 execution_strategy_lookup = {
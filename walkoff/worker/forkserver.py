@@ -0,0 +1,186 @@
+import errno
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+from gevent import reinit
+from gevent.monkey import get_original
+
+import walkoff.appgateway
+import walkoff.config
+from walkoff.executiondb import ExecutionDatabase
+from walkoff.worker.worker import Worker
+
+logger = logging.getLogger(__name__)
+
+# The template process never runs a gevent hub, so it uses these functions as they were before any monkey patching
+_fork = get_original('os', 'fork')
+_waitpid = get_original('os', 'waitpid')
+_signal = get_original('signal', 'signal')
+
+try:
+    _fork_context = multiprocessing.get_context('fork')
+except AttributeError:
+    # Python 2, which always forks on POSIX
+    _fork_context = multiprocessing
+
+
+class WorkerForkServer(object):
+    def __init__(self, config_path, worker_class=Worker):
+        """Initialize a WorkerForkServer object, which starts Workers by forking them from a template process. The
+            template loads the configuration, imports the apps, and creates the execution database once, and the
+            Workers share its memory copy-on-write. Connections to the database, the cache, and the sockets are still
+            opened by each Worker after it is forked.
+
+        Args:
+            config_path (str): The path to the configuration file to be loaded
+            worker_class (cls, optional): The class to run in each forked process. Defaults to Worker.
+        """
+        self.config_path = config_path
+        self.worker_class = worker_class
+        self.process = None
+        self._requests = None
+        self._responses = None
+
+    def start(self):
+        """Starts the template process and waits for it to finish loading
+
+        Returns:
+            (bool): Whether or not the template process was started successfully
+        """
+        # One-way pipes are used rather than a socket pair, whose sockets can be made non-blocking by gevent
+        requests, child_requests = multiprocessing.Pipe(duplex=False)
+        child_responses, responses = multiprocessing.Pipe(duplex=False)
+        self.process = _fork_context.Process(
+            target=self._serve, args=(requests, responses), name='WorkerForkServer')
+        self.process.start()
+        requests.close()
+        responses.close()
+        try:
+            is_ready = child_responses.recv()
+        except EOFError:
+            is_ready = False
+        if not is_ready:
+            logger.error('Worker fork server could not be started')
+            self.process.join(timeout=3)
+            child_requests.close()
+            child_responses.close()
+            return False
+        self._requests = child_requests
+        self._responses = child_responses
+        return True
+
+    def spawn_worker(self, id_):
+        """Forks a Worker from the template process
+
+        Args:
+            id_ (int): The ID of the worker
+
+        Returns:
+            (WorkerProcess): The forked process
+        """
+        self._requests.send(id_)
+        return WorkerProcess(self._responses.recv())
+
+    def _serve(self, requests, responses):
+        _signal(signal.SIGINT, signal.SIG_IGN)
+        _signal(signal.SIGABRT, _exit_handler)
+        _signal(signal.SIGTERM, _exit_handler)
+        try:
+            self._load()
+        except Exception:
+            logger.exception('Worker fork server could not load')
+            responses.send(False)
+            os._exit(1)
+        _signal(signal.SIGCHLD, _reap_children)
+        responses.send(True)
+
+        while True:
+            try:
+                id_ = requests.recv()
+            except EOFError:
+                os._exit(0)
+            pid = _fork()
+            if pid == 0:
+                reinit()
+                requests.close()
+                responses.close()
+                for signum in (signal.SIGINT, signal.SIGABRT, signal.SIGTERM, signal.SIGCHLD):
+                    _signal(signum, signal.SIG_DFL)
+                exit_code = 0
+                try:
+                    self.worker_class(id_, self.config_path, preloaded=True)
+                except Exception:
+                    logger.exception('Worker {} exited with an error'.format(id_))
+                    exit_code = 1
+                finally:
+                    os._exit(exit_code)
+            logger.info('Forked worker {0} as process {1}'.format(id_, pid))
+            responses.send(pid)
+
+    def _load(self):
+        """Does the work which every Worker would otherwise repeat, so that it is shared by all of them"""
+        if walkoff.config.Config.SEPARATE_WORKERS:
+            walkoff.config.initialize(config_path=self.config_path)
+        else:
+            walkoff.config.Config.load_config(self.config_path)
+            walkoff.config.Config.load_env_vars()
+            walkoff.config.Config.read_and_set_zmq_keys()
+        walkoff.appgateway.import_lazy_apps()
+        execution_db = ExecutionDatabase(walkoff.config.Config.EXECUTION_DB_TYPE,
+                                         walkoff.config.Config.EXECUTION_DB_PATH,
+                                         walkoff.config.Config.EXECUTION_DB_HOST)
+        execution_db.tear_down()
+
+
+class WorkerProcess(object):
+    def __init__(self, pid):
+        """Initialize a WorkerProcess object, a handle to a Worker forked by a WorkerForkServer. It can be shut down in
+            the same way as a multiprocessing Process
+
+        Args:
+            pid (int): The ID of the process
+        """
+        self.pid = pid
+
+    def is_alive(self):
+        """Determines if the process is still running. The template process reaps its Workers as they exit
+
+        Returns:
+            (bool): Is the process alive?
+        """
+        try:
+            os.kill(self.pid, 0)
+        except OSError as e:
+            return e.errno == errno.EPERM
+        return True
+
+    def join(self, timeout=None):
+        """Waits for the process to exit
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait. Defaults to None, waiting indefinitely
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        delay = 0.01
+        while self.is_alive() and (deadline is None or time.time() < deadline):
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+
+def _reap_children(signum, frame):
+    while True:
+        try:
+            pid, _ = _waitpid(-1, os.WNOHANG)
+        except OSError as e:
+            if e.errno == errno.ECHILD:
+                return
+            raise
+        if pid == 0:
+            return
+
+
+def _exit_handler(signum, frame):
+    os._exit(0)
@@ -12,9 +12,12 @@ from nacl.public import PrivateKey
 
 import walkoff.cache
 import walkoff.config
+from walkoff.appgateway.appinstancepool import AppInstancePool
 from walkoff.appgateway.appinstancerepo import AppInstanceRepo
+from walkoff.appgateway.httpclient import shutdown_http_client_pool
 from walkoff.events import WalkoffEvent
 from walkoff.executiondb import ExecutionDatabase
+from walkoff.multiprocessedexecutor.affinity import get_worker_lanes
 from walkoff.senders_receivers_helpers import make_results_sender, make_communication_receiver
 from walkoff.worker.workflow_exec_strategy import WorkflowExecutor
 from walkoff.worker.zmq_workflow_receivers import WorkerCommunicationMessageType, WorkflowCommunicationMessageType, \
@@ -24,19 +27,23 @@ logger = logging.getLogger(__name__)
 
 
 class Worker(object):
-    def __init__(self, id_, config_path):
+    def __init__(self, id_, config_path, preloaded=False):
         """Initialize a Worker object, which will be managing the execution of Workflows
 
         Args:
             id_ (str): The ID of the worker
             config_path (str): The path to the configuration file to be loaded
+            preloaded (bool, optional): Whether the worker was forked from a WorkerForkServer, which has already loaded
+                the configuration, imported the apps, and created the execution database. Defaults to False.
         """
         self.id_ = id_
         self._lock = Lock()
         signal.signal(signal.SIGINT, self.exit_handler)
         signal.signal(signal.SIGABRT, self.exit_handler)
 
-        if walkoff.config.Config.SEPARATE_WORKERS or os.name == 'nt':
+        if preloaded:
+            pass
+        elif walkoff.config.Config.SEPARATE_WORKERS or os.name == 'nt':
             walkoff.config.initialize(config_path=config_path)
         else:
             walkoff.config.Config.load_config(config_path)
@@ -49,7 +56,8 @@ class Worker(object):
 
         self.execution_db = ExecutionDatabase(walkoff.config.Config.EXECUTION_DB_TYPE,
                                               walkoff.config.Config.EXECUTION_DB_PATH,
-                                              walkoff.config.Config.EXECUTION_DB_HOST)
+                                              walkoff.config.Config.EXECUTION_DB_HOST,
+                                              create_schema=not preloaded)
 
         @WalkoffEvent.CommonWorkflowSignal.connect
         def handle_data_sent(sender, **kwargs):
@@ -67,17 +75,21 @@ class Worker(object):
 
         self.capacity = walkoff.config.Config.NUMBER_THREADS_PER_PROCESS
 
-        self.workflow_receiver = WorkflowReceiver(key, server_key, walkoff.config.Config.CACHE)
+        lanes = get_worker_lanes(id_, walkoff.config.Config.WORKER_AFFINITY_SHARDS,
+                                 walkoff.config.Config.NUMBER_PROCESSES)
+        self.workflow_receiver = WorkflowReceiver(key, server_key, walkoff.config.Config.CACHE, lanes=lanes)
         data = {'execution_db': self.execution_db, 'socket_id': socket_id}
         self.workflow_results_sender = make_results_sender(**data)
         data = {'socket_id': socket_id}
         self.workflow_communication_receiver = make_communication_receiver(**data)
 
+        self.app_instance_pool = AppInstancePool.from_config(walkoff.config.Config)
         self.workflow_executor = WorkflowExecutor(
             walkoff.config.Config,
             self.capacity,
             self.execution_db,
-            AppInstanceRepo
+            AppInstanceRepo,
+            app_instance_pool=self.app_instance_pool
         )
 
         self.comm_thread = threading.Thread(target=self.receive_communications)
@@ -91,11 +103,12 @@ class Worker(object):
         self.receive_workflows()
 
     def wait_for_ready(self):
-        """Waits for the worker to be ready"""
-        while True:
-            if self.workflow_receiver.is_ready() and self.workflow_results_sender.is_ready() and \
-                    self.workflow_communication_receiver.is_ready():
-                break
+        """Waits for the worker to be ready, backing off between checks"""
+        delay = 0.01
+        while not (self.workflow_receiver.is_ready() and self.workflow_results_sender.is_ready()
+                   and self.workflow_communication_receiver.is_ready()):
+            time.sleep(delay)
+            delay = min(delay * 2, 1)
 
         self.workflow_results_sender.send_ready_message()
 
@@ -106,6 +119,9 @@ class Worker(object):
         self.workflow_receiver.shutdown()
         if self.threadpool:
             self.threadpool.shutdown()
+        if self.app_instance_pool:
+            self.app_instance_pool.shutdown()
+        shutdown_http_client_pool()
         self.workflow_communication_receiver.shutdown()
         if self.comm_thread:
             self.comm_thread.join(timeout=2)
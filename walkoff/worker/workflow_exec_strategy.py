@@ -6,6 +6,7 @@ from walkoff.events import WalkoffEvent
 from walkoff.executiondb.saved_workflow import SavedWorkflow
 from walkoff.executiondb.workflow import Workflow
 from walkoff.executiondb.workflowresults import WorkflowStatus, WorkflowStatusEnum
+from walkoff.multiprocessedexecutor.triggermatching import claim_awaiting_executions
 from walkoff.worker.action_exec_strategy import make_execution_strategy
 from walkoff.worker.workflow_exec_context import WorkflowExecutionContext
 
@@ -126,11 +127,13 @@ class WorkflowExecutor(object):
         'serial': SerialWorkflowExecutionStrategy
     }
 
-    def __init__(self, config, max_workflows, execution_db, app_instance_repo_class, executing_workflow_repo=dict):
+    def __init__(self, config, max_workflows, execution_db, app_instance_repo_class, executing_workflow_repo=dict,
+                 app_instance_pool=None):
         self.max_workflows = max_workflows
         self.execution_db = execution_db
         self.config = config
         self._app_instance_repo_class = app_instance_repo_class
+        self.app_instance_pool = app_instance_pool
         self.executing_workflows = executing_workflow_repo()
         self._lock = threading.Lock()
 
@@ -153,7 +156,7 @@ class WorkflowExecutor(object):
                 workflow_execution_id))
 
     def make_new_context(self, workflow, workflow_execution_id, user=None):
-        app_instance_repo = self._app_instance_repo_class()
+        app_instance_repo = self._app_instance_repo_class(pool=self.app_instance_pool)
         return WorkflowExecutionContext(workflow, app_instance_repo, workflow_execution_id, user)
 
     def make_resumed_context(self, workflow, workflow_execution_id, user=None):
@@ -164,12 +167,13 @@ class WorkflowExecutor(object):
                 workflow_execution_id))
             return None
 
-        workflow_context = WorkflowExecutionContext(workflow, self._app_instance_repo_class(saved_state.app_instances),
-                                                    workflow_execution_id, resumed=True, user=user)
+        app_instance_repo = self._app_instance_repo_class(saved_state.app_instances, pool=self.app_instance_pool)
+        workflow_context = WorkflowExecutionContext(workflow, app_instance_repo, workflow_execution_id, resumed=True,
+                                                    user=user)
         return workflow_context
 
     def execute(self, workflow_id, workflow_execution_id, start, start_arguments=None, resume=False,
-                environment_variables=None, user=None):
+                environment_variables=None, user=None, trigger_data=None):
         """Execute a workflow
 
         Args:
@@ -181,7 +185,17 @@ class WorkflowExecutor(object):
             environment_variables (list[EnvironmentVariable]): Optional list of environment variables to pass into
                 the workflow. These will not be persistent.
             user (str, optional): The username who requested the workflow be executed. Defaults to None.
+            trigger_data (optional): The data sent to the trigger of the starting Action of a workflow awaiting data.
+                The workflow is only resumed if the trigger accepts the data. Defaults to None.
         """
+        try:
+            self._execute(workflow_id, workflow_execution_id, start, start_arguments=start_arguments, resume=resume,
+                          environment_variables=environment_variables, user=user, trigger_data=trigger_data)
+        finally:
+            self.execution_db.remove_session()
+
+    def _execute(self, workflow_id, workflow_execution_id, start, start_arguments=None, resume=False,
+                 environment_variables=None, user=None, trigger_data=None):
         self.execution_db.session.expire_all()
 
         workflow_status = self.execution_db.session.query(WorkflowStatus).filter_by(
@@ -209,13 +223,36 @@ class WorkflowExecutor(object):
             self.executing_workflows[threading.current_thread().name] = workflow_context
 
         action_execution_strategy = make_execution_strategy(self.config, workflow_context)
-        workflow_execution_strategy = self.workflow_execution_strategies['serial'](action_execution_strategy)
-        workflow_execution_strategy.execute(workflow_context, start=start,
-                                            start_arguments=start_arguments, resume=resume,
-                                            environment_variables=environment_variables)
+        if trigger_data is None or self._take_trigger(workflow_context, action_execution_strategy, start,
+                                                      trigger_data):
+            workflow_execution_strategy = self.workflow_execution_strategies['serial'](action_execution_strategy)
+            workflow_execution_strategy.execute(workflow_context, start=start,
+                                                start_arguments=start_arguments, resume=resume,
+                                                environment_variables=environment_variables)
+        # A workflow which paused or is awaiting a trigger was saved with copies of its app instances
+        workflow_context.app_instance_repo.release_instances()
         with self._lock:
             self.executing_workflows.pop(threading.current_thread().name)
 
+    def _take_trigger(self, workflow_context, action_execution_strategy, start, trigger_data):
+        action = workflow_context.get_action_by_id(start if isinstance(start, UUID) else UUID(start))
+        if action is None or action.trigger is None:
+            logger.error('Attempted to send data to workflow {}, but it is not awaiting data'.format(
+                workflow_context.execution_id))
+            return False
+        workflow_context.executing_action = action
+
+        if not action.execute_trigger(action_execution_strategy, trigger_data, workflow_context.accumulator):
+            WalkoffEvent.CommonWorkflowSignal.send(action, event=WalkoffEvent.TriggerActionNotTaken)
+            return False
+
+        if not claim_awaiting_executions(self.execution_db.session, [workflow_context.execution_id]):
+            logger.info('Workflow {} was already resumed by other trigger data'.format(workflow_context.execution_id))
+            return False
+
+        WalkoffEvent.CommonWorkflowSignal.send(action, event=WalkoffEvent.TriggerActionTaken)
+        return True
+
     def get_current_workflow(self):
         with self._lock:
             if threading.currentThread().name in self.executing_workflows:
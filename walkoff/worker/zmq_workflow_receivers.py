@@ -1,3 +1,4 @@
+import json
 import logging
 from collections import namedtuple
 
@@ -13,6 +14,7 @@ import walkoff.cache
 import walkoff.config
 from walkoff.executiondb.argument import Argument
 from walkoff.executiondb.environment_variable import EnvironmentVariable
+from walkoff.multiprocessedexecutor.affinity import REQUEST_QUEUE
 from walkoff.multiprocessedexecutor.protoconverter import ProtobufWorkflowCommunicationConverter
 from walkoff.proto.build.data_pb2 import CommunicationPacket, WorkflowControl, ExecuteWorkflowMessage
 
@@ -112,7 +114,7 @@ class ZmqWorkflowCommunicationReceiver(object):
 
 
 class WorkflowReceiver(object):
-    def __init__(self, key, server_key, cache_config):
+    def __init__(self, key, server_key, cache_config, lanes=None):
         """Initializes a WorkflowReceiver object, which receives workflow execution requests and ships them off to a
             worker to execute
 
@@ -120,12 +122,15 @@ class WorkflowReceiver(object):
             key (PrivateKey): The NaCl PrivateKey generated by the Worker
             server_key (PrivateKey): The NaCl PrivateKey generated by the Worker
             cache_config (dict): Cache configuration
+            lanes (list[str], optional): The request queues to receive from, in the order in which to check them.
+                Defaults to only the shared request queue.
         """
         self._ready = False
         self._exit = False
 
         self.key = key
         self.server_key = server_key
+        self.lanes = lanes or [REQUEST_QUEUE]
         self.cache = walkoff.cache.make_cache(cache_config)
 
         if self.check_status():
@@ -147,7 +152,7 @@ class WorkflowReceiver(object):
         logger.info('Starting workflow receiver')
         box = Box(self.key, self.server_key)
         while not self._exit:
-            received_message = self.cache.rpop("request_queue")
+            received_message = self._receive_message()
             if received_message is not None:
                 try:
                     decrypted_msg = box.decrypt(received_message)
@@ -178,11 +183,19 @@ class WorkflowReceiver(object):
                     if hasattr(message, 'user'):
                         user = message.user
 
+                    trigger_data = None
+                    if message.HasField('trigger_data_in'):
+                        trigger_data = json.loads(message.trigger_data_in)
+
                     yield message.workflow_id, message.workflow_execution_id, start, start_arguments, message.resume, \
-                          env_vars, user
+                          env_vars, user, trigger_data
             else:
                 yield None
         return
 
+    def _receive_message(self):
+        response = self.cache.brpop(self.lanes, timeout=walkoff.config.Config.WORKFLOW_RECEIVER_TIMEOUT_SECONDS)
+        return response[1] if response is not None else None
+
     def is_ready(self):
         return self._ready